@@ -5,10 +5,25 @@ Monitors sensor data and triggers alarms when thresholds are exceeded
 import paho.mqtt.client as mqtt
 import json
 import os
+import socket
 import sys
 import ssl
-from datetime import datetime
+import threading
+import time
 from dotenv import load_dotenv
+from paho.mqtt.properties import Properties
+from paho.mqtt.packettypes import PacketTypes
+
+from src.alerts.alert_system import AlertSystem, SENSOR_EMOJI, reading_time, room_from_topic
+from src.alerts.batch import BatchEvaluator, MicroBatcher
+from src.alerts.lanes import DEFAULT_ROUTINE_MAX, Prescreen, PriorityLanes
+from src.alerts.latency import format_report, transit_ns
+from src.alerts.notify import NotificationDispatcher
+from src.alerts.partition import PartitionRouter, room_key
+from src.alerts.persistence import CatchUp, StateSnapshotter
+from src.alerts.topk import DEFAULT_TOPK_FILE, worker_path
+
+PROCESS_START = time.perf_counter()
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,6 +42,48 @@ MQTT_TOPICS = [
     os.getenv("MQTT_TOPIC_LIGHT", "hostel/room1/light")
 ]
 
+# Horizontal scaling: N workers share $share/<group>/<topic>; each room is owned by one worker
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", 1))
+ALERT_WORKER_ID = int(os.getenv("ALERT_WORKER_ID", 0))
+ALERT_SHARED_GROUP = os.getenv("ALERT_SHARED_GROUP", "alerts")
+ALERT_SHARED_TOPIC = os.getenv("ALERT_SHARED_TOPIC", "hostel/+/+")
+ALERT_ROUTING = os.getenv("ALERT_ROUTING", "forward")
+# "room" (compound rules see all of a room's sensors) or "storm" (whole storm groups per worker)
+ALERT_PARTITION_BY = os.getenv("ALERT_PARTITION_BY", "room")
+# Unique per worker so instances no longer kick each other off; stable so sessions resume
+ALERT_CLIENT_ID = os.getenv("ALERT_CLIENT_ID", f"alert_system_{socket.gethostname()}_w{ALERT_WORKER_ID}")
+
+# Alert state persistence
+ALERT_STATE_FILE = os.getenv("ALERT_STATE_FILE", "alert_state.snapshot" if ALERT_WORKERS <= 1
+                             else f"alert_state.w{ALERT_WORKER_ID}.snapshot")
+ALERT_SNAPSHOT_INTERVAL = float(os.getenv("ALERT_SNAPSHOT_INTERVAL", 30))
+# Catch-up uses a persistent session (QoS 1) so the broker buffers readings while we are down
+ALERT_CATCH_UP = os.getenv("ALERT_CATCH_UP", "true").lower() == "true"
+
+# Micro-batching: evaluate up to ALERT_BATCH_SIZE readings at once, waiting at most
+# ALERT_BATCH_MS for a batch to fill (1 = per-message evaluation)
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", 1))
+ALERT_BATCH_MS = float(os.getenv("ALERT_BATCH_MS", 20))
+
+# Priority lanes: pre-screen readings at ingest so possibly alerting ones skip the routine
+# backlog; routine readings are coalesced per sensor, and dropped past ALERT_LANES_ROUTINE_MAX sensors
+ALERT_LANES = os.getenv("ALERT_LANES", "false").lower() == "true"
+ALERT_LANES_ROUTINE_MAX = int(os.getenv("ALERT_LANES_ROUTINE_MAX", DEFAULT_ROUTINE_MAX))
+
+# Dead-sensor detection and alert storm updates: how often the watchdog runs
+ALERT_LIVENESS_TICK = float(os.getenv("ALERT_LIVENESS_TICK", 1))
+
+# Noisiest sensors (python -m src.alerts.topk, dashboard): written every ALERT_TOPK_INTERVAL seconds
+# (each of several workers writes its own file; readers merge them)
+ALERT_TOPK_FILE = os.getenv("ALERT_TOPK_FILE", DEFAULT_TOPK_FILE)
+if ALERT_WORKERS > 1 and ALERT_TOPK_FILE:
+    ALERT_TOPK_FILE = worker_path(ALERT_TOPK_FILE, ALERT_WORKER_ID)
+ALERT_TOPK_INTERVAL = float(os.getenv("ALERT_TOPK_INTERVAL", 10))
+
+# Alert-path latency percentiles (transit, decode, evaluate, alert, dispatch) are printed
+# every ALERT_LATENCY_REPORT seconds for that interval (0 = only the totals at shutdown)
+ALERT_LATENCY_REPORT = float(os.getenv("ALERT_LATENCY_REPORT", 60))
+
 # Validate credentials
 if not MQTT_BROKER or not MQTT_USERNAME or not MQTT_PASSWORD:
     print("❌ Error: MQTT credentials not found!")
@@ -38,109 +95,36 @@ if not MQTT_BROKER or not MQTT_USERNAME or not MQTT_PASSWORD:
     print("  MQTT_USE_TLS=true")
     sys.exit(1)
 
-# Alert Thresholds
-THRESHOLDS = {
-    'temperature': {'min': 20, 'max': 28, 'unit': '°C'},
-    'humidity': {'min': 40, 'max': 60, 'unit': '%'},
-    'co2': {'min': None, 'max': 1000, 'unit': 'ppm'},
-    'light': {'min': 200, 'max': 800, 'unit': 'lux'}
-}
-
-class AlertSystem:
-    def __init__(self):
-        self.active_alerts = {}
-        self.alert_count = 0
-        self.message_count = 0
-        
-    def beep(self):
-        """Play system beep sound"""
-        try:
-            # Windows beep
-            import winsound
-            winsound.Beep(1000, 500)  # 1000Hz for 500ms - louder and longer
-            print("🔊 BEEP!")
-        except Exception as e:
-            # Fallback
-            print(f'🔊 BEEP! (Sound error: {e})')
-            print('\a')  # ASCII bell character
-    
-    def check_thresholds(self, sensor_type, value):
-        """Check if value exceeds thresholds"""
-        if sensor_type not in THRESHOLDS:
-            return None
-        
-        threshold = THRESHOLDS[sensor_type]
-        
-        # Check minimum threshold
-        if threshold['min'] is not None and value < threshold['min']:
-            return {
-                'type': 'LOW',
-                'threshold': threshold['min'],
-                'value': value,
-                'unit': threshold['unit']
-            }
-        
-        # Check maximum threshold
-        if threshold['max'] is not None and value > threshold['max']:
-            return {
-                'type': 'HIGH',
-                'threshold': threshold['max'],
-                'value': value,
-                'unit': threshold['unit']
-            }
-        
-        return None
-    
-    def trigger_alert(self, sensor_type, alert_info):
-        """Trigger an alert"""
-        alert_key = f"{sensor_type}_{alert_info['type']}"
-        
-        # Only trigger if not already active
-        if alert_key not in self.active_alerts:
-            self.active_alerts[alert_key] = True
-            self.alert_count += 1
-            
-            # Beep sound
-            self.beep()
-            
-            # Visual alert
-            emoji = {'temperature': '🌡️', 'humidity': '💧', 'co2': '🌫️', 'light': '💡'}.get(sensor_type, '📊')
-            
-            print(f"\n{'='*70}")
-            print(f"🚨🚨🚨 ALERT #{self.alert_count} - {alert_info['type']} {sensor_type.upper()} 🚨🚨🚨")
-            print(f"{'='*70}")
-            print(f"{emoji} Current Value: {alert_info['value']}{alert_info['unit']}")
-            print(f"⚠️  Threshold Limit: {alert_info['threshold']}{alert_info['unit']}")
-            print(f"🕐 Time: {datetime.now().strftime('%H:%M:%S')}")
-            print(f"{'='*70}\n")
-    
-    def clear_alert(self, sensor_type, value, unit):
-        """Clear alerts when value returns to normal"""
-        cleared = []
-        
-        for alert_key in list(self.active_alerts.keys()):
-            if alert_key.startswith(sensor_type):
-                del self.active_alerts[alert_key]
-                cleared.append(alert_key)
-        
-        if cleared:
-            emoji = {'temperature': '🌡️', 'humidity': '💧', 'co2': '🌫️', 'light': '💡'}.get(sensor_type, '📊')
-            print(f"\n{'='*70}")
-            print(f"✅ ALERT CLEARED - {sensor_type.upper()}")
-            print(f"{'='*70}")
-            print(f"{emoji} Current Value: {value}{unit} (Back to normal)")
-            print(f"🕐 Time: {datetime.now().strftime('%H:%M:%S')}")
-            print(f"{'='*70}\n")
-
 # Global alert system instance
-alert_system = AlertSystem()
+# Notifications (banners, beeps, file, webhook) run on dispatcher threads,
+# never inside on_message
+try:
+    alert_system = AlertSystem(dispatcher=NotificationDispatcher.from_env(os.environ))
+except FileNotFoundError as e:
+    print(f"❌ Error: rule file not found: {e.filename} (check ALERT_RULES_FILE)")
+    sys.exit(1)
+snapshotter = StateSnapshotter(alert_system, ALERT_STATE_FILE, ALERT_SNAPSHOT_INTERVAL)
+catch_up = None
+batcher = None
+lanes = None
+prescreen = None
+if ALERT_PARTITION_BY == "storm" and alert_system.storm is not None:
+    partition_key = lambda topic: alert_system.storm.label(room_from_topic(topic))  # noqa: E731
+else:
+    partition_key = room_key
+router = PartitionRouter(ALERT_WORKER_ID, ALERT_WORKERS, ALERT_SHARED_GROUP, ALERT_SHARED_TOPIC, ALERT_ROUTING,
+                         partition_key)
 
 def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
         print(f"✅ Connected to MQTT Broker: {MQTT_BROKER}:{MQTT_PORT}")
-        for topic in MQTT_TOPICS:
-            client.subscribe(topic)
+        if ALERT_WORKERS > 1:
+            subscriptions = router.subscriptions()
+        else:
+            subscriptions = [(topic, 1 if ALERT_CATCH_UP else 0) for topic in MQTT_TOPICS]
+        for topic, qos in subscriptions:
+            client.subscribe(topic, qos=qos)
             print(f"📡 Subscribed to: {topic}")
         print(f"\n🎯 Alert System Active - Listening for sensor data...\n")
     else:
@@ -159,34 +143,127 @@ def on_disconnect(client, userdata, disconnect_flags, rc, properties=None):
     if rc != 0:
         print(f"⚠️ Unexpected disconnection (code: {rc}). Attempting to reconnect...")
 
+def admit_reading(room, sensor_type, when):
+    """Drop readings overtaken on the way to this worker or already in the restored state"""
+    if not router.admit(alert_system.tracker.last_time(room, sensor_type), when):
+        return False
+    if catch_up is not None and catch_up.active:
+        # Replaying retained/buffered readings: skip what the snapshot already saw
+        if not catch_up.admit(room, sensor_type, when):
+            return False
+        if not catch_up.active:
+            print(f"⏱️  Steady state {catch_up.steady_after:.2f}s after start "
+                  f"({catch_up.replayed} readings replayed, {catch_up.skipped} already applied)")
+    return True
+
+def save_top_k():
+    if alert_system.noisy is not None and ALERT_TOPK_FILE:
+        alert_system.noisy.save(ALERT_TOPK_FILE)
+
+def dispatch_latency():
+    return {f"dispatch:{sink}": histogram for sink, histogram in alert_system.dispatcher.latency().items()}
+
+def report_latency():
+    interval = alert_system.latency.since_last_report(dispatch_latency())
+    if any(histogram.count for histogram in interval.values()):
+        print(f"⏱️  Alert path latency, last {ALERT_LATENCY_REPORT:g}s:")
+        for line in format_report(interval):
+            print(line)
+
+def watchdog(stop):
+    """
+    Watchdog thread: fire OFFLINE alerts as sensor deadlines pass, send due
+    storm updates, write the noisiest-sensor tables and report latency
+    """
+    next_top_k = time.monotonic() + ALERT_TOPK_INTERVAL
+    next_latency = time.monotonic() + ALERT_LATENCY_REPORT
+    while not stop.wait(ALERT_LIVENESS_TICK):
+        try:
+            alert_system.check_liveness()
+            alert_system.check_storms()
+            if time.monotonic() >= next_top_k:
+                next_top_k += ALERT_TOPK_INTERVAL
+                save_top_k()
+            if ALERT_LATENCY_REPORT > 0 and time.monotonic() >= next_latency:
+                next_latency += ALERT_LATENCY_REPORT
+                report_latency()
+        except Exception as e:
+            print(f"❌ Error in alert watchdog: {e}")
+
+def process_batch(evaluator, items):
+    """Evaluate one micro-batch on the batcher thread"""
+    transitions = evaluator.process(items)
+    if catch_up is None or not catch_up.active:
+        print(f"📥 [{alert_system.message_count}] Evaluated batch of {len(items)} readings "
+              f"({transitions} alert changes)")
+    snapshotter.maybe_save()
+
+def process_lanes(evaluator, items):
+    """Evaluate readings taken from the priority lanes, urgent ones first"""
+    if evaluator is not None:
+        process_batch(evaluator, items)
+        return
+    for topic, payload in items:
+        try:
+            handle_reading(topic, payload)
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+
+def handle_reading(topic, payload):
+    """Decode one reading and run it through the alert system"""
+    alert_system.message_count += 1
+    received = time.time_ns()
+    started = time.perf_counter_ns()
+    data = json.loads(payload.decode())
+    
+    sensor_type = data.get('sensor_type')
+    value = data.get('value')
+    unit = data.get('unit', '')
+    room = room_from_topic(topic)
+    when = reading_time(data.get('timestamp'))
+    latency = alert_system.latency
+    latency.record('decode', time.perf_counter_ns() - started)
+    latency.record('transit', transit_ns(when, received))
+    if not admit_reading(room, sensor_type, when):
+        return
+    if alert_system.noisy is not None:
+        alert_system.noisy.messages.add((room, sensor_type))
+    
+    if catch_up is None or not catch_up.active:
+        # Show incoming data for debugging
+        print(f"📥 [{alert_system.message_count}] Received: {sensor_type} = {value}{unit}")
+    
+    # Run the sensor's state machine (hysteresis, debounce, rate of change)
+    started = time.perf_counter_ns()
+    alert_system.process_reading(sensor_type, value, room, unit, now=when)
+    latency.record('evaluate', time.perf_counter_ns() - started)
+    snapshotter.maybe_save()
+
 def on_message(client, userdata, msg):
     """Callback when message received"""
     try:
-        alert_system.message_count += 1
-        data = json.loads(msg.payload.decode())
-        
-        sensor_type = data.get('sensor_type')
-        value = data.get('value')
-        unit = data.get('unit', '')
-        
-        # Show incoming data for debugging
-        print(f"📥 [{alert_system.message_count}] Received: {sensor_type} = {value}{unit}")
-        
-        # Check thresholds
-        alert_info = alert_system.check_thresholds(sensor_type, value)
-        
-        if alert_info:
-            # Alert triggered
-            alert_system.trigger_alert(sensor_type, alert_info)
-        else:
-            # Value normal - clear any active alerts
-            alert_system.clear_alert(sensor_type, value, unit)
+        topic, forwarded = router.unwrap(msg.topic)
+        if not forwarded:
+            owner_topic = router.route(topic)
+            if owner_topic:
+                # Another worker owns this sensor's state: hand the reading over untouched
+                client.publish(owner_topic, msg.payload, qos=1)
+                return
+        if lanes is not None:
+            # One topic per sensor, so the topic is the coalescing key
+            lanes.submit(topic, (topic, msg.payload), prescreen(topic, msg.payload))
+            return
+        if batcher is not None:
+            batcher.submit((topic, msg.payload))
+            return
+        handle_reading(topic, msg.payload)
     
     except Exception as e:
         print(f"❌ Error processing message: {e}")
 
 def main():
     """Main function"""
+    global catch_up, batcher, lanes, prescreen
     print(f"\n{'='*70}")
     print(f"🚨 IoT ALERT SYSTEM - Starting...")
     print(f"{'='*70}\n")
@@ -195,22 +272,90 @@ def main():
     print(f"   Broker: {MQTT_BROKER}")
     print(f"   Port: {MQTT_PORT}")
     print(f"   TLS: {'✅ Enabled' if MQTT_USE_TLS else '❌ Disabled'}")
-    print(f"   Auth: {'✅ Enabled' if MQTT_USERNAME else '❌ Disabled'}\n")
+    print(f"   Auth: {'✅ Enabled' if MQTT_USERNAME else '❌ Disabled'}")
+    print(f"   Client ID: {ALERT_CLIENT_ID}")
+    if ALERT_WORKERS > 1:
+        print(f"   Worker: {ALERT_WORKER_ID + 1} of {ALERT_WORKERS} "
+              f"($share/{ALERT_SHARED_GROUP}/{ALERT_SHARED_TOPIC}, routing: {ALERT_ROUTING}, "
+              f"partitioned by {'storm group' if partition_key is not room_key else 'room'})")
+    if ALERT_LANES:
+        print(f"   Priority lanes: out-of-band readings first, routine ones coalesced per sensor "
+              f"(up to {ALERT_LANES_ROUTINE_MAX:,} pending)")
+    if ALERT_BATCH_SIZE > 1:
+        print(f"   Batching: up to {ALERT_BATCH_SIZE} readings"
+              + (" per lane drain" if ALERT_LANES else f" / {ALERT_BATCH_MS:g} ms"))
+    print()
     
-    print(f"📋 Alert Thresholds:")
-    for sensor, threshold in THRESHOLDS.items():
-        emoji = {'temperature': '🌡️', 'humidity': '💧', 'co2': '🌫️', 'light': '💡'}.get(sensor, '📊')
-        min_val = f"{threshold['min']}{threshold['unit']}" if threshold['min'] else "None"
-        max_val = f"{threshold['max']}{threshold['unit']}" if threshold['max'] else "None"
+    rules = alert_system.rules
+    print(f"📋 Alert Thresholds (defaults; {rules.rule_count()} rules, {rules.band_count()} distinct bands):")
+    for sensor, rule in rules.defaults.items():
+        emoji = SENSOR_EMOJI.get(sensor, '📊')
+        spec = rule.spec
+        min_val = f"{spec['min']}{rule.unit}" if spec.get('min') is not None else "None"
+        max_val = f"{spec['max']}{rule.unit}" if spec.get('max') is not None else "None"
         print(f"   {emoji} {sensor.title()}: {min_val} - {max_val}")
+    if alert_system.compound is not None:
+        for rule in alert_system.compound.rules:
+            print(f"   🔗 {rule.name}: {rule.violation.threshold}")
+    if alert_system.anomaly is not None:
+        anomaly = alert_system.anomaly
+        print(f"   📈 Anomaly: |z| > {anomaly.z:g} "
+              f"({'hourly baseline' if anomaly.seasonal else 'EWMA'}, alpha {anomaly.alpha:g})")
+    if alert_system.liveness is not None:
+        liveness = alert_system.liveness
+        print(f"   📴 Offline: silent > max({liveness.min_timeout:g}s, {liveness.factor:g}x period)")
+    if alert_system.storm is not None:
+        storm = alert_system.storm
+        print(f"   🌩️ Storms: {storm.min_rooms}+ rooms per {storm.level} within {storm.window:g}s "
+              f"are grouped into one notification")
+        if ALERT_WORKERS > 1 and partition_key is room_key:
+            print(f"   ⚠️  Storm rooms are counted per worker; set ALERT_PARTITION_BY=storm to keep "
+                  f"each {storm.level} on one worker")
     print()
     
+    # Restore alert state so ongoing conditions do not re-fire
+    try:
+        restored = snapshotter.load()
+    except Exception as e:
+        restored = None
+        print(f"⚠️ Could not restore alert state from {ALERT_STATE_FILE}: {e}")
+    if restored:
+        sensors, ms = restored
+        print(f"💾 Restored {sensors} sensor states from {ALERT_STATE_FILE} in {ms:.1f} ms "
+              f"({len(alert_system.active_alerts())} alerts active)\n")
+    if ALERT_CATCH_UP:
+        catch_up = CatchUp(alert_system.tracker, started=PROCESS_START)
+    evaluator = None
+    if ALERT_BATCH_SIZE > 1:
+        evaluator = BatchEvaluator(alert_system, admit=admit_reading)
+    if ALERT_LANES:
+        # All alert state is then owned by the lane thread; on_message only classifies and enqueues
+        prescreen = Prescreen(alert_system.rules, alert_system.tracker)
+        lanes = PriorityLanes(lambda items: process_lanes(evaluator, items), max_items=ALERT_BATCH_SIZE,
+                              routine_max=ALERT_LANES_ROUTINE_MAX, name="alert-lanes").start()
+    elif evaluator is not None:
+        # All alert state is then owned by the batcher thread; on_message only enqueues
+        batcher = MicroBatcher(lambda items: process_batch(evaluator, items),
+                               max_items=ALERT_BATCH_SIZE, max_delay=ALERT_BATCH_MS / 1000).start()
+    stop_watchdog = threading.Event()
+    threading.Thread(target=watchdog, args=(stop_watchdog,), name="alert-watchdog", daemon=True).start()
+    
     # Create MQTT client
-    client = mqtt.Client(
-        client_id="alert_system",
-        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
-        protocol=mqtt.MQTTv311
-    )
+    # Shared subscriptions are an MQTT v5 feature
+    shared = ALERT_WORKERS > 1
+    if shared:
+        client = mqtt.Client(
+            client_id=ALERT_CLIENT_ID,
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            protocol=mqtt.MQTTv5
+        )
+    else:
+        client = mqtt.Client(
+            client_id=ALERT_CLIENT_ID,
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            protocol=mqtt.MQTTv311,
+            clean_session=not ALERT_CATCH_UP
+        )
     
     client.on_connect = on_connect
     client.on_message = on_message
@@ -228,17 +373,73 @@ def main():
     
     # Connect and start
     try:
+        alert_system.dispatcher.start()
         print(f"🔌 Connecting to MQTT broker...\n")
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        if shared:
+            properties = Properties(PacketTypes.CONNECT)
+            # Keep the session (and buffered QoS 1 messages) for an hour while we are away
+            properties.SessionExpiryInterval = 3600 if ALERT_CATCH_UP else 0
+            client.connect(MQTT_BROKER, MQTT_PORT, 60, clean_start=not ALERT_CATCH_UP,
+                           properties=properties)
+        else:
+            client.connect(MQTT_BROKER, MQTT_PORT, 60)
         client.loop_forever()
     except KeyboardInterrupt:
         print(f"\n\n⏸️  Alert system stopped by user")
         print(f"📊 Final Stats: {alert_system.message_count} messages, "
-              f"{alert_system.alert_count} total alerts\n")
+              f"{alert_system.alert_count} total alerts, "
+              f"{len(alert_system.active_alerts())} still active")
+        if alert_system.liveness is not None:
+            liveness = alert_system.liveness
+            print(f"📴 Liveness: {len(liveness)} sensors watched, {liveness.went_offline} went offline, "
+                  f"{liveness.visited} wheel entries visited")
+        if alert_system.storm is not None:
+            storm = alert_system.storm
+            print(f"🌩️ Storms: {storm.storms} opened, {storm.suppressed} alert changes grouped, "
+                  f"{len(storm.active())} still open")
+        if alert_system.noisy is not None:
+            for title, summary in (("📨 Busiest", alert_system.noisy.messages),
+                                   ("🔊 Noisiest", alert_system.noisy.transitions)):
+                top = summary.top(3)
+                if top:
+                    print(f"{title}: " + ", ".join(f"{room}/{sensor} {count:,}" for (room, sensor), count, _ in top))
+        if ALERT_WORKERS > 1:
+            print(f"🔀 Partitioning: {router.forwarded} readings forwarded to owners, "
+                  f"{router.received_forwards} received from other workers, {router.stale} out of order")
+        print()
     except Exception as e:
         print(f"\n❌ Error: {e}\n")
     finally:
+        stop_watchdog.set()
         client.disconnect()
+        if lanes is not None:
+            lanes.stop()
+            stats = lanes.stats()
+            print(f"🚦 Lanes: {prescreen.urgent:,} urgent / {prescreen.routine:,} routine readings, "
+                  f"{stats['coalesced']:,} coalesced, {stats['superseded']:,} superseded, "
+                  f"{stats['dropped']:,} dropped, max backlog {stats['max_backlog']:,}")
+        if batcher is not None:
+            batcher.stop()
+            stats = batcher.stats()
+            print(f"📦 Batches: {stats['batches']} (avg {stats['avg_batch']:.0f}, max {stats['max_batch']} "
+                  f"readings), latency avg {stats['latency_ms_avg']:.1f} ms / p99 {stats['latency_ms_p99']:.1f} ms")
+        snapshotter.save()
+        if evaluator is not None and alert_system.noisy is not None:
+            evaluator.count_messages()
+        try:
+            save_top_k()
+        except OSError as e:
+            print(f"⚠️ Could not write {ALERT_TOPK_FILE}: {e}")
+        print(f"💾 Alert state saved to {ALERT_STATE_FILE} ({snapshotter.last_size:,} bytes)")
+        alert_system.dispatcher.stop()
+        print(f"📬 Notifications: {alert_system.dispatcher.submitted} queued")
+        for sink, stats in alert_system.dispatcher.stats().items():
+            print(f"   {sink}: {stats['sent']} sent, {stats['dropped']} dropped, {stats['limited']} rate-limited, "
+                  f"{stats['errors']} errors, max queue {stats['max_depth']}, "
+                  f"latency avg {stats['latency_ms_avg']:.1f} ms / p99 {stats['latency_ms_p99']:.1f} ms")
+        print("⏱️  Alert path latency since start:")
+        for line in format_report(dict(alert_system.latency.stages, **dispatch_latency())):
+            print(line)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
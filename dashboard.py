@@ -6,17 +6,25 @@ Displays live sensor data from MQTT in a beautiful web interface
 import streamlit as st
 import paho.mqtt.client as mqtt
 import json
-import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime
 import time
-from collections import deque
-import threading
 import warnings
 import os
 import ssl
+import io
 from dotenv import load_dotenv
 
+from src.dashboard.data_store import DataStore
+from src.dashboard.snapshot import SnapshotCache
+from src.dashboard.live_feed import LiveFeedServer, reading_from_payload
+from src.dashboard.rest_api import RestApiServer
+from src.dashboard.export import export, iter_datastore_rows
+from src.dashboard.connection import ConnectionSupervisor
+from src.dashboard.startup import StartupTimer, format_seconds
+from src.alerts.lanes import DEFAULT_ROUTINE_MAX, Prescreen, PriorityLanes
+from src.alerts.rules import RuleEngine
+from src.alerts.topk import DEFAULT_TOPK_FILE, load as load_top_k
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -38,6 +46,9 @@ MQTT_USERNAME = os.getenv("MQTT_USERNAME", None)
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", None)
 MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
 
+# Fleet-wide noisiest sensors, written by alert_system.py
+ALERT_TOPK_FILE = os.getenv("ALERT_TOPK_FILE", DEFAULT_TOPK_FILE)
+
 MQTT_TOPICS = [
     "hostel/room1/temperature",
     "hostel/room1/humidity",
@@ -45,101 +56,61 @@ MQTT_TOPICS = [
     "hostel/room1/light"
 ]
 
-# Global data storage (thread-safe using threading.Lock)
-class DataStore:
-    def __init__(self):
-        self.lock = threading.Lock()
-        self.temperature_data = deque(maxlen=100)
-        self.humidity_data = deque(maxlen=100)
-        self.co2_data = deque(maxlen=100)
-        self.light_data = deque(maxlen=100)
-        self.last_update = None
-        self.message_count = 0
-        self.connected = False
-        self.battery_levels = {}
-        self.last_message_time = datetime.now()
-        self.reconnect_count = 0
-    
-    def add_data(self, sensor_type, value, timestamp, battery):
-        with self.lock:
-            try:
-                data_point = {
-                    'time': datetime.fromisoformat(timestamp.replace('Z', '')),
-                    'value': value
-                }
-                
-                if sensor_type == 'temperature':
-                    self.temperature_data.append(data_point)
-                    self.battery_levels['temperature'] = battery
-                elif sensor_type == 'humidity':
-                    self.humidity_data.append(data_point)
-                    self.battery_levels['humidity'] = battery
-                elif sensor_type == 'co2':
-                    self.co2_data.append(data_point)
-                    self.battery_levels['co2'] = battery
-                elif sensor_type == 'light':
-                    self.light_data.append(data_point)
-                    self.battery_levels['light'] = battery
-                
-                self.last_update = datetime.now()
-                self.last_message_time = datetime.now()
-                self.message_count += 1
-            except Exception as e:
-                print(f"Error adding data: {e}")
-    
-    def get_data(self, sensor_type):
-        with self.lock:
-            if sensor_type == 'temperature':
-                return list(self.temperature_data)
-            elif sensor_type == 'humidity':
-                return list(self.humidity_data)
-            elif sensor_type == 'co2':
-                return list(self.co2_data)
-            elif sensor_type == 'light':
-                return list(self.light_data)
-            return []
-    
-    def get_stats(self):
-        with self.lock:
-            return {
-                'message_count': self.message_count,
-                'last_update': self.last_update,
-                'battery_levels': self.battery_levels.copy(),
-                'connected': self.connected,
-                'last_message_time': self.last_message_time,
-                'reconnect_count': self.reconnect_count
-            }
-    
-    def set_connected(self, status):
-        with self.lock:
-            self.connected = status
-    
-    def increment_reconnect(self):
-        with self.lock:
-            self.reconnect_count += 1
-    
-    def clear_all(self):
-        with self.lock:
-            self.temperature_data.clear()
-            self.humidity_data.clear()
-            self.co2_data.clear()
-            self.light_data.clear()
-            self.message_count = 0
-            self.last_update = None
-            self.battery_levels.clear()
+# Startup clock for time-to-first-paint / time-to-first-data
+@st.cache_resource
+def get_startup_timer():
+    return StartupTimer()
+
+startup_timer = get_startup_timer()
 
 # Create global data store
 @st.cache_resource
 def get_data_store():
-    return DataStore()
+    return DataStore(maxlen=int(os.getenv("DASHBOARD_BUFFER_SIZE", 100)))
 
 data_store = get_data_store()
 
+# One render snapshot per data version, shared by every browser session
+@st.cache_resource
+def get_snapshot_cache():
+    return SnapshotCache(data_store)
+
+snapshot_cache = get_snapshot_cache()
+
+# Optional push feed for lightweight viewers (set LIVE_FEED_PORT to enable)
+@st.cache_resource
+def get_live_feed():
+    port = os.getenv("LIVE_FEED_PORT")
+    if not port:
+        return None
+    feed = LiveFeedServer(port=int(port))
+    feed.start_in_thread()
+    print(f"📡 Live feed on ws://0.0.0.0:{feed.port}/ws")
+    return feed
+
+live_feed = get_live_feed()
+
+# Optional conditional-GET REST API (set REST_API_PORT to enable)
+@st.cache_resource
+def get_rest_api():
+    port = os.getenv("REST_API_PORT")
+    if not port:
+        return None
+    room = MQTT_TOPICS[0].split('/')[1]
+    api = RestApiServer({room: data_store}, port=int(port))
+    api.start_in_thread()
+    print(f"🌐 REST API on http://0.0.0.0:{api.port}/api/latest")
+    return api
+
+rest_api = get_rest_api()
+
 # MQTT Callbacks
 def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
         data_store.set_connected(True)
+        if userdata:
+            userdata.connected()
         print(f"✅ Connected to MQTT broker successfully")
         print(f"📡 Subscribing to topics:")
         for topic in MQTT_TOPICS:
@@ -151,25 +122,16 @@ def on_connect(client, userdata, flags, rc, properties=None):
 
 def on_disconnect(client, userdata, disconnect_flags, rc, properties=None):
     """Callback when disconnected from MQTT broker"""
+    # Never sleep or reconnect here: this runs on the network thread. The
+    # connection supervisor notices the dropped loop and backs off itself.
     data_store.set_connected(False)
     print(f"⚠️ Disconnected with code {rc}")
-    
-    # Auto-reconnect with backoff
-    if rc != 0:
-        data_store.increment_reconnect()
-        print("🔄 Attempting to reconnect...")
-        try:
-            time.sleep(2)  # Wait before reconnecting
-            client.reconnect()
-            print("✅ Reconnected successfully")
-        except Exception as e:
-            print(f"❌ Reconnection failed: {e}")
 
-def on_message(client, userdata, msg):
-    """Callback when message is received"""
+def ingest_reading(topic, raw):
+    """Decode one reading into the data store and the live feed"""
     try:
-        print(f"📨 Received message on topic: {msg.topic}")
-        payload = json.loads(msg.payload.decode())
+        print(f"📨 Received message on topic: {topic}")
+        payload = json.loads(raw.decode())
         sensor_type = payload.get('sensor_type')
         value = payload.get('value')
         timestamp = payload.get('timestamp')
@@ -182,15 +144,42 @@ def on_message(client, userdata, msg):
             print(f"📊 Message #{data_store.get_stats()['message_count']}: {sensor_type} = {value}")
         
         data_store.add_data(sensor_type, value, timestamp, battery)
+        if live_feed:
+            live_feed.publish(topic, reading_from_payload(payload))
         
     except Exception as e:
         print(f"❌ Error processing message: {e}")
-        print(f"   Topic: {msg.topic}, Payload: {msg.payload}")
+        print(f"   Topic: {topic}, Payload: {raw}")
+
+def ingest_readings(items):
+    for topic, raw in items:
+        ingest_reading(topic, raw)
+
+# Optional priority lanes (set DASHBOARD_LANES=true): out-of-band readings are stored
+# before a routine backlog, which is coalesced to the newest reading per sensor
+@st.cache_resource
+def get_ingest_lanes():
+    if os.getenv("DASHBOARD_LANES", "false").lower() != "true":
+        return None, None
+    prescreen = Prescreen(RuleEngine.from_file())
+    lanes = PriorityLanes(ingest_readings, name="dashboard-lanes",
+                          routine_max=int(os.getenv("DASHBOARD_LANES_ROUTINE_MAX", DEFAULT_ROUTINE_MAX)))
+    print("🚦 Priority lanes enabled for incoming readings")
+    return prescreen, lanes.start()
+
+prescreen, ingest_lanes = get_ingest_lanes()
+
+def on_message(client, userdata, msg):
+    """Callback when message is received"""
+    if ingest_lanes is not None:
+        ingest_lanes.submit(msg.topic, (msg.topic, msg.payload), prescreen(msg.topic, msg.payload))
+    else:
+        ingest_reading(msg.topic, msg.payload)
 
 # Start MQTT client in background
 @st.cache_resource
 def get_mqtt_client():
-    """Create and start MQTT client with TLS support"""
+    """Create the MQTT client and start connecting in the background (returns the supervisor)"""
     try:
         # Use a unique client ID with timestamp to avoid conflicts
         client_id = f"dashboard_viewer_{int(time.time())}"
@@ -217,25 +206,14 @@ def get_mqtt_client():
                 tls_version=ssl.PROTOCOL_TLSv1_2
             )
         
-        # Increase keepalive and set reconnect delay
+        # Connect on the supervisor thread so the page renders immediately
         print(f"📡 Connecting to {MQTT_BROKER}:{MQTT_PORT}...")
-        client.connect(MQTT_BROKER, MQTT_PORT, keepalive=120)  # Increased keepalive
-        client.reconnect_delay_set(min_delay=1, max_delay=120)
-        
-        client.loop_start()
-        
-        # Wait for connection
-        timeout = 10
-        start = time.time()
-        while not data_store.get_stats()['connected'] and (time.time() - start) < timeout:
-            time.sleep(0.1)
-        
-        if data_store.get_stats()['connected']:
-            print("✅ MQTT client started successfully")
-        else:
-            print("⚠️ MQTT client started but not connected yet")
-        
-        return client
+        supervisor = ConnectionSupervisor(
+            client, MQTT_BROKER, MQTT_PORT, data_store,
+            keepalive=120, min_delay=1, max_delay=120
+        )
+        client.user_data_set(supervisor)
+        return supervisor.start()
         
     except Exception as e:
         st.error(f"MQTT Connection Error: {e}")
@@ -244,49 +222,60 @@ def get_mqtt_client():
         return None
 
 # Initialize MQTT
-mqtt_client = get_mqtt_client()
+mqtt_supervisor = get_mqtt_client()
 
 # Dashboard Header
 st.title("🏠 Smart Home Environment Monitoring")
 st.markdown("### Real-time IoT Sensor Dashboard - Hostel Room 1")
 
-# Get current stats
-stats = data_store.get_stats()
+# Get the shared snapshot for the current data version
+snapshot = snapshot_cache.get()
 
 # Check if we're receiving messages
-time_since_last = (datetime.now() - stats['last_message_time']).total_seconds() if stats['last_message_time'] else float('inf')
+time_since_last = (datetime.now() - snapshot.last_message_time).total_seconds() if snapshot.last_message_time else float('inf')
 
 # Connection status warning
-if time_since_last > 30 and mqtt_client:
+if time_since_last > 30 and mqtt_supervisor:
     st.warning(f"⚠️ No messages received for {int(time_since_last)} seconds. Connection may be stale.")
     col_warn1, col_warn2 = st.columns(2)
     with col_warn1:
         if st.button("🔄 Force Reconnect", key="force_reconnect"):
-            if mqtt_client:
-                try:
-                    mqtt_client.reconnect()
-                    st.success("Reconnection initiated...")
-                    time.sleep(2)
-                except Exception as e:
-                    st.error(f"Reconnect failed: {e}")
+            mqtt_supervisor.request_reconnect()
+            st.success("Reconnection initiated...")
     with col_warn2:
         if st.button("🔃 Restart MQTT Client", key="restart_mqtt"):
+            mqtt_supervisor.stop()
             st.cache_resource.clear()
             st.rerun()
 
+# Per-sensor liveness: a sensor can go quiet while the others keep the stream alive
+offline = data_store.offline_sensors()
+if offline:
+    st.warning("📴 Sensor offline: " + ", ".join(
+        f"{sensor} (no reading for {int(silent)}s)" for sensor, silent in offline))
+
 # Status bar
-col1, col2, col3, col4 = st.columns(4)
+col1, col2, col3, col4, col5, col6 = st.columns(6)
 with col1:
-    is_connected = stats['connected']
-    status = "🟢 Connected" if is_connected else "🔴 Disconnected"
+    status = {
+        'connected': "🟢 Connected",
+        'connecting': "🟡 Connecting...",
+        'reconnecting': "🟠 Reconnecting..."
+    }.get(snapshot.connection_state, "🔴 Disconnected")
     st.metric("MQTT Status", status)
 with col2:
-    st.metric("Messages Received", stats['message_count'])
+    st.metric("Messages Received", snapshot.message_count)
 with col3:
-    last_update = stats['last_update'].strftime("%H:%M:%S") if stats['last_update'] else "N/A"
+    last_update = snapshot.last_update.strftime("%H:%M:%S") if snapshot.last_update else "N/A"
     st.metric("Last Update", last_update)
 with col4:
-    st.metric("Reconnects", stats['reconnect_count'])
+    st.metric("Reconnects", snapshot.reconnect_count)
+with col5:
+    st.metric("First Paint", format_seconds(startup_timer.time_to_first_paint),
+              help="From the first script run to the first complete page")
+with col6:
+    st.metric("First Data", format_seconds(startup_timer.time_to_first_data(snapshot.first_data_at)),
+              help="From the first script run to the first sensor reading")
 
 st.divider()
 
@@ -306,8 +295,8 @@ with st.sidebar:
     st.divider()
     
     st.subheader("🔋 Battery Status")
-    if stats['battery_levels']:
-        for sensor, battery in stats['battery_levels'].items():
+    if snapshot.battery_levels:
+        for sensor, battery in snapshot.battery_levels.items():
             emoji = "🔋" if battery > 20 else "⚠️"
             st.progress(battery / 100, text=f"{emoji} {sensor.capitalize()}: {battery:.1f}%")
     else:
@@ -316,16 +305,42 @@ with st.sidebar:
     st.divider()
     
     st.subheader("📊 Data Info")
-    st.write(f"Temperature: {len(data_store.get_data('temperature'))} points")
-    st.write(f"Humidity: {len(data_store.get_data('humidity'))} points")
-    st.write(f"CO2: {len(data_store.get_data('co2'))} points")
-    st.write(f"Light: {len(data_store.get_data('light'))} points")
+    st.write(f"Temperature: {snapshot.counts['temperature']} points")
+    st.write(f"Humidity: {snapshot.counts['humidity']} points")
+    st.write(f"CO2: {snapshot.counts['co2']} points")
+    st.write(f"Light: {snapshot.counts['light']} points")
     
     st.divider()
     
     # Auto-refresh control
     st.subheader("🔄 Refresh Settings")
     refresh_rate = st.slider("Refresh Rate (seconds)", 1, 10, 3)
+    chart_renderer = st.radio(
+        "Chart Renderer",
+        ["Standard", "WebGL"],
+        index=1 if os.getenv("DASHBOARD_RENDERER", "standard").lower() == "webgl" else 0,
+        help="WebGL draws long series faster and drops markers above 500 points"
+    )
+    use_webgl = chart_renderer == "WebGL"
+    
+    st.divider()
+    
+    st.subheader("📥 Export Data")
+    export_format = st.selectbox("Format", ["csv", "parquet"])
+    if st.button("📦 Prepare Export"):
+        # Rows stream into the file bytes in chunks, never as a DataFrame
+        export_buffer = io.BytesIO()
+        try:
+            room = MQTT_TOPICS[0].split('/')[1]
+            rows = export(iter_datastore_rows({room: data_store}), export_format, export_buffer)
+            st.download_button(
+                f"⬇️ Download {rows} rows",
+                data=export_buffer.getvalue(),
+                file_name=f"sensor_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}",
+                mime="text/csv" if export_format == "csv" else "application/octet-stream"
+            )
+        except RuntimeError as e:
+            st.error(str(e))
     
     st.divider()
     
@@ -338,86 +353,6 @@ with st.sidebar:
     st.divider()
     st.info("💡 **Tip:** Run sensor simulators to see live data!")
 
-# Helper function to create gauge chart
-def create_gauge(value, title, min_val, max_val, unit, thresholds):
-    """Create a gauge chart"""
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=value,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': f"{title}<br><span style='font-size:0.8em'>{unit}</span>"},
-        delta={'reference': (thresholds[0] + thresholds[1]) / 2},
-        gauge={
-            'axis': {'range': [min_val, max_val]},
-            'bar': {'color': "darkblue"},
-            'steps': [
-                {'range': [min_val, thresholds[0]], 'color': "lightgray"},
-                {'range': [thresholds[0], thresholds[1]], 'color': "lightgreen"},
-                {'range': [thresholds[1], max_val], 'color': "lightgray"}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': value
-            }
-        }
-    ))
-    
-    fig.update_layout(
-        height=250,
-        margin=dict(l=10, r=10, t=50, b=10),
-        paper_bgcolor="rgba(0,0,0,0)",
-        font={'size': 12}
-    )
-    
-    return fig
-
-# Helper function to create trend chart
-def create_trend_chart(data, title, color, unit):
-    """Create a trend line chart"""
-    if len(data) == 0:
-        fig = go.Figure()
-        fig.add_annotation(
-            text="No data yet. Start sensors to see live data!",
-            xref="paper", yref="paper",
-            x=0.5, y=0.5, showarrow=False,
-            font=dict(size=14, color="gray")
-        )
-    else:
-        df = pd.DataFrame(list(data))
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df['time'],
-            y=df['value'],
-            mode='lines+markers',
-            name=title,
-            line=dict(color=color, width=2),
-            marker=dict(size=6)
-        ))
-    
-    # Set Y-axis range based on sensor type
-    y_ranges = {
-        'Temperature': [15, 40],
-        'Humidity': [0, 100],
-        'CO2 Level': [300, 2000],
-        'Light Level': [0, 1000]
-    }
-    
-    y_range = y_ranges.get(title, None)
-    
-    fig.update_layout(
-        title=f"{title} Trend",
-        xaxis_title="Time",
-        yaxis_title=unit,
-        yaxis=dict(range=y_range) if y_range else {},
-        height=300,
-        margin=dict(l=10, r=10, t=40, b=10),
-        hovermode='x unified',
-        showlegend=False
-    )
-    
-    return fig
-
 # Current Values Section
 st.subheader("📊 Current Sensor Readings")
 
@@ -427,37 +362,29 @@ gauge_col1, gauge_col2, gauge_col3, gauge_col4 = st.columns(4)
 gauge_key_suffix = int(time.time() * 1000)
 
 with gauge_col1:
-    temp_data = data_store.get_data('temperature')
-    temp_val = temp_data[-1]['value'] if temp_data else 22
     st.plotly_chart(
-        create_gauge(temp_val, "🌡️ Temperature", 15, 40, "°C", [20, 28]),
+        snapshot.gauge('temperature', 22, "🌡️ Temperature", 15, 40, "°C", [20, 28]),
         use_container_width=True,
         key=f"gauge_temp_{gauge_key_suffix}"
     )
 
 with gauge_col2:
-    hum_data = data_store.get_data('humidity')
-    hum_val = hum_data[-1]['value'] if hum_data else 50
     st.plotly_chart(
-        create_gauge(hum_val, "💧 Humidity", 0, 100, "%", [40, 60]),
+        snapshot.gauge('humidity', 50, "💧 Humidity", 0, 100, "%", [40, 60]),
         use_container_width=True,
         key=f"gauge_hum_{gauge_key_suffix}"
     )
 
 with gauge_col3:
-    co2_data = data_store.get_data('co2')
-    co2_val = co2_data[-1]['value'] if co2_data else 600
     st.plotly_chart(
-        create_gauge(co2_val, "🌫️ CO2", 400, 2000, "ppm", [400, 1000]),
+        snapshot.gauge('co2', 600, "🌫️ CO2", 400, 2000, "ppm", [400, 1000]),
         use_container_width=True,
         key=f"gauge_co2_{gauge_key_suffix}"
     )
 
 with gauge_col4:
-    light_data = data_store.get_data('light')
-    light_val = light_data[-1]['value'] if light_data else 400
     st.plotly_chart(
-        create_gauge(light_val, "💡 Light", 0, 1000, "lux", [200, 800]),
+        snapshot.gauge('light', 400, "💡 Light", 0, 1000, "lux", [200, 800]),
         use_container_width=True,
         key=f"gauge_light_{gauge_key_suffix}"
     )
@@ -474,32 +401,56 @@ trend_col1, trend_col2 = st.columns(2)
 
 with trend_col1:
     st.plotly_chart(
-        create_trend_chart(data_store.get_data('temperature'), "Temperature", "#FF6B6B", "°C"),
+        snapshot.trend_chart('temperature', "Temperature", "#FF6B6B", "°C", webgl=use_webgl),
         use_container_width=True,
         key=f"trend_temp_{chart_key_suffix}"
     )
     st.plotly_chart(
-        create_trend_chart(data_store.get_data('co2'), "CO2 Level", "#95E1D3", "ppm"),
+        snapshot.trend_chart('co2', "CO2 Level", "#95E1D3", "ppm", webgl=use_webgl),
         use_container_width=True,
         key=f"trend_co2_{chart_key_suffix}"
     )
 
 with trend_col2:
     st.plotly_chart(
-        create_trend_chart(data_store.get_data('humidity'), "Humidity", "#4ECDC4", "%"),
+        snapshot.trend_chart('humidity', "Humidity", "#4ECDC4", "%", webgl=use_webgl),
         use_container_width=True,
         key=f"trend_hum_{chart_key_suffix}"
     )
     st.plotly_chart(
-        create_trend_chart(data_store.get_data('light'), "Light Level", "#FFE66D", "lux"),
+        snapshot.trend_chart('light', "Light Level", "#FFE66D", "lux", webgl=use_webgl),
         use_container_width=True,
         key=f"trend_light_{chart_key_suffix}"
     )
 
+# Noisiest sensors across the fleet (only when the alert system is writing them)
+noisy = load_top_k(ALERT_TOPK_FILE)
+if noisy:
+    st.divider()
+    st.subheader("🔊 Noisiest Sensors")
+    st.caption(f"Top {noisy['k']} by the alert system, updated "
+               f"{max(0, int(time.time() - noisy['updated']))}s ago (counts are upper bounds, ± error)")
+    noisy_col1, noisy_col2 = st.columns(2)
+    for column, title, section in ((noisy_col1, "📨 By message volume", noisy['messages']),
+                                   (noisy_col2, "🚨 By alert transitions", noisy['transitions'])):
+        with column:
+            st.markdown(f"**{title}** ({section['total']:,} total)")
+            if section['top']:
+                st.dataframe([{'Room': row['room'], 'Sensor': row['sensor_type'], 'Count': row['count'],
+                               '± Error': row['error'],
+                               'Share': f"{row['count'] / section['total']:.1%}" if section['total'] else ""}
+                              for row in section['top'][:10]],
+                             hide_index=True, use_container_width=True)
+            else:
+                st.info("Nothing recorded yet")
+
 # Auto-refresh footer
 st.markdown("---")
 st.caption(f"🔄 Dashboard auto-refreshes every {refresh_rate} seconds | Last refresh: {datetime.now().strftime('%H:%M:%S')}")
 
+# The first complete run is the first paint
+startup_timer.mark_painted()
+
 # Auto-refresh with configurable rate
 time.sleep(refresh_rate)
 st.rerun()
\ No newline at end of file
@@ -3,12 +3,15 @@ import paho.mqtt.client as mqtt
 import json
 import ssl
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-BROKER = os.getenv("MQTT_BROKER")
-PORT = int(os.getenv("MQTT_PORT", 8883))
+# Without MQTT_BROKER, the embedded broker (python -m src.broker.server)
+BROKER = os.getenv("MQTT_BROKER", "localhost")
+USE_TLS = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+PORT = int(os.getenv("MQTT_PORT", 8883 if USE_TLS else 1883))
 USERNAME = os.getenv("MQTT_USERNAME")
 PASSWORD = os.getenv("MQTT_PASSWORD")
 
@@ -36,28 +39,34 @@ def on_message(client, userdata, msg):
     except Exception as e:
         print(f"❌ Error: {e}")
 
-client = mqtt.Client(
-    client_id="test_123",
-    callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
-    protocol=mqtt.MQTTv311
-)
+def main():
+    client = mqtt.Client(
+        client_id="test_123",
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        protocol=mqtt.MQTTv311
+    )
 
-client.on_connect = on_connect
-client.on_message = on_message
-client.username_pw_set(USERNAME, PASSWORD)
-client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    if USERNAME and PASSWORD:
+        client.username_pw_set(USERNAME, PASSWORD)
+    if USE_TLS:
+        client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
 
-print(f"🔌 Connecting to {BROKER}:{PORT}...")
-client.connect(BROKER, PORT, keepalive=60)
+    print(f"🔌 Connecting to {BROKER}:{PORT}...")
+    client.connect(BROKER, PORT, keepalive=60)
 
-import time
-client.loop_start()
-print("⏱️  Waiting 15 seconds for messages...")
-time.sleep(15)
-client.loop_stop()
-
-print(f"\n📊 Received {len(received)} messages from sensors: {set(received)}")
-if len(received) == 0:
-    print("❌ NO MESSAGES RECEIVED - Sensors may not be running!")
-else:
-    print("✅ Sensors ARE publishing data!")
+    client.loop_start()
+    print("⏱️  Waiting 15 seconds for messages...")
+    time.sleep(15)
+    client.loop_stop()
+
+    print(f"\n📊 Received {len(received)} messages from sensors: {set(received)}")
+    if len(received) == 0:
+        print("❌ NO MESSAGES RECEIVED - Sensors may not be running!")
+    else:
+        print("✅ Sensors ARE publishing data!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""
+Alert support modules
+Rule evaluation and alert state shared by alert_system.py and the metrics scripts
+"""
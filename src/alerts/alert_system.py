@@ -0,0 +1,219 @@
+"""
+Alert System Core
+Threshold checking and alert bookkeeping, independent of the MQTT client so
+the metrics scripts and tests can drive it directly
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+
+from src.alerts.anomaly import AnomalyDetector
+from src.alerts.compound import CompoundEngine
+from src.alerts.latency import StageLatency
+from src.alerts.liveness import LivenessMonitor
+from src.alerts.notify import SENSOR_EMOJI, Notification  # noqa: F401 (SENSOR_EMOJI re-exported)
+from src.alerts.rules import DEFAULT_ROOM, RuleEngine
+from src.alerts.state import AlertTracker
+from src.alerts.storm import StormGrouper
+from src.alerts.topk import TOP_K, NoisySensors
+
+
+def room_from_topic(topic, default=DEFAULT_ROOM):
+    """'hostel/<room>/<sensor>' -> '<room>'"""
+    parts = topic.split('/')
+    return parts[1] if len(parts) >= 3 else default
+
+
+def reading_time(timestamp):
+    """Epoch seconds of a sensor payload's ISO 'timestamp' (UTC), or now if absent/invalid"""
+    if timestamp:
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.timestamp()
+        except (ValueError, TypeError, AttributeError):
+            pass
+    return time.time()
+
+
+class AlertSystem:
+    def __init__(self, rules=None, dispatcher=None, top_k=TOP_K):
+        self.rules = rules if rules is not None else RuleEngine.from_file()
+        self.tracker = AlertTracker(self.rules)
+        self.anomaly = AnomalyDetector.from_spec(self.rules.anomaly) if self.rules.anomaly else None
+        self.compound = CompoundEngine(self.rules.compound) if self.rules.compound else None
+        self.liveness = LivenessMonitor.from_spec(self.rules.offline) if self.rules.offline else None
+        self.storm = StormGrouper.from_spec(self.rules.storm) if self.rules.storm else None
+        # Noisiest sensors by transitions and, counted at ingest, messages; top_k=0 turns it off
+        self.noisy = NoisySensors(top_k) if top_k else None
+        # Per-stage alert-path timings; this class records 'alert', the ingest paths the rest
+        self.latency = StageLatency()
+        # Notifications go to a NotificationDispatcher; None keeps only the counters
+        self.dispatcher = dispatcher
+        self.alert_count = 0
+        self.message_count = 0
+        # trigger_alert() also runs on the watchdog thread (OFFLINE alerts)
+        self._lock = threading.Lock()
+
+    def check_thresholds(self, sensor_type, value, room=DEFAULT_ROOM, hour=None):
+        """Check if value exceeds thresholds; a dict is only built for violations"""
+        violation = self.rules.evaluate(room, sensor_type, value, hour)
+        if violation is None:
+            return None
+        return {
+            'type': violation.type,
+            'severity': violation.severity,
+            'threshold': violation.threshold,
+            'value': value,
+            'unit': self.rules.rule_for(room, sensor_type).unit,
+            'room': room
+        }
+
+    def process_reading(self, sensor_type, value, room=DEFAULT_ROOM, unit='', now=None, hour=None,
+                        detect=True):
+        """
+        Run one reading through the sensor's state machine; banners only on transitions.
+
+        Returns the sensor's transitions (compound rules and liveness notify
+        on their own). detect=False leaves anomaly, compound and liveness
+        updates to the caller, which BatchEvaluator does for a whole batch.
+        """
+        if hour is None:
+            hour = self.rules.current_hour()
+        if now is None:
+            now = time.time()
+        transitions = self.tracker.update(room, sensor_type, value, now, hour)
+        if detect:
+            if self.anomaly is not None:
+                anomalies = self.anomaly.update(room, sensor_type, value, hour)
+                if anomalies is not None:
+                    transitions = transitions + anomalies if transitions else anomalies
+            if self.compound is not None:
+                events = self.compound.update(room, sensor_type, value, now, hour)
+                if events is not None:
+                    self.apply_compound(room, events)
+            if self.liveness is not None:
+                self.mark_seen(room, sensor_type, value, unit)
+        if transitions is None:
+            return None
+        self.apply_transitions(sensor_type, value, room, unit, transitions)
+        # Reading timestamp -> notification queued (replayed readings count their full age)
+        self.latency.record('alert', time.time_ns() - int(now * 1e9), len(transitions))
+        return transitions
+
+    def apply_transitions(self, sensor_type, value, room, unit, transitions):
+        """Turn state-machine transitions into alert and clear notifications"""
+        for action, violation in transitions:
+            if action == 'raise':
+                state = self.tracker.state_for(room, sensor_type)
+                rule_unit = state.rule.unit if state is not None else unit
+                if violation.type == 'RATE':
+                    rule_unit = f"{rule_unit}/min"
+                self.trigger_alert(sensor_type, {
+                    'type': violation.type,
+                    'severity': violation.severity,
+                    'threshold': violation.threshold,
+                    'value': value,
+                    'unit': rule_unit,
+                    'room': room
+                })
+            else:
+                self.clear_alert(sensor_type, value, unit, room, violation.type)
+
+    def apply_compound(self, room, events):
+        """Notify raised/cleared compound rules; the inputs are reported as the value"""
+        for action, rule in events:
+            inputs = self.compound.describe(room, rule)
+            if action == 'raise':
+                self.trigger_alert(rule.label, {
+                    'type': rule.name,
+                    'severity': rule.severity,
+                    'threshold': rule.violation.threshold,
+                    'value': inputs,
+                    'unit': '',
+                    'room': room
+                })
+            else:
+                self.clear_alert(rule.label, inputs, '', room, rule.name)
+
+    def mark_seen(self, room, sensor_type, value, unit=''):
+        """Feed a reading's arrival to the liveness monitor; clears an OFFLINE alert"""
+        if self.liveness.seen(room, sensor_type) is not None:
+            self.clear_alert(sensor_type, value, unit, room, self.liveness.violation.type)
+
+    def check_liveness(self, now=None):
+        """Raise OFFLINE alerts for sensors whose deadline passed; returns how many"""
+        if self.liveness is None:
+            return 0
+        expired = self.liveness.advance(now)
+        violation = self.liveness.violation
+        for room, sensor_type, silent in expired:
+            timeout = self.liveness.timeout_for(self.liveness.slots[room, sensor_type])
+            self.trigger_alert(sensor_type, {
+                'type': violation.type,
+                'severity': violation.severity,
+                'threshold': f"{timeout:g}s",
+                'value': f"silent {silent:.0f}s",
+                'unit': '',
+                'room': room
+            })
+        return len(expired)
+
+    def active_alerts(self):
+        """[(room, sensor_type, alert_type, severity)] of currently raised alerts"""
+        active = [(room, sensor_type, violation.type, violation.severity)
+                  for room, sensor_type, violation in self.tracker.active_alerts()]
+        if self.anomaly is not None:
+            active += [(room, sensor_type, violation.type, violation.severity)
+                       for room, sensor_type, violation in self.anomaly.active()]
+        if self.compound is not None:
+            active += [(room, label, violation.type, violation.severity)
+                       for room, label, violation in self.compound.active()]
+        if self.liveness is not None:
+            active += [(room, sensor_type, violation.type, violation.severity)
+                       for room, sensor_type, violation in self.liveness.active()]
+        return active
+
+    def trigger_alert(self, sensor_type, alert_info):
+        """Queue a raised alert for the notification sinks (the state machine has de-duplicated it)"""
+        with self._lock:
+            self.alert_count += 1
+            number = self.alert_count
+        if self.noisy is not None:
+            self.noisy.transitions.add((alert_info.get('room', DEFAULT_ROOM), sensor_type))
+        if self.dispatcher is not None:
+            self.notify(Notification(
+                'alert', sensor_type, alert_info.get('room', DEFAULT_ROOM), alert_info['type'],
+                alert_info.get('severity', 'warning'), alert_info['value'],
+                alert_info['threshold'], alert_info['unit'], number))
+
+    def clear_alert(self, sensor_type, value, unit, room=DEFAULT_ROOM, alert_type=''):
+        """Queue an alert-cleared notification"""
+        if self.noisy is not None:
+            self.noisy.transitions.add((room, sensor_type))
+        if self.dispatcher is not None:
+            self.notify(Notification('clear', sensor_type, room, alert_type, value=value, unit=unit))
+
+    def notify(self, notification):
+        """Submit to the dispatcher; alerts folded into a storm only reach the audit sinks"""
+        if self.storm is None:
+            self.dispatcher.submit(notification)
+            return
+        deliver, grouped = self.storm.observe(notification)
+        if deliver:
+            self.dispatcher.submit(notification)
+        else:
+            self.dispatcher.submit(notification, audit_only=True)
+        for storm in grouped:
+            self.dispatcher.submit(storm)
+
+    def check_storms(self, now=None):
+        """Send storm count updates that are due; returns how many"""
+        if self.storm is None or self.dispatcher is None:
+            return 0
+        updates = self.storm.tick(now)
+        for storm in updates:
+            self.dispatcher.submit(storm)
+        return len(updates)
@@ -0,0 +1,299 @@
+"""
+Streaming Anomaly Detection
+Per-sensor EWMA mean and variance, an optional hour-of-day baseline and a
+stuck-value counter, kept in flat arrays with O(1) work per reading
+
+Static thresholds cannot see a reading that is unusual but still inside the
+normal band, or a sensor that keeps repeating one value. For every sensor
+the detector tracks an exponentially weighted mean and variance and flags
+readings whose z-score exceeds the configured limit:
+
+    z = (x - mean) / max(std, min_std)
+    mean += alpha * (x - mean)
+    var = (1 - alpha) * (var + alpha * (x - mean_old)^2)
+
+With "seasonal" on, x is first reduced by a per-hour profile (a slow EWMA of
+the readings seen in that hour of the day), so the simulators' diurnal
+cycles are not mistaken for anomalies.
+
+Rule syntax (top level of alert_rules.json):
+    "anomaly": {"z": 5, "alpha": 0.05, "warmup": 30, "seasonal": true,
+                "seasonal_alpha": 0.01, "stuck_after": 200,
+                "sensors": ["temperature", "humidity"]}
+
+State lives in array('d')/array('q') columns indexed by a slot per sensor
+(48 bytes per sensor, plus 384 with the hourly profile), so 100k sensors
+take about 5 MB, or 41 MB with hourly baselines. update() works on Python floats read from the
+columns; update_batch() runs the same arithmetic over NumPy views of them.
+"""
+
+import math
+from array import array
+
+import numpy as np
+
+from src.alerts.rules import Violation
+from src.alerts.state import Transition
+
+HOURS = 24
+_ACTIVE, _STUCK = 1, 2
+
+
+class AnomalyDetector:
+    """EWMA z-score and stuck-sensor detection for every (room, sensor_type)"""
+
+    def __init__(self, z=4.0, alpha=0.05, warmup=30, seasonal=False, seasonal_alpha=0.01,
+                 min_std=0.01, clear_z=None, stuck_after=None, sensors=None):
+        if not 0 < alpha < 1 or not 0 < seasonal_alpha < 1:
+            raise ValueError("anomaly alpha and seasonal_alpha must be between 0 and 1")
+        if min_std <= 0:
+            raise ValueError("anomaly min_std must be positive")
+        self.z = z
+        self.clear_z = z / 2 if clear_z is None else clear_z
+        self.alpha = alpha
+        self.warmup = warmup
+        self.seasonal = seasonal
+        self.seasonal_alpha = seasonal_alpha
+        self.min_std = min_std
+        self.stuck_after = stuck_after
+        self.sensors = set(sensors) if sensors else None
+        self.violation = Violation('ANOMALY', 'warning', f"{z}σ")
+        self.stuck_violation = Violation('STUCK', 'warning', f"{stuck_after} repeats")
+        self.slots = {}
+        self.keys = []
+        self.mean = array('d')
+        self.var = array('d')
+        self.last = array('d')
+        self.count = array('q')
+        self.same = array('q')
+        self.flags = array('q')
+        self.profile = array('d')
+        self.profile_count = array('q')
+        self.flagged = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build from the "anomaly" section of a rule file"""
+        return cls(**{key: value for key, value in spec.items() if key != 'enabled'})
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        columns = (self.mean, self.var, self.last, self.count, self.same, self.flags,
+                   self.profile, self.profile_count)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def slot(self, room, sensor_type):
+        """Column index of a sensor, allocated on first use; None for unwatched sensor types"""
+        key = (room, sensor_type)
+        slot = self.slots.get(key)
+        if slot is None:
+            if self.sensors is not None and sensor_type not in self.sensors:
+                return None
+            slot = self.slots[key] = len(self.keys)
+            self.keys.append(key)
+            for column in (self.mean, self.var, self.last):
+                column.append(0.0)
+            for column in (self.count, self.same, self.flags):
+                column.append(0)
+            if self.seasonal:
+                self.profile.frombytes(bytes(8 * HOURS))
+                self.profile_count.frombytes(bytes(8 * HOURS))
+        return slot
+
+    def reserve(self, keys):
+        """Allocate slots for many (room, sensor_type) keys; returns their slots"""
+        return [self.slot(room, sensor_type) for room, sensor_type in keys]
+
+    # ---- per reading -----------------------------------------------------
+
+    def update(self, room, sensor_type, value, hour=0):
+        """Feed one reading; returns None or a list of Transitions"""
+        slot = self.slots.get((room, sensor_type))
+        if slot is None:
+            slot = self.slot(room, sensor_type)
+            if slot is None:
+                return None
+        x = value
+        if self.seasonal:
+            p = slot * HOURS + hour
+            if self.profile_count[p]:
+                base = self.profile[p]
+                self.profile[p] = base + self.seasonal_alpha * (value - base)
+            else:
+                base = self.profile[p] = value
+            self.profile_count[p] += 1
+            x = value - base
+
+        n = self.count[slot]
+        self.count[slot] = n + 1
+        if n:
+            mean = self.mean[slot]
+            var = self.var[slot]
+            diff = x - mean
+            std = math.sqrt(var)
+            z = diff / (std if std > self.min_std else self.min_std)
+            incr = self.alpha * diff
+            self.mean[slot] = mean + incr
+            self.var[slot] = (1 - self.alpha) * (var + diff * incr)
+        else:
+            self.mean[slot] = x
+            z = 0.0
+
+        same = self.same[slot] + 1 if n and value == self.last[slot] else 0
+        self.same[slot] = same
+        self.last[slot] = value
+
+        flags = self.flags[slot]
+        transitions = None
+        if flags & _ACTIVE:
+            if abs(z) <= self.clear_z:
+                flags &= ~_ACTIVE
+                transitions = [Transition('clear', self.violation)]
+        elif n >= self.warmup and abs(z) > self.z:
+            flags |= _ACTIVE
+            self.flagged += 1
+            transitions = [Transition('raise', self.violation)]
+        if self.stuck_after is not None:
+            if flags & _STUCK:
+                if same == 0:
+                    flags &= ~_STUCK
+                    transitions = (transitions or []) + [Transition('clear', self.stuck_violation)]
+            elif same >= self.stuck_after:
+                flags |= _STUCK
+                transitions = (transitions or []) + [Transition('raise', self.stuck_violation)]
+        self.flags[slot] = flags
+        return transitions
+
+    # ---- batches ---------------------------------------------------------
+
+    def update_batch(self, slots, values, hours=0):
+        """
+        Feed many readings at once (slots from slot()/reserve()).
+
+        Returns [(position in the batch, Transition)] in batch order. A slot
+        that occurs more than once is applied in order, one round per
+        occurrence, so results match calling update() reading by reading.
+        """
+        slots = np.asarray(slots, dtype=np.intp)
+        values = np.asarray(values, dtype=float)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.intp), slots.shape)
+        positions = np.arange(len(slots))
+        events = []
+        while len(slots):
+            _, first = np.unique(slots, return_index=True)
+            if len(first) == len(slots):
+                events.extend(self._apply(slots, values, hours, positions))
+                break
+            round_ = np.zeros(len(slots), dtype=bool)
+            round_[first] = True
+            events.extend(self._apply(slots[round_], values[round_], hours[round_], positions[round_]))
+            rest = ~round_
+            slots, values, hours, positions = slots[rest], values[rest], hours[rest], positions[rest]
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def _apply(self, slots, values, hours, positions):
+        """One vectorized step over distinct slots"""
+        mean_col = np.frombuffer(self.mean, dtype=float)
+        var_col = np.frombuffer(self.var, dtype=float)
+        last_col = np.frombuffer(self.last, dtype=float)
+        count_col = np.frombuffer(self.count, dtype=np.int64)
+        same_col = np.frombuffer(self.same, dtype=np.int64)
+        flags_col = np.frombuffer(self.flags, dtype=np.int64)
+
+        x = values
+        if self.seasonal:
+            profile = np.frombuffer(self.profile, dtype=float)
+            profile_count = np.frombuffer(self.profile_count, dtype=np.int64)
+            p = slots * HOURS + hours
+            seen = profile_count[p] > 0
+            base = np.where(seen, profile[p], values)
+            profile[p] = np.where(seen, base + self.seasonal_alpha * (values - base), values)
+            profile_count[p] += 1
+            x = values - base
+
+        n = count_col[slots]
+        count_col[slots] = n + 1
+        started = n > 0
+        mean = mean_col[slots]
+        var = var_col[slots]
+        diff = x - mean
+        std = np.sqrt(var)
+        z = np.where(started, diff / np.where(std > self.min_std, std, self.min_std), 0.0)
+        incr = self.alpha * diff
+        mean_col[slots] = np.where(started, mean + incr, x)
+        var_col[slots] = np.where(started, (1 - self.alpha) * (var + diff * incr), var)
+
+        same = np.where(started & (values == last_col[slots]), same_col[slots] + 1, 0)
+        same_col[slots] = same
+        last_col[slots] = values
+
+        flags = flags_col[slots]
+        active = (flags & _ACTIVE) != 0
+        abs_z = np.abs(z)
+        cleared = active & (abs_z <= self.clear_z)
+        raised = ~active & (n >= self.warmup) & (abs_z > self.z)
+        flags = np.where(cleared, flags & ~_ACTIVE, np.where(raised, flags | _ACTIVE, flags))
+        events = [(int(positions[i]), Transition('clear', self.violation)) for i in np.flatnonzero(cleared)]
+        events += [(int(positions[i]), Transition('raise', self.violation)) for i in np.flatnonzero(raised)]
+        self.flagged += int(raised.sum())
+        if self.stuck_after is not None:
+            stuck = (flags & _STUCK) != 0
+            unstuck = stuck & (same == 0)
+            now_stuck = ~stuck & (same >= self.stuck_after)
+            flags = np.where(unstuck, flags & ~_STUCK, np.where(now_stuck, flags | _STUCK, flags))
+            events += [(int(positions[i]), Transition('clear', self.stuck_violation)) for i in np.flatnonzero(unstuck)]
+            events += [(int(positions[i]), Transition('raise', self.stuck_violation))
+                       for i in np.flatnonzero(now_stuck)]
+        flags_col[slots] = flags
+        return events
+
+    # ---- snapshots -------------------------------------------------------
+
+    def capture(self):
+        """(header, state columns) for state snapshots"""
+        columns = [self.mean, self.var, self.last, self.count, self.same, self.flags]
+        if self.seasonal:
+            columns += [self.profile, self.profile_count]
+        return {'keys': self.keys, 'seasonal': self.seasonal, 'flagged': self.flagged}, columns
+
+    def restore(self, header, columns):
+        """
+        Load capture() output into the slots of watched sensors; returns how many were restored.
+
+        Means and variances learned with the other "seasonal" setting are
+        measured from a different baseline, so such a snapshot is dropped.
+        """
+        if header['seasonal'] != self.seasonal:
+            return 0
+        slots = self.reserve(tuple(key) for key in header['keys'])
+        kept = [i for i, slot in enumerate(slots) if slot is not None]
+        if not kept:
+            return 0
+        source = np.array(kept, dtype=np.intp)
+        target = np.array([slots[i] for i in kept], dtype=np.intp)
+        ours = [self.mean, self.var, self.last, self.count, self.same, self.flags]
+        for column, saved in zip(ours, columns):
+            dtype = float if column.typecode == 'd' else np.int64
+            np.frombuffer(column, dtype=dtype)[target] = np.frombuffer(saved, dtype=dtype)[source]
+        if self.seasonal:
+            for column, saved in zip((self.profile, self.profile_count), columns[len(ours):]):
+                dtype = float if column.typecode == 'd' else np.int64
+                view = np.frombuffer(column, dtype=dtype).reshape(-1, HOURS)
+                view[target] = np.frombuffer(saved, dtype=dtype).reshape(-1, HOURS)[source]
+        if self.stuck_after is None:
+            np.frombuffer(self.flags, dtype=np.int64)[target] &= ~_STUCK
+        self.flagged += header['flagged']
+        return len(kept)
+
+    def active(self):
+        """Yield (room, sensor_type, violation) for raised anomaly and stuck alerts"""
+        for slot, flags in enumerate(self.flags):
+            if flags:
+                room, sensor_type = self.keys[slot]
+                if flags & _ACTIVE:
+                    yield room, sensor_type, self.violation
+                if flags & _STUCK:
+                    yield room, sensor_type, self.stuck_violation
@@ -0,0 +1,433 @@
+"""
+Alert Backtesting
+Replays recorded or synthetic readings through a rule set with no broker
+and no sleeps, and reports how many alerts each rule would have raised, how
+long they lasted and how often they flapped
+
+Each (room, sensor_type) series is evaluated as a whole with array
+operations where the rules allow:
+
+- threshold bands: a reading that is inside the band of its hour while the
+  sensor has no alert raised and an empty debounce history changes nothing,
+  so only the stretches from an out-of-band reading until the state machine
+  is idle again go through AlertTracker.update() - the same code the live
+  system runs, so hysteresis, debounce, escalation and hourly profiles
+  behave identically;
+- rate of change: computed for all consecutive pairs at once;
+- sliding windows: bucket indices, cumulative sums and a sparse max table
+  give every reading's window average, maximum and time above the limit.
+
+Anomaly detection, compound rules and liveness are not backtested: they
+depend on cross-sensor or wall-clock state rather than one series.
+
+Usage:
+    python -m src.alerts.backtest --rules new_rules.json --history recordings/*.jsonl
+    python -m src.alerts.backtest --rules new_rules.json --baseline src/alerts/alert_rules.json --synthetic 200 --days 30
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from src.alerts.batch import epoch_seconds
+from src.alerts.rules import CompiledRule, RuleEngine
+from src.alerts.state import AlertTracker, SensorState
+
+DEFAULT_FLAP_WINDOW = 300.0
+
+
+def local_hours(times, utc_offset=None):
+    """Hour of day of every epoch time; the offset defaults to the local one at the first reading"""
+    if utc_offset is None:
+        utc_offset = time.localtime(float(times[0]) if len(times) else None).tm_gmtoff
+    return ((np.asarray(times) + utc_offset) // 3600 % 24).astype(np.intp)
+
+
+# ---- vectorized rule parts -------------------------------------------------
+
+def rate_changes(max_rate, times, values):
+    """Positions where the RATE alert flips, with the new state, as AlertTracker.update sees them"""
+    dt = np.diff(times)
+    valid = dt > 0
+    fast = np.zeros(len(dt), dtype=bool)
+    fast[valid] = np.abs(np.diff(values))[valid] * 60 / dt[valid] > max_rate
+    # Pairs with dt <= 0 leave the state as it was: carry the last valid verdict forward
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(dt)), -1))
+    state = np.where(last_valid >= 0, fast[np.maximum(last_valid, 0)], False)
+    flips = np.flatnonzero(state != np.r_[False, state[:-1]])
+    return flips + 1, state[flips]
+
+
+def _sliding_max(values, starts):
+    """max(values[starts[i]:i + 1]) for every i, with a sparse table over the needed range lengths"""
+    n = len(values)
+    ends = np.arange(n)
+    lengths = ends - starts + 1
+    levels = [values]
+    while (1 << len(levels)) <= lengths.max():
+        prev, step = levels[-1], 1 << (len(levels) - 1)
+        levels.append(np.maximum(prev[:-step], prev[step:]))
+    k = np.floor(np.log2(lengths)).astype(np.intp)
+    result = np.empty(n)
+    for level in np.unique(k):
+        rows = np.flatnonzero(k == level)
+        table = levels[level]
+        result[rows] = np.maximum(table[starts[rows]], table[ends[rows] - (1 << level) + 1])
+    return result
+
+
+def window_holds(spec, times, values):
+    """Whether a window condition holds after each reading (WindowState.add, for a whole series)"""
+    index = np.maximum.accumulate(np.floor_divide(times, spec.width))
+    # The window covers the current bucket and the `buckets` before it
+    starts = np.searchsorted(index, index - spec.slots, side='right')
+    ends = np.arange(1, len(times) + 1)
+    # A gap of a whole window empties it: coverage and time above start over
+    reset = np.r_[True, np.diff(index) >= spec.slots]
+    if spec.agg == 'time_above':
+        held = np.zeros(len(times))
+        if len(times) > 1:
+            gaps = np.minimum(np.diff(times), times[1:] - (index[1:] - spec.buckets) * spec.width)
+            held[1:] = np.where((values[:-1] > spec.above) & (gaps > 0) & ~reset[1:], gaps, 0.0)
+        total = np.r_[0.0, np.cumsum(held)]
+        return total[ends] - total[starts] >= spec.duration
+    first = times[np.maximum.accumulate(np.where(reset, np.arange(len(times)), 0))]
+    covered = times - first >= spec.window * spec.min_coverage
+    if spec.agg == 'avg':
+        total = np.r_[0.0, np.cumsum(values)]
+        return covered & ((total[ends] - total[starts]) / (ends - starts) > spec.above)
+    return covered & (_sliding_max(values, starts) > spec.above)
+
+
+def _flips(holds):
+    flips = np.flatnonzero(holds != np.r_[False, holds[:-1]])
+    return flips, holds[flips]
+
+
+# ---- results ---------------------------------------------------------------
+
+class RuleStats:
+    """Counts and durations of one alert kind (sensor type + alert type)"""
+
+    __slots__ = ('raised', 'critical', 'flaps', 'durations', 'open', 'sensors', 'flapping_sensors')
+
+    def __init__(self):
+        self.raised = 0
+        self.critical = 0
+        self.flaps = 0
+        self.durations = []
+        self.open = 0
+        self.sensors = set()
+        self.flapping_sensors = set()
+
+    def to_dict(self):
+        durations = self.durations
+        return {
+            'raised': self.raised,
+            'critical': self.critical,
+            'sensors': len(self.sensors),
+            'open_at_end': self.open,
+            'duration_total_s': float(sum(durations)),
+            'duration_mean_s': float(sum(durations) / len(durations)) if durations else 0.0,
+            'duration_max_s': float(max(durations)) if durations else 0.0,
+            'flaps': self.flaps,
+            'flapping_sensors': len(self.flapping_sensors),
+        }
+
+
+class BacktestReport:
+    """Per-rule statistics of one backtest run"""
+
+    def __init__(self, flap_window=DEFAULT_FLAP_WINDOW):
+        self.flap_window = flap_window
+        self.rules = defaultdict(RuleStats)
+        self.readings = 0
+        self.series = 0
+        self.evaluated = 0
+        self.elapsed = 0.0
+
+    def add_series(self, room, sensor_type, events, end_time):
+        """Fold one series' (time, action, violation) events, in time order, into the stats"""
+        since = {}
+        last_clear = {}
+        for when, action, violation in events:
+            kind = violation.type
+            stats = self.rules[f"{sensor_type} {kind}"]
+            if action == 'raise':
+                stats.raised += 1
+                stats.sensors.add(room)
+                if violation.severity == 'critical':
+                    stats.critical += 1
+                if kind in since:
+                    # Escalation of an alert that is already raised
+                    continue
+                since[kind] = when
+                cleared = last_clear.get(kind)
+                if cleared is not None and when - cleared <= self.flap_window:
+                    stats.flaps += 1
+                    stats.flapping_sensors.add(room)
+            else:
+                started = since.pop(kind, None)
+                if started is not None:
+                    stats.durations.append(when - started)
+                last_clear[kind] = when
+        for kind, started in since.items():
+            stats = self.rules[f"{sensor_type} {kind}"]
+            stats.open += 1
+            stats.durations.append(end_time - started)
+
+    def total_raised(self):
+        return sum(stats.raised for stats in self.rules.values())
+
+    def to_dict(self):
+        return {
+            'readings': self.readings,
+            'series': self.series,
+            'elapsed_s': self.elapsed,
+            'rules': {name: stats.to_dict() for name, stats in sorted(self.rules.items())},
+        }
+
+
+# ---- engine ----------------------------------------------------------------
+
+class Backtest:
+    """Run readings through a RuleEngine's threshold, rate and window rules"""
+
+    def __init__(self, rules, flap_window=DEFAULT_FLAP_WINDOW, utc_offset=None):
+        self.rules = rules
+        self.flap_window = flap_window
+        self.utc_offset = utc_offset
+
+    def series_events(self, room, sensor_type, times, values, hours=None):
+        """
+        [(time, action, violation)] for one sensor, in the order the live
+        tracker would emit them, plus how many readings needed the state
+        machine. None if no rule covers the sensor.
+        """
+        rule = self.rules.rule_for(room, sensor_type)
+        if rule is None:
+            return None
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float)
+        n = len(values)
+        if n == 0:
+            return [], 0
+        if hours is None:
+            hours = local_hours(times, self.utc_offset)
+        # (position, order within the reading, action, violation); same order as AlertTracker.update
+        events = []
+        if rule.max_rate is not None:
+            positions, states = rate_changes(rule.max_rate, times, values)
+            events += [(p, 0, 'raise' if s else 'clear', rule.rate_violation)
+                       for p, s in zip(positions.tolist(), states.tolist())]
+        for order, spec in enumerate(rule.windows or (), start=1):
+            positions, states = _flips(window_holds(spec, times, values))
+            events += [(p, order, 'raise' if s else 'clear', spec.violation)
+                       for p, s in zip(positions.tolist(), states.tolist())]
+        band_events, evaluated = self._band_events(room, sensor_type, rule, times, values, hours)
+        events += band_events
+        events.sort(key=lambda event: (event[0], event[1]))
+        return [(float(times[p]), action, violation) for p, _, action, violation in events], evaluated
+
+    def _band_events(self, room, sensor_type, rule, times, values, hours):
+        """Band transitions; only the readings that can change the state machine are fed to it"""
+        bands = rule.hours
+        lo = np.array([band.lo for band in bands])[hours]
+        hi = np.array([band.hi for band in bands])[hours]
+        outside = np.flatnonzero((values < lo) | (values > hi))
+        if not len(outside):
+            return [], 0
+        # A private tracker whose state has only the band part of the rule
+        spec = {key: value for key, value in rule.spec.items() if key not in ('max_rate', 'windows')}
+        state = SensorState(CompiledRule(room, sensor_type, rule.unit, bands, spec))
+        tracker = AlertTracker(self.rules)
+        tracker.states[sensor_type] = {room: state}
+        update = tracker.update
+        order = 1 + len(rule.windows or ())
+        value_list = values.tolist()
+        time_list = times.tolist()
+        hour_list = hours.tolist()
+        n = len(value_list)
+        events = []
+        evaluated = 0
+        next_outside = 0
+        pos = int(outside[0])
+        while True:
+            # Run the state machine until it is idle again
+            while pos < n:
+                transitions = update(room, sensor_type, value_list[pos], time_list[pos], hour_list[pos])
+                evaluated += 1
+                if transitions is not None:
+                    events += [(pos, order, action, violation) for action, violation in transitions]
+                pos += 1
+                if state.active is None and state.history == 0:
+                    break
+            # In-band readings of an idle sensor are no-ops: jump to the next violation
+            next_outside = int(np.searchsorted(outside, pos, side='left'))
+            if pos >= n or next_outside >= len(outside):
+                return events, evaluated
+            pos = int(outside[next_outside])
+
+    def run(self, series):
+        """Backtest an iterable of (room, sensor_type, times, values); returns a BacktestReport"""
+        report = BacktestReport(self.flap_window)
+        start = time.perf_counter()
+        for room, sensor_type, times, values in series:
+            result = self.series_events(room, sensor_type, times, values)
+            if result is None:
+                continue
+            events, evaluated = result
+            report.series += 1
+            report.readings += len(values)
+            report.evaluated += evaluated
+            report.add_series(room, sensor_type, events, float(times[-1]) if len(times) else 0.0)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+
+# ---- inputs ----------------------------------------------------------------
+
+def _group(rows):
+    """(room, sensor_type, timestamp, value) rows -> [(room, sensor_type, times, values)] in file order"""
+    grouped = defaultdict(lambda: ([], []))
+    for room, sensor_type, timestamp, value in rows:
+        stamps, values = grouped[room, sensor_type]
+        stamps.append(timestamp)
+        values.append(value)
+    return [(room, sensor_type, epoch_seconds(stamps), np.array(values, dtype=float))
+            for (room, sensor_type), (stamps, values) in grouped.items()]
+
+
+def _history_rows(path):
+    """Rows of a JSON Lines recording (raw payloads or live-feed readings) or an exported CSV"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            for record in csv.DictReader(f):
+                try:
+                    yield record['room'], record['sensor_type'], record['timestamp'], float(record['value'])
+                except (KeyError, ValueError):
+                    continue
+            return
+        for line in f:
+            try:
+                record = json.loads(line)
+                topic = record.get('topic')
+                room = topic.split('/')[1] if topic and topic.count('/') >= 2 else record.get('location', '')
+                yield room, record['sensor_type'], record['timestamp'], float(record['value'])
+            except (ValueError, KeyError, AttributeError, TypeError):
+                continue
+
+
+def load_history(paths):
+    """Series from JSON Lines recordings and/or CSV exports (src.dashboard.export)"""
+    def rows():
+        for path in paths:
+            yield from _history_rows(path)
+    return _group(rows())
+
+
+def synthetic_history(rooms, days, step=60.0, seed=0, start=1704067200.0):
+    """
+    A month-like history for `rooms` rooms: diurnal temperature and light,
+    humidity and an occupancy-driven CO2 cycle, with noise and the odd excursion.
+    """
+    rng = np.random.default_rng(seed)
+    times = start + np.arange(int(days * 86400 / step)) * step
+    hour = (times % 86400) / 3600
+    day = np.sin((hour - 9) * np.pi / 12)
+    occupied = ((hour >= 8) & (hour < 23)).astype(float)
+    series = []
+    for r in range(rooms):
+        room = f"room{r + 1}"
+        n = len(times)
+        excursions = rng.random(n) < 0.001
+        temperature = rng.uniform(22, 25) + 2.5 * day + rng.normal(0, 0.3, n) + excursions * rng.normal(0, 6, n)
+        humidity = rng.uniform(45, 55) - 6 * day + rng.normal(0, 1.5, n) + excursions * rng.normal(0, 15, n)
+        co2 = 450 + occupied * rng.uniform(200, 450) * (1 + 0.3 * day) + rng.normal(0, 40, n)
+        light = np.clip(500 + 250 * day + rng.normal(0, 40, n), 0, None) + excursions * rng.normal(0, 300, n)
+        for sensor_type, values in (('temperature', temperature), ('humidity', humidity),
+                                    ('co2', co2), ('light', light)):
+            series.append((room, sensor_type, times, np.round(values, 2)))
+    return series
+
+
+# ---- CLI -------------------------------------------------------------------
+
+def print_report(report, baseline=None):
+    names = sorted(set(report.rules) | set(baseline.rules if baseline else ()))
+    print(f"{'Rule':24} {'Alerts':>8} {'Crit':>6} {'Sensors':>8} {'Mean dur':>10} {'Max dur':>10} "
+          f"{'Flaps':>7}" + (f" {'Baseline':>9}" if baseline else ""))
+    print("-" * (77 + (10 if baseline else 0)))
+    for name in names:
+        stats = report.rules[name].to_dict() if name in report.rules else RuleStats().to_dict()
+        line = (f"{name:24} {stats['raised']:8,} {stats['critical']:6,} {stats['sensors']:8,} "
+                f"{stats['duration_mean_s'] / 60:7.1f} min {stats['duration_max_s'] / 3600:8.1f} h "
+                f"{stats['flaps']:7,}")
+        if baseline:
+            line += f" {baseline.rules[name].raised if name in baseline.rules else 0:9,}"
+        print(line)
+    print("-" * (77 + (10 if baseline else 0)))
+    total = f"{'Total':24} {report.total_raised():8,}"
+    if baseline:
+        total += f"{'':46} {baseline.total_raised():9,}"
+    print(total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest alert rules over recorded or synthetic readings")
+    parser.add_argument("--rules", default=None, help="Rule file to test (default: ALERT_RULES_FILE / bundled)")
+    parser.add_argument("--baseline", default=None, help="Rule file to compare against")
+    parser.add_argument("--history", nargs='*', default=[], help="JSON Lines recordings or CSV exports (globs allowed)")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate a history for this many rooms instead")
+    parser.add_argument("--days", type=float, default=30, help="Days of synthetic history")
+    parser.add_argument("--step", type=float, default=60, help="Seconds between synthetic readings")
+    parser.add_argument("--flap-window", type=float, default=DEFAULT_FLAP_WINDOW,
+                        help="A raise within this many seconds of the previous clear counts as a flap")
+    parser.add_argument("--utc-offset", type=float, default=None, help="Seconds east of UTC for hourly profiles")
+    parser.add_argument("--json", action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        rules = RuleEngine.from_file(args.rules)
+        baseline_rules = RuleEngine.from_file(args.baseline) if args.baseline else None
+    except FileNotFoundError as e:
+        parser.error(f"rule file not found: {e.filename}")
+
+    paths = sorted(p for pattern in args.history for p in glob.glob(pattern))
+    load_start = time.perf_counter()
+    if paths:
+        series = load_history(paths)
+    elif args.synthetic:
+        series = synthetic_history(args.synthetic, args.days, args.step)
+    else:
+        parser.error("nothing to replay: pass --history or --synthetic")
+    loaded = time.perf_counter() - load_start
+
+    report = Backtest(rules, args.flap_window, args.utc_offset).run(series)
+    baseline = None
+    if baseline_rules is not None:
+        baseline = Backtest(baseline_rules, args.flap_window, args.utc_offset).run(series)
+
+    if args.json:
+        result = report.to_dict()
+        if baseline:
+            result['baseline'] = baseline.to_dict()
+        print(json.dumps(result, indent=2))
+        return
+    print(f"\n🧪 Backtest of {os.path.basename(args.rules) if args.rules else 'default rules'}: "
+          f"{report.readings:,} readings from {report.series:,} sensors (loaded in {loaded:.1f}s)\n")
+    print_report(report, baseline)
+    rate = report.readings / report.elapsed if report.elapsed else 0
+    print(f"\n⚡ {rate:,.0f} readings/s ({report.evaluated:,} needed the state machine), "
+          f"{report.elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
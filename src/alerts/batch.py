@@ -0,0 +1,335 @@
+"""
+Micro-Batched Alert Evaluation
+Collects MQTT readings for up to N items or T milliseconds and evaluates the
+batch with array operations instead of one Python call chain per message
+
+A batch is decoded with a single json.loads over the joined payloads, its
+timestamps are parsed as one datetime64 array, and the threshold bands of
+every reading are compared at once. Readings that are in band for a sensor
+with nothing pending (no raised alert, empty debounce history, no rate or
+window rule) only record their value and time; the rest go through the
+sensor's state machine in arrival order, so transitions are exactly those
+of the per-message path. Anomaly detection, when configured, updates every
+reading's baseline in one vectorized pass, compound rules and the liveness
+monitor see every reading in order, and message volume per sensor (see
+src.alerts.topk) is counted from the slot arrays of several batches at once.
+"""
+
+import json
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.alerts.alert_system import reading_time, room_from_topic
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_BATCH_DELAY = 0.020
+LATENCY_SAMPLES = 10000
+_STOP = object()
+
+
+def decode_payloads(payloads):
+    """Decode JSON payloads (bytes) in one call; returns (records, errors)"""
+    try:
+        records = json.loads(b'[' + b','.join(payloads) + b']')
+        if len(records) == len(payloads):
+            return records, 0
+    except (ValueError, TypeError):
+        pass
+    # A malformed payload spoils the joined document: decode one by one
+    records = []
+    errors = 0
+    for payload in payloads:
+        try:
+            records.append(json.loads(payload))
+        except (ValueError, TypeError):
+            records.append(None)
+            errors += 1
+    return records, errors
+
+
+def epoch_seconds(timestamps):
+    """Epoch seconds of ISO 'timestamp' strings (naive = UTC), parsed as one array"""
+    try:
+        stamps = np.array([t[:-1] if t[-1] == 'Z' else t for t in timestamps], dtype='datetime64[us]')
+    except (ValueError, TypeError, IndexError):
+        # Offsets, missing or odd timestamps: the per-reading parser handles them all
+        return np.array([reading_time(t) for t in timestamps], dtype=float)
+    return stamps.astype(np.int64) / 1e6
+
+
+class BatchEvaluator:
+    """
+    Run batches of (topic, payload) messages through an AlertSystem.
+
+    Every (room, sensor_type) seen gets a slot; the bands of the current hour
+    are kept in NumPy arrays indexed by slot, next to an "engaged" flag for
+    sensors whose state machine must see every reading. `admit`, when given,
+    is called as admit(room, sensor_type, when) and filters readings (stale
+    forwards, catch-up replays) before evaluation.
+    """
+
+    def __init__(self, alert_system, admit=None):
+        self.alert_system = alert_system
+        self.tracker = alert_system.tracker
+        self.admit = admit
+        self._slots = {}
+        self._keys = []
+        # Slot arrays of batches not yet counted into the message-volume table
+        self._uncounted = []
+        self._uncounted_readings = 0
+        self._topics = {}
+        self._states = []
+        self._hour = None
+        self._lo = np.empty(0)
+        self._hi = np.empty(0)
+        self._engaged = np.zeros(0, dtype=bool)
+        self.batches = 0
+        self.screened = 0
+        self.errors = 0
+
+    def _slot(self, room, sensor_type):
+        key = (room, sensor_type)
+        slot = self._slots.get(key)
+        if slot is None:
+            state = self.tracker.state_for(room, sensor_type)
+            if state is None:
+                return None
+            slot = self._slots[key] = len(self._states)
+            self._states.append(state)
+            self._keys.append(key)
+        return slot
+
+    def count_messages(self):
+        """
+        Add the readings of the batches since the last call to the alert
+        system's message-volume table; runs by itself every CHUNK readings
+        """
+        if not self._uncounted:
+            return
+        slots = np.concatenate(self._uncounted)
+        self._uncounted = []
+        self._uncounted_readings = 0
+        self._count_messages(self.alert_system.noisy.messages, slots)
+
+    def _count_messages(self, summary, slots):
+        """Feed message counts per sensor to a SpaceSaving summary"""
+        ordered = np.sort(slots)
+        starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+        unique = ordered[starts]
+        counts = np.diff(np.append(starts, len(ordered)))
+        wanted = 2 * summary.k
+        if len(unique) > wanted:
+            # Only the k largest unmonitored sensors of the batch can be kept; the 2k largest include them
+            chosen = np.argpartition(counts, -wanted)[-wanted:]
+            get = self._slots.get
+            monitored = np.fromiter((get(key, -1) for key in list(summary.counts)), dtype=np.intp)
+            found = np.minimum(np.searchsorted(unique, monitored), len(unique) - 1)
+            found = found[unique[found] == monitored]
+            chosen = np.concatenate((chosen, found))
+            unique, counts = unique[chosen], counts[chosen]
+        keys = self._keys
+        # A monitored sensor among the 2k largest appears twice; the dict keeps one
+        summary.update({keys[slot]: count for slot, count in zip(unique.tolist(), counts.tolist())},
+                       len(slots))
+
+    def _refresh(self, hour):
+        """Rebuild the slot arrays after an hour change or new sensors"""
+        bands = [state.rule.hours[hour] for state in self._states]
+        self._lo = np.array([band.lo for band in bands], dtype=float)
+        self._hi = np.array([band.hi for band in bands], dtype=float)
+        engaged = np.zeros(len(self._states), dtype=bool)
+        engaged[:len(self._engaged)] = self._engaged
+        for slot in range(len(self._engaged), len(self._states)):
+            engaged[slot] = self._states[slot].engaged()
+        self._engaged = engaged
+        self._hour = hour
+
+    def process(self, items, hour=None):
+        """Evaluate a batch of (topic, payload bytes); returns the number of transitions"""
+        self.batches += 1
+        received = time.time_ns()
+        started = time.perf_counter_ns()
+        records, errors = decode_payloads([payload for _, payload in items])
+        self.errors += errors
+
+        rows = []
+        topics = self._topics
+        anomaly = self.alert_system.anomaly
+        for (topic, _), data in zip(items, records):
+            if not isinstance(data, dict):
+                continue
+            sensor_type = data.get('sensor_type')
+            value = data.get('value')
+            if sensor_type is None or not isinstance(value, (int, float)):
+                continue
+            # (sensor_type, slot, room, anomaly slot) per topic skips the topic split and key tuple
+            cached = topics.get(topic)
+            if cached is None or cached[0] != sensor_type:
+                room = room_from_topic(topic)
+                cached = topics[topic] = (sensor_type, self._slot(room, sensor_type), room,
+                                          anomaly.slot(room, sensor_type) if anomaly is not None else None)
+            if cached[1] is not None:
+                rows.append((cached[1], cached[2], sensor_type, value, data.get('unit', ''), data.get('timestamp'),
+                             cached[3]))
+        self.alert_system.message_count += len(items)
+        if not rows:
+            return 0
+
+        when = epoch_seconds([row[5] for row in rows])
+        latency = self.alert_system.latency
+        # Transit here includes the wait in the micro-batch; decode and evaluate are per-reading shares
+        latency.record_many('transit', received - (when * 1e9).astype(np.int64))
+        decoded = time.perf_counter_ns()
+        latency.record('decode', (decoded - started) // len(items), len(items))
+        if self.admit is not None:
+            keep = [self.admit(row[1], row[2], t) for row, t in zip(rows, when.tolist())]
+            if not all(keep):
+                rows = [row for row, k in zip(rows, keep) if k]
+                when = when[np.array(keep)]
+                if not rows:
+                    return 0
+
+        hour = self.alert_system.rules.current_hour() if hour is None else hour
+        if hour != self._hour or len(self._states) != len(self._lo):
+            self._refresh(hour)
+        slots = np.fromiter((row[0] for row in rows), dtype=np.intp, count=len(rows))
+        values = np.fromiter((row[3] for row in rows), dtype=float, count=len(rows))
+        noisy = self.alert_system.noisy
+        if noisy is not None:
+            self._uncounted.append(slots)
+            self._uncounted_readings += len(slots)
+            if self._uncounted_readings >= noisy.messages.chunk:
+                self.count_messages()
+
+        # Vectorized screen: in band and nothing pending means no state change
+        quiet = (self._lo[slots] <= values) & (values <= self._hi[slots]) & ~self._engaged[slots]
+        if not quiet.all():
+            # A sensor with any reading needing the state machine gets all of its readings there
+            quiet &= ~np.isin(slots, slots[~quiet])
+        self.screened += int(quiet.sum())
+
+        states = self._states
+        engaged = self._engaged
+        process_reading = self.alert_system.process_reading
+        transitions = 0
+        for row, t, is_quiet in zip(rows, when.tolist(), quiet.tolist()):
+            slot = row[0]
+            if is_quiet:
+                state = states[slot]
+                state.last_value = row[3]
+                state.last_time = t
+                continue
+            result = process_reading(row[2], row[3], row[1], row[4], now=t, hour=hour, detect=False)
+            if result is not None:
+                transitions += len(result)
+            engaged[slot] = states[slot].engaged()
+
+        if anomaly is not None:
+            # Every reading updates its baseline, screened or not, in one vectorized pass
+            watched = [i for i, row in enumerate(rows) if row[6] is not None]
+            events = anomaly.update_batch([rows[i][6] for i in watched], values[watched], hour)
+            for position, transition in events:
+                row = rows[watched[position]]
+                self.alert_system.apply_transitions(row[2], row[3], row[1], row[4], [transition])
+            transitions += len(events)
+
+        compound = self.alert_system.compound
+        if compound is not None:
+            for row, t in zip(rows, when.tolist()):
+                events = compound.update(row[1], row[2], row[3], t, hour)
+                if events is not None:
+                    self.alert_system.apply_compound(row[1], events)
+                    transitions += len(events)
+
+        if self.alert_system.liveness is not None:
+            for row in rows:
+                self.alert_system.mark_seen(row[1], row[2], row[3], row[4])
+        latency.record('evaluate', (time.perf_counter_ns() - decoded) // len(rows), len(rows))
+        return transitions
+
+
+class MicroBatcher:
+    """
+    Hand items submitted from any thread to `handler` in batches.
+
+    A batch closes at `max_items` items or `max_delay` seconds after its
+    first item arrived, whichever comes first. submit() blocks when
+    `maxsize` items are waiting, which pushes back on the MQTT network loop
+    instead of growing memory.
+    """
+
+    def __init__(self, handler, max_items=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_BATCH_DELAY, maxsize=100000):
+        self.handler = handler
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batches = 0
+        self.items = 0
+        self.max_batch = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.thread = threading.Thread(target=self._run, name="alert-batcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, item):
+        self.queue.put((time.perf_counter(), item))
+
+    def stop(self, timeout=5.0):
+        """Flush what is queued and stop the batch thread"""
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+    def _run(self):
+        get = self.queue.get
+        running = True
+        while running:
+            first = get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = first[0] + self.max_delay
+            while len(batch) < self.max_items:
+                timeout = deadline - time.perf_counter()
+                try:
+                    entry = get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    running = False
+                    break
+                batch.append(entry)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            self.handler([item for _, item in batch])
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ Error processing batch: {e}")
+        done = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+        if len(batch) > self.max_batch:
+            self.max_batch = len(batch)
+        self.latencies.extend(done - queued for queued, _ in batch)
+
+    def stats(self):
+        latencies = sorted(self.latencies.copy())
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch': self.items / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'errors': self.errors,
+            'latency_ms_avg': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'latency_ms_p99': latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+            'latency_ms_max': latencies[-1] * 1000 if latencies else 0.0,
+        }
@@ -0,0 +1,188 @@
+"""
+Compound Alert Rules
+Conditions across several sensors of one room (high humidity with low
+temperature, high CO2 with the lights off), evaluated against a per-room
+table of latest values
+
+Rule syntax (top level of alert_rules.json):
+    "compound": [
+      {"name": "CONDENSATION_RISK", "severity": "warning", "max_age": 300,
+       "when": [{"sensor": "humidity", "above": 58}, {"sensor": "temperature", "below": 21}]},
+      {"name": "LIGHTS_OFF_OCCUPIED", "hours": [8, 22], "rooms": ["room1"],
+       "when": [{"sensor": "co2", "above": 900}, {"sensor": "light", "below": 150}]}
+    ]
+
+A rule raises while every condition holds and every input is at most
+"max_age" seconds old (by reading timestamp), and clears as soon as one
+fails. A dependency index maps each sensor type to the conditions that read
+it, so a reading re-evaluates only the rules it feeds: one comparison to
+update its condition bit, plus a freshness check of the other inputs when
+all bits are set. Readings of sensors no rule uses cost one dict lookup.
+"""
+
+import math
+from array import array
+
+from src.alerts.rules import Violation, hours_in
+
+DEFAULT_MAX_AGE = 300.0
+
+
+class CompoundRule:
+    """One compiled compound rule; condition i is bit 1 << i"""
+
+    __slots__ = ('index', 'name', 'severity', 'max_age', 'conditions', 'columns', 'all_bits', 'rooms',
+                 'hours', 'label', 'violation')
+
+    def __init__(self, index, spec, column_of):
+        self.index = index
+        self.name = spec['name']
+        self.severity = spec.get('severity', 'warning')
+        self.max_age = float(spec.get('max_age', DEFAULT_MAX_AGE))
+        conditions = []
+        for condition in spec['when']:
+            if ('above' in condition) == ('below' in condition):
+                raise ValueError(f"compound rule {self.name}: each condition needs exactly one of above/below")
+            above = 'above' in condition
+            conditions.append((condition['sensor'], above, condition['above' if above else 'below']))
+        if not conditions:
+            raise ValueError(f"compound rule {self.name} has no conditions")
+        self.conditions = tuple(conditions)
+        self.columns = tuple(sorted({column_of(sensor) for sensor, _, _ in conditions}))
+        self.all_bits = (1 << len(conditions)) - 1
+        self.rooms = frozenset(spec['rooms']) if spec.get('rooms') else None
+        self.hours = frozenset(hours_in(*spec['hours'])) if spec.get('hours') else None
+        self.label = '+'.join(dict.fromkeys(sensor for sensor, _, _ in conditions))
+        description = ' & '.join(f"{sensor} {'>' if above else '<'} {limit}" for sensor, above, limit in conditions)
+        self.violation = Violation(self.name, self.severity, description)
+
+
+class RoomTable:
+    """Latest value and reading time of each input sensor of one room, plus rule state"""
+
+    __slots__ = ('values', 'times', 'truth', 'active')
+
+    def __init__(self, columns, rules):
+        self.values = array('d', bytes(8 * columns))
+        self.times = array('d', [-math.inf]) * columns
+        # Per rule: bitmask of conditions currently true
+        self.truth = [0] * rules
+        # Bitmask of raised rules
+        self.active = 0
+
+
+class CompoundEngine:
+    """Evaluate compound rules as readings arrive"""
+
+    def __init__(self, specs):
+        self.columns = {}
+        self.rules = [CompoundRule(i, spec, self._column) for i, spec in enumerate(specs)]
+        names = [rule.name for rule in self.rules]
+        if len(set(names)) != len(names):
+            raise ValueError("compound rule names must be unique")
+        # sensor_type -> ((rule, condition bit, above, limit), ...)
+        depends = {}
+        for rule in self.rules:
+            for i, (sensor, above, limit) in enumerate(rule.conditions):
+                depends.setdefault(sensor, []).append((rule, 1 << i, above, limit))
+        self.depends = {sensor: tuple(deps) for sensor, deps in depends.items()}
+        self.tables = {}
+        self.evaluations = 0
+
+    def _column(self, sensor_type):
+        return self.columns.setdefault(sensor_type, len(self.columns))
+
+    def table_for(self, room):
+        table = self.tables.get(room)
+        if table is None:
+            table = self.tables[room] = RoomTable(len(self.columns), len(self.rules))
+        return table
+
+    def update(self, room, sensor_type, value, now, hour=None):
+        """Record a reading; returns None or [(action, rule)] for rules that raised or cleared"""
+        deps = self.depends.get(sensor_type)
+        if deps is None:
+            return None
+        table = self.tables.get(room)
+        if table is None:
+            table = self.table_for(room)
+        column = self.columns[sensor_type]
+        table.values[column] = value
+        table.times[column] = now
+        events = None
+        for rule, bit, above, limit in deps:
+            if rule.rooms is not None and room not in rule.rooms:
+                continue
+            self.evaluations += 1
+            index = rule.index
+            truth = table.truth[index]
+            truth = truth | bit if (value > limit if above else value < limit) else truth & ~bit
+            table.truth[index] = truth
+            holds = truth == rule.all_bits
+            if holds and rule.hours is not None and hour is not None:
+                holds = hour in rule.hours
+            if holds:
+                oldest = now - rule.max_age
+                times = table.times
+                for c in rule.columns:
+                    if times[c] < oldest:
+                        holds = False
+                        break
+            active = table.active >> index & 1
+            if holds and not active:
+                table.active |= 1 << index
+                events = (events or []) + [('raise', rule)]
+            elif active and not holds:
+                table.active &= ~(1 << index)
+                events = (events or []) + [('clear', rule)]
+        return events
+
+    def describe(self, room, rule):
+        """'humidity 61.0, temperature 19.5' - the inputs of a rule in a room"""
+        table = self.tables[room]
+        sensors = dict.fromkeys(sensor for sensor, _, _ in rule.conditions)
+        return ', '.join(f"{sensor} {table.values[self.columns[sensor]]:g}" for sensor in sensors)
+
+    def active(self):
+        """Yield (room, label, violation) for every raised compound rule"""
+        for room, table in self.tables.items():
+            if table.active:
+                for rule in self.rules:
+                    if table.active >> rule.index & 1:
+                        yield room, rule.label, rule.violation
+
+    # ---- snapshots -------------------------------------------------------
+
+    def capture(self):
+        """{room: [{sensor: [value, time]}, [active rule names]]} for state snapshots"""
+        sensors = list(self.columns)
+        state = {}
+        for room, table in self.tables.items():
+            inputs = {sensor: [table.values[c], table.times[c]] for c, sensor in enumerate(sensors)
+                      if table.times[c] != -math.inf}
+            state[room] = [inputs, [rule.name for rule in self.rules if table.active >> rule.index & 1]]
+        return state
+
+    def restore(self, state):
+        """Load capture() output, keeping only sensors and rules that still exist"""
+        by_name = {rule.name: rule for rule in self.rules}
+        for room, (inputs, active) in state.items():
+            table = self.table_for(room)
+            for sensor, (value, when) in inputs.items():
+                column = self.columns.get(sensor)
+                if column is not None:
+                    table.values[column] = value
+                    table.times[column] = when
+            for rule in self.rules:
+                truth = 0
+                for i, (sensor, above, limit) in enumerate(rule.conditions):
+                    c = self.columns[sensor]
+                    if table.times[c] != -math.inf:
+                        value = table.values[c]
+                        if value > limit if above else value < limit:
+                            truth |= 1 << i
+                table.truth[rule.index] = truth
+            for name in active:
+                rule = by_name.get(name)
+                if rule is not None:
+                    table.active |= 1 << rule.index
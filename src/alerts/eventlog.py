@@ -0,0 +1,357 @@
+"""
+Alert Event Log
+Append-only JSON Lines log of alert notifications with batched writes,
+size/time-based rotation and a time index, plus a CLI to query it
+
+Layout of the log directory:
+    alerts-20240301T120000.123.jsonl   segments, one record per line
+    index.jsonl                        one line per closed segment
+
+A record is Notification.to_dict() plus "ts", its epoch seconds. Records
+are buffered and written BATCH_SIZE at a time (or after FLUSH_INTERVAL
+seconds), and a new segment starts once the current one reaches
+max_bytes or max_age seconds. When a segment closes, its index line
+records the time range, record count, the rooms and sensors it mentions
+and a sparse [ts, byte offset] entry every INDEX_EVERY records.
+
+A query skips segments whose range or room/sensor sets cannot match and
+seeks into the others at the last indexed offset before the start of the
+range. Records are in time order within a segment (one writer thread,
+notifications stamped when queued). A segment without an index line (the
+open one, or one left by a crash) is indexed when the next writer starts,
+or scanned in full until then.
+
+Usage:
+    python -m src.alerts.eventlog --dir alert_log --room room1 --sensor co2 --since 2h
+    python -m src.alerts.eventlog --dir alert_log --since 2024-03-01T08:00 --until 2024-03-01T09:00 --json
+"""
+
+import argparse
+import bisect
+import glob
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_AGE = 3600.0
+INDEX_EVERY = 128
+INDEX_FILE = 'index.jsonl'
+SEGMENT_GLOB = 'alerts-*.jsonl'
+
+# One encoder for every record; json.dumps(..., ensure_ascii=False) would build a new one per call
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def segment_name(ts):
+    """'alerts-20240301T120000.123.jsonl' for the segment's first record time"""
+    stamp = datetime.fromtimestamp(ts, timezone.utc)
+    return f"alerts-{stamp.strftime('%Y%m%dT%H%M%S')}.{stamp.microsecond // 1000:03d}.jsonl"
+
+
+class SegmentIndex:
+    """Index entry of one segment while it is being written or scanned"""
+
+    def __init__(self, file):
+        self.file = file
+        self.start = None
+        self.end = None
+        self.count = 0
+        self.rooms = set()
+        self.sensors = set()
+        self.offsets = []
+
+    def add(self, record, offset):
+        ts = record['ts']
+        if self.count % INDEX_EVERY == 0:
+            self.offsets.append([ts, offset])
+        if self.start is None:
+            self.start = ts
+        self.end = ts
+        self.count += 1
+        self.rooms.add(record.get('room'))
+        self.sensors.add(record.get('sensor_type'))
+
+    def to_dict(self):
+        return {
+            'file': self.file,
+            'start': self.start,
+            'end': self.end,
+            'count': self.count,
+            'rooms': sorted(r for r in self.rooms if r is not None),
+            'sensors': sorted(s for s in self.sensors if s is not None),
+            'offsets': self.offsets,
+        }
+
+
+class EventLogSink:
+    """
+    Notification sink writing the event log.
+
+    send() only buffers; the dispatcher's worker calls flush() when its queue
+    has been idle for flush_interval seconds, so a quiet system still gets
+    its last alerts on disk promptly.
+    """
+
+    name = 'eventlog'
+    audit = True
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        self.recovered = recover(directory)
+        self._pending = []
+        self._file = None
+        self._segment = None
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self.written = 0
+        self.segments = 0
+
+    def send(self, n):
+        ts = n.timestamp
+        segment = self._segment
+        if segment is None or self._size >= self.max_bytes or ts - segment.start >= self.max_age:
+            self.rotate()
+            segment = self._open(ts)
+        record = n.to_dict()
+        record['ts'] = ts
+        line = (_encode(record) + '\n').encode()
+        # SegmentIndex.add(), inlined: this runs for every alert
+        if segment.count % INDEX_EVERY == 0:
+            segment.offsets.append([ts, self._size])
+        segment.count += 1
+        segment.end = ts
+        segment.rooms.add(n.room)
+        segment.sensors.add(n.sensor_type)
+        self._size += len(line)
+        pending = self._pending
+        pending.append(line)
+        if len(pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _open(self, ts):
+        name = segment_name(ts)
+        path = os.path.join(self.directory, name)
+        suffix = 1
+        while os.path.exists(path):
+            name = segment_name(ts).replace('.jsonl', f"-{suffix}.jsonl")
+            path = os.path.join(self.directory, name)
+            suffix += 1
+        self._file = open(path, 'ab')
+        self._segment = SegmentIndex(name)
+        self._segment.start = ts
+        self._size = 0
+        self.segments += 1
+        return self._segment
+
+    def flush(self):
+        """Write buffered records in one call"""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        self._file.write(b''.join(self._pending))
+        self._file.flush()
+        self.written += len(self._pending)
+        self._pending = []
+
+    def rotate(self):
+        """Close the current segment and publish its index line"""
+        if self._segment is None:
+            return
+        self.flush()
+        self._file.close()
+        append_index(self.directory, self._segment)
+        self._file = None
+        self._segment = None
+
+    def close(self):
+        self.rotate()
+
+
+# ---- index ---------------------------------------------------------------
+
+def append_index(directory, segment):
+    with open(os.path.join(directory, INDEX_FILE), 'a', encoding='utf-8') as index:
+        index.write(json.dumps(segment.to_dict()) + '\n')
+
+
+def read_index(directory):
+    """{segment file: index entry}; a torn last line (crash mid-write) is ignored"""
+    entries = {}
+    try:
+        with open(os.path.join(directory, INDEX_FILE), encoding='utf-8') as index:
+            for line in index:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry['file']] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def scan_segment(path, offset=0, end=None, needles=None):
+    """
+    Yield (byte offset, record) from `offset` up to byte `end`; stops at a torn last line.
+
+    With `needles`, lines containing none of them are skipped without being parsed.
+    """
+    with open(path, 'rb') as segment:
+        segment.seek(offset)
+        for line in segment:
+            if end is not None and offset >= end:
+                break
+            position = offset
+            offset += len(line)
+            if needles is not None and not any(needle in line for needle in needles):
+                if not line.endswith(b'\n'):
+                    break
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            yield position, record
+
+
+def recover(directory):
+    """Index segments that were never closed (crash or kill); returns how many"""
+    indexed = read_index(directory)
+    recovered = 0
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB))):
+        name = os.path.basename(path)
+        if name in indexed:
+            continue
+        segment = SegmentIndex(name)
+        for offset, record in scan_segment(path):
+            segment.add(record, offset)
+        if segment.count:
+            append_index(directory, segment)
+            recovered += 1
+    return recovered
+
+
+# ---- queries -------------------------------------------------------------
+
+def plan(directory, rooms=None, sensors=None, since=None, until=None):
+    """
+    [(path, start offset, end offset or None)] of the segments a query must
+    read, in time order, and how many segments the index let us skip.
+    """
+    indexed = read_index(directory)
+    reads = []
+    skipped = 0
+    for path in sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB))):
+        entry = indexed.get(os.path.basename(path))
+        if entry is None:
+            reads.append((path, 0, None))
+            continue
+        if ((since is not None and entry['end'] < since) or (until is not None and entry['start'] > until)
+                or (rooms and not rooms.intersection(entry['rooms']))
+                or (sensors and not sensors.intersection(entry['sensors']))):
+            skipped += 1
+            continue
+        times = [ts for ts, _ in entry['offsets']]
+        offset = end = None
+        if since is not None:
+            # Last sparse entry at or before `since`
+            i = bisect.bisect_right(times, since) - 1
+            offset = entry['offsets'][i][1] if i > 0 else None
+        if until is not None:
+            # First sparse entry after `until`: nothing from there on can match
+            i = bisect.bisect_right(times, until)
+            end = entry['offsets'][i][1] if i < len(times) else None
+        reads.append((path, offset or 0, end))
+    return reads, skipped
+
+
+def query(directory, rooms=None, sensors=None, since=None, until=None, types=None, limit=None):
+    """Yield matching records (dicts) in time order; since/until are epoch seconds"""
+    rooms = set(rooms) if rooms else None
+    sensors = set(sensors) if sensors else None
+    types = set(types) if types else None
+    reads, _ = plan(directory, rooms, sensors, since, until)
+    # Records are written with the default separators, so a room filter can reject raw lines
+    needles = [f'"room": {_encode(room)}'.encode() for room in rooms] if rooms else None
+    found = 0
+    for path, offset, end in reads:
+        for _, record in scan_segment(path, offset, end, needles):
+            ts = record['ts']
+            if since is not None and ts < since:
+                continue
+            if until is not None and ts > until:
+                if needles is None:
+                    break
+                continue
+            if ((rooms and record.get('room') not in rooms) or (sensors and record.get('sensor_type') not in sensors)
+                    or (types and record.get('alert_type') not in types)):
+                continue
+            yield record
+            found += 1
+            if limit is not None and found >= limit:
+                return
+
+
+def parse_time(text, now=None):
+    """Epoch seconds from ISO 8601 (UTC unless an offset is given) or a relative age like '15m', '2h', '7d'"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text[-1:] in units:
+        try:
+            return (time.time() if now is None else now) - float(text[:-1]) * units[text[-1]]
+        except ValueError:
+            pass
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_record(record):
+    value = f"{record.get('value')}{record.get('unit') or ''}"
+    if record.get('kind') == 'alert':
+        threshold = record.get('threshold')
+        value += f" (limit {threshold}{'' if isinstance(threshold, str) else record.get('unit') or ''})"
+    icon = {'alert': '🚨', 'storm': '🌩️', 'storm_update': '🌩️'}.get(record.get('kind'), '✅')
+    return (f"{record.get('timestamp', '')[:23]:23}  {icon} "
+            f"{record.get('room', ''):12} {record.get('sensor_type', ''):12} {record.get('alert_type', ''):18} "
+            f"{record.get('severity') or '':8} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the alert event log")
+    parser.add_argument("--dir", default=os.getenv("ALERT_EVENT_LOG", "alert_log"), help="Event log directory")
+    parser.add_argument("--room", nargs='*', default=None, help="Rooms to include")
+    parser.add_argument("--sensor", nargs='*', default=None, help="Sensor types (or compound labels) to include")
+    parser.add_argument("--type", nargs='*', default=None, help="Alert types to include (HIGH, OFFLINE, ...)")
+    parser.add_argument("--since", default=None, help="ISO time or age like 30m / 2h / 7d")
+    parser.add_argument("--until", default=None, help="ISO time or age like 30m / 2h / 7d")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--json", action='store_true', help="Print raw JSON Lines records")
+    args = parser.parse_args()
+
+    since = parse_time(args.since) if args.since else None
+    until = parse_time(args.until) if args.until else None
+    start = time.perf_counter()
+    reads, skipped = plan(args.dir, set(args.room or ()), set(args.sensor or ()), since, until)
+    count = 0
+    for record in query(args.dir, args.room, args.sensor, since, until, args.type, args.limit):
+        print(json.dumps(record, ensure_ascii=False) if args.json else format_record(record))
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"🔎 {count:,} events from {len(reads)} segments ({skipped} skipped by the index) "
+          f"in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
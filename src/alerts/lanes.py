@@ -0,0 +1,165 @@
+"""
+Priority Ingest Lanes
+Keep readings that may change an alert ahead of a routine backlog
+
+Prescreen classifies a reading from its topic and raw payload bytes, before
+any JSON decoding: the "value" field is pulled out with a regex and checked
+against the sensor's current band (RuleEngine.evaluate). Out-of-band
+readings, readings of sensors whose state machine must see every reading
+(an alert raised, debounce counting, rate or window rules) and payloads it
+cannot read are urgent; the rest are routine.
+
+PriorityLanes hands items to one consumer thread, urgent ones always first.
+The urgent lane is FIFO and never drops: submit() blocks when `maxsize`
+urgent items wait, pushing back on the MQTT loop. The routine lane keeps
+at most one pending reading per key (sensor): a newer routine reading
+replaces the pending one in place and an urgent reading supersedes it, so
+per-sensor order is preserved. Under pressure the routine lane therefore
+shrinks to one reading per sensor and, past `routine_max` sensors, new
+routine readings are dropped and counted. Coalesced in-band readings skip
+anomaly baselines and compound inputs; that is the trade for alert latency.
+"""
+
+import re
+import threading
+from collections import deque
+
+DEFAULT_ROUTINE_MAX = 10000
+
+_VALUE = re.compile(rb'"value"\s*:\s*(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)')
+
+
+class Prescreen:
+    """Cheap urgent/routine verdict for a (topic, payload bytes) reading"""
+
+    def __init__(self, rules, tracker=None):
+        self.rules = rules
+        # With the alert tracker, sensors mid-alert or mid-debounce stay urgent
+        self.tracker = tracker
+        self.urgent = 0
+        self.routine = 0
+
+    def __call__(self, topic, payload):
+        parts = topic.split('/')
+        match = _VALUE.search(payload)
+        if len(parts) < 3 or match is None:
+            self.urgent += 1
+            return True
+        room, sensor_type = parts[1], parts[2]
+        urgent = self.rules.evaluate(room, sensor_type, float(match.group(1))) is not None
+        if not urgent and self.tracker is not None:
+            rooms = self.tracker.states.get(sensor_type)
+            state = rooms.get(room) if rooms is not None else None
+            urgent = state is not None and state.engaged()
+        if urgent:
+            self.urgent += 1
+        else:
+            self.routine += 1
+        return urgent
+
+
+class PriorityLanes:
+    """
+    Hand items submitted from any thread to `handler` in lists of up to
+    `max_items`, draining the urgent lane before the routine one
+    """
+
+    def __init__(self, handler, max_items=1, maxsize=100000, routine_max=DEFAULT_ROUTINE_MAX,
+                 name="ingest-lanes"):
+        self.handler = handler
+        self.max_items = max_items
+        self.maxsize = maxsize
+        self.routine_max = routine_max
+        self.urgent = deque()
+        self.routine = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.max_backlog = 0
+        self.batches = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, key, item, urgent):
+        """Queue `item`; `key` identifies its sensor for coalescing. False if it was dropped"""
+        with self._cond:
+            self.submitted += 1
+            routine = self.routine
+            if urgent:
+                while len(self.urgent) >= self.maxsize and not self._stopping:
+                    self._cond.wait()
+                if routine.pop(key, None) is not None:
+                    self.superseded += 1
+                self.urgent.append(item)
+            elif key in routine:
+                routine[key] = item
+                self.coalesced += 1
+            elif len(routine) >= self.routine_max:
+                self.dropped += 1
+                return False
+            else:
+                routine[key] = item
+            backlog = len(self.urgent) + len(routine)
+            if backlog > self.max_backlog:
+                self.max_backlog = backlog
+            self._cond.notify_all()
+        return True
+
+    def stop(self, timeout=5.0):
+        """Process what is queued and stop the consumer thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self.thread.join(timeout)
+
+    def _take(self):
+        """Up to max_items items, urgent first; [] once stopping with nothing left"""
+        with self._cond:
+            while not self.urgent and not self.routine and not self._stopping:
+                self._cond.wait()
+            batch = []
+            urgent, routine = self.urgent, self.routine
+            while urgent and len(batch) < self.max_items:
+                batch.append(urgent.popleft())
+            while routine and len(batch) < self.max_items:
+                # dicts keep insertion order: the oldest pending sensor goes first
+                batch.append(routine.pop(next(iter(routine))))
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                break
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Error processing readings: {e}")
+            self.batches += 1
+
+    def backlog(self):
+        return len(self.urgent), len(self.routine)
+
+    def stats(self):
+        urgent, routine = self.backlog()
+        return {
+            'submitted': self.submitted,
+            'urgent_depth': urgent,
+            'routine_depth': routine,
+            'max_backlog': self.max_backlog,
+            'coalesced': self.coalesced,
+            'superseded': self.superseded,
+            'dropped': self.dropped,
+            'batches': self.batches,
+            'errors': self.errors,
+        }
+
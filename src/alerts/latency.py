@@ -0,0 +1,182 @@
+"""
+Alert Latency Instrumentation
+Bounded-memory latency histograms and per-stage timings of the alert path,
+from a simulator's create_message timestamp to the alert notification
+
+Stages, recorded in nanoseconds:
+    transit    sensor 'timestamp' -> reading received by the alert process
+               (the broker hop; with micro-batching also the batch wait).
+               Clock skew between the sensor host and this one shows up here
+    decode     JSON decode and field extraction
+    evaluate   rule evaluation: state machine, anomaly, compound, liveness
+    alert      sensor 'timestamp' -> alert raised or cleared and queued
+    dispatch   notification queued -> sink done with it (kept per sink by
+               the NotificationDispatcher)
+
+LatencyHistogram is HDR-style log-linear: values below 2**SUB_BITS ns are
+exact, larger ones fall into buckets that keep SUB_BITS significant bits,
+so any percentile is within 1/64 (about 1.6%) of the true value. A
+histogram is 2,368 counters in an array('q') whatever the sample count, and
+values above MAX_VALUE (about 73 minutes) are clamped to it.
+"""
+
+import math
+from array import array
+
+import numpy as np
+
+SUB_BITS = 7
+_SUB = 1 << SUB_BITS
+_HALF = _SUB >> 1
+MAX_VALUE = (1 << 42) - 1
+_MAX_SHIFT = MAX_VALUE.bit_length() - SUB_BITS
+BUCKETS = _MAX_SHIFT * _HALF + _SUB
+PERCENTILES = (50, 99, 99.9)
+
+STAGES = ('transit', 'decode', 'evaluate', 'alert')
+
+
+def bucket_of(value):
+    """Bucket index of a non-negative integer value"""
+    if value < _SUB:
+        return value
+    shift = value.bit_length() - SUB_BITS
+    return shift * _HALF + (value >> shift)
+
+
+def bucket_high(index):
+    """Largest value that falls into a bucket"""
+    if index < _SUB:
+        return index
+    shift = index // _HALF - 1
+    return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear histogram of nanosecond latencies; safe for one writer thread"""
+
+    def __init__(self):
+        self.counts = array('q', bytes(8 * BUCKETS))
+        self._view = np.frombuffer(self.counts, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value, count=1):
+        """Add `count` samples of `value` ns (negative values, e.g. from clock skew, count as 0)"""
+        value = int(value)
+        if value < _SUB:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            if value > MAX_VALUE:
+                value = MAX_VALUE
+            shift = value.bit_length() - SUB_BITS
+            index = shift * _HALF + (value >> shift)
+        self.counts[index] += count
+        self.count += count
+        self.total += value * count
+        if value > self.max:
+            self.max = value
+
+    def record_many(self, values):
+        """Add an array of ns values in one vectorized pass"""
+        values = np.clip(np.asarray(values, dtype=np.int64), 0, MAX_VALUE)
+        if not len(values):
+            return
+        # frexp's exponent is the bit length for integers below 2**53
+        shift = np.maximum(np.frexp(values.astype(np.float64))[1] - SUB_BITS, 0)
+        index = np.where(values < _SUB, values, shift * _HALF + (values >> shift))
+        self._view += np.bincount(index, minlength=BUCKETS)
+        self.count += len(values)
+        self.total += int(values.sum())
+        self.max = max(self.max, int(values.max()))
+
+    def merge(self, other):
+        self._view += other._view
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def copy(self):
+        clone = LatencyHistogram()
+        clone.merge(self)
+        return clone
+
+    def since(self, earlier):
+        """The samples recorded after `earlier`, a copy() of this histogram"""
+        delta = LatencyHistogram()
+        delta._view += self._view - earlier._view
+        delta.count = self.count - earlier.count
+        delta.total = self.total - earlier.total
+        nonzero = np.flatnonzero(delta._view)
+        delta.max = min(self.max, bucket_high(int(nonzero[-1]))) if len(nonzero) else 0
+        return delta
+
+    def percentile(self, p):
+        """Value in ns at or below which p percent of the samples fall (0 when empty)"""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(self.count * p / 100))
+        index = int(np.searchsorted(np.cumsum(self._view), rank))
+        return min(bucket_high(index), self.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, percentiles=PERCENTILES):
+        """{'count', 'mean_ms', 'p50_ms', ..., 'max_ms'}"""
+        result = {'count': self.count, 'mean_ms': self.mean() / 1e6}
+        for p in percentiles:
+            result[f"p{p:g}_ms"] = self.percentile(p) / 1e6
+        result['max_ms'] = self.max / 1e6
+        return result
+
+    def format(self):
+        """'p50 1.23 / p99 4.56 / p999 7.89 ms (n=1,234)'"""
+        if not self.count:
+            return "no samples"
+        values = ' / '.join(f"p{str(p).replace('.', '')} {self.percentile(p) / 1e6:.3g}" for p in PERCENTILES)
+        return f"{values} ms (n={self.count:,})"
+
+
+class StageLatency:
+    """One LatencyHistogram per alert-path stage, plus interval reports"""
+
+    def __init__(self):
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self._reported = {}
+
+    def record(self, stage, value, count=1):
+        self.stages[stage].record(value, count)
+
+    def record_many(self, stage, values):
+        self.stages[stage].record_many(values)
+
+    def since_last_report(self, extra=None):
+        """
+        {name: histogram of the samples since the previous call} for every
+        stage and the `extra` histograms (e.g. the dispatcher's, per sink)
+        """
+        histograms = dict(self.stages, **(extra or {}))
+        interval = {}
+        for name, histogram in histograms.items():
+            current = histogram.copy()
+            earlier = self._reported.get(name)
+            interval[name] = current.since(earlier) if earlier is not None else current
+            self._reported[name] = current
+        return interval
+
+    def summary(self):
+        return {stage: histogram.summary() for stage, histogram in self.stages.items()}
+
+
+def format_report(histograms):
+    """One '   <name>  p50 ... ms (n=...)' line per histogram"""
+    return [f"   {name:18} {histogram.format()}" for name, histogram in histograms.items()]
+
+
+def transit_ns(when, received_ns):
+    """Nanoseconds from a reading's epoch-seconds timestamp to its arrival"""
+    return received_ns - int(when * 1e9)
@@ -0,0 +1,287 @@
+"""
+Sensor Liveness
+Per-sensor "offline" alerts when a sensor misses its expected readings,
+tracked with a hashed timer wheel instead of periodic scans of every sensor
+
+A sensor is offline once it has been silent for
+
+    timeout = max(min_timeout, factor * period)
+
+where period is the sensor type's configured publish interval or, failing
+that, an EWMA of the gaps between its readings. It clears with its next
+reading. Times are arrival times (time.monotonic() by default), not payload
+timestamps, so buffered readings replayed after a restart are not mistaken
+for a live stream and a wrong sensor clock cannot hide a dead sensor.
+
+Rule syntax (top level of alert_rules.json):
+    "offline": {"factor": 3, "min_timeout": 30,
+                "periods": {"temperature": 3, "co2": 3},
+                "sensors": ["temperature", "co2"]}
+
+Each reading only moves its sensor's deadline (O(1)). The wheel holds one
+live entry per sensor, in the bucket of the tick its deadline falls in;
+advance() empties the buckets of the ticks that elapsed, fires the entries
+that are really due and re-files the ones whose deadline moved on. Work per
+tick is therefore proportional to the deadlines in that bucket, not to the
+fleet size, and a sensor that keeps reporting is touched about once per
+timeout. Deadlines further out than one revolution simply wait a lap.
+State lives in array('d')/array('q') columns indexed by a slot per sensor,
+like src.alerts.anomaly, so a bucket is checked with NumPy views of them.
+"""
+
+import math
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from src.alerts.rules import Violation
+from src.alerts.state import Transition
+
+DEFAULT_TICK = 1.0
+DEFAULT_WHEEL_SLOTS = 512
+PERIOD_ALPHA = 0.2
+_SCHEDULED, _OFFLINE, _FIXED = 1, 2, 4
+
+
+class LivenessMonitor:
+    """Deadline per (room, sensor_type), fired from a timer wheel"""
+
+    def __init__(self, factor=3.0, min_timeout=30.0, periods=None, sensors=None,
+                 tick=DEFAULT_TICK, wheel_slots=DEFAULT_WHEEL_SLOTS, clock=time.monotonic):
+        if factor <= 0 or min_timeout < 0:
+            raise ValueError("offline factor must be positive and min_timeout non-negative")
+        if tick <= 0 or wheel_slots < 1:
+            raise ValueError("timer wheel needs a positive tick and at least one slot")
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.periods = dict(periods or {})
+        self.sensors = set(sensors) if sensors else None
+        self.tick = tick
+        self.clock = clock
+        self.violation = Violation('OFFLINE', 'warning', f"{factor:g}x period")
+        self.slots = {}
+        self.keys = []
+        self.deadline = array('d')
+        self.last_seen = array('d')
+        # Learned publish interval; 0 until the second reading
+        self.period = array('d')
+        # Seconds of silence allowed; 0 while the period is unknown
+        self.timeout = array('d')
+        self.flags = array('q')
+        # Tick of the sensor's live wheel entry; entries in other buckets are stale
+        self.filed = array('q')
+        # Scratch column for de-duplicating a bucket
+        self.mark = array('q')
+        # Each bucket is an array of slots
+        self.wheel = [array('q') for _ in range(wheel_slots)]
+        # Last tick advance() has processed
+        self.cursor = None
+        self.lock = threading.Lock()
+        self.went_offline = 0
+        self.visited = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build from the "offline" section of a rule file"""
+        return cls(**{key: value for key, value in spec.items() if key != 'enabled'})
+
+    def __len__(self):
+        return len(self.keys)
+
+    def timeout_for(self, slot):
+        """Seconds of silence before the sensor in `slot` counts as offline; None if unknown"""
+        return self.timeout[slot] or None
+
+    def _file(self, slot, deadline):
+        """Put a sensor in the bucket of the first tick at or after its deadline"""
+        tick = math.ceil(deadline / self.tick)
+        if tick <= self.cursor:
+            tick = self.cursor + 1
+        self.wheel[tick % len(self.wheel)].append(slot)
+        self.filed[slot] = tick
+        self.flags[slot] |= _SCHEDULED
+
+    def _add(self, room, sensor_type, now):
+        slot = self.slots[room, sensor_type] = len(self.keys)
+        self.keys.append((room, sensor_type))
+        period = self.periods.get(sensor_type)
+        self.deadline.append(math.inf)
+        self.last_seen.append(now)
+        self.period.append(period or 0.0)
+        self.timeout.append(max(self.min_timeout, self.factor * period) if period else 0.0)
+        self.flags.append(_FIXED if period else 0)
+        self.filed.append(0)
+        self.mark.append(-1)
+        return slot
+
+    def seen(self, room, sensor_type, now=None):
+        """Record a reading's arrival; returns None or [Transition('clear', ...)] if it was offline"""
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            if self.cursor is None:
+                self.cursor = math.floor(now / self.tick)
+            slot = self.slots.get((room, sensor_type))
+            if slot is None:
+                if self.sensors is not None and sensor_type not in self.sensors:
+                    return None
+                slot = self._add(room, sensor_type, now)
+            flags = self.flags[slot]
+            if not flags & _FIXED:
+                # Learn the period; the silence of an offline sensor says nothing about it
+                gap = now - self.last_seen[slot]
+                if gap > 0 and not flags & _OFFLINE:
+                    period = self.period[slot]
+                    period = self.period[slot] = gap if not period else period + PERIOD_ALPHA * (gap - period)
+                    self.timeout[slot] = max(self.min_timeout, self.factor * period)
+            self.last_seen[slot] = now
+            timeout = self.timeout[slot]
+            if timeout:
+                deadline = self.deadline[slot] = now + timeout
+                # A later deadline waits for the filed entry to come round; an
+                # earlier one (a learned period shrank) needs a new entry
+                if not flags & _SCHEDULED or (not flags & _FIXED
+                                              and math.ceil(deadline / self.tick) < self.filed[slot]):
+                    self._file(slot, deadline)
+            if flags & _OFFLINE:
+                self.flags[slot] &= ~_OFFLINE
+                return [Transition('clear', self.violation)]
+            return None
+
+    def advance(self, now=None):
+        """
+        Process the ticks elapsed up to `now`.
+
+        Returns [(room, sensor_type, silent seconds)] for sensors that just
+        went offline. Each bucket is visited at most once per call, so a
+        long pause costs one pass over the wheel, not one per missed tick.
+        The entries of a bucket are checked and re-filed with array
+        operations over the state columns.
+        """
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            if self.cursor is None:
+                return []
+            target = math.floor(now / self.tick)
+            first = max(self.cursor + 1, target - len(self.wheel) + 1)
+            self.cursor = target
+            expired = []
+            for tick in range(first, target + 1):
+                index = tick % len(self.wheel)
+                if self.wheel[index]:
+                    expired += self._visit(index, tick, now)
+            self.went_offline += len(expired)
+            return expired
+
+    def _visit(self, index, tick, now):
+        """Fire the due entries of one bucket and re-file the rest"""
+        wheel = self.wheel
+        size = len(wheel)
+        bucket = np.frombuffer(wheel[index], dtype=np.int64)
+        wheel[index] = array('q')
+        # A sensor filed twice in this bucket (deadline moved away and back) counts once
+        mark = np.frombuffer(self.mark, dtype=np.int64)
+        positions = np.arange(len(bucket))
+        mark[bucket] = positions
+        bucket = bucket[mark[bucket] == positions]
+        self.visited += len(bucket)
+        flags_col = np.frombuffer(self.flags, dtype=np.int64)
+        filed = np.frombuffer(self.filed, dtype=np.int64)[bucket]
+        # Entries left behind when a deadline moved to another bucket are dropped
+        live = (filed % size == index) & (flags_col[bucket] & _SCHEDULED != 0)
+        later = live & (filed > tick)
+        if later.any():
+            # Due on a later revolution
+            wheel[index].frombytes(bucket[later].tobytes())
+        current = bucket[live & ~later]
+        deadline = np.frombuffer(self.deadline, dtype=float)[current]
+        due = deadline <= now
+        fired = current[due]
+        flags_col[fired] = (flags_col[fired] & ~_SCHEDULED) | _OFFLINE
+        keys = self.keys
+        last_seen = self.last_seen
+        expired = [(*keys[slot], now - last_seen[slot]) for slot in fired.tolist()]
+
+        # Heard from since they were filed: move to their current deadlines
+        moved = current[~due]
+        if len(moved):
+            ticks = np.maximum(np.ceil(deadline[~due] / self.tick).astype(np.int64), self.cursor + 1)
+            np.frombuffer(self.filed, dtype=np.int64)[moved] = ticks
+            buckets = ticks % size
+            order = np.argsort(buckets, kind='stable')
+            buckets, moved = buckets[order], moved[order]
+            starts = np.flatnonzero(np.diff(buckets)) + 1
+            for group_bucket, group in zip(buckets[np.r_[0, starts]].tolist(), np.split(moved, starts)):
+                wheel[group_bucket].frombytes(group.tobytes())
+        return expired
+
+    # ---- snapshots -------------------------------------------------------
+
+    def capture(self, now=None):
+        """
+        (header, state columns) for state snapshots.
+
+        The monotonic clock restarts with the process, so arrival times are
+        saved as seconds of silence before `now`.
+        """
+        if now is None:
+            now = self.clock()
+        with self.lock:
+            silent = array('d', [now - seen for seen in self.last_seen])
+            header = {'keys': list(self.keys), 'went_offline': self.went_offline}
+            return header, [silent, array('d', self.period), array('q', self.flags)]
+
+    def restore(self, header, columns, now=None):
+        """
+        Load capture() output; returns how many sensors were restored.
+
+        Silences resume at `now`, so the downtime itself does not count
+        against a sensor. Offline sensors stay offline until their next
+        reading; sensors already heard from keep their live state.
+        """
+        if now is None:
+            now = self.clock()
+        silent, periods, flags = columns
+        restored = 0
+        with self.lock:
+            if self.cursor is None:
+                self.cursor = math.floor(now / self.tick)
+            for i, (room, sensor_type) in enumerate(header['keys']):
+                if (room, sensor_type) in self.slots:
+                    continue
+                if self.sensors is not None and sensor_type not in self.sensors:
+                    continue
+                slot = self._add(room, sensor_type, now)
+                last_seen = self.last_seen[slot] = now - silent[i]
+                if not self.flags[slot] & _FIXED and periods[i]:
+                    self.period[slot] = periods[i]
+                    self.timeout[slot] = max(self.min_timeout, self.factor * periods[i])
+                if flags[i] & _OFFLINE:
+                    self.flags[slot] |= _OFFLINE
+                elif self.timeout[slot]:
+                    deadline = self.deadline[slot] = last_seen + self.timeout[slot]
+                    self._file(slot, deadline)
+                restored += 1
+            self.went_offline += header['went_offline']
+        return restored
+
+    def silent_for(self, room, sensor_type, now=None):
+        """Seconds since the sensor's last reading, or None if never seen"""
+        slot = self.slots.get((room, sensor_type))
+        if slot is None:
+            return None
+        return (self.clock() if now is None else now) - self.last_seen[slot]
+
+    def is_offline(self, room, sensor_type):
+        slot = self.slots.get((room, sensor_type))
+        return slot is not None and bool(self.flags[slot] & _OFFLINE)
+
+    def active(self):
+        """Yield (room, sensor_type, violation) for offline sensors"""
+        for slot, flags in enumerate(self.flags):
+            if flags & _OFFLINE:
+                room, sensor_type = self.keys[slot]
+                yield room, sensor_type, self.violation
@@ -0,0 +1,357 @@
+"""
+Alert Notification Dispatcher
+Delivers alert notifications off the MQTT thread through pluggable sinks
+
+Every sink gets its own bounded queue and worker thread, so a 500 ms beep
+or a slow webhook only delays that sink. submit() never blocks: when a
+sink's queue is full the notification is dropped for that sink and counted.
+
+Set ALERT_EVENT_LOG to keep a queryable alert history (src.alerts.eventlog)
+and ALERT_CONSOLE=false to turn off the banners. ALERT_RATE_LIMIT caps what
+a sink receives, e.g. "sound=1/10,webhook=30/60" (count per seconds, token
+bucket); notifications over the limit are dropped for that sink and counted.
+Alerts folded into a storm (src.alerts.storm) only reach the audit sinks,
+the event log and the log file.
+"""
+
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.request import Request, urlopen
+
+from src.alerts.eventlog import DEFAULT_MAX_AGE, DEFAULT_MAX_BYTES, EventLogSink
+from src.alerts.latency import LatencyHistogram
+
+QUEUE_SIZE = 1000
+
+SENSOR_EMOJI = {'temperature': '🌡️', 'humidity': '💧', 'co2': '🌫️', 'light': '💡'}
+
+
+class Notification:
+    """One raised or cleared alert, timestamped when it was queued"""
+
+    __slots__ = ('kind', 'sensor_type', 'room', 'alert_type', 'severity', 'value',
+                 'threshold', 'unit', 'alert_number', 'timestamp', 'queued_at', 'rooms')
+
+    def __init__(self, kind, sensor_type, room, alert_type, severity=None, value=None,
+                 threshold=None, unit='', alert_number=None):
+        # 'alert' or 'clear'; 'storm', 'storm_update' or 'storm_clear' for a group of rooms
+        self.kind = kind
+        self.sensor_type = sensor_type
+        self.room = room
+        self.alert_type = alert_type
+        self.severity = severity
+        self.value = value
+        self.threshold = threshold
+        self.unit = unit
+        self.alert_number = alert_number
+        self.timestamp = time.time()
+        self.queued_at = time.perf_counter()
+        # Storms: a sample of the rooms in alert (room is then the building/floor)
+        self.rooms = None
+
+    def to_dict(self):
+        record = {
+            'kind': self.kind,
+            'room': self.room,
+            'sensor_type': self.sensor_type,
+            'alert_type': self.alert_type,
+            'severity': self.severity,
+            'value': self.value,
+            'threshold': self.threshold,
+            'unit': self.unit,
+            'alert_number': self.alert_number,
+            'timestamp': datetime.fromtimestamp(self.timestamp, timezone.utc).replace(tzinfo=None).isoformat() + 'Z',
+        }
+        if self.rooms is not None:
+            record['rooms'] = self.rooms
+        return record
+
+
+# ---- sinks ---------------------------------------------------------------
+
+class ConsoleSink:
+    """The alert banners alert_system.py has always printed"""
+
+    name = 'console'
+
+    def send(self, n):
+        emoji = SENSOR_EMOJI.get(n.sensor_type, '📊')
+        when = datetime.fromtimestamp(n.timestamp).strftime('%H:%M:%S')
+        if n.kind.startswith('storm'):
+            lines = self._storm_lines(n, emoji)
+        elif n.kind == 'alert':
+            lines = [
+                f"\n{'='*70}",
+                f"🚨🚨🚨 ALERT #{n.alert_number} - {(n.severity or 'warning').upper()} {n.alert_type} "
+                f"{n.sensor_type.upper()} ({n.room}) 🚨🚨🚨",
+                f"{'='*70}",
+                f"{emoji} Current Value: {n.value}{n.unit}",
+                # Anomaly limits are descriptive ("5σ", "200 repeats") rather than sensor units
+                f"⚠️  Threshold Limit: {n.threshold}{'' if isinstance(n.threshold, str) else n.unit}",
+            ]
+        else:
+            lines = [
+                f"\n{'='*70}",
+                f"✅ ALERT CLEARED - {n.alert_type} {n.sensor_type.upper()} ({n.room})",
+                f"{'='*70}",
+                f"{emoji} Current Value: {n.value}{n.unit} (Back to normal)",
+            ]
+        lines += [f"🕐 Time: {when}", f"{'='*70}\n"]
+        # One write per banner keeps banners from interleaving
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+    @staticmethod
+    def _storm_lines(n, emoji):
+        rooms = ', '.join(n.rooms or ())
+        if n.value > len(n.rooms or ()):
+            rooms += ', ...'
+        if n.kind == 'storm':
+            return [
+                f"\n{'='*70}",
+                f"🌩️🌩️🌩️ ALERT STORM - {(n.severity or 'warning').upper()} {n.alert_type} "
+                f"{n.sensor_type.upper()} ({n.room}) 🌩️🌩️🌩️",
+                f"{'='*70}",
+                f"{emoji} Rooms in alert: {n.value}",
+                f"🏠 {rooms}",
+                "🔕 Further alerts of this group are grouped until it clears",
+            ]
+        if n.kind == 'storm_update':
+            return [f"\n🌩️ STORM UPDATE - {n.alert_type} {n.sensor_type.upper()} ({n.room}): "
+                    f"{n.value} rooms in alert (peak {n.threshold})"]
+        return [
+            f"\n{'='*70}",
+            f"✅ ALERT STORM CLEARED - {n.alert_type} {n.sensor_type.upper()} ({n.room})",
+            f"{'='*70}",
+            f"{emoji} All rooms back to normal (peak {n.threshold} rooms)",
+        ]
+
+
+class SoundSink:
+    """System beep for raised alerts; clears are silent"""
+
+    name = 'sound'
+
+    def send(self, n):
+        if n.kind not in ('alert', 'storm'):
+            return
+        try:
+            # Windows beep
+            import winsound
+            winsound.Beep(1000, 500)  # 1000Hz for 500ms - louder and longer
+            print("🔊 BEEP!")
+        except Exception as e:
+            # Fallback
+            print(f'🔊 BEEP! (Sound error: {e})')
+            print('\a')  # ASCII bell character
+
+
+class FileSink:
+    """Append notifications to a JSON Lines file"""
+
+    name = 'file'
+    audit = True
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def send(self, n):
+        self._file.write(json.dumps(n.to_dict()) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink:
+    """POST each notification as JSON to a URL"""
+
+    name = 'webhook'
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, n):
+        request = Request(self.url, data=json.dumps(n.to_dict()).encode(),
+                          headers={'Content-Type': 'application/json'}, method='POST')
+        with urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+# ---- dispatcher ----------------------------------------------------------
+
+def parse_rate_limits(text):
+    """'sound=1/10,webhook=30/60' -> {'sound': (1.0, 10.0), 'webhook': (30.0, 60.0)}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in (text or '').split(','))):
+        name, _, rate = item.partition('=')
+        count, _, seconds = rate.partition('/')
+        limits[name.strip()] = (float(count), float(seconds or 1))
+    return limits
+
+
+class _SinkWorker:
+    """Queue, thread and counters for one sink"""
+
+    def __init__(self, sink, maxsize, limit=None):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.audit = getattr(sink, 'audit', False)
+        # Token bucket: up to `burst` notifications at once, refilled at `rate` per second
+        self.burst, period = limit if limit else (None, None)
+        self.rate = self.burst / period if limit else None
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.sent = 0
+        self.dropped = 0
+        self.limited = 0
+        self.errors = 0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+        # Queued -> sent, in ns; written by the worker thread only
+        self.latency = LatencyHistogram()
+        self.thread = threading.Thread(target=self._run, name=f"notify-{sink.name}", daemon=True)
+
+    def offer(self, notification):
+        # Called from the ingest thread and the watchdog thread (OFFLINE alerts, storm updates)
+        with self._lock:
+            if self.rate is not None:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+                self.refilled = now
+                if self.tokens < 1:
+                    self.limited += 1
+                    return False
+                self.tokens -= 1
+            try:
+                self.queue.put_nowait(notification)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            depth = self.queue.qsize()
+            if depth > self.max_depth:
+                self.max_depth = depth
+            return True
+
+    def _run(self):
+        # Buffering sinks (the event log) are flushed whenever the queue goes idle
+        idle = getattr(self.sink, 'flush_interval', None)
+        while True:
+            try:
+                notification = self.queue.get(timeout=idle)
+            except queue.Empty:
+                try:
+                    self.sink.flush()
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Notification sink '{self.sink.name}' failed to flush: {e}")
+                continue
+            if notification is None:
+                break
+            try:
+                self.sink.send(notification)
+                self.sent += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Notification sink '{self.sink.name}' failed: {e}")
+            self.latency.record((time.perf_counter() - notification.queued_at) * 1e9)
+
+    def stats(self):
+        latency = self.latency
+        return {
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'limited': self.limited,
+            'errors': self.errors,
+            'latency_ms_avg': latency.mean() / 1e6,
+            'latency_ms_p50': latency.percentile(50) / 1e6,
+            'latency_ms_p99': latency.percentile(99) / 1e6,
+            'latency_ms_p999': latency.percentile(99.9) / 1e6,
+            'latency_ms_max': latency.max / 1e6,
+        }
+
+
+class NotificationDispatcher:
+    """
+    Fan notifications out to sinks on background threads.
+
+    submit() only enqueues, so it is safe to call from paho's on_message.
+    stop() lets every worker drain its queue before returning.
+    """
+
+    def __init__(self, sinks, maxsize=QUEUE_SIZE, limits=None):
+        limits = limits or {}
+        self.workers = [_SinkWorker(sink, maxsize, limits.get(sink.name)) for sink in sinks]
+        self.submitted = 0
+
+    @classmethod
+    def from_env(cls, env):
+        """
+        Console and sound sinks, plus the event log, file and webhook sinks
+        when ALERT_EVENT_LOG / ALERT_LOG_FILE / ALERT_WEBHOOK_URL are set
+        """
+        sinks = []
+        if env.get("ALERT_CONSOLE", "true").lower() == "true":
+            sinks.append(ConsoleSink())
+        if env.get("ALERT_EVENT_LOG"):
+            sinks.append(EventLogSink(
+                env["ALERT_EVENT_LOG"],
+                max_bytes=int(float(env.get("ALERT_EVENT_LOG_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024)) * 1024 * 1024),
+                max_age=float(env.get("ALERT_EVENT_LOG_ROTATE_S", DEFAULT_MAX_AGE))))
+        if env.get("ALERT_SOUND", "true").lower() == "true":
+            sinks.append(SoundSink())
+        if env.get("ALERT_LOG_FILE"):
+            sinks.append(FileSink(env["ALERT_LOG_FILE"]))
+        if env.get("ALERT_WEBHOOK_URL"):
+            sinks.append(WebhookSink(env["ALERT_WEBHOOK_URL"]))
+        return cls(sinks, maxsize=int(env.get("ALERT_QUEUE_SIZE", QUEUE_SIZE)),
+                   limits=parse_rate_limits(env.get("ALERT_RATE_LIMIT")))
+
+    def start(self):
+        for worker in self.workers:
+            worker.thread.start()
+        return self
+
+    def submit(self, notification, audit_only=False):
+        """
+        Queue for every sink (only the audit sinks with audit_only); returns
+        False if any of them dropped it or was over its rate limit
+        """
+        self.submitted += 1
+        delivered = True
+        for worker in self.workers:
+            if audit_only and not worker.audit:
+                continue
+            delivered &= worker.offer(notification)
+        return delivered
+
+    def stop(self, timeout=5.0):
+        for worker in self.workers:
+            # Blocking put: the sentinel must not be dropped by a full queue
+            try:
+                worker.queue.put(None, timeout=timeout)
+            except queue.Full:
+                print(f"⚠️ Notification sink '{worker.sink.name}' did not drain in {timeout}s")
+        for worker in self.workers:
+            worker.thread.join(timeout)
+            close = getattr(worker.sink, 'close', None)
+            if close:
+                close()
+
+    def depth(self):
+        return sum(worker.queue.qsize() for worker in self.workers)
+
+    def stats(self):
+        return {worker.sink.name: worker.stats() for worker in self.workers}
+
+    def latency(self):
+        """{sink name: LatencyHistogram} of queued -> sent times"""
+        return {worker.sink.name: worker.latency for worker in self.workers}
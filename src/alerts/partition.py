@@ -0,0 +1,118 @@
+"""
+Alert Worker Partitioning
+Consistent per-sensor ownership for N alert workers sharing one MQTT
+subscription
+
+Workers join the MQTT v5 shared subscription $share/<group>/hostel/+/+, and
+the broker hands each message to any one of them. Stateful rules (debounce,
+rate of change, windows) need every reading of a sensor on the same worker,
+and compound rules need every sensor of a room there, so each room
+(hostel/<room>) is owned by exactly one worker, chosen by jump consistent
+hashing of the room prefix. A worker that receives a reading it does not
+own republishes it to alerts/partition/<owner>/<topic>, which only the
+owner subscribes to. Changing the worker count moves only ~1/N of the
+rooms.
+
+Storm grouping counts rooms per floor (or building) on each worker, so a
+storm needs min_rooms of one group on the same worker. Passing the storm
+grouper's label as `key` partitions by that group instead, at the cost of
+coarser balancing.
+
+The forward hop can let a reading reach its owner after a newer one (most
+visibly while a backlog drains), so the owner drops readings older than the
+newest it has applied instead of replaying them out of order.
+
+For brokers with a sticky or hash-by-topic shared-subscription strategy,
+routing='broker' trusts the broker and never forwards.
+"""
+
+import zlib
+
+PARTITION_PREFIX = 'alerts/partition'
+DEFAULT_GROUP = 'alerts'
+DEFAULT_TOPIC = 'hostel/+/+'
+
+
+def jump_hash(key, buckets):
+    """Lamping & Veach jump consistent hash of a 64-bit integer key into [0, buckets)"""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return b
+
+
+def room_key(topic):
+    """'hostel/<room>/<sensor>' -> 'hostel/<room>': a room's sensors share an owner"""
+    return topic.rsplit('/', 1)[0] if topic.count('/') >= 2 else topic
+
+
+def owner_of(topic, workers, key=room_key):
+    """Worker index that owns a sensor topic"""
+    if workers <= 1:
+        return 0
+    name = key(topic).encode()
+    return jump_hash(zlib.crc32(name) | (zlib.adler32(name) << 32), workers)
+
+
+class PartitionRouter:
+    """
+    Per-worker routing decisions, cached per topic.
+
+    route(topic) returns None when this worker owns the topic, otherwise the
+    partition topic to republish the message on.
+    """
+
+    def __init__(self, worker_id=0, workers=1, group=DEFAULT_GROUP, topic=DEFAULT_TOPIC, routing='forward',
+                 key=room_key):
+        if not 0 <= worker_id < workers:
+            raise ValueError(f"worker id {worker_id} outside 0..{workers - 1}")
+        if routing not in ('forward', 'broker'):
+            raise ValueError(f"Unknown routing mode: {routing}")
+        self.worker_id = worker_id
+        self.workers = workers
+        self.group = group
+        self.topic = topic
+        self.routing = routing
+        self.key = key
+        self.inbox_prefix = f"{PARTITION_PREFIX}/{worker_id}/"
+        self._routes = {}
+        self.forwarded = 0
+        self.received_forwards = 0
+        self.stale = 0
+
+    def subscriptions(self):
+        """(topic filter, qos) pairs this worker subscribes to"""
+        if self.workers <= 1:
+            return [(self.topic, 1)]
+        subs = [(f"$share/{self.group}/{self.topic}", 1)]
+        if self.routing == 'forward':
+            subs.append((f"{self.inbox_prefix}#", 1))
+        return subs
+
+    def route(self, topic):
+        route = self._routes.get(topic)
+        if route is None:
+            owner = owner_of(topic, self.workers, self.key)
+            route = '' if owner == self.worker_id or self.routing == 'broker' \
+                else f"{PARTITION_PREFIX}/{owner}/{topic}"
+            self._routes[topic] = route
+        if route:
+            self.forwarded += 1
+            return route
+        return None
+
+    def unwrap(self, topic):
+        """(sensor topic, was_forwarded) for a received message topic"""
+        if topic.startswith(self.inbox_prefix):
+            self.received_forwards += 1
+            return topic[len(self.inbox_prefix):], True
+        return topic, False
+
+    def admit(self, last_time, when):
+        """False for a reading older than the newest one already applied for its sensor"""
+        if self.workers > 1 and last_time is not None and when < last_time:
+            self.stale += 1
+            return False
+        return True
@@ -0,0 +1,286 @@
+"""
+Alert State Snapshots
+Periodic, atomic snapshots of AlertSystem state and a catch-up filter for
+the messages replayed after a restart
+
+Snapshot layout (zlib-compressed):
+    b'ALST' | version (1 byte) | header length (4 bytes, big-endian)
+    | header JSON | float64 array of every window ring, in header order
+
+The header holds counters, one compact list per sensor, the compound
+rules' latest-value tables and the sensor keys of the anomaly detector and
+liveness monitor; the window rings (sums, counts, time-above, monotonic
+maxima) and those two components' state columns are packed as raw 8-byte
+values, so a 10k-sensor snapshot restores in milliseconds.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from collections import deque
+
+MAGIC = b'ALST'
+FORMAT_VERSION = 1
+SNAPSHOT_INTERVAL = 30.0
+
+
+# ---- encode / decode -----------------------------------------------------
+
+def _window_record(window, floats):
+    """Scalars of a WindowState for the header; its rings go to `floats`"""
+    # array-to-array extends are plain memory copies
+    floats.extend(window.sums)
+    floats.extend(window.counts)
+    floats.extend(window.aboves)
+    for index, value in window.maxima:
+        floats.append(index)
+        floats.append(value)
+    return [window.spec.violation.type, window.spec.slots, window.head, len(window.maxima),
+            window.first_time, window.last_time, window.last_above, window.active]
+
+
+def _pack_columns(columns, floats):
+    """Append state columns to `floats` (int64 columns as their raw bytes); returns their layout"""
+    for column in columns:
+        floats.frombytes(column.tobytes())
+    return [[column.typecode, len(column)] for column in columns]
+
+
+def _unpack_columns(layout, blob, offset):
+    """Columns saved by _pack_columns, and the blob offset after them"""
+    columns = []
+    for typecode, length in layout:
+        column = array(typecode)
+        column.frombytes(blob[offset:offset + 8 * length])
+        columns.append(column)
+        offset += 8 * length
+    return columns, offset
+
+
+def capture(alert_system):
+    """Serialize counters and every sensor's state to snapshot bytes"""
+    floats = array('d')
+    sensors = []
+    for sensor_type, rooms in alert_system.tracker.states.items():
+        for room, state in rooms.items():
+            active = state.active
+            sensors.append([
+                room, sensor_type,
+                [active.type, active.severity] if active is not None else None,
+                state.history, state.last_value, state.last_time, state.rate_active,
+                [_window_record(w, floats) for w in state.windows] if state.windows else None,
+            ])
+    detectors = {}
+    for name in ('anomaly', 'liveness'):
+        component = getattr(alert_system, name)
+        if component is not None:
+            state, columns = component.capture()
+            detectors[name] = [state, _pack_columns(columns, floats)]
+    header = json.dumps({
+        'saved_at': time.time(),
+        'alert_count': alert_system.alert_count,
+        'message_count': alert_system.message_count,
+        'compound': alert_system.compound.capture() if alert_system.compound is not None else None,
+        'sensors': sensors,
+        **detectors,
+    }, separators=(',', ':')).encode()
+    body = MAGIC + bytes([FORMAT_VERSION]) + struct.pack('>I', len(header)) + header + floats.tobytes()
+    return zlib.compress(body, 1)
+
+
+def _floats(data):
+    values = array('d')
+    values.frombytes(data)
+    return values
+
+
+def _find_violation(rule, alert_type, severity, hour):
+    """The shared Violation of the rule matching a saved (type, severity)"""
+    bands = [rule.hours[hour]] + list(rule.hours)
+    for band in bands:
+        for violation in (band.low, band.high, band.critical_low, band.critical_high):
+            if violation.type == alert_type and violation.severity == severity:
+                return violation
+    return None
+
+
+def restore(alert_system, data):
+    """
+    Load snapshot bytes into an AlertSystem; returns the number of sensors restored.
+
+    State is matched against the current rules: a saved alert whose limit no
+    longer exists is dropped, and window state is kept only while the
+    window definitions are unchanged.
+    """
+    body = zlib.decompress(data)
+    if body[:4] != MAGIC or body[4] != FORMAT_VERSION:
+        raise ValueError("Not an alert state snapshot (or an unsupported version)")
+    (header_len,) = struct.unpack('>I', body[5:9])
+    header = json.loads(body[9:9 + header_len])
+    blob = memoryview(body)[9 + header_len:]
+
+    alert_system.alert_count = header['alert_count']
+    alert_system.message_count = header['message_count']
+    if header.get('compound') and alert_system.compound is not None:
+        alert_system.compound.restore(header['compound'])
+    tracker = alert_system.tracker
+    hour = alert_system.rules.current_hour()
+    offset = 0
+    restored = 0
+    for room, sensor_type, active, history, last_value, last_time, rate_active, windows in header['sensors']:
+        # Walk the float blob even for sensors that are skipped
+        records = []
+        for record in windows or ():
+            slots, maxima_len = record[1], record[3]
+            size = 8 * (3 * slots + 2 * maxima_len)
+            records.append((record, blob[offset:offset + size]))
+            offset += size
+
+        state = tracker.state_for(room, sensor_type)
+        if state is None:
+            continue
+        rule = state.rule
+        state.active = _find_violation(rule, *active, hour) if active else None
+        state.history = history & rule.debounce_mask
+        state.last_value = last_value
+        state.last_time = last_time
+        state.rate_active = rate_active and rule.max_rate is not None
+        if state.windows and len(records) == len(state.windows):
+            for window, (record, ring) in zip(state.windows, records):
+                name, slots, head, maxima_len, first_time, window_last, last_above, window_active = record
+                if name != window.spec.violation.type or slots != window.spec.slots:
+                    continue
+                size = 8 * slots
+                window.sums = _floats(ring[:size])
+                window.counts = _floats(ring[size:2 * size])
+                window.aboves = _floats(ring[2 * size:3 * size])
+                window.total_sum = sum(window.sums)
+                window.total_count = sum(window.counts)
+                window.total_above = sum(window.aboves)
+                pairs = _floats(ring[3 * size:])
+                window.maxima = deque(zip(map(int, pairs[0::2]), pairs[1::2]))
+                window.head = head
+                window.first_time = first_time
+                window.last_time = window_last
+                window.last_above = last_above
+                window.active = window_active
+        restored += 1
+
+    # Anomaly and liveness columns follow the window rings
+    for name in ('anomaly', 'liveness'):
+        if header.get(name):
+            state, layout = header[name]
+            columns, offset = _unpack_columns(layout, blob, offset)
+            component = getattr(alert_system, name)
+            if component is not None:
+                component.restore(state, columns)
+    return restored
+
+
+def write_atomic(path, data):
+    """Write to a temp file in the same directory, fsync, then rename over path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---- periodic snapshots --------------------------------------------------
+
+class StateSnapshotter:
+    """
+    Save AlertSystem state every `interval` seconds and on shutdown.
+
+    maybe_save() is called from the message thread, so the capture sees a
+    consistent state; the file write runs on a short-lived background thread.
+    """
+
+    def __init__(self, alert_system, path, interval=SNAPSHOT_INTERVAL):
+        self.alert_system = alert_system
+        self.path = path
+        self.interval = interval
+        self.last_save = time.monotonic()
+        self.saves = 0
+        self.last_size = 0
+        self.last_capture_ms = 0.0
+        self._writer = None
+
+    def load(self):
+        """Restore from disk; returns (sensors restored, milliseconds) or None"""
+        if not os.path.exists(self.path):
+            return None
+        start = time.perf_counter()
+        with open(self.path, 'rb') as f:
+            count = restore(self.alert_system, f.read())
+        return count, (time.perf_counter() - start) * 1000
+
+    def maybe_save(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now - self.last_save < self.interval:
+            return False
+        if self._writer is not None and self._writer.is_alive():
+            return False
+        self.last_save = now
+        data = self._capture()
+        self._writer = threading.Thread(target=write_atomic, args=(self.path, data),
+                                        name="alert-snapshot", daemon=True)
+        self._writer.start()
+        return True
+
+    def save(self):
+        """Synchronous save (shutdown)"""
+        if self._writer is not None:
+            self._writer.join()
+        write_atomic(self.path, self._capture())
+        self.last_save = time.monotonic()
+
+    def _capture(self):
+        start = time.perf_counter()
+        data = capture(self.alert_system)
+        self.last_capture_ms = (time.perf_counter() - start) * 1000
+        self.last_size = len(data)
+        self.saves += 1
+        return data
+
+
+class CatchUp:
+    """
+    Filter for the backlog delivered after a restart.
+
+    Retained messages and messages the broker buffered for the persistent
+    session arrive first. Readings a sensor's restored state has already seen
+    are skipped; the rest are re-evaluated. Catch-up ends with the first
+    reading stamped within `live_lag` seconds of the wall clock.
+    """
+
+    def __init__(self, tracker, live_lag=5.0, started=None):
+        self.tracker = tracker
+        self.live_lag = live_lag
+        self.started = time.perf_counter() if started is None else started
+        self.active = True
+        self.replayed = 0
+        self.skipped = 0
+        self.steady_after = None
+
+    def admit(self, room, sensor_type, reading_time):
+        """False for a reading already reflected in the restored state"""
+        if not self.active:
+            return True
+        rooms = self.tracker.states.get(sensor_type)
+        state = rooms.get(room) if rooms is not None else None
+        if state is not None and state.last_time is not None and reading_time <= state.last_time:
+            self.skipped += 1
+            return False
+        if reading_time >= time.time() - self.live_lag:
+            self.active = False
+            self.steady_after = time.perf_counter() - self.started
+        else:
+            self.replayed += 1
+        return True
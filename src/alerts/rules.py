@@ -0,0 +1,235 @@
+"""
+Compiled Alert Rule Engine
+Loads per-room, per-sensor threshold rules from JSON and compiles them into
+an indexed lookup that evaluates a reading with two dict lookups and two
+comparisons on the happy path
+
+Rule file layout (see alert_rules.json):
+    {
+      "defaults": {"temperature": {"unit": "°C", "min": 20, "max": 28,
+                                   "critical_min": 16, "critical_max": 32}},
+      "rooms": {"room7": {"co2": {"max": 900,
+                                  "profiles": [{"hours": [22, 7], "max": 800}]}}}
+    }
+
+min/max bound the normal band (outside it is a "warning"), critical_min and
+critical_max bound the warning band (outside it is "critical"). A profile
+overrides any of those fields for the hours [start, end), wrapping midnight.
+
+State-machine settings (used by src.alerts.state), per rule:
+    "hysteresis": 0.5        clear only once back inside the band by this much
+    "debounce": [2, 3]       raise a warning when 2 of the last 3 samples violate
+                             (critical readings raise immediately)
+    "max_rate": 3.0          RATE alert above this change per minute
+    "windows": [...]         sliding-window conditions, see src.alerts.windows
+
+A top-level "anomaly" section turns on EWMA z-score detection for every
+sensor (see src.alerts.anomaly); a top-level "compound" list adds rules
+across several sensors of a room (see src.alerts.compound); a top-level
+"offline" section raises alerts for sensors that stop publishing (see
+src.alerts.liveness); a top-level "storm" section groups the same alert in
+many rooms of a building or floor into one notification (see
+src.alerts.storm).
+"""
+
+import json
+import math
+import os
+import time
+from collections import namedtuple
+
+from src.alerts.windows import WindowSpec
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alert_rules.json')
+DEFAULT_ROOM = 'room1'
+
+# Built-in rules, used when no rule file is present
+THRESHOLDS = {
+    'temperature': {'min': 20, 'max': 28, 'unit': '°C'},
+    'humidity': {'min': 40, 'max': 60, 'unit': '%'},
+    'co2': {'min': None, 'max': 1000, 'unit': 'ppm'},
+    'light': {'min': 200, 'max': 800, 'unit': 'lux'}
+}
+
+BAND_FIELDS = ('critical_min', 'min', 'max', 'critical_max')
+
+# Pre-built verdicts; evaluate() hands these out instead of allocating
+Violation = namedtuple('Violation', 'type severity threshold')
+
+
+class Band:
+    """Thresholds in force for one hour; violations are prebuilt per band"""
+
+    __slots__ = ('crit_lo', 'lo', 'hi', 'crit_hi', 'low', 'high', 'critical_low', 'critical_high')
+
+    def __init__(self, crit_lo, lo, hi, crit_hi):
+        self.crit_lo = -math.inf if crit_lo is None else crit_lo
+        self.lo = -math.inf if lo is None else lo
+        self.hi = math.inf if hi is None else hi
+        self.crit_hi = math.inf if crit_hi is None else crit_hi
+        self.low = Violation('LOW', 'warning', lo)
+        self.high = Violation('HIGH', 'warning', hi)
+        self.critical_low = Violation('LOW', 'critical', crit_lo)
+        self.critical_high = Violation('HIGH', 'critical', crit_hi)
+
+    def key(self):
+        return (self.crit_lo, self.lo, self.hi, self.crit_hi)
+
+    def check(self, value):
+        """None when the value is normal, otherwise the matching Violation"""
+        if value < self.lo:
+            return self.critical_low if value < self.crit_lo else self.low
+        if value > self.hi:
+            return self.critical_high if value > self.crit_hi else self.high
+        return None
+
+
+class CompiledRule:
+    """A (room, sensor_type) rule as 24 hourly Band references plus state-machine settings"""
+
+    __slots__ = ('room', 'sensor_type', 'unit', 'hours', 'spec', 'hysteresis',
+                 'debounce_n', 'debounce_mask', 'max_rate', 'rate_violation', 'windows')
+
+    def __init__(self, room, sensor_type, unit, hours, spec):
+        self.room = room
+        self.sensor_type = sensor_type
+        self.unit = unit
+        self.hours = hours
+        self.spec = spec
+        self.hysteresis = spec.get('hysteresis', 0)
+        n, m = spec.get('debounce', (1, 1))
+        if not 1 <= n <= m:
+            raise ValueError(f"debounce for {room}/{sensor_type} needs 1 <= N <= M, got {n} of {m}")
+        self.debounce_n = n
+        self.debounce_mask = (1 << m) - 1
+        self.max_rate = spec.get('max_rate')
+        self.rate_violation = Violation('RATE', 'warning', self.max_rate)
+        self.windows = tuple(WindowSpec(w, Violation) for w in spec.get('windows', ())) or None
+
+    def band(self, hour):
+        return self.hours[hour]
+
+
+def hours_in(start, end):
+    """Hours of the day in [start, end), wrapping midnight; start == end means all day"""
+    if start == end:
+        return range(24)
+    if start < end:
+        return range(start, end)
+    return list(range(start, 24)) + list(range(0, end))
+
+
+class RuleEngine:
+    """
+    Indexed threshold lookup keyed by (room, sensor_type).
+
+    The index is a dict of dicts (sensor_type -> room -> CompiledRule) so a
+    lookup needs no key tuple, and rooms without an override share the
+    sensor's default rule. Identical hourly bands are interned, so thousands
+    of rooms with the same profile share one set of Band objects.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or {'defaults': THRESHOLDS, 'rooms': {}}
+        # Settings for src.alerts.anomaly; None (or "enabled": false) turns detection off
+        anomaly = self.config.get('anomaly')
+        self.anomaly = anomaly if anomaly and anomaly.get('enabled', True) else None
+        # Cross-sensor rules for src.alerts.compound
+        self.compound = self.config.get('compound') or None
+        # Dead-sensor detection settings for src.alerts.liveness
+        offline = self.config.get('offline')
+        self.offline = offline if offline and offline.get('enabled', True) else None
+        # Alert storm grouping for src.alerts.storm
+        storm = self.config.get('storm')
+        self.storm = storm if storm and storm.get('enabled', True) else None
+        self._bands = {}
+        self.defaults = {}
+        self.index = {}
+        self._lookup = {}
+        self._compile()
+        self._hour = 0
+        self._hour_valid_until = 0.0
+
+    @classmethod
+    def from_file(cls, path=None):
+        """
+        Load rules from path (or ALERT_RULES_FILE / the bundled file).
+
+        Only a missing bundled file falls back to the built-in limits; a
+        path that was asked for raises FileNotFoundError.
+        """
+        path = path or os.getenv("ALERT_RULES_FILE") or DEFAULT_RULES_FILE
+        if path == DEFAULT_RULES_FILE and not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    # ---- compilation -----------------------------------------------------
+
+    def _intern(self, band):
+        return self._bands.setdefault(band.key(), band)
+
+    def _compile_rule(self, room, sensor_type, spec):
+        base = tuple(spec.get(field) for field in BAND_FIELDS)
+        hours = [self._intern(Band(*base))] * 24
+        for profile in spec.get('profiles', []):
+            start, end = profile['hours']
+            band = self._intern(Band(*(profile.get(field, value) for field, value in zip(BAND_FIELDS, base))))
+            for hour in hours_in(start, end):
+                hours[hour] = band
+        return CompiledRule(room, sensor_type, spec.get('unit', ''), hours, spec)
+
+    def _compile(self):
+        defaults = self.config.get('defaults', {})
+        for sensor_type, spec in defaults.items():
+            self.defaults[sensor_type] = self._compile_rule(None, sensor_type, spec)
+            self.index[sensor_type] = {}
+        for room, sensors in self.config.get('rooms', {}).items():
+            for sensor_type, override in sensors.items():
+                spec = {**defaults.get(sensor_type, {}), **override}
+                self.index.setdefault(sensor_type, {})[room] = self._compile_rule(room, sensor_type, spec)
+        # Flattened for evaluate(): sensor_type -> ({room: hourly bands}, default hourly bands)
+        for sensor_type, rooms in self.index.items():
+            default = self.defaults.get(sensor_type)
+            self._lookup[sensor_type] = ({room: rule.hours for room, rule in rooms.items()},
+                                         default.hours if default else None)
+
+    # ---- evaluation ------------------------------------------------------
+
+    def rule_for(self, room, sensor_type):
+        rooms = self.index.get(sensor_type)
+        if rooms is None:
+            return None
+        rule = rooms.get(room)
+        return rule if rule is not None else self.defaults.get(sensor_type)
+
+    def current_hour(self, now=None):
+        """Local hour, recomputed at most once a minute"""
+        now = time.time() if now is None else now
+        if now >= self._hour_valid_until:
+            self._hour = time.localtime(now).tm_hour
+            self._hour_valid_until = now - now % 60 + 60
+        return self._hour
+
+    def evaluate(self, room, sensor_type, value, hour=None):
+        """
+        Return None for a normal reading (or an unknown sensor), else a Violation.
+
+        Violations are shared prebuilt tuples; nothing is allocated per call.
+        """
+        entry = self._lookup.get(sensor_type)
+        if entry is None:
+            return None
+        hours = entry[0].get(room, entry[1])
+        if hours is None:
+            return None
+        band = hours[self.current_hour() if hour is None else hour]
+        if band.lo <= value <= band.hi:
+            return None
+        return band.check(value)
+
+    def rule_count(self):
+        return len(self.defaults) + sum(len(rooms) for rooms in self.index.values())
+
+    def band_count(self):
+        return len(self._bands)
@@ -0,0 +1,151 @@
+"""
+Per-Sensor Alert State Machines
+Hysteresis, N-of-M debounce and rate-of-change tracking in one fixed-size
+record per (room, sensor_type)
+
+A record holds a reference to its compiled rule, the active threshold
+violation (a shared Violation or None), the last M samples as a bitmask, the
+previous reading for rate-of-change and, for rules with sliding-window
+conditions, one fixed-size WindowState per window. update() returns None
+unless an alert is raised or cleared, so a steady sensor costs a few
+attribute reads.
+"""
+
+from collections import namedtuple
+
+from src.alerts.windows import WindowState
+
+# action is 'raise' or 'clear'; violation is the shared rules.Violation involved
+Transition = namedtuple('Transition', 'action violation')
+
+
+class SensorState:
+    """Fixed-size alert state of one sensor"""
+
+    __slots__ = ('rule', 'active', 'history', 'last_value', 'last_time', 'rate_active', 'windows')
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.active = None
+        self.history = 0
+        self.last_value = None
+        self.last_time = None
+        self.rate_active = False
+        self.windows = [WindowState(spec) for spec in rule.windows] if rule.windows else None
+
+    def engaged(self):
+        """True while every reading matters: an alert is raised, debounce is counting or rate/window rules apply"""
+        return (self.active is not None or self.history != 0 or self.rate_active
+                or self.windows is not None or self.rule.max_rate is not None)
+
+
+class AlertTracker:
+    """
+    State records for every sensor seen, indexed sensor_type -> room.
+
+    Records are created on a sensor's first reading and cache their compiled
+    rule, so later readings skip the rule lookup entirely.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.states = {}
+
+    def state_for(self, room, sensor_type):
+        rooms = self.states.get(sensor_type)
+        if rooms is None:
+            rooms = self.states[sensor_type] = {}
+        state = rooms.get(room)
+        if state is None:
+            rule = self.rules.rule_for(room, sensor_type)
+            if rule is None:
+                return None
+            state = rooms[room] = SensorState(rule)
+        return state
+
+    def last_time(self, room, sensor_type):
+        """Timestamp of the newest reading applied for a sensor, or None"""
+        rooms = self.states.get(sensor_type)
+        state = rooms.get(room) if rooms is not None else None
+        return state.last_time if state is not None else None
+
+    def update(self, room, sensor_type, value, now, hour=None):
+        """Feed one reading; returns None or a list of Transitions"""
+        rooms = self.states.get(sensor_type)
+        state = rooms.get(room) if rooms is not None else None
+        if state is None:
+            state = self.state_for(room, sensor_type)
+            if state is None:
+                return None
+        rule = state.rule
+        transitions = None
+
+        if rule.max_rate is not None and state.last_time is not None and now > state.last_time:
+            fast = abs(value - state.last_value) * 60 / (now - state.last_time) > rule.max_rate
+            if fast is not state.rate_active:
+                state.rate_active = fast
+                transitions = [Transition('raise' if fast else 'clear', rule.rate_violation)]
+        state.last_value = value
+        state.last_time = now
+
+        if state.windows is not None:
+            for window in state.windows:
+                holds = window.add(value, now)
+                if holds is not window.active:
+                    window.active = holds
+                    if transitions is None:
+                        transitions = []
+                    transitions.append(Transition('raise' if holds else 'clear', window.spec.violation))
+
+        band = rule.hours[self.rules.current_hour() if hour is None else hour]
+        active = state.active
+
+        if band.lo <= value <= band.hi:
+            state.history = (state.history << 1) & rule.debounce_mask
+            if active is None:
+                return transitions
+            # Hysteresis: stay raised until the value is well inside the band
+            if active.type == 'HIGH':
+                if value > band.hi - rule.hysteresis:
+                    return transitions
+            elif value < band.lo + rule.hysteresis:
+                return transitions
+            state.active = None
+            if transitions is None:
+                transitions = []
+            transitions.append(Transition('clear', active))
+            return transitions
+
+        violation = band.check(value)
+        state.history = ((state.history << 1) | 1) & rule.debounce_mask
+        if active is violation:
+            return transitions
+        if transitions is None:
+            transitions = []
+        if active is None:
+            # Warnings wait for N of the last M samples; critical readings raise at once
+            if violation.severity == 'critical' or state.history.bit_count() >= rule.debounce_n:
+                state.active = violation
+                transitions.append(Transition('raise', violation))
+        elif violation.type != active.type:
+            state.active = violation
+            transitions.append(Transition('clear', active))
+            transitions.append(Transition('raise', violation))
+        elif violation.severity == 'critical' and active.severity != 'critical':
+            # Escalation; de-escalation keeps the critical alert until it clears
+            state.active = violation
+            transitions.append(Transition('raise', violation))
+        return transitions or None
+
+    def active_alerts(self):
+        """Yield (room, sensor_type, violation) for every raised alert"""
+        for sensor_type, rooms in self.states.items():
+            for room, state in rooms.items():
+                if state.active is not None:
+                    yield room, sensor_type, state.active
+                if state.rate_active:
+                    yield room, sensor_type, state.rule.rate_violation
+                if state.windows is not None:
+                    for window in state.windows:
+                        if window.active:
+                            yield room, sensor_type, window.spec.violation
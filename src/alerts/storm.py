@@ -0,0 +1,225 @@
+"""
+Alert Storm Grouping
+Collapses many rooms raising the same alert at once (an HVAC failure, a
+power cut on one floor) into one grouped notification with a room count
+
+Rooms are placed in a building/floor hierarchy by the top-level "storm"
+section of the rule file:
+    "storm": {"level": "floor", "window": 60, "min_rooms": 5, "update_interval": 30,
+              "building": "hostel",
+              "pattern": "^(?:(?P<building>[A-Za-z]+)-)?room(?P<floor>\\\\d+)\\\\d\\\\d$",
+              "locations": {"server_room": "hostel/0"}}
+
+"locations" pins rooms to "building/floor"; other rooms are matched against
+"pattern" (named groups building and floor, both optional), and rooms that
+match neither belong to "building" as a whole.
+
+Alerts are grouped by sensor, alert type and location at `level` ("floor"
+or "building"). They pass through individually until min_rooms distinct
+rooms of a group raise within `window` seconds while still in alert; the
+group then opens a storm, announced once with the number of rooms in alert.
+From then on its members' raises and clears only reach the audit sinks
+(event log, file), the count is re-announced at most every update_interval
+seconds while it changes, and the storm closes with one notification when
+its last member clears.
+
+A raise or clear costs a few dict and deque operations; nothing scans the
+group's members.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+from src.alerts.notify import Notification
+
+DEFAULT_WINDOW = 60.0
+DEFAULT_MIN_ROOMS = 5
+DEFAULT_UPDATE_INTERVAL = 30.0
+DEFAULT_BUILDING = 'site'
+SAMPLE_ROOMS = 10
+LEVELS = ('building', 'floor')
+
+
+class StormGroup:
+    """Rooms in alert for one (sensor, alert type, location) and the raises of the last window"""
+
+    __slots__ = ('sensor_type', 'alert_type', 'location', 'active', 'recent', 'recent_rooms',
+                 'storming', 'started', 'peak', 'critical', 'announced', 'announced_at', 'suppressed')
+
+    def __init__(self, sensor_type, alert_type, location):
+        self.sensor_type = sensor_type
+        self.alert_type = alert_type
+        self.location = location
+        self.active = set()
+        self.recent = deque()        # (time, room) of raises within the window
+        self.recent_rooms = {}       # room -> raises of it in `recent`
+        self.storming = False
+        self.started = None
+        self.peak = 0
+        self.critical = False
+        self.announced = 0           # room count of the last storm notification
+        self.announced_at = 0.0
+        self.suppressed = 0
+
+    def expire(self, now, window):
+        recent = self.recent
+        counts = self.recent_rooms
+        while recent and recent[0][0] < now - window:
+            _, room = recent.popleft()
+            left = counts[room] - 1
+            if left:
+                counts[room] = left
+            else:
+                del counts[room]
+
+    def notification(self, kind, now):
+        """A storm notification: value is the rooms in alert, threshold the peak"""
+        count = len(self.active)
+        n = Notification(kind, self.sensor_type, self.location, self.alert_type,
+                         'critical' if self.critical else 'warning', count, self.peak, ' rooms')
+        n.rooms = sorted(self.active)[:SAMPLE_ROOMS]
+        n.timestamp = now
+        self.announced = count
+        self.announced_at = now
+        return n
+
+
+class StormGrouper:
+    """
+    Decides which alert notifications reach every sink and which are folded into a storm.
+
+    observe() takes each raised/cleared Notification and returns whether to
+    deliver it to every sink plus any storm notifications to send; tick()
+    sends the pending count updates of quiet storms. Both are thread-safe.
+    """
+
+    def __init__(self, level='floor', window=DEFAULT_WINDOW, min_rooms=DEFAULT_MIN_ROOMS,
+                 update_interval=DEFAULT_UPDATE_INTERVAL, pattern=None, locations=None,
+                 building=DEFAULT_BUILDING):
+        if level not in LEVELS:
+            raise ValueError(f"storm level must be one of {LEVELS}, got {level!r}")
+        if min_rooms < 2:
+            raise ValueError(f"storm min_rooms must be at least 2, got {min_rooms}")
+        self.level = level
+        self.window = window
+        self.min_rooms = min_rooms
+        self.update_interval = update_interval
+        self.pattern = re.compile(pattern) if pattern else None
+        self.locations = {room: tuple(location.split('/', 1)) if '/' in location else (location, None)
+                          for room, location in (locations or {}).items()}
+        self.building = building
+        self.groups = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+        self.storms = 0
+        self.suppressed = 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(level=spec.get('level', 'floor'), window=spec.get('window', DEFAULT_WINDOW),
+                   min_rooms=spec.get('min_rooms', DEFAULT_MIN_ROOMS),
+                   update_interval=spec.get('update_interval', DEFAULT_UPDATE_INTERVAL),
+                   pattern=spec.get('pattern'), locations=spec.get('locations'),
+                   building=spec.get('building', DEFAULT_BUILDING))
+
+    def locate(self, room):
+        """(building, floor or None) of a room"""
+        location = self.locations.get(room)
+        if location is not None:
+            return location
+        match = self.pattern.match(room) if self.pattern is not None else None
+        if match is None:
+            return self.building, None
+        groups = match.groupdict()
+        return groups.get('building') or self.building, groups.get('floor')
+
+    def label(self, room):
+        """The room's group location at the configured level, e.g. 'hostel/2'; cached per room"""
+        label = self._labels.get(room)
+        if label is None:
+            building, floor = self.locate(room)
+            label = building if self.level == 'building' or floor is None else f"{building}/{floor}"
+            self._labels[room] = label
+        return label
+
+    def observe(self, n):
+        """(deliver n to every sink?, [storm notifications]) for a raised or cleared alert"""
+        key = (n.sensor_type, n.alert_type, self.label(n.room))
+        with self._lock:
+            group = self.groups.get(key)
+            if n.kind == 'alert':
+                if group is None:
+                    group = self.groups[key] = StormGroup(*key)
+                return self._raise(group, n)
+            if group is None or n.room not in group.active:
+                return True, []
+            return self._clear(group, n)
+
+    def _raise(self, group, n):
+        now = n.timestamp
+        room = n.room
+        group.active.add(room)
+        group.recent.append((now, room))
+        group.recent_rooms[room] = group.recent_rooms.get(room, 0) + 1
+        group.expire(now, self.window)
+        if n.severity == 'critical':
+            group.critical = True
+        if len(group.active) > group.peak:
+            group.peak = len(group.active)
+        if group.storming:
+            return self._suppress(group), self._update(group, now)
+        if len(group.recent_rooms) < self.min_rooms or len(group.active) < self.min_rooms:
+            return True, []
+        group.storming = True
+        group.started = now
+        group.peak = len(group.active)
+        self.storms += 1
+        return self._suppress(group), [group.notification('storm', now)]
+
+    def _clear(self, group, n):
+        group.active.discard(n.room)
+        if not group.storming:
+            if not group.active and not group.recent:
+                del self.groups[self.groups_key(group)]
+            return True, []
+        if group.active:
+            return self._suppress(group), self._update(group, n.timestamp)
+        # Last member cleared: close the storm and forget the group
+        del self.groups[self.groups_key(group)]
+        return self._suppress(group), [group.notification('storm_clear', n.timestamp)]
+
+    def _suppress(self, group):
+        group.suppressed += 1
+        self.suppressed += 1
+        return False
+
+    def _update(self, group, now):
+        if len(group.active) == group.announced or now - group.announced_at < self.update_interval:
+            return []
+        return [group.notification('storm_update', now)]
+
+    @staticmethod
+    def groups_key(group):
+        return group.sensor_type, group.alert_type, group.location
+
+    def tick(self, now=None):
+        """Storm count updates that are due; also drops quiet groups with nothing in alert"""
+        now = time.time() if now is None else now
+        pending = []
+        with self._lock:
+            for key, group in list(self.groups.items()):
+                if group.storming:
+                    pending += self._update(group, now)
+                    continue
+                group.expire(now, self.window)
+                if not group.active and not group.recent:
+                    del self.groups[key]
+        return pending
+
+    def active(self):
+        """[(location, sensor_type, alert_type, rooms in alert, peak)] of open storms"""
+        with self._lock:
+            return [(g.location, g.sensor_type, g.alert_type, len(g.active), g.peak)
+                    for g in self.groups.values() if g.storming]
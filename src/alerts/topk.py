@@ -0,0 +1,278 @@
+"""
+Noisiest Sensors
+Top-K (room, sensor) pairs by message volume and by alert transitions in
+fixed memory, using the Space-Saving heavy-hitters summary
+
+A SpaceSaving summary keeps at most k counters and is fed in chunks: keys
+already monitored add their count, new keys start from the summary's floor
+(the smallest count kept once the table has overflowed) and the k largest
+counters survive. Every kept count is an upper bound on the true count and
+exceeds it by at most its recorded error, and a key that is not kept
+occurred at most `floor` times, so any key seen more than total/k times is
+always in the table.
+
+Nothing is added to AlertSystem.process_reading. Alert transitions are
+counted where notifications are raised and cleared; message volume is
+counted at ingest: alert_system.py's on_message appends each reading's key
+(folded with collections.Counter every CHUNK keys) and BatchEvaluator counts
+a whole batch from its slot array, merging only the batch's 2k largest
+sensors and the ones already monitored, a superset of what can be kept.
+alert_system.py writes the tables to ALERT_TOPK_FILE every few seconds for
+the dashboard and this CLI; with several alert workers each writes its own
+file and load() merges them.
+
+Usage:
+    python -m src.alerts.topk --file alert_topk.json
+    python -m src.alerts.topk --event-log alert_log --since 24h -k 10
+"""
+
+import argparse
+import glob
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from operator import itemgetter
+
+from src.alerts.eventlog import parse_time, query
+
+TOP_K = 20
+CHUNK = 4096
+DEFAULT_TOPK_FILE = 'alert_topk.json'
+
+
+class SpaceSaving:
+    """Approximate top-k counts of a stream of hashable keys in at most k counters"""
+
+    def __init__(self, k=TOP_K, chunk=CHUNK):
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        self.k = k
+        self.chunk = chunk
+        self.counts = {}
+        self.errors = {}
+        self.floor = 0
+        self.total = 0
+        self.pending = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key):
+        # The ingest thread and the watchdog thread (OFFLINE transitions) both add keys
+        with self._lock:
+            self.pending.append(key)
+            if len(self.pending) >= self.chunk:
+                self._fold()
+
+    def extend(self, keys):
+        with self._lock:
+            self.pending.extend(keys)
+            if len(self.pending) >= self.chunk:
+                self._fold()
+
+    def fold(self):
+        """Merge the pending keys into the counters"""
+        with self._lock:
+            self._fold()
+
+    def _fold(self):
+        pending = self.pending
+        if pending:
+            self.pending = []
+            self._merge(Counter(pending), len(pending))
+
+    def update(self, weights, total=None):
+        """
+        Merge a chunk already counted as {key: count}.
+
+        Unmonitored keys outside the k largest unmonitored ones of the chunk
+        could not be kept and may be left out (taking the chunk's 2k largest
+        keys plus the monitored ones is enough); `total` is then the chunk's
+        full size.
+        """
+        with self._lock:
+            self._merge(weights, sum(weights.values()) if total is None else total)
+
+    def _merge(self, weights, total):
+        self.total += total
+        counts = self.counts
+        errors = self.errors
+        floor = self.floor
+        for key, count in weights.items():
+            if key in counts:
+                counts[key] += count
+            else:
+                counts[key] = floor + count
+                errors[key] = floor
+        if len(counts) > self.k:
+            kept = heapq.nlargest(self.k, counts.items(), key=itemgetter(1))
+            self.counts = dict(kept)
+            self.errors = {key: errors[key] for key in self.counts}
+            self.floor = kept[-1][1]
+
+    def top(self, n=None):
+        """[(key, count, error)] by count, largest first; count - error is a lower bound"""
+        self.fold()
+        with self._lock:
+            ranked = sorted(self.counts.items(), key=itemgetter(1), reverse=True)
+            errors = self.errors
+            return [(key, count, errors[key]) for key, count in ranked[:n]]
+
+
+class NoisySensors:
+    """The sensors sending the most messages and causing the most alert transitions"""
+
+    def __init__(self, k=TOP_K, chunk=CHUNK):
+        self.k = k
+        self.messages = SpaceSaving(k, chunk)
+        self.transitions = SpaceSaving(k, chunk)
+
+    def to_dict(self, n=None):
+        def section(summary):
+            # top() folds pending keys first, so the total is current
+            top = [{'room': room, 'sensor_type': sensor_type, 'count': count, 'error': error}
+                   for (room, sensor_type), count, error in summary.top(n)]
+            return {'total': summary.total, 'floor': summary.floor, 'top': top}
+        return {
+            'updated': time.time(),
+            'k': self.k,
+            'messages': section(self.messages),
+            'transitions': section(self.transitions),
+        }
+
+    def save(self, path):
+        """Write to_dict() atomically, so readers never see a torn file"""
+        temp = f"{path}.tmp"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(temp, path)
+
+
+def worker_path(path, worker):
+    """'alert_topk.json' -> 'alert_topk.w3.json', the file written by one of several alert workers"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.w{worker}{ext}"
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def merge(tables):
+    """
+    One table from the tables of several workers.
+
+    A key missing from a worker's table occurred there at most that table's
+    floor times, so it adds the floor to both its count and its error; the
+    merged counts stay upper bounds and count - error lower bounds.
+    """
+    k = max(table['k'] for table in tables)
+    merged = {'updated': max(table['updated'] for table in tables), 'k': k}
+    for name in ('messages', 'transitions'):
+        sections = [table[name] for table in tables if table.get(name) is not None]
+        if not sections:
+            merged[name] = None
+            continue
+        base = sum(section.get('floor', 0) for section in sections)
+        counts, errors = {}, {}
+        for section in sections:
+            floor = section.get('floor', 0)
+            for row in section['top']:
+                key = (row['room'], row['sensor_type'])
+                counts[key] = counts.get(key, 0) + row['count'] - floor
+                errors[key] = errors.get(key, 0) + row['error'] - floor
+        ranked = sorted(counts.items(), key=itemgetter(1), reverse=True)
+        top = [{'room': room, 'sensor_type': sensor_type, 'count': count + base,
+                'error': errors[room, sensor_type] + base}
+               for (room, sensor_type), count in ranked[:k]]
+        merged[name] = {'total': sum(section['total'] for section in sections),
+                        'floor': base + ranked[k][1] if len(ranked) > k else base, 'top': top}
+    return merged
+
+
+def load(path):
+    """
+    The dict saved by NoisySensors.save(), or None if missing or unreadable.
+
+    When several alert workers write their own files (worker_path()), the
+    newest of `path` and the merged worker tables is returned.
+    """
+    table = _read(path)
+    stem, ext = os.path.splitext(path)
+    workers = [worker for worker in map(_read, sorted(glob.glob(f"{glob.escape(stem)}.w*{ext}")))
+               if worker is not None]
+    if workers:
+        merged = merge(workers)
+        if table is None or merged['updated'] > table['updated']:
+            return merged
+    return table
+
+
+def from_event_log(directory, k=TOP_K, since=None, until=None):
+    """NoisySensors with transitions counted from an alert event log (no message volume)"""
+    noisy = NoisySensors(k)
+    noisy.transitions.extend((record.get('room'), record.get('sensor_type'))
+                             for record in query(directory, since=since, until=until)
+                             if record.get('kind') in ('alert', 'clear'))
+    return noisy
+
+
+def print_table(title, section, n):
+    total = section['total']
+    print(f"\n{title} ({total:,} total)")
+    print(f"{'#':>3}  {'Room':16} {'Sensor':14} {'Count':>10} {'± error':>9} {'Share':>7}")
+    print("-" * 70)
+    for rank, row in enumerate(section['top'][:n], 1):
+        share = row['count'] / total if total else 0.0
+        print(f"{rank:3}  {row['room']:16} {row['sensor_type']:14} {row['count']:10,} "
+              f"{row['error']:9,} {share:7.1%}")
+    if not section['top']:
+        print("   (nothing recorded)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the noisiest sensors")
+    parser.add_argument("--file", default=os.getenv("ALERT_TOPK_FILE", DEFAULT_TOPK_FILE),
+                        help="Top-K file written by alert_system.py")
+    parser.add_argument("--event-log", default=None, help="Count transitions from this event log instead")
+    parser.add_argument("--since", default=None, help="With --event-log: ISO time or age like 2h / 7d")
+    parser.add_argument("-k", type=int, default=TOP_K, help="Rows to show")
+    parser.add_argument("--json", action='store_true', help="Print the raw JSON")
+    args = parser.parse_args()
+
+    if args.event_log:
+        since = parse_time(args.since) if args.since else None
+        data = from_event_log(args.event_log, max(args.k, TOP_K), since).to_dict()
+        data['messages'] = None
+    else:
+        data = load(args.file)
+        if data is None:
+            print(f"❌ No top-K data in {args.file} (is alert_system.py running with ALERT_TOPK_FILE?)",
+                  file=sys.stderr)
+            sys.exit(1)
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    print("=" * 70)
+    print(" 🔊 NOISIEST SENSORS - IoT Monitoring System")
+    print("=" * 70)
+    if not args.event_log:
+        age = time.time() - data['updated']
+        print(f"🕐 Updated {age:.0f}s ago, {data['k']} counters per table")
+    if data['messages'] is not None:
+        print_table("📨 By message volume", data['messages'], args.k)
+    print_table("🚨 By alert transitions (raised + cleared)", data['transitions'], args.k)
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    main()
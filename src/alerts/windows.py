@@ -0,0 +1,168 @@
+"""
+Sliding-Window Alert Conditions
+Average, maximum and time-above-threshold over a time window, updated
+incrementally per reading with memory fixed by the bucket count
+
+A window of W seconds is a ring of B buckets (W / B seconds each). Running
+totals are adjusted as buckets expire, and the maximum is kept in a monotonic
+deque of bucket maxima, so a reading costs O(1) amortized whether the window
+is a minute or a day. Results are exact at bucket granularity: the ring
+holds B + 1 buckets, the current one and the B before it, so the window
+always spans at least W seconds (up to W + W / B). With only B buckets a
+time_above "duration" equal to the window would be reached and lost again
+within every bucket.
+
+Rule syntax (inside a sensor rule in alert_rules.json):
+    "windows": [
+      {"agg": "avg", "window": 300, "above": 1000},
+      {"agg": "max", "window": 60, "above": 1400, "severity": "critical"},
+      {"agg": "time_above", "window": 1800, "above": 60, "duration": 1800}
+    ]
+
+time_above holds each reading until the next one and alerts once the time
+spent above the limit within the window reaches "duration" seconds.
+avg and max wait until the window has been observed for "min_coverage"
+(fraction of the window, default 1.0) so a single early sample cannot fire.
+"""
+
+from array import array
+from collections import deque
+
+AGGREGATES = ('avg', 'max', 'time_above')
+DEFAULT_BUCKETS = 60
+
+
+class WindowSpec:
+    """A compiled window condition; shared by every sensor using the rule"""
+
+    __slots__ = ('agg', 'window', 'buckets', 'slots', 'width', 'above', 'duration', 'min_coverage', 'violation')
+
+    def __init__(self, spec, violation_factory):
+        self.agg = spec['agg']
+        if self.agg not in AGGREGATES:
+            raise ValueError(f"Unknown window aggregate: {self.agg}")
+        self.window = float(spec['window'])
+        self.buckets = int(spec.get('buckets', DEFAULT_BUCKETS))
+        self.slots = self.buckets + 1
+        self.width = self.window / self.buckets
+        self.above = spec['above']
+        self.duration = float(spec.get('duration', self.window))
+        if self.agg == 'time_above' and self.duration > self.window:
+            raise ValueError(f"time_above duration {self.duration:g}s exceeds its {self.window:g}s window")
+        self.min_coverage = float(spec.get('min_coverage', 1.0))
+        name = spec.get('name', f"{self.agg.upper()}_{int(self.window)}S")
+        self.violation = violation_factory(name, spec.get('severity', 'warning'),
+                                           self.duration if self.agg == 'time_above' else self.above)
+
+
+class WindowState:
+    """
+    Ring buffers and running totals of one window for one sensor.
+
+    The rings are float64 arrays so snapshots can copy them as raw bytes.
+    """
+
+    __slots__ = ('spec', 'sums', 'counts', 'aboves', 'total_sum', 'total_count', 'total_above',
+                 'head', 'maxima', 'first_time', 'last_time', 'last_above', 'active')
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.sums = array('d', bytes(8 * spec.slots))
+        self.counts = array('d', bytes(8 * spec.slots))
+        self.aboves = array('d', bytes(8 * spec.slots))
+        self.total_sum = 0.0
+        self.total_count = 0
+        self.total_above = 0.0
+        self.head = None
+        # (bucket index, bucket max), maxima strictly decreasing from the left
+        self.maxima = deque()
+        self.first_time = None
+        self.last_time = None
+        self.last_above = False
+        self.active = False
+
+    def _advance(self, index):
+        """Expire buckets that fall out of the window as time moves to `index`"""
+        slots = self.spec.slots
+        if self.head is None or index - self.head >= slots:
+            empty = bytes(8 * slots)
+            self.sums = array('d', empty)
+            self.counts = array('d', empty)
+            self.aboves = array('d', empty)
+            self.total_sum = 0.0
+            self.total_count = 0
+            self.total_above = 0.0
+            # Nothing before the gap is in the window: coverage and time above start over
+            self.first_time = None
+            self.last_time = None
+            self.last_above = False
+        else:
+            for expired in range(self.head + 1, index + 1):
+                slot = expired % slots
+                self.total_sum -= self.sums[slot]
+                self.total_count -= self.counts[slot]
+                self.total_above -= self.aboves[slot]
+                self.sums[slot] = 0.0
+                self.counts[slot] = 0.0
+                self.aboves[slot] = 0.0
+            if self.total_count == 0:
+                # Drop accumulated float error whenever the window empties
+                self.total_sum = 0.0
+                self.total_above = 0.0
+        self.head = index
+        oldest = index - slots
+        maxima = self.maxima
+        while maxima and maxima[0][0] <= oldest:
+            maxima.popleft()
+
+    def add(self, value, now):
+        """Add a reading; returns whether the condition currently holds"""
+        spec = self.spec
+        index = int(now // spec.width)
+        if index != self.head:
+            if self.head is not None and index < self.head:
+                # Out-of-order reading from an older bucket: count it in the current one
+                index = self.head
+            else:
+                self._advance(index)
+        slot = index % spec.slots
+
+        if self.first_time is None:
+            self.first_time = now
+        elif self.last_above:
+            # Time before the oldest live bucket is no longer in the window
+            held = min(now - self.last_time, now - (index - spec.buckets) * spec.width)
+            if held > 0:
+                self.aboves[slot] += held
+                self.total_above += held
+        self.last_time = now
+        self.last_above = value > spec.above
+
+        self.sums[slot] += value
+        self.counts[slot] += 1
+        self.total_sum += value
+        self.total_count += 1
+
+        maxima = self.maxima
+        while maxima and maxima[-1][1] <= value:
+            maxima.pop()
+        if not maxima or maxima[-1][0] != index:
+            maxima.append((index, value))
+
+        agg = spec.agg
+        if agg == 'time_above':
+            return self.total_above >= spec.duration
+        if now - self.first_time < spec.window * spec.min_coverage:
+            return False
+        if agg == 'avg':
+            return self.total_sum / self.total_count > spec.above
+        return maxima[0][1] > spec.above
+
+    def average(self):
+        return self.total_sum / self.total_count if self.total_count else None
+
+    def maximum(self):
+        return self.maxima[0][1] if self.maxima else None
+
+    def time_above(self):
+        return min(self.total_above, self.spec.window)
@@ -0,0 +1,5 @@
+"""
+Embedded MQTT broker
+A local stand-in for the cloud broker, so tests and benchmarks run offline,
+plus the topic matching and event loop thread helpers the dashboard servers share
+"""
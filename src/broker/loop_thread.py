@@ -0,0 +1,43 @@
+"""
+Event Loop Threads
+Runs an asyncio server (the broker, the live feed, the REST API) on its own
+event loop thread for synchronous callers such as dashboard.py and the tests
+"""
+
+import asyncio
+import threading
+
+
+def start_in_thread(server, name, label, timeout=5.0):
+    """
+    Run `server` (an object with async start() and stop()) on a new event loop thread.
+
+    Returns the thread once start() has finished. Raises whatever start()
+    raised (e.g. OSError for a port in use), or RuntimeError if it has not
+    finished within `timeout` seconds. Stopping the loop runs stop().
+    """
+    started = threading.Event()
+    failure = []
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server.start())
+        except BaseException as e:
+            failure.append(e)
+            loop.close()
+            return
+        finally:
+            started.set()
+        loop.run_forever()
+        loop.run_until_complete(server.stop())
+        loop.close()
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    if not started.wait(timeout):
+        raise RuntimeError(f"{label} did not start within {timeout:g}s")
+    if failure:
+        raise failure[0]
+    return thread
@@ -0,0 +1,616 @@
+"""
+Embedded MQTT Broker
+Small asyncio MQTT 3.1.1 broker for offline tests, CI and air-gapped benchmarks
+
+Supports QoS 0 and 1 (QoS 2 publishes are accepted with the PUBREC/PUBREL/
+PUBCOMP handshake and delivered at QoS 1 at most), + and # wildcards (which
+do not match $-topics at the first level), retained messages, last will,
+keep-alive and persistent sessions (clean_session=False keeps subscriptions
+and queues QoS 1 messages while the client is away). There is no TLS and
+no authentication unless `users` is given.
+
+Subscriptions live in a topic trie and each topic's subscriber list is
+cached until the subscriptions change, so a publish on a known topic costs
+one dict lookup. A QoS 0 message is encoded once for all its QoS 0
+subscribers, and every connection writes what a read produced in one
+transport.write() instead of one syscall per packet. QoS 0 messages to a
+subscriber with more than `high_water` bytes unsent are dropped and
+counted, as real brokers do for slow consumers; QoS 1 messages beyond
+MAX_INFLIGHT unacknowledged ones wait in the session's queue.
+
+Usage:
+    python -m src.broker.server --port 1883
+    (then MQTT_BROKER=127.0.0.1 MQTT_PORT=1883 MQTT_USE_TLS=false for the other tools)
+
+In tests, the `mqtt_broker` fixture in tests/conftest.py starts one on a
+free port.
+"""
+
+import argparse
+import asyncio
+import uuid
+from collections import deque
+
+from src.broker.loop_thread import start_in_thread
+from src.broker.topics import topic_matches
+
+MAX_INFLIGHT = 1000
+MAX_QUEUED = 100000
+HIGH_WATER = 16 * 1024 * 1024
+MAX_QOS = 1
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+PINGRESP_PACKET = b'\xd0\x00'
+
+
+class ProtocolError(Exception):
+    """A malformed or out-of-order packet; the connection is closed"""
+
+
+def encode_length(n):
+    """MQTT variable-length 'remaining length'"""
+    if n < 128:
+        return bytes((n,))
+    out = bytearray()
+    while True:
+        byte = n % 128
+        n //= 128
+        if n:
+            out.append(byte | 128)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_publish(topic, payload, qos=0, mid=0, retain=False, dup=False):
+    """PUBLISH packet bytes; topic is already UTF-8 encoded"""
+    header = 0x30 | (qos << 1) | (1 if retain else 0) | (8 if dup else 0)
+    variable = len(topic).to_bytes(2, 'big') + topic
+    if qos:
+        variable += mid.to_bytes(2, 'big')
+    return bytes((header,)) + encode_length(len(variable) + len(payload)) + variable + payload
+
+
+def _string(data, pos):
+    """(bytes, next position) of a length-prefixed field"""
+    if pos + 2 > len(data):
+        raise ProtocolError("truncated string")
+    end = pos + 2 + int.from_bytes(data[pos:pos + 2], 'big')
+    if end > len(data):
+        raise ProtocolError("truncated string")
+    return bytes(data[pos + 2:end]), end
+
+
+def valid_filter(topic_filter):
+    levels = topic_filter.split('/')
+    for i, level in enumerate(levels):
+        if '#' in level and (level != '#' or i != len(levels) - 1):
+            return False
+        if '+' in level and level != '+':
+            return False
+    return bool(topic_filter)
+
+
+class _Node:
+    __slots__ = ('children', 'subscribers')
+
+    def __init__(self):
+        self.children = {}
+        self.subscribers = {}
+
+
+class SubscriptionTrie:
+    """Topic filters by level; match() returns {session: highest granted QoS}"""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, topic_filter, session, qos):
+        node = self.root
+        for level in topic_filter.split('/'):
+            node = node.children.setdefault(level, _Node())
+        node.subscribers[session] = qos
+
+    def remove(self, topic_filter, session):
+        path = [self.root]
+        for level in topic_filter.split('/'):
+            node = path[-1].children.get(level)
+            if node is None:
+                return False
+            path.append(node)
+        if path[-1].subscribers.pop(session, None) is None:
+            return False
+        # Prune empty branches
+        for level, parent, node in zip(reversed(topic_filter.split('/')), reversed(path[:-1]), reversed(path[1:])):
+            if node.children or node.subscribers:
+                break
+            del parent.children[level]
+        return True
+
+    def match(self, topic):
+        levels = topic.split('/')
+        found = {}
+        self._walk(self.root, levels, 0, found, topic.startswith('$'))
+        return found
+
+    def _walk(self, node, levels, i, found, system):
+        children = node.children
+        wildcard = not (system and i == 0)
+        if wildcard:
+            rest = children.get('#')
+            if rest is not None:
+                self._collect(rest.subscribers, found)
+        if i == len(levels):
+            self._collect(node.subscribers, found)
+            return
+        child = children.get(levels[i])
+        if child is not None:
+            self._walk(child, levels, i + 1, found, system)
+        if wildcard:
+            child = children.get('+')
+            if child is not None:
+                self._walk(child, levels, i + 1, found, system)
+
+    @staticmethod
+    def _collect(subscribers, found):
+        for session, qos in subscribers.items():
+            if found.get(session, -1) < qos:
+                found[session] = qos
+
+
+class Session:
+    """Subscriptions and undelivered QoS 1 messages of one client id"""
+
+    def __init__(self, client_id, clean):
+        self.client_id = client_id
+        self.clean = clean
+        self.subscriptions = {}
+        self.connection = None
+        self.inflight = {}
+        self.queue = deque()
+        self.next_mid = 1
+        self.dropped = 0
+
+    def deliver(self, topic, payload, qos, packet0=None, retain=False):
+        """Send (or, while offline or at the in-flight limit, queue) one message"""
+        connection = self.connection
+        if qos == 0:
+            if connection is None:
+                return
+            if connection.backlog() > connection.broker.high_water:
+                self.dropped += 1
+                return
+            connection.send(packet0 if packet0 is not None and not retain
+                            else encode_publish(topic, payload, 0, retain=retain))
+            return
+        if connection is None or len(self.inflight) >= MAX_INFLIGHT or self.queue:
+            if connection is None and self.clean:
+                return
+            if len(self.queue) >= MAX_QUEUED:
+                self.dropped += 1
+                return
+            self.queue.append((topic, payload, retain))
+            return
+        self._send_qos1(topic, payload, retain)
+
+    def _send_qos1(self, topic, payload, retain):
+        mid = self.next_mid
+        self.next_mid = mid % 65535 + 1
+        packet = encode_publish(topic, payload, 1, mid, retain)
+        self.inflight[mid] = packet
+        self.connection.send(packet)
+
+    def acknowledged(self, mid):
+        self.inflight.pop(mid, None)
+        queue = self.queue
+        while queue and len(self.inflight) < MAX_INFLIGHT and self.connection is not None:
+            self._send_qos1(*queue.popleft())
+
+    def resume(self):
+        """After a reconnect: resend unacknowledged messages (DUP set), then the queue"""
+        for mid, packet in self.inflight.items():
+            self.connection.send(bytes((packet[0] | 8,)) + packet[1:])
+        self.acknowledged(0)
+
+
+class _Connection(asyncio.Protocol):
+    """One client connection: packet framing, output batching and the protocol state"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.transport = None
+        self.buffer = bytearray()
+        self.session = None
+        self.out = []
+        self.out_bytes = 0
+        self.flush_scheduled = False
+        self.will = None
+        self.keepalive = 0
+        self.last_seen = 0.0
+        self.closing = False
+
+    # ---- transport -------------------------------------------------------
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.last_seen = self.broker.loop.time()
+        self.broker.connections.add(self)
+
+    def connection_lost(self, exc):
+        self.broker.connections.discard(self)
+        self.out.clear()
+        self.closing = True
+        session = self.session
+        if session is not None and session.connection is self:
+            session.connection = None
+            if self.will is not None:
+                self.broker.publish(*self.will)
+            if session.clean:
+                self.broker.remove_session(session)
+
+    def send(self, packet):
+        self.out.append(packet)
+        self.out_bytes += len(packet)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.broker.loop.call_soon(self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        if self.out and not self.closing:
+            self.transport.write(b''.join(self.out))
+        self.out.clear()
+        self.out_bytes = 0
+
+    def backlog(self):
+        return self.out_bytes + self.transport.get_write_buffer_size()
+
+    def close(self):
+        if not self.closing:
+            self.flush()
+            self.closing = True
+            self.transport.close()
+
+    def data_received(self, data):
+        self.last_seen = self.broker.loop.time()
+        buffer = self.buffer
+        buffer += data
+        size = len(buffer)
+        pos = 0
+        try:
+            while size - pos >= 2:
+                # Fixed header: type/flags byte, then 1-4 bytes of remaining length
+                length = 0
+                shift = 0
+                cursor = pos + 1
+                while True:
+                    if cursor >= size:
+                        length = -1
+                        break
+                    byte = buffer[cursor]
+                    length |= (byte & 127) << shift
+                    cursor += 1
+                    if byte < 128:
+                        break
+                    shift += 7
+                    if shift > 21:
+                        raise ProtocolError("remaining length too long")
+                end = cursor + length
+                if length < 0 or end > size:
+                    break
+                header = buffer[pos]
+                if header >> 4 == PUBLISH:
+                    self.on_publish(header, buffer, cursor, end)
+                else:
+                    self.dispatch(header, bytes(buffer[cursor:end]))
+                if self.closing:
+                    return
+                pos = end
+        except ProtocolError:
+            self.close()
+            return
+        del buffer[:pos]
+
+    # ---- packets ---------------------------------------------------------
+
+    def dispatch(self, header, body):
+        kind = header >> 4
+        if self.session is None and kind != CONNECT:
+            raise ProtocolError("first packet must be CONNECT")
+        if kind == CONNECT:
+            self.on_connect(body)
+        elif kind == PUBACK:
+            self.session.acknowledged(int.from_bytes(body[:2], 'big'))
+        elif kind == SUBSCRIBE:
+            self.on_subscribe(body)
+        elif kind == UNSUBSCRIBE:
+            self.on_unsubscribe(body)
+        elif kind == PINGREQ:
+            self.send(PINGRESP_PACKET)
+        elif kind == PUBREL:
+            self.send(b'\x70\x02' + body[:2])
+        elif kind == DISCONNECT:
+            self.will = None
+            self.close()
+        elif kind in (PUBREC, PUBCOMP):
+            pass
+        else:
+            raise ProtocolError(f"unexpected packet type {kind}")
+
+    def on_connect(self, body):
+        if self.session is not None:
+            raise ProtocolError("second CONNECT")
+        name, pos = _string(body, 0)
+        if name not in (b'MQTT', b'MQIsdp') or pos + 4 > len(body):
+            raise ProtocolError("not MQTT")
+        level, flags = body[pos], body[pos + 1]
+        self.keepalive = int.from_bytes(body[pos + 2:pos + 4], 'big')
+        pos += 4
+        if level not in (3, 4):
+            self.send(b'\x20\x02\x00\x01')
+            self.close()
+            return
+        client_id, pos = _string(body, pos)
+        clean = bool(flags & 0x02)
+        if flags & 0x04:
+            will_topic, pos = _string(body, pos)
+            will_payload, pos = _string(body, pos)
+            self.will = (will_topic.decode(), will_payload, min((flags >> 3) & 3, MAX_QOS), bool(flags & 0x20))
+        username = password = None
+        if flags & 0x80:
+            username, pos = _string(body, pos)
+        if flags & 0x40:
+            password, pos = _string(body, pos)
+        if not client_id:
+            if not clean:
+                self.send(b'\x20\x02\x00\x02')
+                self.close()
+                return
+            client_id = f"auto-{uuid.uuid4().hex}".encode()
+        if not self.broker.authenticate(username, password):
+            self.send(b'\x20\x02\x00\x05')
+            self.close()
+            return
+        session, present = self.broker.attach(client_id.decode(), clean, self)
+        self.session = session
+        self.send(b'\x20\x02' + (b'\x01' if present else b'\x00') + b'\x00')
+        if present:
+            session.resume()
+
+    def on_publish(self, header, buffer, start, end):
+        if self.session is None:
+            raise ProtocolError("PUBLISH before CONNECT")
+        qos = (header >> 1) & 3
+        topic_end = start + 2 + ((buffer[start] << 8) | buffer[start + 1])
+        topic = bytes(buffer[start + 2:topic_end])
+        if qos:
+            mid = bytes(buffer[topic_end:topic_end + 2])
+            payload = bytes(buffer[topic_end + 2:end])
+            self.send((b'\x40\x02' if qos == 1 else b'\x50\x02') + mid)
+        else:
+            payload = bytes(buffer[topic_end:end])
+        # An incoming QoS 0 packet without the retain flag goes out byte for byte
+        packet0 = None
+        if qos == 0 and not header & 1:
+            packet0 = bytes(buffer[start - len(encode_length(end - start)) - 1:end])
+        self.broker.route(topic, payload, min(qos, MAX_QOS), bool(header & 1), packet0)
+
+    def on_subscribe(self, body):
+        mid = body[:2]
+        pos = 2
+        granted = bytearray()
+        filters = []
+        while pos < len(body):
+            topic_filter, pos = _string(body, pos)
+            if pos >= len(body):
+                raise ProtocolError("SUBSCRIBE without QoS")
+            qos = body[pos] & 3
+            pos += 1
+            topic_filter = topic_filter.decode()
+            if not valid_filter(topic_filter):
+                granted.append(0x80)
+                continue
+            qos = min(qos, MAX_QOS)
+            granted.append(qos)
+            filters.append((topic_filter, qos))
+        if not filters and not granted:
+            raise ProtocolError("empty SUBSCRIBE")
+        for topic_filter, qos in filters:
+            self.broker.subscribe(self.session, topic_filter, qos)
+        self.send(b'\x90' + encode_length(2 + len(granted)) + mid + bytes(granted))
+        for topic_filter, qos in filters:
+            self.broker.send_retained(self.session, topic_filter, qos)
+
+    def on_unsubscribe(self, body):
+        pos = 2
+        while pos < len(body):
+            topic_filter, pos = _string(body, pos)
+            self.broker.unsubscribe(self.session, topic_filter.decode())
+        self.send(b'\xb0\x02' + body[:2])
+
+
+class MQTTBroker:
+    """
+    In-process MQTT 3.1.1 broker.
+
+    await start() on a running loop, or start_in_thread() from synchronous
+    code (tests, benchmarks) and shutdown() when done. port=0 picks a free
+    port, available as .port once started.
+    """
+
+    def __init__(self, host='127.0.0.1', port=1883, users=None, high_water=HIGH_WATER):
+        self.host = host
+        self.port = port
+        self.users = users
+        self.high_water = high_water
+        self.loop = None
+        self.server = None
+        self.connections = set()
+        self.sessions = {}
+        self.trie = SubscriptionTrie()
+        self.retained = {}
+        self._routes = {}
+        self._sweeper = None
+        self._thread = None
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    # ---- routing ---------------------------------------------------------
+
+    def route(self, topic, payload, qos, retain, packet0=None):
+        """Deliver a PUBLISH from any client; topic is bytes"""
+        self.received += 1
+        if retain:
+            if payload:
+                self.retained[topic] = (payload, qos)
+            else:
+                self.retained.pop(topic, None)
+        targets = self._routes.get(topic)
+        if targets is None:
+            name = topic.decode()
+            if '+' in name or '#' in name:
+                return
+            targets = tuple(self.trie.match(name).items())
+            if len(self._routes) > 100000:
+                self._routes.clear()
+            self._routes[topic] = targets
+        if not targets:
+            return
+        if packet0 is None:
+            packet0 = encode_publish(topic, payload)
+        for session, granted in targets:
+            session.deliver(topic, payload, qos if qos < granted else granted, packet0)
+        self.delivered += len(targets)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        """Publish from the broker itself (last wills); topic is a str"""
+        self.route(topic.encode(), payload, min(qos, MAX_QOS), retain)
+
+    def subscribe(self, session, topic_filter, qos):
+        session.subscriptions[topic_filter] = qos
+        self.trie.add(topic_filter, session, qos)
+        self._routes.clear()
+
+    def unsubscribe(self, session, topic_filter):
+        if session.subscriptions.pop(topic_filter, None) is not None:
+            self.trie.remove(topic_filter, session)
+            self._routes.clear()
+
+    def send_retained(self, session, topic_filter, qos):
+        wildcard = '+' in topic_filter or '#' in topic_filter
+        for topic, (payload, retained_qos) in list(self.retained.items()):
+            if topic_matches(topic_filter, topic.decode()) if wildcard else topic == topic_filter.encode():
+                session.deliver(topic, payload, min(qos, retained_qos), retain=True)
+
+    # ---- sessions --------------------------------------------------------
+
+    def authenticate(self, username, password):
+        if self.users is None:
+            return True
+        if username is None:
+            return False
+        expected = self.users.get(username.decode())
+        return expected is not None and password is not None and expected == password.decode()
+
+    def attach(self, client_id, clean, connection):
+        """The session for a CONNECT, taking over from an older connection of the same client"""
+        session = self.sessions.get(client_id)
+        if session is not None and session.connection is not None:
+            old = session.connection
+            session.connection = None
+            old.will = None
+            old.close()
+        if session is not None and (clean or session.clean):
+            self.remove_session(session)
+            session = None
+        present = session is not None
+        if session is None:
+            session = self.sessions[client_id] = Session(client_id, clean)
+        session.connection = connection
+        return session, present
+
+    def remove_session(self, session):
+        self.dropped += session.dropped
+        for topic_filter in list(session.subscriptions):
+            self.unsubscribe(session, topic_filter)
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+
+    async def _sweep(self):
+        """Close connections silent for 1.5x their keep-alive"""
+        while True:
+            await asyncio.sleep(1)
+            now = self.loop.time()
+            for connection in list(self.connections):
+                if connection.keepalive and now - connection.last_seen > 1.5 * connection.keepalive:
+                    connection.close()
+
+    # ---- lifecycle -------------------------------------------------------
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await self.loop.create_server(lambda: _Connection(self), self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        self._sweeper = self.loop.create_task(self._sweep())
+        return self
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for connection in list(self.connections):
+            connection.will = None
+            connection.transport.abort()
+
+    def start_in_thread(self, timeout=5.0):
+        """Run the broker on its own event loop thread; raises if it cannot start (e.g. port in use)"""
+        self._thread = start_in_thread(self, "mqtt-broker", "MQTT broker", timeout)
+        return self._thread
+
+    def shutdown(self, timeout=5.0):
+        """Stop a broker started with start_in_thread()"""
+        if self._thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        return {
+            'connections': len(self.connections),
+            'sessions': len(self.sessions),
+            'retained': len(self.retained),
+            'received': self.received,
+            'delivered': self.delivered,
+            'dropped': self.dropped + sum(session.dropped for session in self.sessions.values()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the embedded MQTT broker")
+    parser.add_argument("--host", default="0.0.0.0", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=1883, help="Port to listen on")
+    args = parser.parse_args()
+
+    async def serve():
+        broker = await MQTTBroker(args.host, args.port).start()
+        print(f"📡 MQTT broker on {broker.host}:{broker.port}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            print(f"📊 {broker.stats()}")
+            await broker.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n⏹️  Broker stopped by user")
+
+
+if __name__ == "__main__":
+    main()
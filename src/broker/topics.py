@@ -0,0 +1,24 @@
+"""
+MQTT Topic Filters
+Wildcard matching shared by the embedded broker and the dashboard's live feed
+"""
+
+
+def topic_matches(topic_filter, topic):
+    """Match an MQTT topic against a filter with + and # wildcards (which skip $-topics at the first level)"""
+    if topic_filter == topic:
+        return True
+    if topic.startswith('$') and topic_filter[:1] in ('+', '#'):
+        return False
+    if topic_filter == '#':
+        return True
+    filter_parts = topic_filter.split('/')
+    topic_parts = topic.split('/')
+    for i, part in enumerate(filter_parts):
+        if part == '#':
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[i]:
+            return False
+    return len(filter_parts) == len(topic_parts)
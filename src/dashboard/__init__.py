@@ -0,0 +1,4 @@
+"""
+Dashboard support modules
+Data storage and chart helpers shared by dashboard.py and the metrics scripts
+"""
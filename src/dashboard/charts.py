@@ -0,0 +1,197 @@
+"""
+Dashboard Chart Helpers
+Plotly figure builders for the gauges and trend charts
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Naive epoch, so wall-clock sensor times are not shifted by the local timezone
+EPOCH = datetime(1970, 1, 1)
+
+# Above this many points markers are dropped in WebGL mode; they dominate
+# both the payload and the draw time while adding nothing visually.
+MARKER_POINT_THRESHOLD = 500
+
+# Set Y-axis range based on sensor type
+Y_RANGES = {
+    'Temperature': [15, 40],
+    'Humidity': [0, 100],
+    'CO2 Level': [300, 2000],
+    'Light Level': [0, 1000]
+}
+
+
+# Helper function to create gauge chart
+def create_gauge(value, title, min_val, max_val, unit, thresholds):
+    """Create a gauge chart"""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number+delta",
+        value=value,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': f"{title}<br><span style='font-size:0.8em'>{unit}</span>"},
+        delta={'reference': (thresholds[0] + thresholds[1]) / 2},
+        gauge={
+            'axis': {'range': [min_val, max_val]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [min_val, thresholds[0]], 'color': "lightgray"},
+                {'range': [thresholds[0], thresholds[1]], 'color': "lightgreen"},
+                {'range': [thresholds[1], max_val], 'color': "lightgray"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': value
+            }
+        }
+    ))
+
+    fig.update_layout(
+        height=250,
+        margin=dict(l=10, r=10, t=50, b=10),
+        paper_bgcolor="rgba(0,0,0,0)",
+        font={'size': 12}
+    )
+
+    return fig
+
+
+def _series_arrays(data):
+    """
+    Split a list of {'time', 'value'} points into float64 x/y arrays.
+
+    x is milliseconds since the epoch, which Plotly reads as a date on a
+    'date' axis; numeric arrays skip Plotly's per-element validation and are
+    shipped base64-encoded instead of as long ISO strings.
+    """
+    n = len(data)
+    x = np.fromiter(((point['time'] - EPOCH).total_seconds() * 1000 for point in data), float, n)
+    y = np.fromiter((point['value'] for point in data), float, n)
+    return x, y
+
+
+# Helper function to create trend chart
+def create_trend_chart(data, title, color, unit, webgl=False,
+                       marker_threshold=MARKER_POINT_THRESHOLD):
+    """
+    Create a trend line chart.
+
+    With webgl=True the trace is a Scattergl fed from numeric arrays (no
+    DataFrame round trip) and markers are dropped once the series is longer
+    than marker_threshold.
+    """
+    if len(data) == 0:
+        fig = go.Figure()
+        fig.add_annotation(
+            text="No data yet. Start sensors to see live data!",
+            xref="paper", yref="paper",
+            x=0.5, y=0.5, showarrow=False,
+            font=dict(size=14, color="gray")
+        )
+    elif webgl:
+        x, y = _series_arrays(data)
+        show_markers = len(y) <= marker_threshold
+        fig = go.Figure()
+        fig.add_trace(go.Scattergl(
+            x=x,
+            y=y,
+            mode='lines+markers' if show_markers else 'lines',
+            name=title,
+            line=dict(color=color, width=2),
+            marker=dict(size=6) if show_markers else None
+        ))
+        fig.update_xaxes(type='date')
+    else:
+        df = pd.DataFrame(list(data))
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=df['time'],
+            y=df['value'],
+            mode='lines+markers',
+            name=title,
+            line=dict(color=color, width=2),
+            marker=dict(size=6)
+        ))
+
+    y_range = Y_RANGES.get(title, None)
+
+    fig.update_layout(
+        title=f"{title} Trend",
+        xaxis_title="Time",
+        yaxis_title=unit,
+        yaxis=dict(range=y_range) if y_range else {},
+        height=300,
+        margin=dict(l=10, r=10, t=40, b=10),
+        hovermode='x unified',
+        showlegend=False
+    )
+
+    return fig
+
+
+def create_trend_delta(new_points, max_points, trace_index=0):
+    """
+    Build a Plotly.extendTraces payload carrying only new_points.
+
+    Returns a dict with 'update', 'traces' and 'max_points' keys, matching the
+    arguments of Plotly.extendTraces(gd, update, traces, max_points), so a
+    client that already has the figure appends instead of redrawing it.
+    Returns None when there is nothing to send.
+    """
+    if not new_points:
+        return None
+    x, y = _series_arrays(new_points)
+    return {
+        'update': {'x': [x.tolist()], 'y': [y.tolist()]},
+        'traces': [trace_index],
+        'max_points': max_points
+    }
+
+
+class TrendChartSession:
+    """
+    Per-client view of one trend series.
+
+    Remembers the last DataStore version this client has seen and answers
+    each refresh with either a full figure (first call or after a resync) or
+    an extendTraces delta with only the points that arrived since.
+    """
+
+    def __init__(self, data_store, sensor_type, title, color, unit,
+                 marker_threshold=MARKER_POINT_THRESHOLD):
+        self.data_store = data_store
+        self.sensor_type = sensor_type
+        self.title = title
+        self.color = color
+        self.unit = unit
+        self.marker_threshold = marker_threshold
+        self.version = -1
+        self.point_count = 0
+
+    def refresh(self):
+        """Return ('full', figure), ('delta', payload) or ('none', None)"""
+        points, version = self.data_store.get_data_since(self.sensor_type, self.version)
+        is_delta = self.version >= 0 and len(points) == version - self.version
+        max_points = self.data_store.series[self.sensor_type].maxlen
+        self.version = version
+
+        if not is_delta:
+            self.point_count = len(points)
+            fig = create_trend_chart(points, self.title, self.color, self.unit,
+                                     webgl=True, marker_threshold=self.marker_threshold)
+            return 'full', fig
+
+        if not points:
+            return 'none', None
+
+        # Crossing the marker threshold changes the trace style, so redraw once
+        crossed = self.point_count <= self.marker_threshold < self.point_count + len(points)
+        self.point_count = min(self.point_count + len(points), max_points)
+        if crossed:
+            self.version = -1
+            return self.refresh()
+        return 'delta', create_trend_delta(points, max_points)
@@ -0,0 +1,112 @@
+"""
+MQTT Connection Supervisor
+Runs the paho network loop on a background thread and reconnects with
+jittered exponential backoff, so neither the UI nor paho callbacks ever sleep
+"""
+
+import random
+import threading
+
+import paho.mqtt.client as mqtt
+
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_RECONNECTING = 'reconnecting'
+STATE_STOPPED = 'stopped'
+
+
+def backoff_delay(attempt, min_delay=1.0, max_delay=120.0, rng=random):
+    """
+    Exponential backoff with equal jitter.
+
+    The ceiling doubles per attempt up to max_delay, and the delay is drawn
+    from [ceiling / 2, ceiling] so many dashboards restarting at once do not
+    reconnect in lockstep.
+    """
+    ceiling = min(max_delay, min_delay * (2 ** attempt))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+class ConnectionSupervisor:
+    """
+    Own the connect/loop/reconnect cycle of one paho client.
+
+    start() returns immediately; the first connect happens on the supervisor
+    thread. Connection state is mirrored into the DataStore so the page can
+    show "connecting" while the broker is still being reached. Call
+    connected() from on_connect to reset the backoff after a good CONNACK.
+    """
+
+    def __init__(self, client, host, port, data_store, keepalive=120,
+                 min_delay=1.0, max_delay=120.0):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.data_store = data_store
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.attempt = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._reconnect_requested = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # connect_async only records the endpoint; no network I/O happens here
+        self.client.connect_async(self.host, self.port, keepalive=self.keepalive)
+        self.data_store.set_connection_state(STATE_CONNECTING)
+        self._thread = threading.Thread(target=self._run, name="mqtt-supervisor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        try:
+            self.client.disconnect()
+        except Exception:
+            pass
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.data_store.set_connection_state(STATE_STOPPED)
+
+    def connected(self):
+        """Reset the backoff; called from on_connect after a successful CONNACK"""
+        self.attempt = 0
+        self.last_error = None
+
+    def request_reconnect(self):
+        """Ask the supervisor thread to drop and re-establish the connection"""
+        self._reconnect_requested.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.client.reconnect()
+            except Exception as e:
+                self.last_error = e
+                print(f"❌ MQTT connect failed: {e}")
+                self._backoff()
+                continue
+
+            rc = mqtt.MQTT_ERR_SUCCESS
+            while rc == mqtt.MQTT_ERR_SUCCESS and not self._stop.is_set() \
+                    and not self._reconnect_requested.is_set():
+                rc = self.client.loop(timeout=1.0)
+
+            if self._stop.is_set():
+                break
+            if self._reconnect_requested.is_set():
+                self._reconnect_requested.clear()
+                self.client.disconnect()
+                self.attempt = 0
+            self.data_store.increment_reconnect()
+            self._backoff()
+
+    def _backoff(self):
+        self.data_store.set_connection_state(STATE_RECONNECTING)
+        delay = backoff_delay(self.attempt, self.min_delay, self.max_delay)
+        self.attempt += 1
+        print(f"🔄 Reconnecting in {delay:.1f}s (attempt {self.attempt})")
+        # Waiting on the event keeps stop() responsive during long backoffs
+        self._stop.wait(delay)
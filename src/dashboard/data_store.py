@@ -0,0 +1,181 @@
+"""
+Dashboard Data Store
+Thread-safe buffer of recent sensor readings shared by the MQTT thread and the UI
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+
+from src.alerts.liveness import LivenessMonitor
+
+SENSOR_TYPES = ['temperature', 'humidity', 'co2', 'light']
+# The dashboard shows one room; liveness keys need one
+ROOM = 'room1'
+
+
+# Global data storage (thread-safe using threading.Lock)
+class DataStore:
+    def __init__(self, maxlen=100, liveness=None):
+        self.lock = threading.Lock()
+        self.temperature_data = deque(maxlen=maxlen)
+        self.humidity_data = deque(maxlen=maxlen)
+        self.co2_data = deque(maxlen=maxlen)
+        self.light_data = deque(maxlen=maxlen)
+        self.series = {
+            'temperature': self.temperature_data,
+            'humidity': self.humidity_data,
+            'co2': self.co2_data,
+            'light': self.light_data
+        }
+        # Total points ever appended per series; doubles as the series version
+        self.series_versions = {sensor: 0 for sensor in SENSOR_TYPES}
+        # Bumped on every change that a render can observe
+        self.version = 0
+        self.last_update = None
+        self.message_count = 0
+        self.connected = False
+        self.connection_state = 'disconnected'
+        self.battery_levels = {}
+        self.last_message_time = datetime.now()
+        self.reconnect_count = 0
+        # perf_counter() of the first reading, for time-to-first-data
+        self.first_data_at = None
+        # Per-sensor offline detection from learned publish intervals
+        self.liveness = liveness if liveness is not None else LivenessMonitor(factor=3, min_timeout=10)
+
+    def add_data(self, sensor_type, value, timestamp, battery):
+        with self.lock:
+            try:
+                data_point = {
+                    'time': datetime.fromisoformat(timestamp.replace('Z', '')),
+                    'value': value
+                }
+
+                series = self.series.get(sensor_type)
+                if series is not None:
+                    series.append(data_point)
+                    self.series_versions[sensor_type] += 1
+                    self.battery_levels[sensor_type] = battery
+                    self.liveness.seen(ROOM, sensor_type)
+
+                self.last_update = datetime.now()
+                self.last_message_time = datetime.now()
+                self.message_count += 1
+                self.version += 1
+                if self.first_data_at is None:
+                    self.first_data_at = time.perf_counter()
+            except Exception as e:
+                print(f"Error adding data: {e}")
+
+    def get_data(self, sensor_type):
+        with self.lock:
+            series = self.series.get(sensor_type)
+            return list(series) if series is not None else []
+
+    def get_version(self, sensor_type):
+        """Return the current version (total points appended) of a series"""
+        with self.lock:
+            return self.series_versions.get(sensor_type, 0)
+
+    def get_data_since(self, sensor_type, since_version):
+        """
+        Return (points, version) with only the points appended after since_version.
+
+        If the client fell further behind than the buffer holds, or the data
+        was cleared, the whole buffer comes back instead. Callers detect that
+        case with len(points) != version - since_version and replace their
+        copy rather than appending.
+        """
+        with self.lock:
+            series = self.series.get(sensor_type)
+            if series is None:
+                return [], 0
+            version = self.series_versions[sensor_type]
+            missing = version - since_version
+            if missing == 0:
+                return [], version
+            if since_version < 0 or missing < 0 or missing >= len(series):
+                return list(series), version
+            # deque has no slicing; walk back from the right end only
+            points = list(islice(reversed(series), missing))
+            points.reverse()
+            return points, version
+
+    def capture(self):
+        """Copy everything a render needs under one lock acquisition"""
+        with self.lock:
+            return {
+                'version': self.version,
+                'series': {sensor: list(points) for sensor, points in self.series.items()},
+                'series_versions': self.series_versions.copy(),
+                'message_count': self.message_count,
+                'last_update': self.last_update,
+                'battery_levels': self.battery_levels.copy(),
+                'connected': self.connected,
+                'connection_state': self.connection_state,
+                'last_message_time': self.last_message_time,
+                'reconnect_count': self.reconnect_count,
+                'first_data_at': self.first_data_at
+            }
+
+    def get_latest(self):
+        """Latest point and battery level per sensor, without copying the series"""
+        with self.lock:
+            return {
+                sensor: {
+                    'time': points[-1]['time'],
+                    'value': points[-1]['value'],
+                    'battery_level': self.battery_levels.get(sensor)
+                }
+                for sensor, points in self.series.items() if points
+            }
+
+    def offline_sensors(self):
+        """[(sensor_type, silent seconds)] for sensors that missed their expected readings"""
+        self.liveness.advance()
+        return [(sensor, self.liveness.silent_for(ROOM, sensor)) for sensor in SENSOR_TYPES
+                if self.liveness.is_offline(ROOM, sensor)]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'message_count': self.message_count,
+                'last_update': self.last_update,
+                'battery_levels': self.battery_levels.copy(),
+                'connected': self.connected,
+                'connection_state': self.connection_state,
+                'last_message_time': self.last_message_time,
+                'reconnect_count': self.reconnect_count
+            }
+
+    def set_connected(self, status):
+        self.set_connection_state('connected' if status else 'disconnected')
+
+    def set_connection_state(self, state):
+        with self.lock:
+            if self.connection_state != state:
+                self.connection_state = state
+                self.connected = state == 'connected'
+                self.version += 1
+
+    def increment_reconnect(self):
+        with self.lock:
+            self.reconnect_count += 1
+            self.version += 1
+
+    def clear_all(self):
+        with self.lock:
+            self.temperature_data.clear()
+            self.humidity_data.clear()
+            self.co2_data.clear()
+            self.light_data.clear()
+            # Bump versions so incremental clients see a gap and resync
+            for sensor in self.series_versions:
+                self.series_versions[sensor] += 1
+            self.message_count = 0
+            self.last_update = None
+            self.battery_levels.clear()
+            self.version += 1
@@ -0,0 +1,198 @@
+"""
+Sensor Data Export
+Streams buffered and recorded readings to CSV or Parquet in fixed-size chunks
+
+Rows are (room, sensor_type, timestamp, value) tuples pulled from an
+iterator, so exporting millions of readings never builds a DataFrame or a
+list of dicts: CSV is written chunk by chunk, Parquet one row group per chunk.
+
+Usage:
+    python -m src.dashboard.export --format csv --output readings.csv --history recordings/*.jsonl
+    python -m src.dashboard.export --format parquet --output readings.parquet --api http://localhost:8080
+"""
+
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from urllib.request import urlopen
+
+CHUNK_ROWS = 10000
+COLUMNS = ('room', 'sensor_type', 'timestamp', 'value')
+FORMATS = ('csv', 'parquet')
+
+
+def iter_datastore_rows(stores):
+    """Yield rows from {room: DataStore}, copying one series at a time"""
+    for room, store in stores.items():
+        for sensor in store.series:
+            for point in store.get_data(sensor):
+                yield room, sensor, point['time'], point['value']
+
+
+def _room_from(record):
+    topic = record.get('topic')
+    if topic and topic.count('/') >= 2:
+        return topic.split('/')[1]
+    return record.get('location', '')
+
+
+def iter_history_rows(paths):
+    """
+    Yield rows from JSON Lines recordings of sensor messages.
+
+    Each line is either a raw sensor payload or a live-feed reading (which
+    adds a 'topic' field); bad lines are skipped.
+    """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    yield (_room_from(record), record['sensor_type'],
+                           datetime.fromisoformat(record['timestamp'].replace('Z', '')),
+                           record['value'])
+                except (ValueError, KeyError, AttributeError):
+                    continue
+
+
+def iter_api_rows(base_url):
+    """Yield rows by pulling each room's series from a running REST API"""
+    with urlopen(f"{base_url.rstrip('/')}/api/latest") as response:
+        latest = json.load(response)
+    for room, sensors in latest.items():
+        for sensor in sensors:
+            with urlopen(f"{base_url.rstrip('/')}/api/rooms/{room}/{sensor}/series") as response:
+                series = json.load(response)
+            for point in series['points']:
+                yield room, sensor, datetime.fromisoformat(point['time'].replace('Z', '')), point['value']
+
+
+def _chunks(rows, chunk_rows):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_csv(rows, chunk_rows=CHUNK_ROWS):
+    """Yield CSV as encoded byte chunks, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(COLUMNS)
+    for chunk in _chunks(rows, chunk_rows):
+        writer.writerows(
+            (room, sensor, ts.isoformat(timespec='milliseconds') + 'Z', value)
+            for room, sensor, ts, value in chunk
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # Header-only output for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_csv(rows, sink, chunk_rows=CHUNK_ROWS):
+    """Stream rows to a binary file-like object; returns the row count"""
+    count = 0
+
+    def counted():
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    for data in iter_csv(counted(), chunk_rows):
+        sink.write(data)
+    return count
+
+
+def write_parquet(rows, sink, chunk_rows=CHUNK_ROWS):
+    """
+    Stream rows to Parquet, one row group per chunk; returns the row count.
+
+    pyarrow is an optional dependency and only imported here.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    schema = pa.schema([
+        ('room', pa.string()),
+        ('sensor_type', pa.string()),
+        ('timestamp', pa.timestamp('ms')),
+        ('value', pa.float64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(sink, schema, compression='snappy') as writer:
+        for chunk in _chunks(rows, chunk_rows):
+            rooms, sensors, stamps, values = zip(*chunk)
+            writer.write_table(pa.Table.from_arrays([
+                pa.array(rooms, pa.string()),
+                pa.array(sensors, pa.string()),
+                pa.array(stamps, pa.timestamp('ms')),
+                pa.array(values, pa.float64()),
+            ], schema=schema))
+            count += len(chunk)
+    return count
+
+
+def export(rows, fmt, sink, chunk_rows=CHUNK_ROWS):
+    if fmt == 'csv':
+        return write_csv(rows, sink, chunk_rows)
+    if fmt == 'parquet':
+        return write_parquet(rows, sink, chunk_rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sensor readings to CSV or Parquet")
+    parser.add_argument("--format", choices=FORMATS, default='csv')
+    parser.add_argument("--output", required=True, help="Output file path ('-' for stdout, CSV only)")
+    parser.add_argument("--history", nargs='*', default=[], help="JSON Lines recordings (globs allowed)")
+    parser.add_argument("--api", default=None, help="Base URL of a running REST API to export from")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.history for p in glob.glob(pattern))
+    sources = []
+    if paths:
+        sources.append(iter_history_rows(paths))
+    if args.api:
+        sources.append(iter_api_rows(args.api))
+    if not sources:
+        parser.error("nothing to export: pass --history and/or --api")
+
+    def rows():
+        for source in sources:
+            yield from source
+
+    start = time.perf_counter()
+    if args.output == '-':
+        if args.format != 'csv':
+            parser.error("stdout output is only supported for CSV")
+        count = export(rows(), args.format, sys.stdout.buffer, args.chunk_rows)
+    else:
+        with open(args.output, 'wb') as sink:
+            count = export(rows(), args.format, sink, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+
+    if args.output != '-':
+        size = os.path.getsize(args.output)
+        print(f"✅ Exported {count:,} rows to {args.output} ({size / 1024 / 1024:.1f} MB) "
+              f"in {elapsed:.2f}s - {count / elapsed if elapsed else 0:,.0f} rows/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Live Feed Server
+Small asyncio HTTP/WebSocket server that pushes sensor readings to lightweight viewers
+
+Clients connect to ws://host:port/ws?topics=hostel/+/co2,hostel/room1/# and
+receive JSON arrays of readings. Each client has its own MQTT-style topic
+filters and a pending map holding only the latest reading per topic, so a
+slow client gets the newest value of every series instead of a backlog.
+GET /latest returns the latest reading of every topic as JSON. Remember to
+URL-encode '#' as %23 in the topics query.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from src.broker.loop_thread import start_in_thread
+from src.broker.topics import topic_matches
+
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_TOO_BIG = 1009
+# Longest message read_frame accepts by default, and the much smaller limit
+# for viewer requests ({"subscribe": [...]})
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+MAX_REQUEST_SIZE = 64 * 1024
+
+
+class FrameTooLarge(ValueError):
+    """A WebSocket message longer than the reader's limit"""
+
+
+def _apply_mask(data, key):
+    """XOR data with the 4-byte WebSocket masking key"""
+    n = len(data)
+    if n == 0:
+        return data
+    stream = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, 'big') ^ int.from_bytes(stream, 'big')).to_bytes(n, 'big')
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=False):
+    """Encode a single FIN WebSocket frame; clients must mask, servers must not"""
+    n = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if n < 126:
+        header = struct.pack('!BB', 0x80 | opcode, mask_bit | n)
+    elif n < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, mask_bit | 126, n)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, mask_bit | 127, n)
+    if mask:
+        key = os.urandom(4)
+        return header + key + _apply_mask(payload, key)
+    return header + payload
+
+
+async def read_frame(reader, max_size=MAX_FRAME_SIZE):
+    """Read one (possibly fragmented) message of at most max_size bytes; returns (opcode, payload)"""
+    message_opcode = None
+    chunks = []
+    size = 0
+    while True:
+        first, second = await reader.readexactly(2)
+        fin = first & 0x80
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', await reader.readexactly(8))[0]
+        size += length
+        if size > max_size:
+            raise FrameTooLarge(f"message of {size} bytes or more exceeds {max_size}")
+        key = await reader.readexactly(4) if second & 0x80 else None
+        payload = await reader.readexactly(length)
+        if key:
+            payload = _apply_mask(payload, key)
+        # Control frames may arrive between fragments and are never fragmented
+        if opcode >= OP_CLOSE:
+            return opcode, payload
+        if opcode != OP_CONTINUATION:
+            message_opcode = opcode
+        chunks.append(payload)
+        if fin:
+            return message_opcode, b''.join(chunks)
+
+
+class FeedClient:
+    """One connected WebSocket viewer and its coalescing buffer"""
+
+    __slots__ = ('writer', 'filters', 'pending', 'ready', 'match_cache',
+                 'sent_batches', 'sent_readings', 'coalesced', 'closed')
+
+    def __init__(self, writer, filters):
+        self.writer = writer
+        self.filters = list(filters)
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.match_cache = {}
+        self.sent_batches = 0
+        self.sent_readings = 0
+        self.coalesced = 0
+        self.closed = False
+
+    def wants(self, topic):
+        matched = self.match_cache.get(topic)
+        if matched is None:
+            matched = any(topic_matches(f, topic) for f in self.filters)
+            self.match_cache[topic] = matched
+        return matched
+
+    def set_filters(self, filters):
+        self.filters = list(filters)
+        self.match_cache.clear()
+
+    def offer(self, topic, encoded):
+        # Overwriting an unsent reading is the coalescing step
+        if topic in self.pending:
+            self.coalesced += 1
+        self.pending[topic] = encoded
+        self.ready.set()
+
+
+class LiveFeedServer:
+    """
+    Push readings to WebSocket subscribers.
+
+    publish() is thread-safe and cheap: it only appends to an inbox, and the
+    event loop drains the inbox in batches, encoding each reading once and
+    offering the same bytes to every matching client.
+    """
+
+    def __init__(self, host='0.0.0.0', port=8765):
+        self.host = host
+        self.port = port
+        self.clients = set()
+        self.latest = {}
+        self._latest_version = 0
+        self._latest_cache = (-1, b'{}')
+        self._inbox = deque()
+        self._drain_scheduled = False
+        self._inbox_lock = threading.Lock()
+        self.loop = None
+        self.server = None
+        self.published = 0
+
+    # ---- ingestion -------------------------------------------------------
+
+    def publish(self, topic, reading):
+        """Queue a reading dict for fan-out; safe to call from any thread"""
+        self._inbox.append((topic, reading))
+        if self.loop is None:
+            return
+        with self._inbox_lock:
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        self.loop.call_soon_threadsafe(self._drain_inbox)
+
+    def _drain_inbox(self):
+        with self._inbox_lock:
+            self._drain_scheduled = False
+        inbox = self._inbox
+        clients = self.clients
+        while inbox:
+            topic, reading = inbox.popleft()
+            encoded = json.dumps({'topic': topic, **reading}, separators=(',', ':')).encode()
+            self.latest[topic] = encoded
+            self._latest_version += 1
+            self.published += 1
+            for client in clients:
+                if client.wants(topic):
+                    client.offer(topic, encoded)
+
+    # ---- HTTP / WebSocket ------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = request.decode('latin-1').split('\r\n')
+        try:
+            method, target, _ = lines[0].split(' ', 2)
+        except ValueError:
+            writer.close()
+            return
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+
+        if method == 'GET' and url.path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+            query = parse_qs(url.query)
+            filters = [f for value in query.get('topics', ['#']) for f in value.split(',') if f]
+            await self._serve_websocket(reader, writer, headers, filters)
+        elif method == 'GET' and url.path == '/latest':
+            self._send_http(writer, 200, self._latest_body(), 'application/json')
+            await self._close(writer)
+        else:
+            self._send_http(writer, 404, b'{"error":"not found"}', 'application/json')
+            await self._close(writer)
+
+    def _latest_body(self):
+        version, body = self._latest_cache
+        if version != self._latest_version:
+            body = b'{' + b','.join(
+                json.dumps(topic).encode() + b':' + encoded for topic, encoded in self.latest.items()
+            ) + b'}'
+            self._latest_cache = (self._latest_version, body)
+        return body
+
+    @staticmethod
+    def _send_http(writer, status, body, content_type):
+        reason = {200: 'OK', 404: 'Not Found'}.get(status, '')
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _serve_websocket(self, reader, writer, headers, filters):
+        key = headers.get('sec-websocket-key', '').encode()
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        client = FeedClient(writer, filters)
+        self.clients.add(client)
+        # New subscribers start from the current value of every matching series
+        for topic, encoded in self.latest.items():
+            if client.wants(topic):
+                client.offer(topic, encoded)
+        sender = asyncio.ensure_future(self._client_sender(client))
+        try:
+            await self._client_receiver(reader, client)
+        finally:
+            client.closed = True
+            client.ready.set()
+            self.clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+    async def _client_receiver(self, reader, client):
+        """Handle subscribe/unsubscribe requests, pings and close frames"""
+        while True:
+            try:
+                opcode, payload = await read_frame(reader, MAX_REQUEST_SIZE)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+            except FrameTooLarge:
+                client.writer.write(encode_frame(struct.pack('!H', CLOSE_TOO_BIG), OP_CLOSE))
+                return
+            if opcode == OP_CLOSE:
+                client.writer.write(encode_frame(payload[:2], OP_CLOSE))
+                return
+            if opcode == OP_PING:
+                client.writer.write(encode_frame(payload, OP_PONG))
+            elif opcode == OP_TEXT:
+                try:
+                    request = json.loads(payload)
+                except ValueError:
+                    continue
+                if not isinstance(request, dict):
+                    continue
+                subscribe = request.get('subscribe')
+                if isinstance(subscribe, list):
+                    client.set_filters(set(client.filters) | {t for t in subscribe if isinstance(t, str)})
+                unsubscribe = request.get('unsubscribe')
+                if isinstance(unsubscribe, list):
+                    client.set_filters(set(client.filters) - set(t for t in unsubscribe if isinstance(t, str)))
+
+    async def _client_sender(self, client):
+        writer = client.writer
+        while True:
+            await client.ready.wait()
+            if client.closed:
+                return
+            client.ready.clear()
+            pending = client.pending
+            if not pending:
+                continue
+            client.pending = {}
+            writer.write(encode_frame(b'[' + b','.join(pending.values()) + b']'))
+            client.sent_batches += 1
+            client.sent_readings += len(pending)
+            try:
+                # While a slow client drains, new readings coalesce in pending
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    # ---- lifecycle -------------------------------------------------------
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        if self._inbox:
+            self._drain_inbox()
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        for client in list(self.clients):
+            client.closed = True
+            client.ready.set()
+            client.writer.close()
+
+    def start_in_thread(self, timeout=5.0):
+        """Run the server on its own event loop thread (used by dashboard.py); raises if it cannot start"""
+        return start_in_thread(self, "live-feed", "live feed", timeout)
+
+
+def reading_from_payload(payload):
+    """Reduce a sensor MQTT payload to the fields viewers need"""
+    return {
+        'sensor_type': payload.get('sensor_type'),
+        'value': payload.get('value'),
+        'unit': payload.get('unit', ''),
+        'timestamp': payload.get('timestamp'),
+        'battery_level': payload.get('battery_level', 100)
+    }
+
+
+def main():
+    """Run the live feed standalone, subscribed directly to the sensor topics"""
+    import ssl
+
+    import paho.mqtt.client as mqtt
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    broker = os.getenv("MQTT_BROKER", "95c2f02d61404267847ebc19552f72b0.s1.eu.hivemq.cloud")
+    port = int(os.getenv("MQTT_PORT", 8883))
+    username = os.getenv("MQTT_USERNAME", None)
+    password = os.getenv("MQTT_PASSWORD", None)
+    use_tls = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
+    topic = os.getenv("LIVE_FEED_MQTT_TOPIC", "hostel/+/+")
+
+    feed = LiveFeedServer(port=int(os.getenv("LIVE_FEED_PORT", 8765)))
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            client.subscribe(topic, qos=1)
+            print(f"✅ Connected to MQTT broker, subscribed to {topic}")
+        else:
+            print(f"❌ Connection failed with code {rc}")
+
+    def on_message(client, userdata, msg):
+        try:
+            feed.publish(msg.topic, reading_from_payload(json.loads(msg.payload.decode())))
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+
+    client = mqtt.Client(
+        client_id=f"live_feed_{os.getpid()}",
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        protocol=mqtt.MQTTv311
+    )
+    client.on_connect = on_connect
+    client.on_message = on_message
+    if username and password:
+        client.username_pw_set(username, password)
+    if use_tls:
+        client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
+
+    async def serve():
+        await feed.start()
+        print(f"📡 Live feed on ws://{feed.host}:{feed.port}/ws  (latest: /latest)")
+        client.connect(broker, port, 60)
+        client.loop_start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            client.loop_stop()
+            client.disconnect()
+            await feed.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n⏹️  Live feed stopped by user")
+
+
+if __name__ == "__main__":
+    main()
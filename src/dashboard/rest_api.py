@@ -0,0 +1,284 @@
+"""
+REST API Server
+Conditional-GET JSON API over one or more DataStores (one per room)
+
+Endpoints:
+    GET /api/latest                                   latest values of every room
+    GET /api/rooms/<room>/latest                      latest values of one room
+    GET /api/rooms/<room>/<sensor>/latest             latest value of one sensor
+    GET /api/rooms/<room>/<sensor>/series?from=&to=   points in an ISO time range
+
+Every response carries an ETag built from DataStore version counters. A poll
+whose If-None-Match still matches gets 304 without touching the data, and a
+changed resource is serialized once per version and then served from cache.
+"""
+
+import asyncio
+import json
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from src.broker.loop_thread import start_in_thread
+
+# Bound on cached (path, query) bodies; range queries with arbitrary bounds
+# would otherwise grow the cache without limit.
+MAX_CACHED_RESPONSES = 1024
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed'}
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat() + 'Z'
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode(data):
+    return json.dumps(data, separators=(',', ':'), default=_json_default).encode()
+
+
+def _parse_time(value):
+    """ISO time as naive UTC, like the stored points; offsets (+02:00, Z) are converted"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def get_range(data_store, sensor_type, start=None, end=None):
+    """Points of a series with start <= time <= end, found by bisection"""
+    with data_store.lock:
+        series = data_store.series.get(sensor_type)
+        if series is None:
+            return []
+        lo = bisect_left(series, start, key=lambda p: p['time']) if start else 0
+        hi = bisect_right(series, end, key=lambda p: p['time']) if end else len(series)
+        return [series[i] for i in range(lo, hi)]
+
+
+class RestApi:
+    """Route table, ETag computation and the per-version response cache"""
+
+    def __init__(self, stores):
+        # stores: {room: DataStore}
+        self.stores = stores
+        self._cache = {}
+        self.hits = 0
+        self.not_modified = 0
+        self.encodes = 0
+
+    def _etag(self, path_parts):
+        """Version tag of the resource; cheap integer reads only"""
+        if path_parts == ['latest']:
+            # Versions only grow and rooms are never removed, so the sum
+            # changes whenever any room does
+            stores = list(self.stores.values())
+            return f'"all-{len(stores)}-{sum(store.version for store in stores)}"'
+        room = path_parts[1]
+        store = self.stores[room]
+        if len(path_parts) == 3:
+            return f'"{room}-{store.version}"'
+        return f'"{room}-{path_parts[2]}-{store.series_versions.get(path_parts[2], 0)}"'
+
+    def _build(self, path_parts, start=None, end=None):
+        """Serialize the resource; only called when the cached version is stale"""
+        if path_parts == ['latest']:
+            return {room: store.get_latest() for room, store in list(self.stores.items())}
+        store = self.stores[path_parts[1]]
+        if len(path_parts) == 3:
+            return store.get_latest()
+        sensor, view = path_parts[2], path_parts[3]
+        if view == 'latest':
+            return store.get_latest().get(sensor)
+        return {'sensor_type': sensor, 'points': get_range(store, sensor, start, end)}
+
+    def _route(self, path):
+        parts = [p for p in path.split('/') if p]
+        if parts[:1] != ['api']:
+            return None
+        parts = parts[1:]
+        if parts == ['latest']:
+            return parts
+        if len(parts) >= 3 and parts[0] == 'rooms' and parts[1] in self.stores:
+            if len(parts) == 3 and parts[2] == 'latest':
+                return parts
+            if len(parts) == 4 and parts[3] in ('latest', 'series') and \
+                    parts[2] in self.stores[parts[1]].series:
+                return parts
+        return None
+
+    def handle(self, method, target, if_none_match=None):
+        """Return (status, etag, body) for a request"""
+        if method not in ('GET', 'HEAD'):
+            return 405, None, b'{"error":"method not allowed"}'
+        url = urlsplit(target)
+        parts = self._route(url.path)
+        if parts is None:
+            return 404, None, b'{"error":"not found"}'
+
+        etag = self._etag(parts)
+        if if_none_match == etag:
+            self.not_modified += 1
+            return 304, etag, b''
+
+        key = (url.path, url.query)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == etag:
+            self.hits += 1
+            return 200, etag, cached[1]
+
+        start = end = None
+        if parts[-1] == 'series':
+            query = parse_qs(url.query)
+            try:
+                start = _parse_time(query.get('from', [None])[0])
+                end = _parse_time(query.get('to', [None])[0])
+            except (TypeError, ValueError):
+                return 400, None, b'{"error":"bad time range"}'
+        body = _encode(self._build(parts, start, end))
+        self.encodes += 1
+        if len(self._cache) >= MAX_CACHED_RESPONSES:
+            self._cache.clear()
+        self._cache[key] = (etag, body)
+        return 200, etag, body
+
+
+class RestApiServer:
+    """Minimal HTTP/1.1 keep-alive server in front of RestApi"""
+
+    def __init__(self, stores, host='0.0.0.0', port=8080):
+        self.api = RestApi(stores)
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                lines = request.decode('latin-1').split('\r\n')
+                method, target, version = lines[0].split(' ', 2)
+                if_none_match = None
+                close = version == 'HTTP/1.0'
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    name = name.strip().lower()
+                    if name == 'if-none-match':
+                        if_none_match = value.strip()
+                    elif name == 'connection':
+                        close = value.strip().lower() == 'close'
+
+                status, etag, body = self.api.handle(method, target, if_none_match)
+                head = [f"HTTP/1.1 {status} {REASONS[status]}"]
+                if etag:
+                    head.append(f"ETag: {etag}")
+                    head.append("Cache-Control: no-cache")
+                if status != 304:
+                    head.append("Content-Type: application/json")
+                    head.append(f"Content-Length: {len(body)}")
+                if close:
+                    head.append("Connection: close")
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() +
+                             (body if method != 'HEAD' else b''))
+                await writer.drain()
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    def start_in_thread(self, timeout=5.0):
+        """Run the server on its own event loop thread (used by dashboard.py); raises if it cannot start"""
+        return start_in_thread(self, "rest-api", "REST API", timeout)
+
+
+def main():
+    """Run the REST API standalone, filling one DataStore per room from MQTT"""
+    import ssl
+
+    import paho.mqtt.client as mqtt
+    from dotenv import load_dotenv
+
+    from src.dashboard.data_store import DataStore
+
+    load_dotenv()
+    broker = os.getenv("MQTT_BROKER", "95c2f02d61404267847ebc19552f72b0.s1.eu.hivemq.cloud")
+    port = int(os.getenv("MQTT_PORT", 8883))
+    username = os.getenv("MQTT_USERNAME", None)
+    password = os.getenv("MQTT_PASSWORD", None)
+    use_tls = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
+    topic = os.getenv("REST_API_MQTT_TOPIC", "hostel/+/+")
+    buffer_size = int(os.getenv("DASHBOARD_BUFFER_SIZE", 100))
+
+    stores = {}
+    server = RestApiServer(stores, port=int(os.getenv("REST_API_PORT", 8080)))
+
+    def on_connect(client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            client.subscribe(topic, qos=1)
+            print(f"✅ Connected to MQTT broker, subscribed to {topic}")
+        else:
+            print(f"❌ Connection failed with code {rc}")
+
+    def on_message(client, userdata, msg):
+        try:
+            room = msg.topic.split('/')[1]
+            payload = json.loads(msg.payload.decode())
+            store = stores.get(room)
+            if store is None:
+                # New rooms appear between requests; dict assignment is atomic
+                store = stores[room] = DataStore(maxlen=buffer_size)
+            store.add_data(payload.get('sensor_type'), payload.get('value'),
+                           payload.get('timestamp'), payload.get('battery_level', 100))
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+
+    client = mqtt.Client(
+        client_id=f"rest_api_{os.getpid()}",
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        protocol=mqtt.MQTTv311
+    )
+    client.on_connect = on_connect
+    client.on_message = on_message
+    if username and password:
+        client.username_pw_set(username, password)
+    if use_tls:
+        client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
+
+    async def serve():
+        await server.start()
+        print(f"🌐 REST API on http://{server.host}:{server.port}/api/latest")
+        client.connect(broker, port, 60)
+        client.loop_start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            client.loop_stop()
+            client.disconnect()
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n⏹️  REST API stopped by user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Shared Render Snapshot
+One read-only view of the DataStore per data version, shared by every browser session
+"""
+
+import threading
+from types import MappingProxyType
+
+from src.dashboard.charts import create_gauge, create_trend_chart
+
+
+class RenderSnapshot:
+    """
+    Everything the dashboard page reads, computed once for a data version.
+
+    Series are tuples and mappings are read-only proxies; sessions must treat
+    the snapshot as immutable because it is shared between them. Gauge and
+    trend figures are built lazily and memoised on the snapshot, so the first
+    session to need a chart pays for it and the rest reuse it.
+    """
+
+    __slots__ = ('version', 'series', 'latest', 'counts', 'series_stats',
+                 'battery_levels', 'message_count', 'last_update', 'connected',
+                 'connection_state', 'last_message_time', 'reconnect_count',
+                 'first_data_at', '_figures', '_figure_lock')
+
+    def __init__(self, captured):
+        self.version = captured['version']
+        self.series = MappingProxyType({
+            sensor: tuple(points) for sensor, points in captured['series'].items()
+        })
+        self.latest = MappingProxyType({
+            sensor: points[-1]['value'] for sensor, points in self.series.items() if points
+        })
+        self.counts = MappingProxyType({sensor: len(points) for sensor, points in self.series.items()})
+        self.series_stats = MappingProxyType({
+            sensor: self._summarize(points) for sensor, points in self.series.items() if points
+        })
+        self.battery_levels = MappingProxyType(captured['battery_levels'])
+        self.message_count = captured['message_count']
+        self.last_update = captured['last_update']
+        self.connected = captured['connected']
+        self.connection_state = captured['connection_state']
+        self.last_message_time = captured['last_message_time']
+        self.reconnect_count = captured['reconnect_count']
+        self.first_data_at = captured['first_data_at']
+        self._figures = {}
+        self._figure_lock = threading.Lock()
+
+    @staticmethod
+    def _summarize(points):
+        values = [point['value'] for point in points]
+        return MappingProxyType({
+            'min': min(values),
+            'max': max(values),
+            'mean': sum(values) / len(values)
+        })
+
+    def get_latest(self, sensor_type, default):
+        """Latest value for a sensor, or default when there is no data yet"""
+        return self.latest.get(sensor_type, default)
+
+    def _memo(self, key, build):
+        fig = self._figures.get(key)
+        if fig is None:
+            with self._figure_lock:
+                fig = self._figures.get(key)
+                if fig is None:
+                    fig = build()
+                    self._figures[key] = fig
+        return fig
+
+    def gauge(self, sensor_type, default, title, min_val, max_val, unit, thresholds):
+        """Shared gauge figure for this version (do not update it in place)"""
+        value = self.get_latest(sensor_type, default)
+        return self._memo(
+            ('gauge', sensor_type),
+            lambda: create_gauge(value, title, min_val, max_val, unit, thresholds)
+        )
+
+    def trend_chart(self, sensor_type, title, color, unit, webgl=False):
+        """
+        Shared trend figure for this version.
+
+        Plotly figures are mutable, so callers must not update the returned
+        figure in place.
+        """
+        return self._memo(
+            ('trend', sensor_type, webgl),
+            lambda: create_trend_chart(self.series.get(sensor_type, ()), title, color, unit, webgl=webgl)
+        )
+
+
+class SnapshotCache:
+    """
+    Hands out the current RenderSnapshot, rebuilding it at most once per version.
+
+    Reading the cached snapshot is a single version comparison, and concurrent
+    sessions that notice a new version wait on one rebuild instead of each
+    copying the DataStore themselves.
+    """
+
+    def __init__(self, data_store):
+        self.data_store = data_store
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def get(self):
+        snapshot = self._snapshot
+        # Reading an int without the store lock is safe; a stale read just
+        # means this session renders the previous version.
+        if snapshot is not None and snapshot.version == self.data_store.version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self.data_store.version:
+                snapshot = RenderSnapshot(self.data_store.capture())
+                self._snapshot = snapshot
+                self.builds += 1
+            return snapshot
@@ -0,0 +1,44 @@
+"""
+Startup Timing
+Time-to-first-paint and time-to-first-data for the dashboard status bar
+"""
+
+import time
+
+
+class StartupTimer:
+    """
+    Clock started on the dashboard's first script run.
+
+    First paint is recorded server-side when the first run finishes sending
+    its elements, which is when the browser can first draw the page; first
+    data is taken from DataStore.first_data_at.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.first_paint_at = None
+
+    def mark_painted(self):
+        if self.first_paint_at is None:
+            self.first_paint_at = time.perf_counter()
+
+    @property
+    def time_to_first_paint(self):
+        if self.first_paint_at is None:
+            return None
+        return self.first_paint_at - self.started_at
+
+    def time_to_first_data(self, first_data_at):
+        if first_data_at is None:
+            return None
+        return max(0.0, first_data_at - self.started_at)
+
+
+def format_seconds(seconds):
+    """Short label for the status bar"""
+    if seconds is None:
+        return "…"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.1f} s"
@@ -0,0 +1,159 @@
+"""
+Alert Worker Scaling Benchmark
+Runs 1/2/4/8 alert worker processes the way MQTT shared subscriptions feed
+them and measures end-to-end readings/second
+
+The parent process plays the broker: it deals message batches round-robin to
+the workers (as $share does). Each worker decodes the JSON, forwards readings
+of sensors it does not own to the owner's inbox (the alerts/partition/<n>
+hop) and runs AlertSystem on the rest. With --routing broker the parent deals
+by owner instead, like a broker with a hash-by-topic strategy.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/alert_scaling_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem, reading_time, room_from_topic  # noqa: E402
+from src.alerts.partition import PartitionRouter, owner_of  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+SENSOR_VALUES = {'temperature': (24.0, 30.5), 'humidity': (50.0, 64.0), 'co2': (700.0, 1120.0),
+                 'light': (400.0, 850.0)}
+
+
+def make_messages(rooms, periods):
+    """(topic, payload bytes) for every sensor of every room, one period at a time"""
+    start = datetime(2024, 1, 1)
+    messages = []
+    for i in range(periods):
+        ts = (start + timedelta(seconds=3 * i)).isoformat() + 'Z'
+        for r in range(rooms):
+            for sensor, (normal, high) in SENSOR_VALUES.items():
+                value = high if (i // 20 + r) % 5 == 0 else normal
+                payload = json.dumps({'sensor_type': sensor, 'value': value, 'timestamp': ts,
+                                      'battery_level': 90.0}).encode()
+                messages.append((f"hostel/room{r}/{sensor}", payload))
+    return messages
+
+
+def worker(worker_id, workers, routing, inboxes, results):
+    """
+    One alert worker. Its inbox carries broker batches, forwards from peers and
+    the end markers; a peer's 'peer-done' follows every forward it sent here,
+    so the worker is finished after the broker's 'done' and N - 1 of those.
+    """
+    router = PartitionRouter(worker_id, workers, routing=routing)
+    alerts = AlertSystem(RuleEngine.from_file())
+    inbox = inboxes[worker_id]
+    results.put(('ready', worker_id))
+    finished_peers = 0
+    broker_done = False
+    while not broker_done or finished_peers < workers - 1:
+        kind, batch = inbox.get()
+        if kind == 'done':
+            broker_done = True
+            for peer in range(workers):
+                if peer != worker_id:
+                    inboxes[peer].put(('peer-done', None))
+            continue
+        if kind == 'peer-done':
+            finished_peers += 1
+            continue
+        forwards = {}
+        for topic, payload in batch:
+            if kind == 'broker' and router.route(topic):
+                forwards.setdefault(owner_of(topic, workers), []).append((topic, payload))
+                continue
+            alerts.message_count += 1
+            data = json.loads(payload)
+            room, sensor_type, when = room_from_topic(topic), data['sensor_type'], reading_time(data['timestamp'])
+            if router.admit(alerts.tracker.last_time(room, sensor_type), when):
+                alerts.process_reading(sensor_type, data['value'], room, now=when, hour=12)
+        for owner, items in forwards.items():
+            inboxes[owner].put(('forward', items))
+    results.put(('stats', (worker_id, alerts.message_count, alerts.alert_count, router.forwarded, router.stale)))
+
+
+def run_workers(messages, workers, routing, batch):
+    """Deal `messages` to `workers` processes; returns (seconds, per-worker stats)"""
+    inboxes = [mp.Queue() for _ in range(workers)]
+    results = mp.Queue()
+    procs = [mp.Process(target=worker, args=(w, workers, routing, inboxes, results)) for w in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in range(workers):
+        results.get()
+
+    start = time.perf_counter()
+    if routing == 'broker':
+        by_owner = [[] for _ in range(workers)]
+        for topic, payload in messages:
+            by_owner[owner_of(topic, workers)].append((topic, payload))
+        # Interleave the owners' batches so every worker is fed as the stream advances
+        per_owner = max(1, batch // workers)
+        for i in range(0, max(len(items) for items in by_owner), per_owner):
+            for owner, items in enumerate(by_owner):
+                if i < len(items):
+                    inboxes[owner].put(('broker', items[i:i + per_owner]))
+    else:
+        for n, i in enumerate(range(0, len(messages), batch)):
+            inboxes[n % workers].put(('broker', messages[i:i + batch]))
+    for inbox in inboxes:
+        inbox.put(('done', None))
+
+    stats = [results.get()[1] for _ in range(workers)]
+    elapsed = time.perf_counter() - start
+    for p in procs:
+        p.join()
+    return elapsed, sorted(stats)
+
+
+def run_benchmark(rooms, periods, worker_counts, routing, batch):
+    print("=" * 70)
+    print(" 📊 ALERT WORKER SCALING BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    messages = make_messages(rooms, periods)
+    print(f"\n🏠 Rooms: {rooms:,} ({rooms * 4:,} sensors)   📨 Messages: {len(messages):,}")
+    print(f"🔀 Routing: {routing}   📦 Batch: {batch}   🖥️  CPU cores: {os.cpu_count()}\n")
+
+    print(f"{'Workers':>7} {'Msg/s':>10} {'Speedup':>8} {'Forwarded':>10} {'Stale':>6} {'Alerts':>7} {'Busiest':>8}")
+    print("-" * 70)
+    baseline = None
+    for workers in worker_counts:
+        elapsed, stats = run_workers(messages, workers, routing, batch)
+        rate = len(messages) / elapsed
+        baseline = baseline or rate
+        processed = [s[1] for s in stats]
+        assert sum(processed) == len(messages), "messages lost between workers"
+        busiest = max(processed) / len(messages)
+        print(f"{workers:7} {rate:10,.0f} {rate / baseline:7.2f}x {sum(s[3] for s in stats):10,} "
+              f"{sum(s[4] for s in stats):6,} {sum(s[2] for s in stats):7,} {busiest:8.1%}")
+
+    print("\n🧭 Every sensor is evaluated by exactly one worker (busiest ≈ 1/N of the readings);")
+    print("   stale readings were overtaken on the forward hop and dropped by their owner.")
+    if (os.cpu_count() or 1) < max(worker_counts):
+        print(f"⚠️  Only {os.cpu_count()} core(s) here: workers share the CPU, so expect speedup")
+        print("   to track the core count, not the worker count.")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert worker scaling benchmark")
+    parser.add_argument("--rooms", type=int, default=500, help="Rooms (4 sensors each)")
+    parser.add_argument("--periods", type=int, default=100, help="Readings per sensor")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4, 8], help="Worker counts to run")
+    parser.add_argument("--routing", choices=['forward', 'broker'], default='forward',
+                        help="forward: round-robin shared subscription + owner forwarding; "
+                             "broker: broker delivers by topic hash")
+    parser.add_argument("--batch", type=int, default=500, help="Messages per delivery batch")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.periods, args.workers, args.routing, args.batch)
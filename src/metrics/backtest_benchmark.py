@@ -0,0 +1,70 @@
+"""
+Alert Backtest Benchmark
+Readings per second of the vectorized backtest on a synthetic month versus
+replaying the same readings one by one through AlertSystem.process_reading
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Allow running as `python src/metrics/backtest_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem  # noqa: E402
+from src.alerts.backtest import Backtest, local_hours, synthetic_history  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+
+def per_reading(rules, series):
+    """The live path: one process_reading() call per reading; returns (alerts, seconds)"""
+    config = {key: value for key, value in rules.config.items() if key not in ('anomaly', 'compound', 'offline')}
+    alerts = AlertSystem(RuleEngine(config))
+    start = time.perf_counter()
+    for room, sensor_type, times, values in series:
+        process = alerts.process_reading
+        for t, v, h in zip(times.tolist(), values.tolist(), local_hours(times, 0).tolist()):
+            process(sensor_type, v, room, now=t, hour=h)
+    return alerts.alert_count, time.perf_counter() - start
+
+
+def run_benchmark(rooms, days, step, replay_rooms):
+    rules = RuleEngine.from_file()
+    print("=" * 70)
+    print(" 📊 ALERT BACKTEST BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    series = synthetic_history(rooms, days, step)
+    readings = sum(len(values) for _, _, _, values in series)
+    print(f"\n🧪 Synthetic history: {rooms} rooms x 4 sensors, {days:g} days every {step:g}s "
+          f"= {readings:,} readings\n")
+
+    report = Backtest(rules, utc_offset=0).run(series)
+    replay = [s for s in series if int(s[0][4:]) <= replay_rooms]
+    replay_readings = sum(len(values) for _, _, _, values in replay)
+    sample = Backtest(rules, utc_offset=0).run(replay)
+    live_alerts, live_seconds = per_reading(rules, replay)
+    assert live_alerts == sample.total_raised(), (live_alerts, sample.total_raised())
+
+    print(f"{'Engine':26} {'Readings':>12} {'Seconds':>9} {'Readings/s':>12} {'Alerts':>9}")
+    print("-" * 70)
+    print(f"{'per-reading replay':26} {replay_readings:12,} {live_seconds:9.2f} "
+          f"{replay_readings / live_seconds:12,.0f} {live_alerts:9,}")
+    print(f"{'vectorized (same rooms)':26} {replay_readings:12,} {sample.elapsed:9.2f} "
+          f"{replay_readings / sample.elapsed:12,.0f} {sample.total_raised():9,}")
+    print(f"{'vectorized (all rooms)':26} {readings:12,} {report.elapsed:9.2f} "
+          f"{readings / report.elapsed:12,.0f} {report.total_raised():9,}")
+    print(f"\n🔁 {report.evaluated / readings:.1%} of readings needed the per-sensor state machine;")
+    print("   the rest were settled by array screens, rate and window passes.")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized alert backtest benchmark")
+    parser.add_argument("--rooms", type=int, default=100, help="Rooms in the synthetic history")
+    parser.add_argument("--days", type=float, default=30, help="Days of history")
+    parser.add_argument("--step", type=float, default=60, help="Seconds between readings")
+    parser.add_argument("--replay-rooms", type=int, default=5, help="Rooms replayed one reading at a time")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.days, args.step, args.replay_rooms)
@@ -0,0 +1,157 @@
+"""
+Micro-Batch Alert Benchmark
+Compares the per-message alert path (json.loads, timestamp parse, state
+machine per message) with micro-batched, vectorized evaluation: throughput
+for several batch sizes, then the latency a batching delay adds at a fixed
+message rate
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/batch_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem, reading_time, room_from_topic  # noqa: E402
+from src.alerts.batch import BatchEvaluator, MicroBatcher  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+SENSOR_VALUES = {'temperature': (24.0, 30.5, '°C'), 'humidity': (50.0, 64.0, '%'),
+                 'co2': (700.0, 1120.0, 'ppm'), 'light': (400.0, 850.0, 'lux')}
+
+
+def make_messages(rooms, periods):
+    """(topic, payload bytes) in the sensor scripts' format; every fifth room runs out of band for a while"""
+    start = datetime(2024, 1, 1)
+    messages = []
+    for i in range(periods):
+        ts = (start + timedelta(seconds=3 * i)).isoformat() + 'Z'
+        for r in range(rooms):
+            for sensor, (normal, high, unit) in SENSOR_VALUES.items():
+                value = high if (i // 20 + r) % 5 == 0 else normal
+                payload = json.dumps({'sensor_id': f"{sensor}_{r}", 'sensor_type': sensor, 'value': value,
+                                      'unit': unit, 'timestamp': ts, 'battery_level': 90.0}).encode()
+                messages.append((f"hostel/room{r}/{sensor}", payload))
+    return messages
+
+
+def per_message(alerts, messages):
+    """What on_message does for each message, minus the MQTT client"""
+    for topic, payload in messages:
+        alerts.message_count += 1
+        data = json.loads(payload)
+        alerts.process_reading(data['sensor_type'], data['value'], room_from_topic(topic), data.get('unit', ''),
+                               now=reading_time(data.get('timestamp')), hour=12)
+
+
+def batched(alerts, messages, batch):
+    evaluator = BatchEvaluator(alerts)
+    for i in range(0, len(messages), batch):
+        evaluator.process(messages[i:i + batch], hour=12)
+    return evaluator
+
+
+def per_message_run(rules, messages):
+    alerts = AlertSystem(rules)
+    t0 = time.perf_counter()
+    per_message(alerts, messages)
+    return len(messages) / (time.perf_counter() - t0), alerts.alert_count
+
+
+def batched_run(rules, messages, batch):
+    alerts = AlertSystem(rules)
+    t0 = time.perf_counter()
+    evaluator = batched(alerts, messages, batch)
+    return len(messages) / (time.perf_counter() - t0), (alerts.alert_count, evaluator.screened)
+
+
+def best_of(repeats, run):
+    """(best msg/s, result of that run) over `repeats` runs"""
+    return max((run() for _ in range(repeats)), key=lambda result: result[0])
+
+
+def live_latency(rules, messages, rate, batch, delay):
+    """Feed the MicroBatcher at `rate` msg/s; per-message latency from submit to evaluated"""
+    alerts = AlertSystem(rules)
+    if batch <= 1:
+        latencies = []
+        interval = 1.0 / rate
+        start = time.perf_counter()
+        for n, (topic, payload) in enumerate(messages):
+            due = start + n * interval
+            while time.perf_counter() < due:
+                pass
+            per_message(alerts, [(topic, payload)])
+            # From the message's due time, so falling behind the rate shows up as latency
+            latencies.append(time.perf_counter() - due)
+        return sorted(latencies)
+
+    evaluator = BatchEvaluator(alerts)
+    batcher = MicroBatcher(lambda items: evaluator.process(items, hour=12), max_items=batch, max_delay=delay,
+                           maxsize=len(messages) + 1)
+    batcher.latencies = deque(maxlen=len(messages))
+    batcher.start()
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for n, item in enumerate(messages):
+        pause = start + n * interval - time.perf_counter()
+        if pause > 0:
+            # Sleep, not spin: the batch thread needs the GIL meanwhile
+            time.sleep(pause)
+        batcher.submit(item)
+    batcher.stop(timeout=60)
+    return sorted(batcher.latencies)
+
+
+def run_benchmark(rooms, periods, batch_sizes, rate, delay_ms, repeats):
+    print("=" * 70)
+    print(" 📊 MICRO-BATCH ALERT BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    messages = make_messages(rooms, periods)
+    rules = RuleEngine.from_file()
+    print(f"\n🏠 Rooms: {rooms:,} ({rooms * 4:,} sensors)   📨 Messages: {len(messages):,}\n")
+
+    for label, rule_set in (("bundled rules (windows, debounce, anomaly)", rules), ("thresholds only", RuleEngine())):
+        print(f"📋 {label}")
+        print(f"{'Path':16} {'Msg/s':>10} {'Speedup':>8} {'Screened':>9} {'Alerts':>7}")
+        print("-" * 70)
+        base_rate, expected = best_of(repeats, lambda: per_message_run(rule_set, messages))
+        print(f"{'per-message':16} {base_rate:10,.0f} {1.0:7.2f}x {'-':>9} {expected:7,}")
+        for batch in batch_sizes:
+            rate_, (alert_count, screened) = best_of(repeats, lambda: batched_run(rule_set, messages, batch))
+            assert alert_count == expected, "batched path raised different alerts"
+            print(f"{f'batch {batch}':16} {rate_:10,.0f} {rate_ / base_rate:7.2f}x "
+                  f"{screened / len(messages):8.0%} {alert_count:7,}")
+        print()
+
+    sample = messages[:min(len(messages), int(rate * 2))]
+    print(f"⏱️  Added latency at {rate:,.0f} msg/s ({len(sample):,} messages, max delay {delay_ms:g} ms)")
+    print(f"{'Path':16} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    print("-" * 70)
+    for batch in [1] + list(batch_sizes):
+        latencies = live_latency(rules, sample, rate, batch, delay_ms / 1000)
+        label = 'per-message' if batch <= 1 else f'batch {batch}'
+        print(f"{label:16} {statistics.median(latencies) * 1000:9.3f} "
+              f"{latencies[int(len(latencies) * 0.99)] * 1000:9.3f} {latencies[-1] * 1000:9.3f}")
+    print("\n🧮 Screened = readings settled by the vectorized band check alone; sensors with")
+    print("   window or rate rules always run their state machine.")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-batched vs per-message alert evaluation")
+    parser.add_argument("--rooms", type=int, default=500, help="Rooms (4 sensors each)")
+    parser.add_argument("--periods", type=int, default=100, help="Readings per sensor")
+    parser.add_argument("--batch-sizes", type=int, nargs='+', default=[10, 100, 500, 2000], help="Batch sizes")
+    parser.add_argument("--rate", type=float, default=20000, help="Message rate for the latency run (msg/s)")
+    parser.add_argument("--repeats", type=int, default=3, help="Throughput runs per path (best is kept)")
+    parser.add_argument("--delay-ms", type=float, default=20, help="Maximum batching delay (ms)")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.periods, args.batch_sizes, args.rate, args.delay_ms, args.repeats)
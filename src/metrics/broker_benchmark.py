@@ -0,0 +1,182 @@
+"""
+Embedded Broker Benchmark
+Messages per second through src.broker.server, to check the stand-in broker
+is not the bottleneck of the throughput and latency benchmarks
+
+The broker runs in its own process (`python -m src.broker.server`) and the
+clients speak raw MQTT over sockets, so paho's per-message overhead is not
+what gets measured. One publisher sends pre-encoded PUBLISH packets as fast
+as the slowest subscriber keeps up (at most --window messages ahead); each subscriber (subscribed to bench/#) parses
+its stream and acknowledges QoS 1 deliveries. Broker CPU time comes from
+/proc on Linux.
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+# Allow running as `python src/metrics/broker_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.broker.server import encode_length, encode_publish  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def connect(port, client_id):
+    """Raw MQTT 3.1.1 CONNECT (clean session, 60 s keep-alive)"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    body = b'\x00\x04MQTT\x04\x02\x00\x3c' + len(client_id).to_bytes(2, 'big') + client_id.encode()
+    sock.sendall(b'\x10' + encode_length(len(body)) + body)
+    if sock.recv(4)[:2] != b'\x20\x02':
+        raise ConnectionError("no CONNACK")
+    return sock
+
+
+class Subscriber(threading.Thread):
+    """Counts PUBLISH packets on a raw connection, acknowledging QoS 1 ones"""
+
+    def __init__(self, port, index, qos, expected):
+        super().__init__(daemon=True)
+        self.sock = connect(port, f"bench-sub-{index}")
+        topic = b'bench/#'
+        body = b'\x00\x01' + len(topic).to_bytes(2, 'big') + topic + bytes((qos,))
+        self.sock.sendall(b'\x82' + encode_length(len(body)) + body)
+        if self.sock.recv(5)[:1] != b'\x90':
+            raise ConnectionError("no SUBACK")
+        self.expected = expected
+        self.received = 0
+        self.finished = None
+
+    def run(self):
+        buffer = bytearray()
+        while self.received < self.expected:
+            data = self.sock.recv(1 << 20)
+            if not data:
+                break
+            buffer += data
+            pos, size, acks = 0, len(buffer), []
+            while size - pos >= 2:
+                length, shift, cursor = 0, 0, pos + 1
+                while cursor < size:
+                    byte = buffer[cursor]
+                    length |= (byte & 127) << shift
+                    cursor += 1
+                    if byte < 128:
+                        break
+                    shift += 7
+                else:
+                    break
+                end = cursor + length
+                if end > size:
+                    break
+                header = buffer[pos]
+                if header >> 4 == 3:
+                    self.received += 1
+                    if header & 0x06:
+                        mid = cursor + 2 + int.from_bytes(buffer[cursor:cursor + 2], 'big')
+                        acks.append(b'\x40\x02' + bytes(buffer[mid:mid + 2]))
+                pos = end
+            del buffer[:pos]
+            if acks:
+                self.sock.sendall(b''.join(acks))
+        self.finished = time.perf_counter()
+
+
+def broker_cpu(pid):
+    """User + system CPU seconds of a process, or None off Linux"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def run_case(port, pid, qos, messages, subscribers, payload_size, window):
+    subs = [Subscriber(port, i, qos, messages) for i in range(subscribers)]
+    publisher = connect(port, f"bench-pub-{qos}")
+    payload = b'x' * payload_size
+    batch = b''.join(encode_publish(f"bench/room{i % 100}/co2".encode(), payload, qos, i % 65535 + 1)
+                     for i in range(1000))
+    # Drain the publisher's PUBACKs so its receive buffer never fills
+    threading.Thread(target=lambda: [None for _ in iter(lambda: publisher.recv(1 << 20), b'')],
+                     daemon=True).start()
+    for sub in subs:
+        sub.start()
+    cpu_before = broker_cpu(pid)
+    start = time.perf_counter()
+    for sent in range(1000, messages + 1, 1000):
+        # Stay at most `window` messages ahead of the slowest subscriber, so
+        # QoS 1 sessions do not overflow the broker's queue
+        while sent - min(sub.received for sub in subs) > window and all(sub.is_alive() for sub in subs):
+            time.sleep(0.001)
+        publisher.sendall(batch)
+    for sub in subs:
+        sub.join(timeout=120)
+    elapsed = max(sub.finished or time.perf_counter() for sub in subs) - start
+    cpu_after = broker_cpu(pid)
+    publisher.close()
+    for sub in subs:
+        sub.sock.close()
+    delivered = sum(sub.received for sub in subs)
+    cpu = cpu_after - cpu_before if cpu_before is not None else None
+    return delivered, elapsed, cpu
+
+
+def run_benchmark(messages, qos_levels, subscribers, payload_size, window):
+    print("=" * 70)
+    print(" 📊 EMBEDDED BROKER BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    port = free_port()
+    broker = subprocess.Popen([sys.executable, '-m', 'src.broker.server', '--host', '127.0.0.1',
+                               '--port', str(port)], cwd=ROOT, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+        messages -= messages % 1000
+        print(f"\n📨 {messages:,} messages of {payload_size} bytes, {subscribers} subscriber(s) on bench/#\n")
+        print(f"{'QoS':>3} {'Published/s':>12} {'Delivered/s':>12} {'Delivered':>12} {'Broker CPU':>11} "
+              f"{'Per CPU s':>11}")
+        print("-" * 70)
+        for qos in qos_levels:
+            delivered, elapsed, cpu = run_case(port, broker.pid, qos, messages, subscribers, payload_size, window)
+            per_cpu = f"{delivered / cpu:11,.0f}" if cpu else f"{'n/a':>11}"
+            cpu_text = f"{cpu:10.2f}s" if cpu is not None else f"{'n/a':>11}"
+            print(f"{qos:3} {messages / elapsed:12,.0f} {delivered / elapsed:12,.0f} {delivered:12,} "
+                  f"{cpu_text} {per_cpu}")
+    finally:
+        broker.terminate()
+        broker.wait()
+    print("\n⚙️  Per CPU s = deliveries per second of broker CPU time (the rate it could sustain alone)")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedded MQTT broker throughput benchmark")
+    parser.add_argument("--messages", type=int, default=200000, help="Messages to publish per QoS level")
+    parser.add_argument("--qos", default="0,1", help="Comma-separated QoS levels")
+    parser.add_argument("--subscribers", type=int, default=1, help="Subscribers on bench/#")
+    parser.add_argument("--payload", type=int, default=64, help="Payload size in bytes")
+    parser.add_argument("--window", type=int, default=20000, help="Most messages ahead of the slowest subscriber")
+    args = parser.parse_args()
+
+    run_benchmark(args.messages, [int(q) for q in args.qos.split(',')], args.subscribers, args.payload, args.window)
@@ -0,0 +1,113 @@
+"""
+Alert Event Log Benchmark
+Per-notification cost of the console banners, the per-line file sink and the
+batched event log, then history queries with the segment index versus a scan
+of every file
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Allow running as `python src/metrics/event_log_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.eventlog import EventLogSink, plan, query  # noqa: E402
+from src.alerts.notify import ConsoleSink, FileSink, Notification  # noqa: E402
+
+START = 1700000000.0
+
+
+def notifications(count, rooms, per_second):
+    sensors = ('temperature', 'humidity', 'co2', 'light')
+    for i in range(count):
+        n = Notification('alert' if i % 2 == 0 else 'clear', sensors[i % 4], f"room{i % rooms}", 'HIGH',
+                         'warning', 1000 + i % 100, 1000, 'ppm', i)
+        n.timestamp = START + i / per_second
+        yield n
+
+
+def write_rate(sink, items):
+    start = time.perf_counter()
+    for n in items:
+        sink.send(n)
+    close = getattr(sink, 'close', None)
+    if close:
+        close()
+    return len(items) / (time.perf_counter() - start)
+
+
+def full_scan(directory, room, since, until):
+    """What a query costs without the index: parse every line of every file"""
+    found = 0
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith('alerts-'):
+            continue
+        with open(os.path.join(directory, name), 'rb') as segment:
+            for line in segment:
+                record = json.loads(line)
+                if record['room'] == room and since <= record['ts'] <= until:
+                    found += 1
+    return found
+
+
+def run_benchmark(events, write_events, rooms, per_second, segment_mb):
+    print("=" * 70)
+    print(" 📊 ALERT EVENT LOG BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    with tempfile.TemporaryDirectory() as tmp:
+        items = list(notifications(write_events, rooms, per_second))
+        print(f"\n✍️  Writing {write_events:,} notifications\n")
+        print(f"{'Sink':28} {'Notifications/s':>16} {'µs each':>10}")
+        print("-" * 70)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            console = write_rate(ConsoleSink(), items)
+        for name, rate in (
+            ('console banners (devnull)', console),
+            ('file sink (flush per line)', write_rate(FileSink(os.path.join(tmp, 'alerts.jsonl')), items)),
+            ('event log (batched)', write_rate(EventLogSink(os.path.join(tmp, 'bench')), items)),
+        ):
+            print(f"{name:28} {rate:16,.0f} {1e6 / rate:10.1f}")
+
+        directory = os.path.join(tmp, 'history')
+        sink = EventLogSink(directory, max_bytes=int(segment_mb * 1024 * 1024))
+        for n in notifications(events, rooms, per_second):
+            sink.send(n)
+        sink.close()
+        span = events / per_second
+        size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        print(f"\n🔎 History: {events:,} events over {span / 3600:.1f} h in {sink.segments} segments "
+              f"({size / 1024 / 1024:.0f} MB)\n")
+        print(f"{'Query':34} {'Found':>7} {'Segments':>9} {'Indexed':>10} {'Full scan':>10}")
+        print("-" * 70)
+        for label, room, since, until in (
+            ('room3, 1 hour in the middle', 'room3', START + span / 2, START + span / 2 + 3600),
+            ('room3, last 5 minutes', 'room3', START + span - 300, START + span),
+            ('room3, everything', 'room3', START, START + span),
+        ):
+            start = time.perf_counter()
+            found = sum(1 for _ in query(directory, rooms=[room], since=since, until=until))
+            indexed = time.perf_counter() - start
+            reads, _ = plan(directory, rooms={room}, since=since, until=until)
+            start = time.perf_counter()
+            scanned = full_scan(directory, room, since, until)
+            scan = time.perf_counter() - start
+            assert scanned == found
+            print(f"{label:34} {found:7,} {len(reads):9} {indexed * 1000:7.1f} ms {scan * 1000:7.0f} ms")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert event log write and query benchmark")
+    parser.add_argument("--events", type=int, default=500000, help="Events in the queried history")
+    parser.add_argument("--write-events", type=int, default=50000, help="Notifications per write test")
+    parser.add_argument("--rooms", type=int, default=50, help="Rooms the events are spread over")
+    parser.add_argument("--per-second", type=float, default=20, help="Events per second of history")
+    parser.add_argument("--segment-mb", type=float, default=4, help="Segment rotation size")
+    args = parser.parse_args()
+
+    run_benchmark(args.events, args.write_events, args.rooms, args.per_second, args.segment_mb)
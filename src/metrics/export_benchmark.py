@@ -0,0 +1,70 @@
+"""
+Export Throughput Benchmark
+Streams synthetic readings through the CSV and Parquet exporters and reports rows/second
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/export_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dashboard.export import FORMATS, export  # noqa: E402
+
+SENSORS = ('temperature', 'humidity', 'co2', 'light')
+
+
+def synthetic_rows(count, rooms):
+    start = datetime(2024, 1, 1)
+    step = timedelta(seconds=3)
+    for i in range(count):
+        yield f"room{i % rooms + 1}", SENSORS[i % 4], start + step * (i // (rooms * 4)), 20.0 + (i % 97) / 10
+
+
+def run_benchmark(rows, rooms, chunk_rows, trace_memory):
+    print("=" * 70)
+    print(" 📊 EXPORT THROUGHPUT BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n📈 Rows: {rows:,}   🏠 Rooms: {rooms}   🧱 Chunk: {chunk_rows:,} rows\n")
+
+    print(f"{'Format':10} {'Rows/s':>12} {'Size':>10} {'Elapsed':>9} {'Peak mem':>10}")
+    print("-" * 70)
+    for fmt in FORMATS:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"export.{fmt}")
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                with open(path, 'wb') as sink:
+                    count = export(synthetic_rows(rows, rooms), fmt, sink, chunk_rows)
+            except RuntimeError as e:
+                print(f"{fmt:10} skipped: {e}")
+                continue
+            finally:
+                peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+                if trace_memory:
+                    tracemalloc.stop()
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(path)
+        peak_text = f"{peak / 1024 / 1024:7.1f} MB" if trace_memory else "       n/a"
+        print(f"{fmt:10} {count / elapsed:12,.0f} {size / 1024 / 1024:7.1f} MB {elapsed:8.2f}s {peak_text}")
+
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV/Parquet export throughput benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic rows to export")
+    parser.add_argument("--rooms", type=int, default=100, help="Distinct rooms")
+    parser.add_argument("--chunk-rows", type=int, default=10000, help="Rows per chunk / row group")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Report peak Python allocations (slows the run down)")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.rooms, args.chunk_rows, args.trace_memory)
@@ -0,0 +1,114 @@
+"""
+Priority Lane Benchmark
+Alert latency when readings arrive faster than the alert system evaluates
+them: one FIFO queue versus the urgent/routine lanes of src.alerts.lanes
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+# Allow running as `python src/metrics/lanes_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem, reading_time, room_from_topic  # noqa: E402
+from src.alerts.lanes import Prescreen, PriorityLanes  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+RULES = {'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}}
+TICK = 0.005
+
+
+def consumer(alerts):
+    """What alert_system.py does per reading, minus the console output"""
+    def handle(items):
+        for topic, payload in items:
+            data = json.loads(payload)
+            alerts.process_reading(data['sensor_type'], data['value'], room_from_topic(topic), data['unit'],
+                                   now=reading_time(data['timestamp']), hour=12)
+    return handle
+
+
+def readings(sensors, alert_share, seed):
+    """Endless (topic, value) stream; a few readings per thousand are over the limit"""
+    rng = random.Random(seed)
+    topics = [f"hostel/room{i}/co2" for i in range(sensors)]
+    while True:
+        for topic in topics:
+            yield topic, 1500 if rng.random() < alert_share else 600
+
+
+def payload(value, stamp):
+    return (f'{{"sensor_type": "co2", "value": {value}, "unit": "ppm", '
+            f'"timestamp": "{stamp}"}}').encode()
+
+
+def capacity(sensors, alert_share, count=50000):
+    """Readings per second the consumer evaluates with nothing else running"""
+    handle = consumer(AlertSystem(RuleEngine(RULES)))
+    stamp = datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+    stream = readings(sensors, alert_share, 1)
+    items = [(topic, payload(value, stamp)) for topic, value in (next(stream) for _ in range(count))]
+    start = time.perf_counter()
+    handle(items)
+    return count / (time.perf_counter() - start)
+
+
+def run(mode, rate, seconds, sensors, alert_share):
+    alerts = AlertSystem(RuleEngine(RULES))
+    prescreen = Prescreen(alerts.rules, alerts.tracker)
+    lanes = PriorityLanes(consumer(alerts), maxsize=10 ** 7).start()
+    stream = readings(sensors, alert_share, 2)
+    per_tick = max(1, int(rate * TICK))
+    start = time.perf_counter()
+    for tick in range(int(seconds / TICK)):
+        stamp = datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+        for _ in range(per_tick):
+            topic, value = next(stream)
+            data = payload(value, stamp)
+            # Without lanes every reading waits in one FIFO queue
+            lanes.submit(topic, (topic, data), prescreen(topic, data) if mode == 'lanes' else True)
+        delay = start + (tick + 1) * TICK - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    offered = time.perf_counter() - start
+    lanes.stop(timeout=600)
+    drained = time.perf_counter() - start
+    return alerts.latency.stages['alert'], lanes.stats(), offered, drained
+
+
+def run_benchmark(overload, seconds, sensors, alert_share):
+    print("=" * 70)
+    print(" 📊 PRIORITY LANE BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    rate = capacity(sensors, alert_share) * overload
+    print(f"\n📨 {sensors:,} sensors, {alert_share:.1%} of readings over the limit, offered at "
+          f"{rate:,.0f} msg/s ({overload:g}x what the consumer evaluates alone) for {seconds:g}s\n")
+
+    print(f"{'Mode':8} {'Alert p50':>10} {'p99':>9} {'Max':>9} {'Evaluated':>10} {'Coalesced':>10} "
+          f"{'Dropped':>8} {'Drain':>7}")
+    print("-" * 70)
+    for mode in ('fifo', 'lanes'):
+        alert, stats, offered, drained = run(mode, rate, seconds, sensors, alert_share)
+        evaluated = stats['submitted'] - stats['coalesced'] - stats['superseded'] - stats['dropped']
+        print(f"{mode:8} {alert.percentile(50) / 1e6:7.1f} ms {alert.percentile(99) / 1e6:6.1f} ms "
+              f"{alert.max / 1e6:6.0f} ms {evaluated:10,} {stats['coalesced']:10,} {stats['dropped']:8,} "
+              f"{drained - offered:6.2f}s")
+    print("\n⏱️  Alert = reading timestamp -> alert raised or cleared (AlertSystem.latency 'alert')")
+    print("🧹 Drain = time to empty the queues after the publisher stopped")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Priority lane (alert latency under overload) benchmark")
+    parser.add_argument("--overload", type=float, default=2.0, help="Offered rate / consumer capacity")
+    parser.add_argument("--seconds", type=float, default=5.0, help="How long to publish")
+    parser.add_argument("--sensors", type=int, default=2000, help="Sensors publishing")
+    parser.add_argument("--alert-share", type=float, default=0.002, help="Share of out-of-range readings")
+    args = parser.parse_args()
+
+    run_benchmark(args.overload, args.seconds, args.sensors, args.alert_share)
@@ -1,133 +1,220 @@
 """
 Latency Test Script
-Measures end-to-end latency from sensor to dashboard
+Closed-loop MQTT latency: publishes its own probes at a fixed rate through
+the broker and times them back on a second connection
+
+Every probe carries its sequence number, the time.perf_counter_ns() at
+which it was *scheduled* to be sent and the sender's time.time_ns(). The
+latency is the receive perf_counter_ns minus the scheduled time, so a
+publisher falling behind its rate shows up as latency instead of being
+hidden (no coordinated omission). Samples go into an HDR-style
+LatencyHistogram (src.alerts.latency) per QoS level and payload size; the
+first --warmup probes of each case are not recorded.
+
+The broker is configured like the sensors and alert system (MQTT_BROKER,
+MQTT_PORT, MQTT_USE_TLS, MQTT_USERNAME, MQTT_PASSWORD, .env), or with
+--broker/--port/--tls.
+
+Usage:
+    python src/metrics/latency_test.py --qos 0,1 --sizes 64,1024,16384 --rate 500 --duration 10
 """
 
-import paho.mqtt.client as mqtt
+import argparse
+import os
+import ssl
+import struct
+import sys
+import threading
 import time
-import json
-from datetime import datetime
-import statistics
+import uuid
+
+import paho.mqtt.client as mqtt
+from dotenv import load_dotenv
+
+# Allow running as `python src/metrics/latency_test.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.latency import LatencyHistogram  # noqa: E402
+
+load_dotenv()
+
+# Same variables as the sensors; without MQTT_BROKER, a local plain-TCP broker
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+MQTT_PORT = int(os.getenv("MQTT_PORT", 8883 if MQTT_USE_TLS else 1883))
+
+# sequence, scheduled send time (perf_counter_ns), sender wall clock (time_ns)
+PROBE = struct.Struct('!IQQ')
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class ProbeCase:
+    """Probes of one QoS level and payload size"""
+
+    def __init__(self, topic, qos, size, count, warmup):
+        self.topic = topic
+        self.qos = qos
+        self.size = max(size, PROBE.size)
+        self.count = count
+        self.warmup = warmup
+        self.histogram = LatencyHistogram()
+        self.seen = bytearray(count)
+        self.sent = 0
+        self.received = 0
+        self.duplicates = 0
+        self.publish_seconds = 0.0
+
 
 class LatencyTester:
-    def __init__(self):
-        self.latencies = []
-        self.received_count = 0
-        self.test_duration = 60  # seconds
-        
-        self.client = mqtt.Client(client_id="latency_tester")
-        self.client.on_connect = self.on_connect
-        self.client.on_message = self.on_message
-    
-    def on_connect(self, client, userdata, flags, rc):
+    def __init__(self, broker, port, use_tls, username=None, password=None, prefix="metrics/latency"):
+        self.broker = broker
+        self.port = port
+        self.topic_root = f"{prefix}/{uuid.uuid4().hex[:8]}"
+        self.cases = {}
+        self.publisher = self._client("pub", use_tls, username, password)
+        self.subscriber = self._client("sub", use_tls, username, password)
+        self.subscriber.on_message = self.on_message
+        self.subscribed = threading.Event()
+        self.subscriber.on_subscribe = lambda *args: self.subscribed.set()
+
+    def _client(self, role, use_tls, username, password):
+        client = mqtt.Client(
+            client_id=f"latency_{role}_{os.getpid()}",
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            protocol=mqtt.MQTTv311,
+            userdata=threading.Event()
+        )
+        client.on_connect = self.on_connect
+        if username and password:
+            client.username_pw_set(username, password)
+        if use_tls:
+            client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
+        # Let QoS 1/2 probes overlap instead of going one round trip at a time
+        client.max_inflight_messages_set(1000)
+        return client
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
-            print("✅ Connected to MQTT Broker")
-            # Subscribe to all sensor topics
-            topics = [
-                "hostel/room1/temperature",
-                "hostel/room1/humidity",
-                "hostel/room1/co2",
-                "hostel/room1/light"
-            ]
-            for topic in topics:
-                client.subscribe(topic)
-            print(f"📡 Subscribed to {len(topics)} topics\n")
-    
-    def on_message(self, client, userdata, msg):
-        """Calculate latency when message received"""
-        try:
-            receive_time = datetime.utcnow()
-            payload = json.loads(msg.payload.decode())
-            
-            # Parse timestamp from sensor
-            send_time = datetime.fromisoformat(payload['timestamp'].replace('Z', ''))
-            
-            # Calculate latency in milliseconds
-            latency = (receive_time - send_time).total_seconds() * 1000
-            
-            self.latencies.append(latency)
-            self.received_count += 1
-            
-            print(f"📨 {payload['sensor_type']:12} | Latency: {latency:6.2f} ms | "
-                  f"Messages: {self.received_count}")
-            
-        except Exception as e:
-            print(f"⚠️  Error processing message: {e}")
-    
-    def run_test(self):
-        """Run latency test for specified duration"""
-        print("="*70)
-        print(" 📊 LATENCY TEST - IoT Monitoring System")
-        print("="*70)
-        print(f"\n⏱️  Test Duration: {self.test_duration} seconds")
-        print("🎯 Measuring: Time from sensor reading to MQTT reception\n")
-        
-        try:
-            self.client.connect("localhost", 1883, 60)
-            self.client.loop_start()
-            
-            # Run test
-            start_time = time.time()
-            while time.time() - start_time < self.test_duration:
-                time.sleep(0.1)
-            
-            self.client.loop_stop()
-            self.client.disconnect()
-            
-            # Calculate statistics
-            self.print_results()
-            
-        except KeyboardInterrupt:
-            print("\n\n⏹️  Test stopped by user")
-            self.print_results()
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-    
-    def print_results(self):
-        """Print test results"""
-        print("\n" + "="*70)
-        print(" 📈 TEST RESULTS")
-        print("="*70)
-        
-        if self.latencies:
-            print(f"\n📊 Total Messages Received: {self.received_count}")
-            print(f"⏱️  Average Latency:        {statistics.mean(self.latencies):.2f} ms")
-            print(f"📉 Minimum Latency:        {min(self.latencies):.2f} ms")
-            print(f"📈 Maximum Latency:        {max(self.latencies):.2f} ms")
-            print(f"📊 Median Latency:         {statistics.median(self.latencies):.2f} ms")
-            print(f"📐 Std Deviation:          {statistics.stdev(self.latencies):.2f} ms")
-            
-            # Latency distribution
-            print("\n🎯 Latency Distribution:")
-            under_50 = sum(1 for l in self.latencies if l < 50)
-            under_100 = sum(1 for l in self.latencies if 50 <= l < 100)
-            under_200 = sum(1 for l in self.latencies if 100 <= l < 200)
-            over_200 = sum(1 for l in self.latencies if l >= 200)
-            
-            total = len(self.latencies)
-            print(f"   < 50 ms:     {under_50:4} ({under_50/total*100:.1f}%)")
-            print(f"   50-100 ms:   {under_100:4} ({under_100/total*100:.1f}%)")
-            print(f"   100-200 ms:  {under_200:4} ({under_200/total*100:.1f}%)")
-            print(f"   > 200 ms:    {over_200:4} ({over_200/total*100:.1f}%)")
-            
-            # Performance rating
-            avg_latency = statistics.mean(self.latencies)
-            if avg_latency < 50:
-                rating = "🌟 EXCELLENT"
-            elif avg_latency < 100:
-                rating = "✅ GOOD"
-            elif avg_latency < 200:
-                rating = "⚠️  ACCEPTABLE"
-            else:
-                rating = "❌ POOR"
-            
-            print(f"\n🏆 Performance Rating: {rating}")
+            userdata.set()
         else:
-            print("\n⚠️  No messages received during test period")
-            print("   Make sure sensors are running!")
-        
-        print("="*70 + "\n")
+            print(f"❌ Connection failed: {rc}")
+
+    def on_message(self, client, userdata, msg):
+        """Record the probe's latency, once per sequence number"""
+        now = time.perf_counter_ns()
+        case = self.cases.get(msg.topic)
+        if case is None:
+            return
+        seq, scheduled, _ = PROBE.unpack_from(msg.payload)
+        if seq >= case.count or case.seen[seq]:
+            case.duplicates += 1
+            return
+        case.seen[seq] = 1
+        case.received += 1
+        if seq >= case.warmup:
+            case.histogram.record(now - scheduled)
+
+    def connect(self, timeout=10):
+        for client in (self.subscriber, self.publisher):
+            client.connect(self.broker, self.port, 60)
+            client.loop_start()
+            if not client.user_data_get().wait(timeout):
+                raise ConnectionError(f"no CONNACK from {self.broker}:{self.port} within {timeout}s")
+        self.subscriber.subscribe(f"{self.topic_root}/#", qos=2)
+        if not self.subscribed.wait(timeout):
+            raise ConnectionError("subscription was not acknowledged")
+
+    def close(self):
+        for client in (self.publisher, self.subscriber):
+            client.loop_stop()
+            client.disconnect()
+
+    def run_case(self, qos, size, rate, duration, warmup, drain=5.0):
+        """Publish `rate` probes/s for `duration` s (after `warmup` probes), then wait for stragglers"""
+        count = warmup + int(rate * duration)
+        case = ProbeCase(f"{self.topic_root}/q{qos}/{size}", qos, size, count, warmup)
+        self.cases[case.topic] = case
+        padding = bytes(case.size - PROBE.size)
+        interval = 1e9 / rate
+        publish = self.publisher.publish
+        start = time.perf_counter_ns()
+        for seq in range(count):
+            scheduled = start + int(seq * interval)
+            ahead = scheduled - time.perf_counter_ns()
+            if ahead > 200_000:
+                time.sleep(ahead / 1e9)
+            publish(case.topic, PROBE.pack(seq, scheduled, time.time_ns()) + padding, qos=qos)
+            case.sent += 1
+        case.publish_seconds = (time.perf_counter_ns() - start) / 1e9
+        deadline = time.monotonic() + drain
+        while case.received < case.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return case
+
+
+def print_results(cases):
+    print("\n" + "=" * 70)
+    print(" 📈 TEST RESULTS (ms)")
+    print("=" * 70)
+    print(f"{'QoS':>3} {'Bytes':>6} {'Recv':>7} {'Lost':>5} {'Rate/s':>7} "
+          + " ".join(f"{'p' + format(p, 'g').replace('.', ''):>7}" for p in PERCENTILES) + f" {'max':>7}")
+    print("-" * 70)
+    for case in cases:
+        histogram = case.histogram
+        lost = case.sent - case.received
+        rate = case.sent / case.publish_seconds if case.publish_seconds else 0.0
+        values = " ".join(f"{histogram.percentile(p) / 1e6:7.2f}" for p in PERCENTILES)
+        print(f"{case.qos:3} {case.size:6} {case.received:7,} {lost:5,} {rate:7,.0f} {values} "
+              f"{histogram.max / 1e6:7.2f}")
+    if any(case.duplicates for case in cases):
+        print("\n🔁 Duplicates (QoS 1 redeliveries): "
+              + ", ".join(f"QoS {case.qos}/{case.size} B: {case.duplicates}" for case in cases if case.duplicates))
+    print("\n⏱️  Latency = received - scheduled send time, so publisher lag counts")
+    print("=" * 70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Closed-loop MQTT latency test")
+    parser.add_argument("--broker", default=MQTT_BROKER, help="Broker host")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="Broker port")
+    parser.add_argument("--tls", action=argparse.BooleanOptionalAction, default=MQTT_USE_TLS, help="Use TLS")
+    parser.add_argument("--qos", default="0,1", help="Comma-separated QoS levels")
+    parser.add_argument("--sizes", default="64,1024,16384", help="Comma-separated payload sizes in bytes")
+    parser.add_argument("--rate", type=float, default=200, help="Probes per second")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of recorded probes per case")
+    parser.add_argument("--warmup", type=int, default=100, help="Unrecorded probes at the start of each case")
+    parser.add_argument("--prefix", default="metrics/latency", help="Probe topic prefix")
+    args = parser.parse_args()
+
+    levels = [int(q) for q in args.qos.split(',')]
+    sizes = [int(s) for s in args.sizes.split(',')]
+    print("=" * 70)
+    print(" 📊 LATENCY TEST - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n🔌 Broker: {args.broker}:{args.port} (TLS {'on' if args.tls else 'off'})")
+    print(f"🎯 {args.rate:g} probes/s for {args.duration:g}s per case, QoS {levels} x {sizes} bytes\n")
+
+    tester = LatencyTester(args.broker, args.port, args.tls, os.getenv("MQTT_USERNAME"),
+                           os.getenv("MQTT_PASSWORD"), args.prefix)
+    cases = []
+    try:
+        tester.connect()
+        print("✅ Connected to MQTT Broker")
+        for qos in levels:
+            for size in sizes:
+                case = tester.run_case(qos, size, args.rate, args.duration, args.warmup)
+                print(f"📨 QoS {qos}, {case.size:,} B: {case.received:,}/{case.sent:,} received, "
+                      f"p99 {case.histogram.percentile(99) / 1e6:.2f} ms")
+                cases.append(case)
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Test stopped by user")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        tester.close()
+    if cases:
+        print_results(cases)
+
 
 if __name__ == "__main__":
-    tester = LatencyTester()
-    tester.run_test()
+    main()
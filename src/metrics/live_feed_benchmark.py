@@ -0,0 +1,114 @@
+"""
+Live Feed Fan-out Benchmark
+Measures WebSocket fan-out throughput of the live feed server with many
+simulated clients on localhost
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from urllib.parse import quote
+
+# Allow running as `python src/metrics/live_feed_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dashboard.live_feed import LiveFeedServer, read_frame  # noqa: E402
+
+
+class BenchClient:
+    def __init__(self, slow=False):
+        self.slow = slow
+        self.received = 0
+        self.frames = 0
+        self.latest = {}
+
+    async def connect(self, port, topics):
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write(
+            f"GET /ws?topics={quote(topics)} HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+        await self.reader.readuntil(b'\r\n\r\n')
+
+    async def consume(self):
+        try:
+            while True:
+                _, payload = await read_frame(self.reader)
+                batch = json.loads(payload)
+                self.frames += 1
+                self.received += len(batch)
+                for reading in batch:
+                    self.latest[reading['topic']] = reading['value']
+                if self.slow:
+                    await asyncio.sleep(0.05)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+
+async def run_benchmark(clients, messages, rooms, slow_clients):
+    print("=" * 70)
+    print(" 📊 LIVE FEED FAN-OUT BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n👥 Clients:  {clients} ({slow_clients} slow)")
+    print(f"📨 Messages: {messages} across {rooms * 4} topics\n")
+
+    server = await LiveFeedServer(host='127.0.0.1', port=0).start()
+    bench_clients = [BenchClient(slow=i < slow_clients) for i in range(clients)]
+    connect_start = time.perf_counter()
+    for i in range(0, clients, 100):
+        await asyncio.gather(*(c.connect(server.port, 'hostel/#') for c in bench_clients[i:i + 100]))
+    print(f"🔌 Connected {clients} clients in {time.perf_counter() - connect_start:.2f}s")
+    consumers = [asyncio.ensure_future(c.consume()) for c in bench_clients]
+
+    topics = [f"hostel/room{r}/{s}" for r in range(rooms) for s in ('temperature', 'humidity', 'co2', 'light')]
+    start = time.perf_counter()
+    for i in range(messages):
+        server.publish(topics[i % len(topics)], {'value': i, 'timestamp': time.time()})
+        if i % 50 == 49:
+            await asyncio.sleep(0)
+    final = {topic: i for i, topic in ((i, topics[i % len(topics)]) for i in range(messages))}
+
+    # Done when every client holds the final value of every topic
+    while any(c.latest != final for c in bench_clients):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+
+    delivered = sum(c.received for c in bench_clients)
+    frames = sum(c.frames for c in bench_clients)
+    coalesced = sum(fc.coalesced for fc in server.clients)
+    offered = messages * clients
+
+    print(f"\n⏱️  Elapsed:             {elapsed:.2f} s")
+    print(f"📥 Published:           {messages / elapsed:,.0f} msg/s")
+    print(f"📤 Readings delivered:  {delivered:,} ({delivered / elapsed:,.0f}/s)")
+    print(f"🧱 WebSocket frames:    {frames:,} ({frames / elapsed:,.0f}/s)")
+    print(f"🔀 Coalesced readings:  {coalesced:,} ({coalesced / offered * 100:.1f}% of {offered:,} offered)")
+    if slow_clients:
+        slow = bench_clients[:slow_clients]
+        print(f"🐢 Slow client avg:     {sum(c.received for c in slow) / slow_clients:,.0f} readings "
+              f"(bounded by {len(topics)} per batch)")
+    print("=" * 70 + "\n")
+
+    for c in bench_clients:
+        c.writer.close()
+    await server.stop()
+    for task in consumers:
+        task.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live feed WebSocket fan-out benchmark")
+    parser.add_argument("--clients", type=int, default=1000, help="Simulated WebSocket clients")
+    parser.add_argument("--messages", type=int, default=2000, help="Readings to publish")
+    parser.add_argument("--rooms", type=int, default=10, help="Rooms (4 topics each)")
+    parser.add_argument("--slow-clients", type=int, default=0, help="Clients that read slowly")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.clients, args.messages, args.rooms, args.slow_clients))
@@ -0,0 +1,116 @@
+"""
+Sensor Liveness Benchmark
+Cost of tracking 100k sensors' deadlines with the timer wheel versus a
+periodic full scan of every sensor's last-seen time, plus detection delay
+for sensors that die mid-run
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Allow running as `python src/metrics/liveness_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.liveness import LivenessMonitor  # noqa: E402
+
+
+class FullScan:
+    """The naive alternative: remember last-seen times and check all of them every tick"""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.last_seen = {}
+        self.offline = set()
+        self.visited = 0
+
+    def seen(self, room, sensor_type, now):
+        key = (room, sensor_type)
+        self.last_seen[key] = now
+        self.offline.discard(key)
+
+    def advance(self, now):
+        expired = []
+        limit = now - self.timeout
+        for key, last in self.last_seen.items():
+            if last <= limit and key not in self.offline:
+                self.offline.add(key)
+                expired.append((*key, now - last))
+        self.visited += len(self.last_seen)
+        return expired
+
+
+def simulate(tracker, sensors, period, seconds, dead):
+    """
+    Each sensor reports every `period` seconds (phases spread over the period);
+    the `dead` set stops at half time. Simulated clock, one advance() per second.
+
+    Returns (reading seconds, advance seconds, readings, detection delays).
+    """
+    types = ('temperature', 'humidity', 'co2', 'light')
+    keys = [(f"room{i // 4}", types[i % 4]) for i in range(sensors)]
+    by_phase = [keys[phase::period] for phase in range(period)]
+    die_at = seconds // 2
+    seen = tracker.seen
+    reading_time = advance_time = 0.0
+    readings = 0
+    delays = []
+    for second in range(seconds):
+        now = float(second)
+        batch = by_phase[second % period]
+        if second >= die_at:
+            batch = [key for key in batch if key not in dead]
+        start = time.perf_counter()
+        for room, sensor_type in batch:
+            seen(room, sensor_type, now)
+        reading_time += time.perf_counter() - start
+        readings += len(batch)
+
+        start = time.perf_counter()
+        expired = tracker.advance(now + 0.5)
+        advance_time += time.perf_counter() - start
+        for room, sensor_type, silent in expired:
+            delays.append(silent)
+    return reading_time, advance_time, readings, delays
+
+
+def run_benchmark(sensors, period, seconds, dead_fraction, factor):
+    timeout = factor * period
+    rng = random.Random(3)
+    types = ('temperature', 'humidity', 'co2', 'light')
+    dead = {(f"room{i // 4}", types[i % 4]) for i in rng.sample(range(sensors), int(sensors * dead_fraction))}
+
+    print("=" * 70)
+    print(" 📊 SENSOR LIVENESS BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n📴 {sensors:,} sensors every {period}s for {seconds}s (simulated clock), "
+          f"timeout {timeout:g}s, {len(dead):,} die at {seconds // 2}s\n")
+    print(f"{'Tracker':12} {'Per reading':>12} {'Per tick':>11} {'Visits/tick':>12} {'Detected':>9} "
+          f"{'Delay avg':>10}")
+    print("-" * 70)
+    trackers = (
+        ('timer wheel', LivenessMonitor(factor=factor, min_timeout=0, periods={t: period for t in types})),
+        ('full scan', FullScan(timeout)),
+    )
+    for name, tracker in trackers:
+        reading_time, advance_time, readings, delays = simulate(tracker, sensors, period, seconds, dead)
+        avg_delay = sum(delays) / len(delays) if delays else 0.0
+        print(f"{name:12} {reading_time / readings * 1e6:9.2f} µs {advance_time / seconds * 1e3:8.2f} ms "
+              f"{tracker.visited / seconds:12,.0f} {len(delays):9,} {avg_delay:8.1f} s")
+    print(f"\n🕐 The wheel re-files a live sensor about once per timeout; the scan")
+    print(f"   reads every sensor every tick, so its cost grows with the fleet.")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Timer-wheel dead-sensor detection benchmark")
+    parser.add_argument("--sensors", type=int, default=100000, help="Number of sensors")
+    parser.add_argument("--period", type=int, default=3, help="Seconds between a sensor's readings")
+    parser.add_argument("--seconds", type=int, default=120, help="Simulated run length")
+    parser.add_argument("--dead", type=float, default=0.01, help="Fraction of sensors that stop at half time")
+    parser.add_argument("--factor", type=float, default=3, help="Missed periods before a sensor is offline")
+    args = parser.parse_args()
+
+    run_benchmark(args.sensors, args.period, args.seconds, args.dead, args.factor)
@@ -0,0 +1,95 @@
+"""
+Alert Notification Benchmark
+Drives an alert storm through AlertSystem and compares message throughput when
+notifications run inline (as on_message used to) with the threaded dispatcher
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Allow running as `python src/metrics/notification_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem  # noqa: E402
+from src.alerts.notify import NotificationDispatcher  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+
+class SlowSink:
+    """Stands in for a beep or webhook that takes `delay` seconds"""
+
+    def __init__(self, name, delay):
+        self.name = name
+        self.delay = delay
+
+    def send(self, n):
+        time.sleep(self.delay)
+
+
+class InlineDispatcher:
+    """Calls every sink on the caller's thread, like the old trigger_alert"""
+
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def submit(self, notification):
+        for sink in self.sinks:
+            sink.send(notification)
+        return True
+
+
+def storm(rooms, messages):
+    """Every reading flips a room between critical HIGH and normal: one notification each"""
+    for i in range(messages):
+        yield f"room{i % rooms}", 35.0 if (i // rooms) % 2 == 0 else 24.0
+
+
+def run(alerts, rooms, messages):
+    start = time.perf_counter()
+    for i, (room, value) in enumerate(storm(rooms, messages)):
+        alerts.process_reading('temperature', value, room, '°C', now=float(i), hour=12)
+    return time.perf_counter() - start
+
+
+def run_benchmark(rooms, messages, sink_ms, queue_size):
+    print("=" * 70)
+    print(" 📊 ALERT NOTIFICATION BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n🏠 Rooms: {rooms}   📨 Storm messages: {messages:,} (every one a transition)")
+    print(f"🐢 Sinks: sound + webhook, {sink_ms} ms each   📥 Queue size: {queue_size}\n")
+
+    sinks = [SlowSink('sound', sink_ms / 1000), SlowSink('webhook', sink_ms / 1000)]
+
+    inline = run(AlertSystem(RuleEngine(), InlineDispatcher(sinks)), rooms, messages)
+
+    dispatcher = NotificationDispatcher(sinks, maxsize=queue_size).start()
+    threaded = run(AlertSystem(RuleEngine(), dispatcher), rooms, messages)
+    drain_start = time.perf_counter()
+    dispatcher.stop(timeout=messages * sink_ms / 1000 + 5)
+    drained = time.perf_counter() - drain_start
+
+    print(f"{'Mode':24} {'Ingest msg/s':>14} {'Ingest time':>14}")
+    print("-" * 70)
+    print(f"{'Inline sinks':24} {messages / inline:14,.0f} {inline * 1000:11.1f} ms")
+    print(f"{'Dispatcher':24} {messages / threaded:14,.0f} {threaded * 1000:11.1f} ms")
+
+    print(f"\n{'Sink':10} {'Sent':>7} {'Dropped':>8} {'Max depth':>10} {'Avg lat':>10} {'p99 lat':>10}")
+    print("-" * 70)
+    for name, stats in dispatcher.stats().items():
+        print(f"{name:10} {stats['sent']:7,} {stats['dropped']:8,} {stats['max_depth']:10,} "
+              f"{stats['latency_ms_avg']:7.1f} ms {stats['latency_ms_p99']:7.1f} ms")
+    print(f"\n⏱️  Queues drained {drained:.2f}s after the storm ended")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert notification dispatcher benchmark")
+    parser.add_argument("--rooms", type=int, default=50, help="Rooms alerting at once")
+    parser.add_argument("--messages", type=int, default=500, help="Storm messages")
+    parser.add_argument("--sink-ms", type=float, default=5.0, help="Time each slow sink takes per notification")
+    parser.add_argument("--queue-size", type=int, default=1000, help="Per-sink queue bound")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.messages, args.sink_ms, args.queue_size)
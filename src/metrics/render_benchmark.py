@@ -0,0 +1,132 @@
+"""
+Trend Chart Render Benchmark
+Compares payload size and serialization time of the standard SVG trend chart,
+the WebGL trend chart and incremental extendTraces deltas
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/render_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dashboard.charts import create_trend_chart, create_trend_delta  # noqa: E402
+from src.dashboard.data_store import DataStore  # noqa: E402
+
+
+def fill_store(points, new_points):
+    """Create a DataStore holding `points` temperature readings plus `new_points` more"""
+    store = DataStore(maxlen=points)
+    start = datetime(2024, 1, 1)
+    for i in range(points + new_points):
+        ts = (start + timedelta(seconds=3 * i)).isoformat() + 'Z'
+        store.add_data('temperature', 24 + (i % 50) / 10, ts, 100.0)
+    return store
+
+
+def measure(build, repeats):
+    """Return (payload_bytes, median_ms) for a callable producing a JSON string"""
+    timings = []
+    payload = ''
+    for _ in range(repeats):
+        start = time.perf_counter()
+        payload = build()
+        timings.append((time.perf_counter() - start) * 1000)
+    return len(payload.encode('utf-8')), statistics.median(timings)
+
+
+def write_frame_time_page(path, full_fig, webgl_fig, delta):
+    """
+    Write a standalone HTML page that measures browser frame time.
+
+    Server-side Python cannot see the browser, so the page replays both
+    figures with Plotly.react and the delta with Plotly.extendTraces, timing
+    each call plus the following animation frame, and prints the medians.
+    """
+    from plotly.offline import get_plotlyjs
+
+    html = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Trend render benchmark</title>
+<script>{get_plotlyjs()}</script></head>
+<body><div id="chart" style="width:900px;height:300px"></div><pre id="out">running...</pre>
+<script>
+const full = {full_fig.to_json()};
+const webgl = {webgl_fig.to_json()};
+const delta = {json.dumps(delta)};
+const gd = document.getElementById('chart');
+const frame = () => new Promise(r => requestAnimationFrame(() => r()));
+async function timeit(fn, n) {{
+  const t = [];
+  for (let i = 0; i < n; i++) {{
+    const s = performance.now(); await fn(); await frame(); t.push(performance.now() - s);
+  }}
+  t.sort((a, b) => a - b); return t[Math.floor(t.length / 2)].toFixed(1);
+}}
+(async () => {{
+  const a = await timeit(() => Plotly.react(gd, full.data, full.layout), 20);
+  const b = await timeit(() => Plotly.react(gd, webgl.data, webgl.layout), 20);
+  await Plotly.react(gd, webgl.data, webgl.layout);
+  const c = await timeit(() => Plotly.extendTraces(gd, delta.update, delta.traces, delta.max_points), 20);
+  document.getElementById('out').textContent =
+    `standard full redraw: ${{a}} ms\\nwebgl full redraw:    ${{b}} ms\\nwebgl delta append:   ${{c}} ms`;
+}})();
+</script></body></html>"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def run_benchmark(points, new_points, repeats, html_path=None):
+    print("=" * 70)
+    print(" 📊 TREND RENDER BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n📈 Series length: {points} points, {new_points} new per refresh")
+    print(f"🔁 Repeats: {repeats}\n")
+
+    store = fill_store(points, new_points)
+    data = store.get_data('temperature')
+    version = store.get_version('temperature') - new_points
+    new_data, _ = store.get_data_since('temperature', version)
+
+    results = {
+        'Standard (Scatter, lines+markers)': measure(
+            lambda: create_trend_chart(data, "Temperature", "#FF6B6B", "°C").to_json(), repeats),
+        'WebGL full (Scattergl)': measure(
+            lambda: create_trend_chart(data, "Temperature", "#FF6B6B", "°C", webgl=True).to_json(), repeats),
+        'WebGL delta (extendTraces)': measure(
+            lambda: json.dumps(create_trend_delta(new_data, points)), repeats),
+    }
+
+    baseline_bytes = results['Standard (Scatter, lines+markers)'][0]
+    print(f"{'Mode':36} {'Payload':>12} {'vs std':>8} {'Build+JSON':>12}")
+    print("-" * 70)
+    for name, (size, ms) in results.items():
+        print(f"{name:36} {size / 1024:9.1f} KB {size / baseline_bytes * 100:7.1f}% {ms:9.2f} ms")
+
+    if html_path:
+        write_frame_time_page(
+            html_path,
+            create_trend_chart(data, "Temperature", "#FF6B6B", "°C"),
+            create_trend_chart(data, "Temperature", "#FF6B6B", "°C", webgl=True),
+            create_trend_delta(new_data, points)
+        )
+        print(f"\n🌐 Browser frame-time page written to {html_path}")
+        print("   Open it in a browser to see redraw/append medians")
+
+    print("=" * 70 + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trend chart payload and render benchmark")
+    parser.add_argument("--points", type=int, default=10000, help="Series length")
+    parser.add_argument("--new-points", type=int, default=1, help="Points arriving per refresh")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per mode")
+    parser.add_argument("--html", default=None, help="Write a browser frame-time page to this path")
+    args = parser.parse_args()
+
+    run_benchmark(args.points, args.new_points, args.repeats, args.html)
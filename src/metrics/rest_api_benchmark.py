@@ -0,0 +1,119 @@
+"""
+REST API Polling Benchmark
+Measures requests/second for hot polling of the conditional-GET REST API
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/rest_api_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dashboard.data_store import DataStore, SENSOR_TYPES  # noqa: E402
+from src.dashboard.rest_api import RestApiServer  # noqa: E402
+
+
+def make_stores(rooms, points):
+    stores = {}
+    start = datetime(2024, 1, 1)
+    for r in range(rooms):
+        store = DataStore(maxlen=points)
+        for i in range(points):
+            ts = (start + timedelta(seconds=3 * i)).isoformat() + 'Z'
+            for sensor in SENSOR_TYPES:
+                store.add_data(sensor, 20 + i % 10, ts, 100.0)
+        stores[f"room{r + 1}"] = store
+    return stores
+
+
+async def poller(port, path, conditional, deadline, mutate=None):
+    """One keep-alive client polling `path` until deadline; returns (requests, statuses)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    etag = None
+    count = 0
+    statuses = {}
+    while time.perf_counter() < deadline:
+        if mutate:
+            mutate()
+        header = f"If-None-Match: {etag}\r\n" if conditional and etag else ""
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{header}\r\n".encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode().split('\r\n')
+        status = int(lines[0].split(' ')[1])
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            if name.lower() == 'etag':
+                etag = value.strip()
+            elif name.lower() == 'content-length':
+                length = int(value)
+        if length:
+            await reader.readexactly(length)
+        statuses[status] = statuses.get(status, 0) + 1
+        count += 1
+    writer.close()
+    return count, statuses
+
+
+async def run_mode(server, path, conditional, connections, duration, mutate=None):
+    deadline = time.perf_counter() + duration
+    results = await asyncio.gather(*(
+        poller(server.port, path, conditional, deadline, mutate) for _ in range(connections)
+    ))
+    total = sum(count for count, _ in results)
+    statuses = {}
+    for _, s in results:
+        for code, n in s.items():
+            statuses[code] = statuses.get(code, 0) + n
+    return total / duration, statuses
+
+
+async def run_benchmark(rooms, points, connections, duration):
+    print("=" * 70)
+    print(" 📊 REST API POLLING BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n🏠 Rooms: {rooms}   📈 Points per series: {points}")
+    print(f"🔌 Keep-alive connections: {connections}   ⏱️  {duration}s per mode\n")
+
+    stores = make_stores(rooms, points)
+    server = await RestApiServer(stores, host='127.0.0.1', port=0).start()
+    store = stores['room1']
+    tick = [0]
+
+    def mutate():
+        tick[0] += 1
+        store.add_data('temperature', 20 + tick[0] % 10, datetime.utcnow().isoformat() + 'Z', 99.0)
+
+    modes = [
+        ("Latest, If-None-Match (304)", '/api/latest', True, None),
+        ("Latest, cached 200", '/api/latest', False, None),
+        ("Latest, changes every poll", '/api/latest', True, mutate),
+        ("Series, If-None-Match (304)", '/api/rooms/room1/temperature/series', True, None),
+        ("Series, cached 200", '/api/rooms/room1/temperature/series', False, None),
+    ]
+
+    print(f"{'Mode':32} {'Req/s':>10}  Statuses")
+    print("-" * 70)
+    for name, path, conditional, mutator in modes:
+        rate, statuses = await run_mode(server, path, conditional, connections, duration, mutator)
+        print(f"{name:32} {rate:10,.0f}  {dict(sorted(statuses.items()))}")
+
+    api = server.api
+    print(f"\n🧮 Encodes: {api.encodes:,}   Cache hits: {api.hits:,}   304s: {api.not_modified:,}")
+    print("=" * 70 + "\n")
+    await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="REST API hot-polling benchmark")
+    parser.add_argument("--rooms", type=int, default=50, help="Rooms (one DataStore each)")
+    parser.add_argument("--points", type=int, default=100, help="Points per series")
+    parser.add_argument("--connections", type=int, default=20, help="Concurrent keep-alive pollers")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per mode")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.rooms, args.points, args.connections, args.duration))
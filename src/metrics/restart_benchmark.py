@@ -0,0 +1,116 @@
+"""
+Alert Restart Benchmark
+Measures snapshot size and save/restore time, then restart-to-steady-state
+with a buffered backlog, comparing a warm restart (snapshot + catch-up)
+against a cold start that rebuilds state from the backlog alone
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Allow running as `python src/metrics/restart_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem  # noqa: E402
+from src.alerts.persistence import CatchUp, StateSnapshotter  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+SAMPLE_PERIOD = 3.0
+
+
+def readings(rooms, start, count):
+    """Every room reports all four sensors each period; a quarter of the rooms run hot"""
+    for i in range(count):
+        now = start + i * SAMPLE_PERIOD
+        for r in range(rooms):
+            room = f"room{r}"
+            hot = r % 4 == 0
+            yield room, 'temperature', 30.0 if hot else 24.0, now
+            yield room, 'humidity', 65.0 if hot else 50.0, now
+            yield room, 'co2', 1150.0 if hot else 700.0, now
+            yield room, 'light', 400.0, now
+
+
+def feed(alerts, stream, catch_up=None):
+    processed = 0
+    for room, sensor, value, now in stream:
+        if catch_up is not None and not catch_up.admit(room, sensor, now):
+            continue
+        alerts.process_reading(sensor, value, room, now=now, hour=12)
+        processed += 1
+    return processed
+
+
+def run_benchmark(rooms, history, downtime, overlap):
+    print("=" * 70)
+    print(" 📊 ALERT RESTART BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    sensors = rooms * 4
+    print(f"\n🏠 Rooms: {rooms:,} ({sensors:,} sensors, bundled rules incl. 5/30-minute windows)")
+    print(f"📜 History before restart: {history} periods   💤 Downtime: {downtime} periods "
+          f"(+{overlap} already-applied)\n")
+
+    rules = RuleEngine.from_file()
+    now = time.time()
+    start = now - (history + downtime) * SAMPLE_PERIOD
+    alerts = AlertSystem(rules)
+    feed(alerts, readings(rooms, start, history))
+    active_before = len(alerts.active_alerts())
+
+    path = os.path.join(tempfile.mkdtemp(), 'alert_state.snapshot')
+    snapshotter = StateSnapshotter(alerts, path)
+    t0 = time.perf_counter()
+    snapshotter.save()
+    save_ms = (time.perf_counter() - t0) * 1000
+
+    # The broker's buffered backlog: what arrived while down, plus a few readings
+    # from just before the snapshot (QoS 1 redelivery)
+    backlog_start = start + (history - overlap) * SAMPLE_PERIOD
+    backlog = list(readings(rooms, backlog_start, downtime + overlap))
+
+    # Warm restart: load snapshot, replay the backlog through catch-up
+    t0 = time.perf_counter()
+    warm = AlertSystem(rules)
+    restored, load_ms = StateSnapshotter(warm, path).load()
+    catch_up = CatchUp(warm.tracker, live_lag=SAMPLE_PERIOD * 2, started=t0)
+    warm_processed = feed(warm, backlog, catch_up)
+    warm_total = time.perf_counter() - t0
+    warm_refired = warm.alert_count - alerts.alert_count
+
+    # Cold start: no snapshot, the backlog is all there is
+    t0 = time.perf_counter()
+    cold = AlertSystem(rules)
+    feed(cold, backlog)
+    cold_total = time.perf_counter() - t0
+    longest_window = max((spec.window for rule in rules.defaults.values() for spec in rule.windows or ()),
+                         default=0)
+
+    print(f"💾 Snapshot: {snapshotter.last_size / 1024:,.1f} KB   capture {snapshotter.last_capture_ms:.1f} ms"
+          f"   save {save_ms:.1f} ms   restore {load_ms:.1f} ms ({restored:,} sensors)")
+    print(f"🚨 Alerts active at shutdown: {active_before:,}\n")
+
+    print(f"{'Restart':8} {'Backlog done':>13} {'Windows ready':>14} {'Processed':>10} {'Skipped':>8} "
+          f"{'Re-fired':>9} {'Active':>7}")
+    print("-" * 70)
+    print(f"{'Warm':8} {warm_total * 1000:10.1f} ms {'immediately':>14} {warm_processed:10,} "
+          f"{catch_up.skipped:8,} {warm_refired:9,} {len(warm.active_alerts()):7,}")
+    print(f"{'Cold':8} {cold_total * 1000:10.1f} ms {f'+{longest_window:.0f}s live':>14} {len(backlog):10,} "
+          f"{0:8,} {cold.alert_count:9,} {len(cold.active_alerts()):7,}")
+    print("\n🪟 A cold start re-fires every ongoing condition and its window alerts stay")
+    print("   silent until each window has seen a full period of live data again.")
+    print("=" * 70 + "\n")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert state snapshot/restart benchmark")
+    parser.add_argument("--rooms", type=int, default=2500, help="Rooms (4 sensors each)")
+    parser.add_argument("--history", type=int, default=200, help="Sample periods before the restart")
+    parser.add_argument("--downtime", type=int, default=20, help="Sample periods buffered while down")
+    parser.add_argument("--overlap", type=int, default=5, help="Redelivered periods the snapshot already saw")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.history, args.downtime, args.overlap)
@@ -0,0 +1,153 @@
+"""
+Rule Engine Benchmark
+Measures threshold evaluations/second for the compiled per-room rule engine
+against the original global-dict check (no rooms) and a straightforward
+per-message merge of the same room rules
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+# Allow running as `python src/metrics/rule_engine_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.rules import THRESHOLDS, RuleEngine  # noqa: E402
+
+SENSORS = list(THRESHOLDS)
+
+
+def legacy_check(sensor_type, value):
+    """The original AlertSystem.check_thresholds (global dict, no rooms)"""
+    if sensor_type not in THRESHOLDS:
+        return None
+    threshold = THRESHOLDS[sensor_type]
+    if threshold['min'] is not None and value < threshold['min']:
+        return {'type': 'LOW', 'threshold': threshold['min'], 'value': value, 'unit': threshold['unit']}
+    if threshold['max'] is not None and value > threshold['max']:
+        return {'type': 'HIGH', 'threshold': threshold['max'], 'value': value, 'unit': threshold['unit']}
+    return None
+
+
+def merged_check(config, room, sensor_type, value, hour):
+    """Room-aware check without compilation: merge defaults, override and profile per message"""
+    spec = {**config['defaults'].get(sensor_type, {}),
+            **config['rooms'].get(room, {}).get(sensor_type, {})}
+    for profile in spec.get('profiles', []):
+        start, end = profile['hours']
+        if (start <= hour < end) if start < end else (hour >= start or hour < end):
+            spec = {**spec, **profile}
+    if spec.get('min') is not None and value < spec['min']:
+        return {'type': 'LOW', 'threshold': spec['min'], 'value': value, 'unit': spec['unit']}
+    if spec.get('max') is not None and value > spec['max']:
+        return {'type': 'HIGH', 'threshold': spec['max'], 'value': value, 'unit': spec['unit']}
+    return None
+
+
+def make_config(rooms, override_ratio):
+    """Default rules plus per-room overrides (with a night profile) for a share of rooms"""
+    config = {
+        'defaults': {sensor: {**spec, 'critical_max': (spec['max'] or 0) * 1.5}
+                     for sensor, spec in THRESHOLDS.items()},
+        'rooms': {}
+    }
+    rng = random.Random(1)
+    for r in range(rooms):
+        if rng.random() < override_ratio:
+            config['rooms'][f"room{r}"] = {
+                'temperature': {'max': 24 + rng.randint(0, 4)},
+                'co2': {'max': 1200, 'profiles': [{'hours': [22, 7], 'max': 900}]},
+            }
+    return config
+
+
+def make_stream(rooms, count, violation_ratio):
+    rng = random.Random(2)
+    normal = {'temperature': 22.0, 'humidity': 50.0, 'co2': 600.0, 'light': 400.0}
+    high = {'temperature': 35.0, 'humidity': 80.0, 'co2': 2000.0, 'light': 1500.0}
+    stream = []
+    for _ in range(count):
+        sensor = rng.choice(SENSORS)
+        value = high[sensor] if rng.random() < violation_ratio else normal[sensor]
+        stream.append((f"room{rng.randrange(rooms)}", sensor, value))
+    return stream
+
+
+def time_engine(engine, stream, hour):
+    evaluate = engine.evaluate
+    start = time.perf_counter()
+    for room, sensor, value in stream:
+        evaluate(room, sensor, value, hour)
+    return time.perf_counter() - start
+
+
+def time_merged(config, stream, hour):
+    start = time.perf_counter()
+    for room, sensor, value in stream:
+        merged_check(config, room, sensor, value, hour)
+    return time.perf_counter() - start
+
+
+def time_legacy(stream):
+    start = time.perf_counter()
+    for _room, sensor, value in stream:
+        legacy_check(sensor, value)
+    return time.perf_counter() - start
+
+
+def happy_path_allocations(engine, stream, hour):
+    """Net memory blocks still allocated after evaluating normal readings"""
+    evaluate = engine.evaluate
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for room, sensor, value in stream:
+        evaluate(room, sensor, value, hour)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return sum(s.count_diff for s in stats if 'rules.py' in s.traceback[0].filename)
+
+
+def run_benchmark(rooms, messages, override_ratio, rounds):
+    print("=" * 70)
+    print(" 📊 RULE ENGINE BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+
+    config = make_config(rooms, override_ratio)
+    start = time.perf_counter()
+    engine = RuleEngine(config)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"\n🏠 Rooms: {rooms:,}   🧩 Compiled rules: {engine.rule_count():,} "
+          f"({engine.band_count()} distinct bands) in {compile_ms:.1f} ms")
+    print(f"📨 Messages per round: {messages:,}   🔁 Rounds: {rounds}\n")
+
+    print("Evaluations/second (best of rounds):")
+    print(f"{'Workload':16} {'Global dict':>13} {'Merged/msg':>13} {'Compiled':>13} {'vs merged':>10}")
+    print(f"{'':16} {'(no rooms)':>13}")
+    print("-" * 70)
+    for label, ratio in (("All normal", 0.0), ("1% violations", 0.01), ("20% violations", 0.2)):
+        stream = make_stream(rooms, messages, ratio)
+        legacy = min(time_legacy(stream) for _ in range(rounds))
+        merged = min(time_merged(config, stream, 3) for _ in range(rounds))
+        compiled = min(time_engine(engine, stream, 3) for _ in range(rounds))
+        print(f"{label:16} {messages / legacy:13,.0f} {messages / merged:13,.0f} "
+              f"{messages / compiled:13,.0f} {merged / compiled:9.1f}x")
+
+    leaked = happy_path_allocations(engine, make_stream(rooms, 100000, 0.0), 3)
+    print(f"\n🧮 Blocks allocated by 100,000 happy-path evaluations: {leaked}")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compiled alert rule engine benchmark")
+    parser.add_argument("--rooms", type=int, default=5000, help="Rooms in the rule set")
+    parser.add_argument("--messages", type=int, default=500000, help="Readings per round")
+    parser.add_argument("--override-ratio", type=float, default=0.3,
+                        help="Share of rooms with their own overrides")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed rounds (best is reported)")
+    args = parser.parse_args()
+
+    run_benchmark(args.rooms, args.messages, args.override_ratio, args.rounds)
@@ -0,0 +1,123 @@
+"""
+Shared Snapshot Benchmark
+Simulates concurrent dashboard sessions and compares per-session DataStore reads
+with the shared per-version RenderSnapshot
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Allow running as `python src/metrics/snapshot_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.dashboard.charts import create_gauge, create_trend_chart  # noqa: E402
+from src.dashboard.data_store import DataStore  # noqa: E402
+from src.dashboard.snapshot import SnapshotCache  # noqa: E402
+
+CHARTS = [
+    ('temperature', "Temperature", "#FF6B6B", "°C", 22, 15, 40, [20, 28]),
+    ('humidity', "Humidity", "#4ECDC4", "%", 50, 0, 100, [40, 60]),
+    ('co2', "CO2 Level", "#95E1D3", "ppm", 600, 400, 2000, [400, 1000]),
+    ('light', "Light Level", "#FFE66D", "lux", 400, 0, 1000, [200, 800]),
+]
+
+
+def render_per_session(data_store):
+    """The page as it used to read the store: every session copies every series itself"""
+    stats = data_store.get_stats()
+    _ = [len(data_store.get_data(sensor)) for sensor, *_ in CHARTS]  # sidebar counts
+    for sensor, title, color, unit, default, lo, hi, band in CHARTS:
+        data = data_store.get_data(sensor)
+        create_gauge(data[-1]['value'] if data else default, title, lo, hi, unit, band)
+    for sensor, title, color, unit, *_ in CHARTS:
+        create_trend_chart(data_store.get_data(sensor), title, color, unit)
+    return stats['message_count']
+
+
+def render_with_snapshot(snapshot_cache):
+    """The page reading one shared snapshot per data version"""
+    snapshot = snapshot_cache.get()
+    _ = [snapshot.counts[sensor] for sensor, *_ in CHARTS]
+    for sensor, title, color, unit, default, lo, hi, band in CHARTS:
+        snapshot.gauge(sensor, default, title, lo, hi, unit, band)
+    for sensor, title, color, unit, *_ in CHARTS:
+        snapshot.trend_chart(sensor, title, color, unit)
+    return snapshot.message_count
+
+
+def publish_tick(data_store, tick):
+    ts = (datetime(2024, 1, 1) + timedelta(seconds=3 * tick)).isoformat() + 'Z'
+    for sensor, *_, default, _lo, _hi, _band in CHARTS:
+        data_store.add_data(sensor, default + tick % 7, ts, 100.0)
+
+
+def run_mode(render, data_store, sessions, ticks):
+    """Run `ticks` refresh rounds of `sessions` concurrent renders; return per-tick seconds"""
+    tick_times = []
+    for tick in range(ticks):
+        publish_tick(data_store, tick)
+        barrier = threading.Barrier(sessions + 1)
+
+        def session():
+            barrier.wait()
+            render()
+
+        threads = [threading.Thread(target=session) for _ in range(sessions)]
+        for t in threads:
+            t.start()
+        start = time.perf_counter()
+        barrier.wait()
+        for t in threads:
+            t.join()
+        tick_times.append(time.perf_counter() - start)
+    return tick_times
+
+
+def run_benchmark(sessions, ticks, points):
+    print("=" * 70)
+    print(" 📊 SHARED SNAPSHOT BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n👥 Concurrent sessions: {sessions}")
+    print(f"🔁 Refresh ticks:       {ticks}")
+    print(f"📈 Points per series:   {points}\n")
+
+    results = {}
+
+    store = DataStore(maxlen=points)
+    for tick in range(points):
+        publish_tick(store, tick)
+    results['Per-session reads'] = run_mode(
+        lambda: render_per_session(store), store, sessions, ticks)
+
+    store = DataStore(maxlen=points)
+    for tick in range(points):
+        publish_tick(store, tick)
+    cache = SnapshotCache(store)
+    results['Shared snapshot'] = run_mode(
+        lambda: render_with_snapshot(cache), store, sessions, ticks)
+
+    baseline = statistics.median(results['Per-session reads'])
+    print(f"{'Mode':22} {'Median tick':>12} {'Per session':>12} {'Speedup':>9}")
+    print("-" * 70)
+    for name, times in results.items():
+        median = statistics.median(times)
+        print(f"{name:22} {median * 1000:9.1f} ms {median / sessions * 1000:9.2f} ms "
+              f"{baseline / median:8.1f}x")
+    print(f"\n🧮 Snapshot builds: {cache.builds} for {ticks} ticks x {sessions} sessions")
+    print("=" * 70 + "\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent dashboard session benchmark")
+    parser.add_argument("--sessions", type=int, default=50, help="Simulated browser sessions")
+    parser.add_argument("--ticks", type=int, default=10, help="Refresh rounds")
+    parser.add_argument("--points", type=int, default=100, help="Points per series (DataStore maxlen)")
+    args = parser.parse_args()
+
+    run_benchmark(args.sessions, args.ticks, args.points)
@@ -0,0 +1,87 @@
+"""
+Alert Storm Benchmark
+A building-wide HVAC failure: every room goes over the temperature limit
+within a minute and recovers later. Counts what the console and sound sinks
+receive with and without storm grouping, and the ingest cost of grouping
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Allow running as `python src/metrics/storm_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem  # noqa: E402
+from src.alerts.notify import NotificationDispatcher  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+
+PATTERN = r'^room(?P<floor>\d+)\d\d$'
+
+
+class CountingSink:
+    def __init__(self, name, audit=False):
+        self.name = name
+        self.audit = audit
+        self.kinds = {}
+
+    def send(self, n):
+        self.kinds[n.kind] = self.kinds.get(n.kind, 0) + 1
+
+
+def hvac_failure(floors, per_floor, passes):
+    """Readings of every room: normal, over the limit for `passes` passes, normal again"""
+    rooms = [f"room{floor}{i:02d}" for floor in range(1, floors + 1) for i in range(per_floor)]
+    profile = [24.0] + [31.0] * passes + [24.0] * 3
+    for step, value in enumerate(profile):
+        for room in rooms:
+            yield room, value, float(step)
+
+
+def run(floors, per_floor, passes, storm):
+    config = {'defaults': {'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'critical_max': 32,
+                                           'hysteresis': 0.5, 'debounce': [2, 3]}}}
+    if storm:
+        config['storm'] = {'level': 'floor', 'window': 60, 'min_rooms': 5, 'pattern': PATTERN}
+    console, sound, eventlog = CountingSink('console'), CountingSink('sound'), CountingSink('eventlog', True)
+    dispatcher = NotificationDispatcher([console, sound, eventlog], maxsize=100000,
+                                        limits={'sound': (3, 60)}).start()
+    alerts = AlertSystem(RuleEngine(config), dispatcher)
+    readings = list(hvac_failure(floors, per_floor, passes))
+    start = time.perf_counter()
+    for room, value, step in readings:
+        alerts.process_reading('temperature', value, room, '°C', now=step, hour=12)
+    elapsed = time.perf_counter() - start
+    dispatcher.stop()
+    return alerts, console, dispatcher.stats(), eventlog, len(readings) / elapsed
+
+
+def run_benchmark(floors, per_floor, passes):
+    print("=" * 70)
+    print(" 📊 ALERT STORM BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    print(f"\n🏢 {floors} floors x {per_floor} rooms = {floors * per_floor} rooms over the limit at once")
+    print("🔊 Sound sink rate limit: 3 per 60 s\n")
+
+    print(f"{'Mode':16} {'Alerts':>8} {'Console':>9} {'Storms':>8} {'Beeps':>7} {'Limited':>8} "
+          f"{'Audit':>7} {'Ingest/s':>10}")
+    print("-" * 70)
+    for mode, storm in (('individual', False), ('grouped', True)):
+        alerts, console, stats, eventlog, rate = run(floors, per_floor, passes, storm)
+        storms = sum(count for kind, count in console.kinds.items() if kind.startswith('storm'))
+        print(f"{mode:16} {alerts.alert_count:8,} {sum(console.kinds.values()):9,} {storms:8,} "
+              f"{stats['sound']['sent']:7,} {stats['sound']['limited']:8,} "
+              f"{sum(eventlog.kinds.values()):7,} {rate:10,.0f}")
+    print("\n🗂️  Audit = notifications kept by the event log (every raise and clear in both modes)")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Alert storm grouping benchmark")
+    parser.add_argument("--floors", type=int, default=5, help="Floors in the building")
+    parser.add_argument("--rooms-per-floor", type=int, default=100, help="Rooms on each floor")
+    parser.add_argument("--passes", type=int, default=5, help="Readings per room during the failure")
+    args = parser.parse_args()
+
+    run_benchmark(args.floors, args.rooms_per_floor, args.passes)
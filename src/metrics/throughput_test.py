@@ -1,30 +1,129 @@
 """
 Throughput Test Script
 Measures message throughput (messages per second)
+
+Passive mode (the default) counts what the sensor simulators publish and
+compares it with the rate their sampling intervals should give.
+
+Saturation mode (--saturate) finds the maximum sustainable rate instead: a
+fleet of publisher connections sends stepped rates of probe readings
+through the broker into a consumer under test (a null sink, the dashboard's
+DataStore ingest or the AlertSystem), once per payload format. Every probe
+carries its scheduled perf_counter_ns, so each step reports delivery, loss
+and latency percentiles; the knee is the first step whose loss, p99 latency
+or delivered rate misses its limit, and the step before it is the maximum
+sustainable msg/s.
+
+The broker is configured like the sensors (MQTT_BROKER, MQTT_PORT,
+MQTT_USE_TLS, MQTT_USERNAME, MQTT_PASSWORD, .env) or with --broker/--port/--tls.
+
+Usage:
+    python src/metrics/throughput_test.py --duration 60
+    python src/metrics/throughput_test.py --saturate --consumers null,datastore,alerts --formats json,binary
 """
 
-import paho.mqtt.client as mqtt
-import time
+import argparse
 import json
-from datetime import datetime
+import os
+import re
+import ssl
+import struct
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import paho.mqtt.client as mqtt
+from dotenv import load_dotenv
+
+# Allow running as `python src/metrics/throughput_test.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem, reading_time  # noqa: E402
+from src.alerts.latency import LatencyHistogram  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+from src.dashboard.data_store import DataStore  # noqa: E402
+
+load_dotenv()
+
+# Same variables as the sensors; without MQTT_BROKER, a local plain-TCP broker
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+MQTT_PORT = int(os.getenv("MQTT_PORT", 8883 if MQTT_USE_TLS else 1883))
+MQTT_USERNAME = os.getenv("MQTT_USERNAME")
+MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
+
+SENSOR_CONFIG = os.path.join(os.path.dirname(__file__), '..', 'sensors', 'sensor_config.json')
+SENSORS = ('temperature', 'humidity', 'co2', 'light')
+UNITS = {'temperature': '°C', 'humidity': '%', 'co2': 'ppm', 'light': 'lux'}
+VALUES = {'temperature': 24.0, 'humidity': 50.0, 'co2': 600.0, 'light': 400.0}
+
+DEFAULT_RATES = "250,500,1000,2000,4000,8000,16000"
+
+
+def make_client(client_id, userdata=None):
+    client = mqtt.Client(
+        client_id=client_id,
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        protocol=mqtt.MQTTv311,
+        userdata=userdata
+    )
+    if MQTT_USERNAME and MQTT_PASSWORD:
+        client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+    if MQTT_USE_TLS:
+        client.tls_set(cert_reqs=ssl.CERT_REQUIRED, tls_version=ssl.PROTOCOL_TLSv1_2)
+    return client
+
+
+class WindowCounter:
+    """Message counts in fixed-width time buckets: O(1) per message, O(windows) to report"""
+
+    def __init__(self, width, start=None):
+        self.width = width
+        self.start = time.time() if start is None else start
+        self.counts = []
+
+    def add(self, t):
+        index = int((t - self.start) // self.width)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+
+    def rates(self):
+        """[(offset seconds, msg/s)] per window"""
+        return [(i * self.width, count / self.width) for i, count in enumerate(self.counts)]
+
+
+def expected_rate(path=SENSOR_CONFIG):
+    """msg/s the enabled simulators publish (one reading per sampling_rate seconds each)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            sensors = json.load(f)['sensors']
+    except (OSError, ValueError, KeyError):
+        return 4 / 3
+    return sum(1 / spec['sampling_rate'] for spec in sensors.values() if spec.get('enabled', True))
+
 
 class ThroughputTester:
-    def __init__(self):
+    def __init__(self, duration=60, window=5):
         self.message_count = 0
-        self.test_duration = 60  # seconds
-        self.message_timestamps = []
+        self.test_duration = duration  # seconds
+        self.window_size = window
+        self.windows = None
         self.sensor_counts = {
             'temperature': 0,
             'humidity': 0,
             'co2': 0,
             'light': 0
         }
-        
-        self.client = mqtt.Client(client_id="throughput_tester")
+
+        self.client = make_client("throughput_tester")
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
-    
-    def on_connect(self, client, userdata, flags, rc):
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             print("✅ Connected to MQTT Broker")
             topics = [
@@ -36,19 +135,19 @@ class ThroughputTester:
             for topic in topics:
                 client.subscribe(topic)
             print(f"📡 Subscribed to {len(topics)} topics\n")
-    
+
     def on_message(self, client, userdata, msg):
         """Count messages"""
         try:
             self.message_count += 1
-            self.message_timestamps.append(time.time())
-            
+            self.windows.add(time.time())
+
             payload = json.loads(msg.payload.decode())
             sensor_type = payload.get('sensor_type', 'unknown')
-            
+
             if sensor_type in self.sensor_counts:
                 self.sensor_counts[sensor_type] += 1
-            
+
             # Print every 10 messages
             if self.message_count % 10 == 0:
                 elapsed = time.time() - self.start_time
@@ -56,100 +155,357 @@ class ThroughputTester:
                 print(f"📨 Messages: {self.message_count:4} | "
                       f"Rate: {current_rate:.2f} msg/s | "
                       f"Elapsed: {elapsed:.1f}s")
-            
+
         except Exception as e:
             print(f"⚠️  Error: {e}")
-    
+
     def run_test(self):
         """Run throughput test"""
         print("="*70)
         print(" 📊 THROUGHPUT TEST - IoT Monitoring System")
         print("="*70)
         print(f"\n⏱️  Test Duration: {self.test_duration} seconds")
+        print(f"🔌 Broker: {MQTT_BROKER}:{MQTT_PORT}")
         print("🎯 Measuring: Messages received per second\n")
-        
+
         try:
-            self.client.connect("localhost", 1883, 60)
-            self.client.loop_start()
-            
             self.start_time = time.time()
-            
+            self.windows = WindowCounter(self.window_size, self.start_time)
+            self.client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            self.client.loop_start()
+
             # Run test
             while time.time() - self.start_time < self.test_duration:
                 time.sleep(0.1)
-            
+
             self.client.loop_stop()
             self.client.disconnect()
-            
+
             # Calculate statistics
             self.print_results()
-            
+
         except KeyboardInterrupt:
             print("\n\n⏹️  Test stopped by user")
             self.print_results()
         except Exception as e:
             print(f"\n❌ Error: {e}")
-    
+
     def print_results(self):
         """Print test results"""
         print("\n" + "="*70)
         print(" 📈 TEST RESULTS")
         print("="*70)
-        
+
         elapsed = time.time() - self.start_time
-        
+
         print(f"\n📊 Total Messages Received: {self.message_count}")
         print(f"⏱️  Test Duration:          {elapsed:.2f} seconds")
         print(f"📈 Average Throughput:      {self.message_count/elapsed:.2f} messages/second")
-        
+
         print("\n📡 Messages by Sensor Type:")
         for sensor, count in self.sensor_counts.items():
             rate = count / elapsed if elapsed > 0 else 0
             print(f"   {sensor:12}: {count:4} messages ({rate:.2f} msg/s)")
-        
-        # Calculate throughput over time (5-second windows)
-        if self.message_timestamps:
-            print("\n📊 Throughput Over Time (5-second windows):")
-            window_size = 5
-            start = self.message_timestamps[0]
-            end = self.message_timestamps[-1]
-            
-            current_window = start
-            while current_window < end:
-                window_end = current_window + window_size
-                count = sum(1 for t in self.message_timestamps 
-                           if current_window <= t < window_end)
-                rate = count / window_size
-                
-                elapsed_from_start = current_window - start
+
+        # Throughput over time from the streaming window counts
+        if self.message_count:
+            print(f"\n📊 Throughput Over Time ({self.window_size}-second windows):")
+            for offset, rate in self.windows.rates():
                 bar = "█" * int(rate * 2)
-                print(f"   {elapsed_from_start:5.0f}s - {elapsed_from_start+window_size:5.0f}s: "
+                print(f"   {offset:5.0f}s - {offset + self.window_size:5.0f}s: "
                       f"{rate:5.2f} msg/s {bar}")
-                
-                current_window = window_end
-        
-        # Performance rating
+
+        # Performance rating: share of what the simulators should have sent
         avg_throughput = self.message_count / elapsed if elapsed > 0 else 0
-        if avg_throughput >= 1.0:
+        expected = expected_rate()
+        delivered = avg_throughput / expected if expected else 0
+        if delivered >= 0.99:
             rating = "🌟 EXCELLENT"
-        elif avg_throughput >= 0.5:
+        elif delivered >= 0.95:
             rating = "✅ GOOD"
-        elif avg_throughput >= 0.2:
+        elif delivered >= 0.8:
             rating = "⚠️  ACCEPTABLE"
         else:
             rating = "❌ POOR"
-        
-        print(f"\n🏆 Performance Rating: {rating}")
-        
+
+        print(f"\n🏆 Performance Rating: {rating} ({delivered:.0%} of the {expected:.2f} msg/s "
+              f"the simulators publish)")
+        print("   For the maximum sustainable rate run with --saturate")
+
         # Data rate estimate
         if self.message_count > 0:
             avg_message_size = 250  # bytes (approximate)
             data_rate_bytes = avg_throughput * avg_message_size
             data_rate_kb = data_rate_bytes / 1024
             print(f"📡 Estimated Data Rate: {data_rate_kb:.2f} KB/s")
-        
+
         print("="*70 + "\n")
 
+
+# ---- saturation mode ---------------------------------------------------------
+
+# sensor index, value, wall clock time_ns, scheduled perf_counter_ns
+BINARY = struct.Struct('!BdQQ')
+_PROBE = re.compile(rb'"probe_ns": (\d+)')
+FORMATS = ('json', 'minimal', 'binary')
+
+
+def iso_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+
+
+def encode(fmt, sensor, value, probe_ns, count=0):
+    """Payload of one probe reading: a full simulator message, its bare fields, or packed binary"""
+    if fmt == 'binary':
+        return BINARY.pack(SENSORS.index(sensor), value, time.time_ns(), probe_ns)
+    message = {'probe_ns': probe_ns, 'sensor_type': sensor, 'value': value, 'timestamp': iso_now()}
+    if fmt == 'json':
+        message.update({'sensor_id': f"{sensor.upper()}_BENCH", 'unit': UNITS[sensor], 'battery_level': 99.5,
+                        'message_count': count, 'location': 'Saturation Test'})
+    return json.dumps(message).encode()
+
+
+def probe_of(fmt, payload):
+    """Scheduled perf_counter_ns of a probe, without decoding the rest"""
+    if fmt == 'binary':
+        return BINARY.unpack_from(payload)[3]
+    return int(_PROBE.search(payload).group(1))
+
+
+def decode(fmt, payload):
+    """(sensor_type, value, unit, ISO timestamp, battery) as the consumers need them"""
+    if fmt == 'binary':
+        index, value, wall_ns, _ = BINARY.unpack(payload)
+        sensor = SENSORS[index]
+        stamp = datetime.fromtimestamp(wall_ns / 1e9, timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+        return sensor, value, UNITS[sensor], stamp, 100
+    data = json.loads(payload)
+    sensor = data['sensor_type']
+    return sensor, data['value'], data.get('unit', UNITS[sensor]), data['timestamp'], data.get('battery_level', 100)
+
+
+def make_consumer(name, fmt):
+    """consume(topic, payload) for a consumer under test"""
+    if name == 'null':
+        return lambda topic, payload: None
+    if name == 'datastore':
+        store = DataStore(maxlen=100)
+
+        def consume(topic, payload):
+            sensor, value, _, stamp, battery = decode(fmt, payload)
+            store.add_data(sensor, value, stamp, battery)
+        return consume
+    if name == 'alerts':
+        alerts = AlertSystem(RuleEngine.from_file())
+
+        def consume(topic, payload):
+            sensor, value, unit, stamp, _ = decode(fmt, payload)
+            alerts.process_reading(sensor, value, topic.rsplit('/', 2)[-2], unit, now=reading_time(stamp))
+        return consume
+    raise ValueError(f"unknown consumer {name!r} (null, datastore, alerts)")
+
+
+class Step:
+    """Counters of one offered rate"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.histogram = LatencyHistogram()
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.start = 0
+        self.publish_seconds = 0.0
+
+    def loss(self):
+        return 1 - self.received / self.sent if self.sent else 0.0
+
+    def publish_rate(self):
+        return self.sent / self.publish_seconds if self.publish_seconds else 0.0
+
+
+class SaturationTester:
+    """A publisher fleet and one subscriber that feeds every probe to the consumer under test"""
+
+    def __init__(self, publishers=4, sensors=100, qos=0, prefix="metrics/throughput"):
+        self.sensors = sensors
+        self.qos = qos
+        self.root = f"{prefix}/{uuid.uuid4().hex[:8]}"
+        self.fleet = [make_client(f"saturation_pub{i}_{os.getpid()}", threading.Event()) for i in range(publishers)]
+        self.subscriber = make_client(f"saturation_sub_{os.getpid()}", threading.Event())
+        self.subscriber.on_message = self.on_message
+        for client in self.fleet + [self.subscriber]:
+            client.on_connect = self.on_connect
+            client.max_inflight_messages_set(1000)
+        self.step = None
+        self.fmt = None
+        self.consume = None
+        self.topics = []
+
+    def connect(self, timeout=10):
+        for client in [self.subscriber] + self.fleet:
+            client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            client.loop_start()
+            if not client.user_data_get().wait(timeout):
+                raise ConnectionError(f"no CONNACK from {MQTT_BROKER}:{MQTT_PORT} within {timeout}s")
+        self.subscriber.subscribe(f"{self.root}/#", qos=self.qos)
+        time.sleep(0.5)
+
+    def close(self):
+        for client in self.fleet + [self.subscriber]:
+            client.loop_stop()
+            client.disconnect()
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            userdata.set()
+        else:
+            print(f"❌ Connection failed: {rc}")
+
+    def on_message(self, client, userdata, msg):
+        step = self.step
+        if step is None:
+            return
+        try:
+            probe = probe_of(self.fmt, msg.payload)
+            if probe < step.start:
+                return  # a straggler from an earlier step
+            self.consume(msg.topic, msg.payload)
+        except Exception:
+            step.errors += 1
+            return
+        step.received += 1
+        step.histogram.record(time.perf_counter_ns() - probe)
+
+    def _publish(self, client, first, step, count, topics):
+        """Publisher thread: every len(fleet)-th probe of the step, on its scheduled time"""
+        interval = 1e9 / step.rate
+        stride = len(self.fleet)
+        for seq in range(first, count, stride):
+            scheduled = step.start + int(seq * interval)
+            ahead = scheduled - time.perf_counter_ns()
+            if ahead > 200_000:
+                time.sleep(ahead / 1e9)
+            topic, sensor = topics[seq % len(topics)]
+            client.publish(topic, encode(self.fmt, sensor, VALUES[sensor], scheduled, seq), qos=self.qos)
+
+    def run_step(self, rate, seconds, drain=2.0):
+        step = Step(rate)
+        count = int(rate * seconds)
+        step.start = time.perf_counter_ns()
+        self.step = step
+        threads = [threading.Thread(target=self._publish, args=(client, i, step, count, self.topics), daemon=True)
+                   for i, client in enumerate(self.fleet)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        step.sent = count
+        step.publish_seconds = (time.perf_counter_ns() - step.start) / 1e9
+        deadline = time.monotonic() + drain
+        while step.received + step.errors < step.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.step = None
+        return step
+
+    def saturate(self, consumer, fmt, rates, seconds, limits):
+        """Steps until the knee; returns (steps, max sustainable msg/s, reason at the knee)"""
+        self.fmt = fmt
+        self.consume = make_consumer(consumer, fmt)
+        self.topics = [(f"{self.root}/{consumer}-{fmt}/room{i // len(SENSORS)}/{SENSORS[i % len(SENSORS)]}",
+                        SENSORS[i % len(SENSORS)]) for i in range(self.sensors)]
+        steps, best = [], 0.0
+        for rate in rates:
+            step = self.run_step(rate, seconds)
+            steps.append(step)
+            reason = knee_reason(step, seconds, limits)
+            print(f"   {consumer:9} {fmt:7} {rate:8,.0f} msg/s -> {step.received / seconds:8,.0f} delivered, "
+                  f"loss {step.loss():6.2%}, p99 {step.histogram.percentile(99) / 1e6:8.1f} ms"
+                  + (f"  ⛔ {reason}" if reason else ""))
+            if reason:
+                return steps, best, reason
+            best = step.received / seconds
+        return steps, best, "no knee within the tested rates"
+
+
+def knee_reason(step, seconds, limits):
+    """Why a step is past the knee, or None if it is sustainable"""
+    max_loss, max_p99_ms = limits
+    if step.publish_rate() < 0.95 * step.rate:
+        return f"publisher fleet only reached {step.publish_rate():,.0f} msg/s"
+    if step.loss() > max_loss:
+        return f"loss {step.loss():.2%} > {max_loss:.2%}"
+    p99 = step.histogram.percentile(99) / 1e6
+    if p99 > max_p99_ms:
+        return f"p99 {p99:.0f} ms > {max_p99_ms:g} ms"
+    if step.received / seconds < 0.95 * step.rate:
+        return f"delivered {step.received / seconds:,.0f} msg/s < 95% of offered"
+    return None
+
+
+def run_saturation(args):
+    print("=" * 70)
+    print(" 📊 SATURATION THROUGHPUT TEST - IoT Monitoring System")
+    print("=" * 70)
+    rates = [float(rate) for rate in args.rates.split(',')]
+    consumers = args.consumers.split(',')
+    formats = args.formats.split(',')
+    print(f"\n🔌 Broker: {MQTT_BROKER}:{MQTT_PORT}, QoS {args.qos}, {args.publishers} publishers, "
+          f"{args.sensors} sensors")
+    print(f"🎯 Steps of {args.step_seconds:g}s at {', '.join(f'{rate:g}' for rate in rates)} msg/s; "
+          f"knee at loss > {args.max_loss:.2%} or p99 > {args.max_p99_ms:g} ms\n")
+
+    tester = SaturationTester(args.publishers, args.sensors, args.qos)
+    results = []
+    try:
+        tester.connect()
+        for consumer in consumers:
+            for fmt in formats:
+                steps, best, reason = tester.saturate(consumer, fmt, rates, args.step_seconds,
+                                                      (args.max_loss, args.max_p99_ms))
+                results.append((consumer, fmt, best, reason))
+    except KeyboardInterrupt:
+        print("\n\n⏹️  Test stopped by user")
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+    finally:
+        tester.close()
+
+    print("\n" + "=" * 70)
+    print(" 📈 MAX SUSTAINABLE THROUGHPUT")
+    print("=" * 70)
+    print(f"{'Consumer':10} {'Format':8} {'msg/s':>10}  Knee")
+    print("-" * 70)
+    for consumer, fmt, best, reason in results:
+        print(f"{consumer:10} {fmt:8} {best:10,.0f}  {reason}")
+    print("=" * 70 + "\n")
+
+
+def main():
+    global MQTT_BROKER, MQTT_PORT, MQTT_USE_TLS
+    parser = argparse.ArgumentParser(description="MQTT throughput test")
+    parser.add_argument("--broker", default=MQTT_BROKER, help="Broker host")
+    parser.add_argument("--port", type=int, default=MQTT_PORT, help="Broker port")
+    parser.add_argument("--tls", action=argparse.BooleanOptionalAction, default=MQTT_USE_TLS, help="Use TLS")
+    parser.add_argument("--duration", type=float, default=60, help="Passive mode: seconds to listen")
+    parser.add_argument("--saturate", action='store_true', help="Find the maximum sustainable rate")
+    parser.add_argument("--consumers", default="null,datastore,alerts", help="Saturation: consumers under test")
+    parser.add_argument("--formats", default="json,binary", help=f"Saturation: payload formats ({', '.join(FORMATS)})")
+    parser.add_argument("--rates", default=DEFAULT_RATES, help="Saturation: offered msg/s per step")
+    parser.add_argument("--step-seconds", type=float, default=5, help="Saturation: seconds per step")
+    parser.add_argument("--publishers", type=int, default=4, help="Saturation: publisher connections")
+    parser.add_argument("--sensors", type=int, default=100, help="Saturation: distinct sensor topics")
+    parser.add_argument("--qos", type=int, default=0, help="Saturation: QoS of the probes")
+    parser.add_argument("--max-loss", type=float, default=0.001, help="Saturation: loss allowed at a step")
+    parser.add_argument("--max-p99-ms", type=float, default=100, help="Saturation: p99 latency allowed at a step")
+    args = parser.parse_args()
+    MQTT_BROKER, MQTT_PORT, MQTT_USE_TLS = args.broker, args.port, args.tls
+
+    if args.saturate:
+        run_saturation(args)
+    else:
+        ThroughputTester(args.duration).run_test()
+
+
 if __name__ == "__main__":
-    tester = ThroughputTester()
-    tester.run_test()
+    main()
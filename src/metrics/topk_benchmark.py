@@ -0,0 +1,92 @@
+"""
+Noisiest Sensor Benchmark
+Accuracy of the Space-Saving top-K tables on a skewed fleet, and what
+counting costs on the batched and per-message ingest paths
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+# Allow running as `python src/metrics/topk_benchmark.py` from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.alerts.alert_system import AlertSystem  # noqa: E402
+from src.alerts.batch import BatchEvaluator  # noqa: E402
+from src.alerts.rules import RuleEngine  # noqa: E402
+from src.alerts.topk import SpaceSaving  # noqa: E402
+
+
+def skewed_fleet(messages, sensors, seed=0):
+    """(room, sensor_type) per message; a few chatty sensors dominate (Zipf)"""
+    rng = np.random.default_rng(seed)
+    ids = (rng.zipf(1.2, messages) - 1) % sensors
+    return [(f"room{i // 4}", ('temperature', 'humidity', 'co2', 'light')[i % 4]) for i in ids.tolist()]
+
+
+def accuracy(keys, k):
+    summary = SpaceSaving(k)
+    start = time.perf_counter()
+    for key in keys:
+        summary.add(key)
+    summary.fold()
+    elapsed = time.perf_counter() - start
+    truth = Counter(keys)
+    top = summary.top(10)
+    recall = len({key for key, _, _ in top} & {key for key, _ in truth.most_common(10)}) / 10
+    worst = max((count - truth[key]) / truth[key] for key, count, _ in top)
+    return recall, worst, len(summary), elapsed / len(keys)
+
+
+def batch_rate(keys, top_k, batch):
+    rules = RuleEngine({'defaults': {sensor: {'max': 1e9} for sensor in ('temperature', 'humidity', 'co2', 'light')}})
+    evaluator = BatchEvaluator(AlertSystem(rules, top_k=top_k))
+    items = [(f"hostel/{room}/{sensor}",
+              json.dumps({'sensor_type': sensor, 'value': 1.0, 'timestamp': '2024-01-01T00:00:00Z'}).encode())
+             for room, sensor in keys]
+    batches = [items[i:i + batch] for i in range(0, len(items), batch)]
+    for chunk in batches[:20]:
+        evaluator.process(chunk, hour=12)
+    start = time.perf_counter()
+    for chunk in batches:
+        evaluator.process(chunk, hour=12)
+    return len(items) / (time.perf_counter() - start)
+
+
+def run_benchmark(messages, sensors, k, batch):
+    print("=" * 70)
+    print(" 📊 NOISIEST SENSOR BENCHMARK - IoT Monitoring System")
+    print("=" * 70)
+    keys = skewed_fleet(messages, sensors)
+    print(f"\n📨 {messages:,} messages from {sensors:,} sensors (Zipf 1.2), k = {k}\n")
+
+    recall, worst, counters, per_key = accuracy(keys, k)
+    print(f"🎯 Top-10 recall: {recall:.0%}   worst overcount in the top 10: {worst:.2%}")
+    print(f"🧠 Memory: {counters} counters (+ up to 4096 pending keys) vs {len(set(keys)):,} exact")
+    print(f"⏱️  Per-message add(): {per_key * 1e9:.0f} ns\n")
+
+    print(f"{'Batched ingest':24} {'Messages/s':>14} {'Overhead':>10}")
+    print("-" * 70)
+    # Interleaved best-of-5: the difference is smaller than run-to-run noise
+    runs = [(batch_rate(keys, 0, batch), batch_rate(keys, k, batch)) for _ in range(5)]
+    base = max(rate for rate, _ in runs)
+    counted = max(rate for _, rate in runs)
+    print(f"{'without top-K':24} {base:14,.0f}")
+    print(f"{'with top-K':24} {counted:14,.0f} {base / counted - 1:9.1%}")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Noisiest sensor (Space-Saving) benchmark")
+    parser.add_argument("--messages", type=int, default=500000, help="Messages in the stream")
+    parser.add_argument("--sensors", type=int, default=40000, help="Sensors in the fleet")
+    parser.add_argument("-k", type=int, default=20, help="Counters per table")
+    parser.add_argument("--batch", type=int, default=500, help="Readings per micro-batch")
+    args = parser.parse_args()
+
+    run_benchmark(args.messages, args.sensors, args.k, args.batch)
@@ -0,0 +1,25 @@
+"""
+Pytest configuration
+Puts the project root on sys.path so tests can import the src packages, and
+provides an `mqtt_broker` fixture (the embedded broker on a free local port)
+that the MQTT tests connect to instead of a cloud broker
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.broker.server import MQTTBroker  # noqa: E402
+
+# Manual scripts that publish to whatever broker is running; nothing to collect
+collect_ignore = ['quick_test.py', 'quick_alarm_test.py', 'verify_system.py']
+
+
+@pytest.fixture
+def mqtt_broker():
+    broker = MQTTBroker(host='127.0.0.1', port=0)
+    broker.start_in_thread()
+    yield broker
+    broker.shutdown()
@@ -1,6 +1,10 @@
 """
 Automated MQTT Connection Test
 Tests MQTT broker connectivity without user interaction
+
+`python tests/mqtt_connection_test.py` checks the configured broker (the
+embedded one on localhost:1883 without MQTT_BROKER); under pytest the check
+runs against the embedded broker fixture.
 """
 
 import paho.mqtt.client as mqtt
@@ -14,18 +18,22 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-def test_mqtt_connection():
-    """Test if we can connect to MQTT broker"""
+def check_mqtt_connection(broker=None, port=None, use_tls=None):
+    """Test if we can connect to MQTT broker (defaults from the environment)"""
     
     print("="*70)
     print(" 🔌 MQTT CONNECTION TEST")
     print("="*70)
     
-    broker = os.getenv("MQTT_BROKER", "95c2f02d61404267847ebc19552f72b0.s1.eu.hivemq.cloud")
-    port = int(os.getenv("MQTT_PORT", 8883))
+    # Without MQTT_BROKER, the embedded broker (python -m src.broker.server)
+    if broker is None:
+        broker = os.getenv("MQTT_BROKER", "localhost")
+    if use_tls is None:
+        use_tls = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+    if port is None:
+        port = int(os.getenv("MQTT_PORT", 8883 if use_tls else 1883))
     username = os.getenv("MQTT_USERNAME", None)
     password = os.getenv("MQTT_PASSWORD", None)
-    use_tls = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
     
     print(f"\n🌐 Broker: {broker}")
     print(f"🔌 Port: {port}")
@@ -78,7 +86,7 @@ def test_mqtt_connection():
             print("\n📊 Connection Details:")
             print(f"   - Broker: {broker}")
             print(f"   - Port: {port}")
-            print(f"   - Protocol: MQTT v5.0")
+            print(f"   - Protocol: MQTT v3.1.1")
             print(f"   - Connection time: {time.time() - start:.2f} seconds")
             
             # Test publish
@@ -128,6 +136,10 @@ def test_mqtt_connection():
         print("   - Public broker might be down")
         return False
 
+def test_mqtt_connection(mqtt_broker):
+    assert check_mqtt_connection('127.0.0.1', mqtt_broker.port, use_tls=False)
+    assert mqtt_broker.stats()['received'] == 1
+
 if __name__ == "__main__":
-    success = test_mqtt_connection()
+    success = check_mqtt_connection()
     exit(0 if success else 1)
@@ -0,0 +1,107 @@
+"""
+Micro-Batch Alert Tests
+Checks bulk decoding, vectorized timestamps, batch/per-message equivalence and batcher flushing
+"""
+import json
+import threading
+import time
+
+from src.alerts.alert_system import AlertSystem, reading_time
+from src.alerts.batch import BatchEvaluator, MicroBatcher, decode_payloads, epoch_seconds
+from src.alerts.rules import RuleEngine
+
+CONFIG = {
+    'defaults': {
+        'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'critical_max': 35, 'debounce': [2, 3],
+                        'hysteresis': 0.5},
+        'co2': {'unit': 'ppm', 'max': 5000, 'windows': [{'agg': 'avg', 'window': 60, 'buckets': 6, 'above': 1000}]},
+    },
+    'rooms': {'room2': {'temperature': {'max_rate': 2.0}}},
+}
+
+
+def message(room, sensor, value, ts):
+    payload = {'sensor_type': sensor, 'value': value, 'unit': '', 'timestamp': ts}
+    return f"hostel/{room}/{sensor}", json.dumps(payload).encode()
+
+
+def stream():
+    temps = [24, 29, 24, 29, 29, 30, 36, 27.8, 27, 24, 24, 24]
+    co2 = [800, 900, 1200, 1300, 1250, 1400, 1100, 900, 800, 700, 600, 600]
+    items = []
+    for i in range(len(temps)):
+        ts = f"2024-01-01T00:{i:02d}:00.000000Z"
+        for room in ('room1', 'room2', 'room3'):
+            items.append(message(room, 'temperature', temps[i] if room != 'room3' else 24, ts))
+            items.append(message(room, 'co2', co2[i], ts))
+    return items
+
+
+def test_decode_payloads_falls_back_on_bad_payload():
+    records, errors = decode_payloads([b'{"a": 1}', b'{"a": 2}'])
+    assert records == [{'a': 1}, {'a': 2}] and errors == 0
+    records, errors = decode_payloads([b'{"a": 1}', b'not json', b'{"a": 3}'])
+    assert records == [{'a': 1}, None, {'a': 3}] and errors == 1
+
+
+def test_epoch_seconds_matches_reading_time():
+    stamps = ['2024-03-01T12:30:00.250000Z', '2024-03-01T12:30:01']
+    assert list(epoch_seconds(stamps)) == [reading_time(t) for t in stamps]
+    mixed = ['2024-03-01T12:30:00+02:00', None]
+    parsed = epoch_seconds(mixed)
+    assert parsed[0] == reading_time(mixed[0])
+    assert abs(parsed[1] - time.time()) < 5
+
+
+def test_batches_match_per_message_path():
+    rules = RuleEngine(CONFIG)
+    items = stream()
+
+    single = AlertSystem(rules)
+    for topic, payload in items:
+        data = json.loads(payload)
+        single.process_reading(data['sensor_type'], data['value'], topic.split('/')[1],
+                               now=reading_time(data['timestamp']), hour=12)
+
+    for size in (1, 5, len(items)):
+        batched = AlertSystem(rules)
+        evaluator = BatchEvaluator(batched)
+        for i in range(0, len(items), size):
+            evaluator.process(items[i:i + size], hour=12)
+        assert batched.alert_count == single.alert_count
+        assert sorted(batched.active_alerts()) == sorted(single.active_alerts())
+        assert batched.tracker.last_time('room3', 'temperature') == single.tracker.last_time('room3', 'temperature')
+        assert batched.message_count == len(items)
+    assert single.alert_count > 0
+    # room3's steady temperature never needed its state machine
+    assert evaluator.screened >= 12
+
+
+def test_admit_filters_readings():
+    alerts = AlertSystem(RuleEngine(CONFIG))
+    evaluator = BatchEvaluator(alerts, admit=lambda room, sensor, when: room != 'room1')
+    evaluator.process(stream(), hour=12)
+    assert alerts.tracker.last_time('room1', 'temperature') is None
+    assert alerts.tracker.last_time('room2', 'temperature') is not None
+
+
+def test_micro_batcher_flushes_by_size_delay_and_stop():
+    batches = []
+    done = threading.Event()
+    batcher = MicroBatcher(lambda items: (batches.append(list(items)), done.set()), max_items=3, max_delay=0.05)
+    batcher.start()
+    for i in range(3):
+        batcher.submit(i)
+    assert done.wait(1)
+    assert batches[0] == [0, 1, 2]
+
+    batcher.submit(3)
+    time.sleep(0.15)
+    assert batches[1] == [3]
+
+    batcher.max_delay = 10
+    batcher.submit(4)
+    batcher.stop()
+    assert batches[-1] == [4]
+    stats = batcher.stats()
+    assert stats['items'] == 5 and stats['max_batch'] == 3 and stats['errors'] == 0
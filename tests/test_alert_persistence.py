@@ -0,0 +1,136 @@
+"""
+Alert State Snapshot Tests
+Checks snapshot round-trips, no re-firing after restore, atomic writes and catch-up filtering
+"""
+import os
+import time
+
+from src.alerts.alert_system import AlertSystem, reading_time
+from src.alerts.persistence import CatchUp, StateSnapshotter, capture, restore
+from src.alerts.rules import RuleEngine
+
+CONFIG = {
+    'defaults': {
+        'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'debounce': [2, 3], 'max_rate': 5.0},
+        'co2': {'unit': 'ppm', 'max': 5000, 'windows': [{'agg': 'avg', 'window': 300, 'above': 1000}]},
+    }
+}
+
+
+def run(alerts, start, count, temperature, co2, rooms=('room1', 'room2')):
+    for i in range(count):
+        for room in rooms:
+            alerts.process_reading('temperature', temperature, room, now=start + i * 3.0, hour=12)
+            alerts.process_reading('co2', co2, room, now=start + i * 3.0, hour=12)
+
+
+def test_round_trip_keeps_alerts_and_windows():
+    before = AlertSystem(RuleEngine(CONFIG))
+    run(before, 0.0, 150, 30.0, 1200.0)
+    assert len(before.active_alerts()) == 4
+
+    after = AlertSystem(RuleEngine(CONFIG))
+    assert restore(after, capture(before)) == 4
+    assert after.active_alerts() == before.active_alerts()
+    assert (after.alert_count, after.message_count) == (before.alert_count, before.message_count)
+    old = before.tracker.state_for('room1', 'co2').windows[0]
+    new = after.tracker.state_for('room1', 'co2').windows[0]
+    assert (new.average(), new.maximum(), new.head) == (old.average(), old.maximum(), old.head)
+
+    # Ongoing conditions continue without re-firing, and both instances clear together
+    count = after.alert_count
+    run(after, 450.0, 10, 30.0, 1200.0)
+    assert after.alert_count == count
+    run(before, 450.0, 150, 24.0, 600.0)
+    run(after, 480.0, 150, 24.0, 600.0)
+    assert before.active_alerts() == after.active_alerts() == []
+
+
+def test_restore_follows_changed_rules():
+    before = AlertSystem(RuleEngine(CONFIG))
+    run(before, 0.0, 150, 30.0, 1200.0)
+    changed = {'defaults': {'temperature': {'unit': '°C', 'min': 20, 'max': 28},
+                            'co2': {'unit': 'ppm', 'max': 5000,
+                                    'windows': [{'agg': 'max', 'window': 60, 'above': 1500}]}}}
+    after = AlertSystem(RuleEngine(changed))
+    restore(after, capture(before))
+    assert sorted(after.active_alerts()) == [('room1', 'temperature', 'HIGH', 'warning'),
+                                             ('room2', 'temperature', 'HIGH', 'warning')]
+
+
+def test_snapshotter_writes_atomically(tmp_path):
+    path = str(tmp_path / 'state.snapshot')
+    alerts = AlertSystem(RuleEngine(CONFIG))
+    run(alerts, 0.0, 20, 30.0, 900.0)
+    snapshotter = StateSnapshotter(alerts, path, interval=10.0)
+    assert not snapshotter.maybe_save(now=snapshotter.last_save + 1)
+    assert snapshotter.maybe_save(now=snapshotter.last_save + 11)
+    snapshotter.save()
+    assert os.listdir(tmp_path) == ['state.snapshot']
+
+    restored = AlertSystem(RuleEngine(CONFIG))
+    count, ms = StateSnapshotter(restored, path).load()
+    assert count == 4 and ms < 1000
+    assert restored.active_alerts() == alerts.active_alerts()
+
+
+def test_catch_up_skips_applied_readings_and_detects_live():
+    alerts = AlertSystem(RuleEngine(CONFIG))
+    old = time.time() - 600
+    alerts.process_reading('temperature', 24.0, 'room1', now=old + 30, hour=12)
+    catch_up = CatchUp(alerts.tracker, live_lag=5.0)
+    assert not catch_up.admit('room1', 'temperature', old + 30)
+    assert catch_up.admit('room1', 'temperature', old + 33)
+    assert catch_up.admit('room9', 'temperature', old + 10)
+    assert catch_up.active
+    assert catch_up.admit('room1', 'temperature', time.time())
+    assert not catch_up.active and catch_up.steady_after is not None
+    assert (catch_up.replayed, catch_up.skipped) == (2, 1)
+
+
+def test_reading_time_parses_sensor_timestamps():
+    assert reading_time('2024-01-01T00:00:00Z') == 1704067200.0
+    assert reading_time('2024-01-01T00:00:00') == 1704067200.0
+    assert abs(reading_time(None) - time.time()) < 1
+
+
+def test_round_trip_keeps_anomaly_and_liveness_state():
+    config = {'defaults': {'temperature': {'unit': '°C', 'min': 10, 'max': 40}},
+              'anomaly': {'z': 4, 'warmup': 10, 'stuck_after': 20},
+              'offline': {'factor': 3, 'min_timeout': 5}}
+    clock = [0.0]
+    before = AlertSystem(RuleEngine(config))
+    before.liveness.clock = lambda: clock[0]
+    for i in range(40):
+        clock[0] = i * 2.0
+        before.process_reading('temperature', 23.9 + 0.2 * (i % 2), 'room1', now=clock[0], hour=12)
+        before.process_reading('temperature', 24.0, 'room2', now=clock[0], hour=12)
+        if i < 20:
+            before.process_reading('temperature', 24.0, 'room3', now=clock[0], hour=12)
+    before.process_reading('temperature', 30.0, 'room1', now=clock[0], hour=12)
+    before.check_liveness(clock[0])
+    assert sorted(before.active_alerts()) == [('room1', 'temperature', 'ANOMALY', 'warning'),
+                                              ('room2', 'temperature', 'STUCK', 'warning'),
+                                              ('room3', 'temperature', 'OFFLINE', 'warning')]
+
+    # The new process has its own monotonic clock
+    data = capture(before)
+    clock[0] += 5000.0
+    after = AlertSystem(RuleEngine(config))
+    after.liveness.clock = lambda: clock[0]
+    restore(after, data)
+    assert sorted(after.active_alerts()) == sorted(before.active_alerts())
+    assert after.liveness.timeout_for(after.liveness.slots['room1', 'temperature']) == 6.0
+    assert after.liveness.silent_for('room1', 'temperature') == 0.0
+
+    # Ongoing conditions do not re-fire; the next readings clear them
+    count = after.alert_count
+    clock[0] += 1.0
+    after.process_reading('temperature', 24.0, 'room2', now=clock[0], hour=12)
+    assert after.alert_count == count
+    after.process_reading('temperature', 24.0, 'room1', now=clock[0], hour=12)
+    after.process_reading('temperature', 24.001, 'room2', now=clock[0], hour=12)
+    after.process_reading('temperature', 24.002, 'room3', now=clock[0], hour=12)
+    assert after.active_alerts() == []
+    # Restored deadlines are on the wheel
+    assert after.check_liveness(clock[0] + 7.0) == 3
@@ -0,0 +1,72 @@
+"""
+Alert State Machine Tests
+Checks hysteresis, N-of-M debounce, rate-of-change and escalation transitions
+"""
+from src.alerts.alert_system import AlertSystem
+from src.alerts.rules import RuleEngine
+from src.alerts.state import AlertTracker
+
+CONFIG = {
+    'defaults': {
+        'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'critical_min': 16, 'critical_max': 32,
+                        'hysteresis': 0.5, 'debounce': [2, 3]},
+    },
+    'rooms': {'server_room': {'temperature': {'max_rate': 2.0, 'debounce': [1, 1]}}}
+}
+
+
+def feed(tracker, values, room='room1', step=3.0):
+    events = []
+    for i, value in enumerate(values):
+        for action, violation in tracker.update(room, 'temperature', value, i * step, hour=12) or ():
+            events.append((action, violation.type, violation.severity))
+    return events
+
+
+def test_single_spike_is_debounced():
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    assert feed(tracker, [25, 29, 25, 25, 29, 25]) == []
+    assert feed(tracker, [29, 29]) == [('raise', 'HIGH', 'warning')]
+
+
+def test_hysteresis_stops_flapping_at_threshold():
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    noisy = [28.3, 27.9, 28.2, 27.8, 28.4, 27.7] * 50
+    assert feed(tracker, noisy) == [('raise', 'HIGH', 'warning')]
+    assert feed(tracker, [27.4]) == [('clear', 'HIGH', 'warning')]
+
+
+def test_critical_raises_immediately_and_escalates():
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    assert feed(tracker, [35]) == [('raise', 'HIGH', 'critical')]
+    # Falling back to the warning band keeps the critical alert
+    assert feed(tracker, [30, 30]) == []
+
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    assert feed(tracker, [29, 29, 33]) == [('raise', 'HIGH', 'warning'), ('raise', 'HIGH', 'critical')]
+    assert feed(tracker, [10]) == [('clear', 'HIGH', 'critical'), ('raise', 'LOW', 'critical')]
+
+
+def test_rate_of_change():
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    # 2 °C/min allowed; one reading every 3 s
+    events = feed(tracker, [21.0, 21.05, 21.1, 21.5, 21.55], room='server_room')
+    assert events == [('raise', 'RATE', 'warning'), ('clear', 'RATE', 'warning')]
+
+
+def test_state_records_are_fixed_size():
+    tracker = AlertTracker(RuleEngine(CONFIG))
+    feed(tracker, [25, 29, 29, 35, 20])
+    state = tracker.state_for('room1', 'temperature')
+    assert not hasattr(state, '__dict__')
+    assert 0 <= state.history <= 0b111
+
+
+def test_alert_system_counts_transitions_only():
+    alerts = AlertSystem(RuleEngine(CONFIG))
+    for i, value in enumerate([29, 29, 28.2, 29, 28.1, 25]):
+        alerts.process_reading('temperature', value, 'room1', '°C', now=i * 3.0, hour=12)
+    assert alerts.alert_count == 1
+    assert alerts.active_alerts() == []
+    alerts.process_reading('temperature', 40, 'room2', '°C', now=30.0, hour=12)
+    assert alerts.active_alerts() == [('room2', 'temperature', 'HIGH', 'critical')]
@@ -0,0 +1,130 @@
+"""
+Sliding-Window Condition Tests
+Feeds fast synthetic streams and checks incremental aggregates against brute force
+"""
+import random
+import time
+
+from src.alerts.rules import RuleEngine, Violation
+from src.alerts.state import AlertTracker
+from src.alerts.windows import WindowSpec, WindowState
+
+
+def make_window(agg, window, above, buckets=60, **extra):
+    return WindowState(WindowSpec({'agg': agg, 'window': window, 'above': above,
+                                   'buckets': buckets, **extra}, Violation))
+
+
+def test_aggregates_match_brute_force():
+    rng = random.Random(3)
+    state = make_window('avg', 60.0, 25.0, buckets=12)
+    width = 60.0 / 12
+    history = []  # (bucket index, value, seconds held above before this reading)
+    now, last, last_above, head = 0.0, None, False, None
+    for step in range(20000):
+        now += rng.choice((0.01, 0.5, 2.0, 9.0, 75.0)) if step % 50 == 0 else rng.uniform(0.01, 1.5)
+        value = rng.gauss(25, 3)
+        index = int(now // width)
+        # A gap of 13 buckets or more empties the window
+        if head is None or index - head >= 13:
+            last, last_above = None, False
+        held = min(now - last, now - (index - 12) * width) if last is not None and last_above else 0.0
+        history.append((index, value, held))
+        last, last_above, head = now, value > 25.0, index
+        state.add(value, now)
+
+        if step % 97 == 0:
+            current = int(now // width)
+            in_window = [(v, h) for i, v, h in history if i >= current - 12]
+            values = [v for v, _ in in_window]
+            assert abs(state.average() - sum(values) / len(values)) < 1e-6
+            assert state.maximum() == max(values)
+            assert abs(state.time_above() - min(sum(h for _, h in in_window), 60.0)) < 1e-6
+
+
+def test_cost_and_memory_do_not_grow_with_window():
+    def run(window):
+        state = make_window('max', window, 1000.0)
+        rng = random.Random(5)
+        values = [rng.uniform(400, 1200) for _ in range(100000)]
+        start = time.perf_counter()
+        for i, value in enumerate(values):
+            state.add(value, i * 0.1)
+        return time.perf_counter() - start, state
+
+    short_time, short = run(60.0)
+    long_time, long = run(86400.0)
+    assert long_time < short_time * 3
+    assert len(long.sums) == len(short.sums) == 61
+    assert len(long.maxima) <= 61
+
+
+def test_time_above_needs_sustained_readings():
+    state = make_window('time_above', 1800.0, 60.0, duration=1800.0)
+    fired = [state.add(65.0, t * 60.0) for t in range(31)]
+    assert fired[-1] and not any(fired[:-1])
+    # One dry reading and the time above stops accumulating
+    assert state.add(55.0, 31 * 60.0)
+    assert not state.add(55.0, 61 * 60.0)
+
+
+def test_time_above_holds_while_readings_stay_high():
+    rules = RuleEngine({'defaults': {'humidity': {
+        'unit': '%', 'max': 90,
+        'windows': [{'agg': 'time_above', 'window': 1800, 'above': 60, 'duration': 1800}]}}})
+    tracker = AlertTracker(rules)
+    events = []
+    # Two hours at 65 %, every 3 s (including readings between bucket edges)
+    for i in range(2400):
+        for action, violation in tracker.update('room1', 'humidity', 65.0, 1.0 + i * 3.0, hour=12) or ():
+            events.append((i, action, violation.type))
+    assert [(action, kind) for _, action, kind in events] == [('raise', 'TIME_ABOVE_1800S')]
+    assert events[0][0] == 600
+    # A duration just under the window used to flap once per bucket
+    state = make_window('time_above', 1800.0, 60.0, duration=1780.0)
+    holds = [state.add(65.0, i * 1.7) for i in range(5000)]
+    first = holds.index(True)
+    assert all(holds[first:])
+
+
+def test_time_above_duration_longer_than_window_is_rejected():
+    try:
+        make_window('time_above', 600.0, 60.0, duration=900.0)
+    except ValueError:
+        return
+    raise AssertionError("duration > window was accepted")
+
+
+def test_gap_longer_than_the_window_starts_over():
+    for agg, expected in (('avg', False), ('max', False)):
+        state = make_window(agg, 300.0, 1000.0)
+        for t in range(0, 600, 5):
+            state.add(500.0, float(t))
+        # One high reading after a long silence is a single early sample
+        assert state.add(1200.0, 4000.0) is expected
+        assert state.first_time == 4000.0
+    state = make_window('time_above', 300.0, 1000.0, duration=120.0)
+    state.add(1200.0, 0.0)
+    # Silent for 5000 s, then below the limit: nothing was held above it within the window
+    assert not state.add(500.0, 5000.0)
+    assert state.time_above() == 0.0
+    # A gap within the window still counts, but not beyond the oldest live bucket
+    state.add(1200.0, 5100.0)
+    assert state.add(1200.0, 5390.0)
+    assert state.time_above() == 290.0
+
+
+def test_tracker_raises_and_clears_window_alerts():
+    tracker = AlertTracker(RuleEngine({
+        'defaults': {'co2': {'unit': 'ppm', 'max': 5000,
+                             'windows': [{'agg': 'avg', 'window': 300, 'above': 1000}]}},
+    }))
+    events = []
+    for i in range(400):
+        value = 1100.0 if i < 200 else 700.0
+        for action, violation in tracker.update('room1', 'co2', value, i * 3.0, hour=12) or ():
+            events.append((i, action, violation.type))
+    assert [(action, kind) for _, action, kind in events] == [('raise', 'AVG_300S'), ('clear', 'AVG_300S')]
+    # Raised once the window is covered (300 s / 3 s), cleared when the average drops under 1000
+    assert events[0][0] == 100
+    assert 220 < events[1][0] < 260
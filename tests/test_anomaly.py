@@ -0,0 +1,110 @@
+"""
+Anomaly Detection Tests
+Checks EWMA z-score flagging, stuck sensors, hourly baselines and batch/per-reading equivalence
+"""
+import json
+
+import numpy as np
+import pytest
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.anomaly import AnomalyDetector
+from src.alerts.batch import BatchEvaluator
+from src.alerts.rules import RuleEngine
+
+
+def noisy(n, level=24.0, seed=0):
+    return (level + np.random.default_rng(seed).normal(0, 0.1, n)).tolist()
+
+
+def test_spike_raises_after_warmup_and_clears():
+    warming = AnomalyDetector(z=4, warmup=20)
+    for value in noisy(10) + [30.0]:
+        assert warming.update('room1', 'temperature', value) is None
+
+    detector = AnomalyDetector(z=6, warmup=20)
+    for value in noisy(40, seed=1):
+        assert detector.update('room1', 'temperature', value) is None
+    raised = detector.update('room1', 'temperature', 27.0)
+    assert [(t.action, t.violation.type) for t in raised] == [('raise', 'ANOMALY')]
+    assert list(detector.active()) == [('room1', 'temperature', detector.violation)]
+    cleared = None
+    for value in noisy(10, seed=2):
+        cleared = cleared or detector.update('room1', 'temperature', value)
+    assert [(t.action, t.violation.type) for t in cleared] == [('clear', 'ANOMALY')]
+
+
+def test_stuck_sensor():
+    detector = AnomalyDetector(stuck_after=5)
+    events = [detector.update('room1', 'co2', 800.0) for _ in range(7)]
+    assert events[5][0].action == 'raise' and events[5][0].violation.type == 'STUCK'
+    assert detector.update('room1', 'co2', 801.0)[0].action == 'clear'
+
+
+def test_hourly_baseline_learns_daily_cycle():
+    plain = AnomalyDetector(z=5, warmup=10)
+    hourly = AnomalyDetector(z=5, warmup=10, seasonal=True, seasonal_alpha=0.5)
+    flags = {'plain': 0, 'hourly': 0}
+    for day in range(4):
+        for hour in range(24):
+            level = 20.0 if hour < 12 else 26.0
+            for value in noisy(12, level, seed=day * 24 + hour):
+                flags['plain'] += bool(plain.update('room1', 'temperature', value, hour))
+                if day > 0:
+                    flags['hourly'] += bool(hourly.update('room1', 'temperature', value, hour))
+                else:
+                    hourly.update('room1', 'temperature', value, hour)
+    assert flags['plain'] > 0
+    assert flags['hourly'] == 0
+
+
+@pytest.mark.parametrize('seasonal', [False, True])
+def test_batch_matches_per_reading(seasonal):
+    rng = np.random.default_rng(3)
+    keys = [(f"room{i}", 'humidity') for i in range(50)]
+    scalar = AnomalyDetector(z=3, warmup=5, seasonal=seasonal, stuck_after=4)
+    vector = AnomalyDetector(z=3, warmup=5, seasonal=seasonal, stuck_after=4)
+    slots = np.array(vector.reserve(keys))
+    scalar.reserve(keys)
+    for step in range(40):
+        # Repeated sensors within a batch, spikes and flat runs
+        picks = rng.integers(0, len(keys), 80)
+        values = np.round(50 + rng.normal(0, 1, 80) + (rng.random(80) < 0.05) * 15, 0)
+        hour = step % 24
+        expected = []
+        for position, (k, value) in enumerate(zip(picks, values.tolist())):
+            for transition in scalar.update(*keys[k], value, hour) or ():
+                expected.append((position, transition))
+        assert vector.update_batch(slots[picks], values, hour) == expected
+    assert list(vector.mean) == list(scalar.mean)
+    assert list(vector.var) == list(scalar.var)
+    assert vector.flagged == scalar.flagged > 0
+
+
+def test_sensor_filter_and_validation():
+    detector = AnomalyDetector(sensors=['co2'])
+    assert detector.slot('room1', 'temperature') is None
+    assert detector.update('room1', 'temperature', 99.0) is None
+    assert len(detector) == 0
+    with pytest.raises(ValueError):
+        AnomalyDetector(alpha=1.5)
+
+
+def test_alert_system_raises_anomaly_alerts_in_both_paths():
+    config = {'defaults': {'temperature': {'unit': '°C', 'min': 10, 'max': 40}},
+              'anomaly': {'z': 5, 'warmup': 10}}
+    readings = noisy(30) + [30.0] + noisy(5, seed=4)
+    single = AlertSystem(RuleEngine(config))
+    for value in readings:
+        single.process_reading('temperature', value, 'room1', now=0, hour=12)
+    assert single.alert_count == 1
+    assert single.anomaly.flagged == 1
+
+    batched = AlertSystem(RuleEngine(config))
+    items = [('hostel/room1/temperature', json.dumps({'sensor_type': 'temperature', 'value': v,
+                                                      'timestamp': '2024-01-01T00:00:00Z'}).encode())
+             for v in readings]
+    BatchEvaluator(batched).process(items, hour=12)
+    assert batched.alert_count == single.alert_count
+    assert batched.active_alerts() == single.active_alerts()
+    assert AlertSystem(RuleEngine({**config, 'anomaly': {'enabled': False}})).anomaly is None
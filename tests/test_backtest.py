@@ -0,0 +1,101 @@
+"""
+Alert Backtest Tests
+Checks the vectorized backtest against the live per-reading path, the report and history loading
+"""
+import json
+
+import numpy as np
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.backtest import Backtest, load_history, local_hours, synthetic_history, window_holds
+from src.alerts.rules import RuleEngine
+from src.alerts.windows import WindowSpec, WindowState
+
+CONFIG = {
+    'defaults': {
+        'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'critical_min': 16, 'critical_max': 32,
+                        'hysteresis': 0.5, 'debounce': [2, 3], 'max_rate': 3.0,
+                        'profiles': [{'hours': [22, 6], 'max': 26}]},
+        'co2': {'unit': 'ppm', 'max': 1000, 'critical_max': 1400, 'hysteresis': 50, 'debounce': [2, 3],
+                'windows': [{'agg': 'avg', 'window': 300, 'buckets': 10, 'above': 950},
+                            {'agg': 'max', 'window': 120, 'buckets': 4, 'above': 1300},
+                            {'agg': 'time_above', 'window': 600, 'above': 1100, 'duration': 180}]},
+    },
+}
+
+
+def noisy_series(rng, n, base, spread, spikes):
+    times = 1700000000.0 + np.cumsum(rng.uniform(5, 40, n))
+    # A few readings arrive out of order or with a repeated timestamp
+    times[rng.choice(n, 5, replace=False)] -= 60
+    values = np.round(base + spread * np.sin(np.arange(n) / 40) + rng.normal(0, spread / 6, n), 2)
+    values[rng.random(n) < 0.01] += spikes
+    return times, values
+
+
+def live_events(rules, room, sensor_type, times, values, hours):
+    alerts = AlertSystem(rules)
+    events = []
+    for t, v, h in zip(times.tolist(), values.tolist(), hours.tolist()):
+        for action, violation in alerts.process_reading(sensor_type, v, room, now=t, hour=h) or ():
+            events.append((t, action, violation))
+    return events
+
+
+def test_matches_live_tracker():
+    rules = RuleEngine(CONFIG)
+    rng = np.random.default_rng(5)
+    backtest = Backtest(rules, utc_offset=0)
+    for sensor_type, base, spread, spikes in (('temperature', 24, 5, 9), ('co2', 900, 300, 500)):
+        times, values = noisy_series(rng, 4000, base, spread, spikes)
+        hours = local_hours(times, 0)
+        expected = live_events(rules, 'room1', sensor_type, times, values, hours)
+        events, evaluated = backtest.series_events('room1', sensor_type, times, values)
+        assert events == expected
+        assert len(expected) > 20
+        assert evaluated < len(values)
+
+
+def test_window_holds_matches_window_state():
+    rng = np.random.default_rng(2)
+    times = 1000.0 + np.cumsum(rng.uniform(1, 30, 3000))
+    times[rng.choice(3000, 10, replace=False)] -= 45
+    # Silences longer than the window empty it
+    times[1000:] += 5000
+    times[2000:] += 700
+    values = rng.normal(50, 10, 3000)
+    for agg in ('avg', 'max', 'time_above'):
+        spec = WindowSpec({'agg': agg, 'window': 600, 'buckets': 12, 'above': 55, 'duration': 200},
+                          lambda *args: args)
+        state = WindowState(spec)
+        expected = [state.add(v, t) for t, v in zip(times.tolist(), values.tolist())]
+        assert window_holds(spec, times, values).tolist() == expected
+
+
+def test_report_counts_durations_and_flaps():
+    rules = RuleEngine({'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}})
+    times = np.arange(12) * 60.0
+    values = np.array([900, 1100, 1100, 900, 1100, 900, 900, 900, 900, 900, 900, 1200], dtype=float)
+    report = Backtest(rules, flap_window=120, utc_offset=0).run([('room1', 'co2', times, values)])
+    stats = report.rules['co2 HIGH'].to_dict()
+    assert stats['raised'] == 3 and stats['flaps'] == 1 and stats['open_at_end'] == 1
+    # 120 s + 60 s closed, plus the one still open at the last reading (0 s)
+    assert stats['duration_total_s'] == 180.0
+    assert report.readings == 12 and report.total_raised() == 3
+
+
+def test_synthetic_month_and_history_files(tmp_path):
+    series = synthetic_history(rooms=2, days=3, step=120)
+    report = Backtest(RuleEngine.from_file(), utc_offset=0).run(series)
+    assert report.series == 8 and report.readings == 8 * 3 * 720
+    assert report.total_raised() > 0
+
+    recording = tmp_path / 'room.jsonl'
+    lines = [{'topic': 'hostel/room7/co2', 'sensor_type': 'co2', 'value': v,
+              'timestamp': f"2024-01-01T00:{i:02d}:00.000000Z"} for i, v in enumerate([800, 1500, 1500, 800])]
+    recording.write_text('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n')
+    [(room, sensor_type, times, values)] = load_history([str(recording)])
+    assert (room, sensor_type) == ('room7', 'co2') and values.tolist() == [800, 1500, 1500, 800]
+    assert times[1] - times[0] == 60
+    events, _ = Backtest(RuleEngine(CONFIG), utc_offset=0).series_events(room, sensor_type, times, values)
+    assert [(action, v.type) for _, action, v in events][:1] == [('raise', 'HIGH')]
@@ -0,0 +1,123 @@
+"""
+Embedded Broker Tests
+Checks QoS 0/1 delivery, wildcards, retained messages, unsubscribe, last will, persistent sessions, startup failures and the latency probe through it
+"""
+import queue
+import threading
+
+import paho.mqtt.client as mqtt
+import pytest
+
+from src.broker.server import MQTTBroker, SubscriptionTrie
+from src.broker.topics import topic_matches
+from src.metrics.latency_test import LatencyTester
+
+
+def client(broker, client_id, clean=True, will=None):
+    """A connected paho client whose messages land in client.received"""
+    received = queue.Queue()
+    connected = threading.Event()
+    c = mqtt.Client(client_id=client_id, callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                    protocol=mqtt.MQTTv311, clean_session=clean)
+    c.on_connect = lambda *args: connected.set()
+    c.on_message = lambda _c, _u, msg: received.put((msg.topic, msg.payload, msg.qos, msg.retain))
+    if will:
+        c.will_set(*will)
+    c.connect('127.0.0.1', broker.port, 60)
+    c.loop_start()
+    assert connected.wait(5)
+    c.received = received
+    return c
+
+
+def subscribe(c, topic_filter, qos=0):
+    done = threading.Event()
+    c.on_subscribe = lambda *args: done.set()
+    c.subscribe(topic_filter, qos)
+    assert done.wait(5)
+
+
+def close(*clients):
+    for c in clients:
+        c.disconnect()
+        c.loop_stop()
+
+
+def test_topic_matching():
+    assert topic_matches('hostel/+/co2', 'hostel/room1/co2')
+    assert not topic_matches('hostel/+/co2', 'hostel/room1/co2/raw')
+    assert topic_matches('hostel/#', 'hostel')
+    assert not topic_matches('#', '$SYS/uptime')
+    assert topic_matches('$SYS/#', '$SYS/uptime')
+    trie = SubscriptionTrie()
+    trie.add('hostel/#', 'a', 0)
+    trie.add('hostel/+/co2', 'a', 1)
+    trie.add('+/room1/co2', 'b', 0)
+    trie.add('#', 'c', 0)
+    assert trie.match('hostel/room1/co2') == {'a': 1, 'b': 0, 'c': 0}
+    assert trie.match('$SYS/load') == {}
+    assert trie.remove('hostel/+/co2', 'a')
+    assert trie.match('hostel/room1/co2') == {'a': 0, 'b': 0, 'c': 0}
+
+
+def test_publish_subscribe_and_retained(mqtt_broker):
+    sub = client(mqtt_broker, 'sub')
+    pub = client(mqtt_broker, 'pub')
+    subscribe(sub, 'hostel/+/co2', qos=1)
+    pub.publish('hostel/room1/co2', b'600', qos=0)
+    pub.publish('hostel/room2/co2', b'700', qos=1).wait_for_publish(5)
+    pub.publish('hostel/room1/temperature', b'21', qos=1)
+    assert sub.received.get(timeout=5) == ('hostel/room1/co2', b'600', 0, False)
+    assert sub.received.get(timeout=5) == ('hostel/room2/co2', b'700', 1, False)
+
+    pub.publish('hostel/room3/status', b'online', qos=1, retain=True).wait_for_publish(5)
+    late = client(mqtt_broker, 'late')
+    subscribe(late, 'hostel/#')
+    assert late.received.get(timeout=5) == ('hostel/room3/status', b'online', 0, True)
+    # An empty retained payload clears it
+    pub.publish('hostel/room3/status', b'', retain=True).wait_for_publish(5)
+    assert late.received.get(timeout=5)[:2] == ('hostel/room3/status', b'')
+
+    done = threading.Event()
+    sub.on_unsubscribe = lambda *args: done.set()
+    sub.unsubscribe('hostel/+/co2')
+    assert done.wait(5)
+    pub.publish('hostel/room1/co2', b'650', qos=1).wait_for_publish(5)
+    assert late.received.get(timeout=5)[:2] == ('hostel/room1/co2', b'650')
+    assert sub.received.empty()
+    assert mqtt_broker.stats()['retained'] == 0
+    close(sub, pub, late)
+
+
+def test_will_and_persistent_session(mqtt_broker):
+    watcher = client(mqtt_broker, 'watcher')
+    subscribe(watcher, 'devices/#', qos=1)
+    sensor = client(mqtt_broker, 'sensor', will=('devices/sensor/status', b'offline', 1))
+    sensor.loop_stop()
+    sensor.socket().close()  # dropped without DISCONNECT
+    assert watcher.received.get(timeout=5)[:2] == ('devices/sensor/status', b'offline')
+
+    alerts = client(mqtt_broker, 'alerts', clean=False)
+    subscribe(alerts, 'hostel/#', qos=1)
+    close(alerts)
+    watcher.publish('hostel/room1/co2', b'1500', qos=1).wait_for_publish(5)
+    alerts = client(mqtt_broker, 'alerts', clean=False)
+    assert alerts.received.get(timeout=5)[:3] == ('hostel/room1/co2', b'1500', 1)
+    close(watcher, alerts)
+
+
+def test_latency_probe_round_trip(mqtt_broker):
+    tester = LatencyTester('127.0.0.1', mqtt_broker.port, use_tls=False)
+    tester.connect()
+    try:
+        case = tester.run_case(qos=1, size=256, rate=400, duration=0.5, warmup=20)
+    finally:
+        tester.close()
+    assert case.received == case.sent == 220
+    assert case.histogram.count == 200
+    assert 0 < case.histogram.percentile(50) < 1e9
+
+
+def test_start_failure_is_raised(mqtt_broker):
+    with pytest.raises(OSError):
+        MQTTBroker(host='127.0.0.1', port=mqtt_broker.port).start_in_thread()
@@ -0,0 +1,99 @@
+"""
+Compound Alert Rule Tests
+Checks cross-sensor raising and clearing, freshness limits, the dependency index and snapshots
+"""
+import json
+
+import pytest
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.batch import BatchEvaluator
+from src.alerts.compound import CompoundEngine
+from src.alerts.persistence import capture, restore
+from src.alerts.rules import RuleEngine
+
+RULES = [
+    {'name': 'CONDENSATION_RISK', 'max_age': 60,
+     'when': [{'sensor': 'humidity', 'above': 58}, {'sensor': 'temperature', 'below': 21}]},
+    {'name': 'LIGHTS_OFF_OCCUPIED', 'hours': [8, 22], 'rooms': ['room1'],
+     'when': [{'sensor': 'co2', 'above': 900}, {'sensor': 'light', 'below': 150}]},
+]
+
+
+def actions(events):
+    return [(action, rule.name) for action, rule in events or ()]
+
+
+def test_raises_only_when_all_conditions_hold():
+    engine = CompoundEngine(RULES)
+    assert engine.update('room1', 'humidity', 62, now=100) is None
+    assert actions(engine.update('room1', 'temperature', 19.5, now=101)) == [('raise', 'CONDENSATION_RISK')]
+    assert engine.update('room1', 'temperature', 19.0, now=102) is None
+    assert list(engine.active()) == [('room1', 'humidity+temperature', engine.rules[0].violation)]
+    assert engine.describe('room1', engine.rules[0]) == 'humidity 62, temperature 19'
+    assert actions(engine.update('room1', 'humidity', 55, now=103)) == [('clear', 'CONDENSATION_RISK')]
+    # Rooms are independent
+    assert engine.update('room2', 'temperature', 19.0, now=104) is None
+
+
+def test_stale_inputs_do_not_count():
+    engine = CompoundEngine(RULES)
+    engine.update('room1', 'humidity', 62, now=0)
+    assert engine.update('room1', 'temperature', 19.5, now=61) is None
+    # A fresh humidity reading completes the pair
+    assert actions(engine.update('room1', 'humidity', 62, now=70)) == [('raise', 'CONDENSATION_RISK')]
+    # humidity stopped reporting: the next temperature reading clears the rule
+    assert actions(engine.update('room1', 'temperature', 19.4, now=200)) == [('clear', 'CONDENSATION_RISK')]
+
+
+def test_dependency_index_rooms_and_hours():
+    engine = CompoundEngine(RULES)
+    assert set(engine.depends) == {'humidity', 'temperature', 'co2', 'light'}
+    assert engine.update('room1', 'pressure', 1000, now=0) is None
+    engine.update('room1', 'humidity', 50, now=0)
+    assert engine.evaluations == 1
+    engine.update('room2', 'co2', 1000, now=0)
+    assert engine.update('room2', 'light', 50, now=1, hour=12) is None
+    engine.update('room1', 'co2', 1000, now=0, hour=23)
+    assert engine.update('room1', 'light', 50, now=1, hour=23) is None
+    assert actions(engine.update('room1', 'light', 50, now=2, hour=12)) == [('raise', 'LIGHTS_OFF_OCCUPIED')]
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        CompoundEngine([{'name': 'X', 'when': [{'sensor': 'co2', 'above': 1, 'below': 2}]}])
+    with pytest.raises(ValueError):
+        CompoundEngine([{'name': 'X', 'when': []}])
+    with pytest.raises(ValueError):
+        CompoundEngine([RULES[0], RULES[0]])
+
+
+def reading(room, sensor, value, ts):
+    return f"hostel/{room}/{sensor}", json.dumps({'sensor_type': sensor, 'value': value, 'timestamp': ts}).encode()
+
+
+def test_alert_system_paths_and_snapshot():
+    config = {'defaults': {'temperature': {'min': 10, 'max': 40}, 'humidity': {'min': 10, 'max': 90}},
+              'compound': RULES}
+    items = [reading('room1', 'humidity', 62, '2024-01-01T00:00:00Z'),
+             reading('room1', 'temperature', 19.5, '2024-01-01T00:00:10Z'),
+             reading('room2', 'humidity', 62, '2024-01-01T00:00:10Z')]
+
+    single = AlertSystem(RuleEngine(config))
+    for topic, payload in items:
+        data = json.loads(payload)
+        single.process_reading(data['sensor_type'], data['value'], topic.split('/')[1], now=0, hour=12)
+    batched = AlertSystem(RuleEngine(config))
+    BatchEvaluator(batched).process(items, hour=12)
+    for alerts in (single, batched):
+        assert alerts.alert_count == 1
+        assert alerts.active_alerts() == [('room1', 'humidity+temperature', 'CONDENSATION_RISK', 'warning')]
+
+    restarted = AlertSystem(RuleEngine(config))
+    restore(restarted, capture(single))
+    assert restarted.active_alerts() == single.active_alerts()
+    # Still raised: no re-fire; a dry reading clears it
+    restarted.process_reading('temperature', 19.0, 'room1', now=1, hour=12)
+    assert restarted.alert_count == 1
+    restarted.process_reading('humidity', 50, 'room1', now=2, hour=12)
+    assert restarted.active_alerts() == []
@@ -0,0 +1,48 @@
+"""
+Connection Supervisor Tests
+Checks backoff bounds and that startup never blocks on an unreachable broker
+"""
+import random
+import socket
+import time
+
+import paho.mqtt.client as mqtt
+
+from src.dashboard.connection import ConnectionSupervisor, backoff_delay
+from src.dashboard.data_store import DataStore
+
+
+def test_backoff_is_jittered_and_capped():
+    rng = random.Random(7)
+    for attempt in range(10):
+        ceiling = min(8.0, 1.0 * 2 ** attempt)
+        delays = [backoff_delay(attempt, 1.0, 8.0, rng) for _ in range(50)]
+        assert all(ceiling / 2 <= d <= ceiling for d in delays)
+        assert len(set(delays)) > 1
+
+
+def test_start_returns_immediately_and_reports_reconnecting():
+    # Grab a free port and close it so the connect is refused
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    store = DataStore()
+    client = mqtt.Client(client_id="test_supervisor",
+                         callback_api_version=mqtt.CallbackAPIVersion.VERSION2)
+    supervisor = ConnectionSupervisor(client, '127.0.0.1', port, store, min_delay=0.05, max_delay=0.2)
+
+    start = time.perf_counter()
+    supervisor.start()
+    assert time.perf_counter() - start < 0.1
+    assert store.get_stats()['connection_state'] in ('connecting', 'reconnecting')
+
+    deadline = time.time() + 2
+    while supervisor.attempt < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert supervisor.attempt >= 2
+    assert store.get_stats()['connection_state'] == 'reconnecting'
+    assert isinstance(supervisor.last_error, OSError)
+
+    supervisor.stop()
+    assert store.get_stats()['connection_state'] == 'stopped'
@@ -0,0 +1,106 @@
+"""
+Alert Event Log Tests
+Checks batched writes, rotation, the segment index, crash recovery and queries
+"""
+import json
+import os
+
+from src.alerts.eventlog import EventLogSink, parse_time, plan, query, read_index
+from src.alerts.notify import Notification, NotificationDispatcher
+
+
+def notification(i, room='room1', sensor='co2', kind='alert', ts=1700000000.0):
+    n = Notification(kind, sensor, room, 'HIGH', 'warning', 1000 + i, 1000, 'ppm', i)
+    n.timestamp = ts + i
+    return n
+
+
+def write(sink, count, **kwargs):
+    for i in range(count):
+        sink.send(notification(i, **kwargs))
+
+
+def test_records_are_batched_and_indexed(tmp_path):
+    sink = EventLogSink(str(tmp_path), batch_size=10, flush_interval=3600)
+    write(sink, 25)
+    assert sink.written == 20
+    sink.close()
+    assert sink.written == 25
+    entries = list(read_index(str(tmp_path)).values())
+    assert len(entries) == 1
+    assert entries[0]['count'] == 25 and entries[0]['rooms'] == ['room1'] and entries[0]['sensors'] == ['co2']
+    records = list(query(str(tmp_path)))
+    assert [r['value'] for r in records] == [1000 + i for i in range(25)]
+
+
+def test_rotation_by_size_and_age(tmp_path):
+    sink = EventLogSink(str(tmp_path / 'size'), max_bytes=2000)
+    write(sink, 50)
+    sink.close()
+    assert sink.segments > 3
+    assert sum(e['count'] for e in read_index(str(tmp_path / 'size')).values()) == 50
+
+    sink = EventLogSink(str(tmp_path / 'age'), max_age=10)
+    write(sink, 35)
+    sink.close()
+    assert sink.segments == 4
+
+
+def test_query_uses_index_to_skip_and_seek(tmp_path):
+    directory = str(tmp_path)
+    sink = EventLogSink(directory, max_age=1000)
+    write(sink, 3000, room='room1', sensor='co2')
+    write(sink, 3000, room='room2', sensor='light', ts=1700003000.0)
+    sink.close()
+
+    reads, skipped = plan(directory, rooms={'room2'})
+    assert skipped == 3 and len(reads) == 3
+
+    since, until = 1700001500.0, 1700001510.0
+    reads, skipped = plan(directory, since=since, until=until)
+    assert len(reads) == 1 and reads[0][1] > 0 and reads[0][2] > reads[0][1]
+    records = list(query(directory, since=since, until=until))
+    assert [r['ts'] for r in records] == [since + i for i in range(11)]
+
+    assert len(list(query(directory, rooms=['room2'], sensors=['light'], limit=5))) == 5
+    assert list(query(directory, rooms=['room2'], sensors=['co2'])) == []
+
+
+def test_unclosed_segment_is_recovered(tmp_path):
+    directory = str(tmp_path)
+    sink = EventLogSink(directory, batch_size=1)
+    write(sink, 5)
+    # Simulate a crash: flushed records, a torn line, no index entry
+    sink._file.write(b'{"kind": "alert", "ts"')
+    sink._file.close()
+    assert read_index(directory) == {}
+    assert len(list(query(directory))) == 5
+
+    restarted = EventLogSink(directory)
+    assert restarted.recovered == 1
+    assert list(read_index(directory).values())[0]['count'] == 5
+
+
+def test_dispatcher_flushes_idle_event_log(tmp_path):
+    directory = str(tmp_path / 'log')
+    dispatcher = NotificationDispatcher.from_env({'ALERT_CONSOLE': 'false', 'ALERT_SOUND': 'false',
+                                                  'ALERT_EVENT_LOG': directory})
+    [worker] = dispatcher.workers
+    worker.sink.flush_interval = 0.05
+    dispatcher.start()
+    dispatcher.submit(notification(0))
+    segment = None
+    for _ in range(100):
+        files = [f for f in os.listdir(directory) if f.startswith('alerts-')]
+        if files and os.path.getsize(os.path.join(directory, files[0])):
+            segment = files[0]
+            break
+        worker.thread.join(0.02)
+    assert segment is not None
+    dispatcher.stop()
+    assert json.loads(open(os.path.join(directory, segment)).readline())['alert_type'] == 'HIGH'
+
+
+def test_parse_time():
+    assert parse_time('2024-03-01T12:00:00Z') == parse_time('2024-03-01T12:00:00') == 1709294400.0
+    assert parse_time('2h', now=10000.0) == 2800.0
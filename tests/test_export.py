@@ -0,0 +1,63 @@
+"""
+Export Tests
+Checks chunked CSV/Parquet export from DataStores and JSON Lines recordings
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from src.dashboard.data_store import DataStore
+from src.dashboard.export import export, iter_csv, iter_datastore_rows, iter_history_rows
+
+
+def make_store():
+    store = DataStore()
+    for i in range(5):
+        store.add_data('temperature', 20 + i, f'2024-01-01T00:00:0{i}Z', 95.0)
+    store.add_data('co2', 800, '2024-01-01T00:00:05Z', 90.0)
+    return store
+
+
+def test_csv_export_streams_in_chunks():
+    rows = list(iter_datastore_rows({'room1': make_store()}))
+    chunks = list(iter_csv(iter(rows), chunk_rows=2))
+    assert len(chunks) == 3
+    parsed = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert parsed[0] == ['room', 'sensor_type', 'timestamp', 'value']
+    assert parsed[1] == ['room1', 'temperature', '2024-01-01T00:00:00.000Z', '20']
+    assert len(parsed) == 7
+
+
+def test_empty_csv_export_still_has_header():
+    sink = io.BytesIO()
+    assert export(iter(()), 'csv', sink) == 0
+    assert sink.getvalue() == b'room,sensor_type,timestamp,value\n'
+
+
+def test_parquet_export_writes_row_groups():
+    pq = pytest.importorskip('pyarrow.parquet')
+    sink = io.BytesIO()
+    count = export(iter_datastore_rows({'room1': make_store()}), 'parquet', sink, chunk_rows=4)
+    assert count == 6
+    sink.seek(0)
+    parquet_file = pq.ParquetFile(sink)
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().column('value').to_pylist()[-1] == 800.0
+
+
+def test_history_reader_skips_bad_lines(tmp_path):
+    path = tmp_path / 'history.jsonl'
+    path.write_text('\n'.join([
+        json.dumps({'topic': 'hostel/room2/co2', 'sensor_type': 'co2', 'value': 950,
+                    'timestamp': '2024-01-01T00:00:00Z'}),
+        'not json',
+        json.dumps({'sensor_type': 'light', 'value': 300, 'timestamp': '2024-01-01T00:00:03Z',
+                    'location': 'Hostel Room 1'}),
+    ]))
+    assert list(iter_history_rows([str(path)])) == [
+        ('room2', 'co2', datetime(2024, 1, 1, 0, 0, 0), 950),
+        ('Hostel Room 1', 'light', datetime(2024, 1, 1, 0, 0, 3), 300),
+    ]
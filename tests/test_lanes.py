@@ -0,0 +1,83 @@
+"""
+Priority Lane Tests
+Checks the raw-payload pre-screen, urgent-first draining, coalescing and dropping of routine readings
+"""
+import json
+import threading
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.lanes import Prescreen, PriorityLanes
+from src.alerts.rules import RuleEngine
+
+RULES = {'defaults': {'co2': {'unit': 'ppm', 'max': 1000, 'debounce': [2, 3]},
+                      'temperature': {'unit': '°C', 'min': 18, 'max': 28}}}
+
+
+def payload(sensor_type, value):
+    return json.dumps({'sensor_type': sensor_type, 'value': value, 'unit': '',
+                       'timestamp': '2024-01-01T00:00:00Z'}).encode()
+
+
+def test_prescreen_flags_possible_alerts():
+    alerts = AlertSystem(RuleEngine(RULES))
+    prescreen = Prescreen(alerts.rules, alerts.tracker)
+    assert not prescreen('hostel/room1/co2', payload('co2', 600))
+    assert prescreen('hostel/room1/co2', payload('co2', 1500))
+    assert prescreen('hostel/room1/temperature', payload('temperature', -3.5e1))
+    assert not prescreen('hostel/room1/temperature', payload('temperature', 21.25))
+    # Unreadable payloads and odd topics go to the full path
+    assert prescreen('hostel/room1/co2', b'{"value": null}')
+    assert prescreen('co2', payload('co2', 600))
+    # A sensor mid-debounce needs every reading, in band or not
+    alerts.process_reading('co2', 1500, 'room2', now=0.0, hour=12)
+    assert prescreen('hostel/room2/co2', payload('co2', 600))
+    assert (prescreen.urgent, prescreen.routine) == (5, 2)
+
+
+def test_urgent_first_coalesced_routine():
+    release = threading.Event()
+    seen = []
+
+    def handler(items):
+        release.wait(5)
+        seen.extend(items)
+
+    lanes = PriorityLanes(handler, routine_max=3).start()
+    lanes.submit('a', 'a0', False)
+    while lanes.backlog() != (0, 0):
+        pass
+    # The consumer is now blocked on a0; build up a backlog behind it
+    lanes.submit('a', 'a1', False)
+    lanes.submit('b', 'b1', False)
+    lanes.submit('a', 'a2', False)
+    lanes.submit('c', 'c1', True)
+    lanes.submit('b', 'b2', True)
+    lanes.submit('d', 'd1', False)
+    lanes.submit('e', 'e1', False)
+    assert not lanes.submit('f', 'f1', False)
+    release.set()
+    lanes.stop()
+    assert seen == ['a0', 'c1', 'b2', 'a2', 'd1', 'e1']
+    stats = lanes.stats()
+    assert (stats['coalesced'], stats['superseded'], stats['dropped']) == (1, 1, 1)
+    assert stats['submitted'] == 9 and stats['errors'] == 0
+
+
+def test_batches_fill_from_both_lanes():
+    batches = []
+    release = threading.Event()
+
+    def handler(items):
+        release.wait(5)
+        batches.append(items)
+
+    lanes = PriorityLanes(handler, max_items=4).start()
+    lanes.submit('x', 'x0', False)
+    while lanes.backlog() != (0, 0):
+        pass
+    for i in range(5):
+        lanes.submit(f"r{i}", f"r{i}", False)
+    lanes.submit('u', 'u0', True)
+    release.set()
+    lanes.stop()
+    assert batches == [['x0'], ['u0', 'r0', 'r1', 'r2'], ['r3', 'r4']]
@@ -0,0 +1,90 @@
+"""
+Alert Latency Tests
+Checks histogram accuracy and bounds, interval reports and the stages recorded on the alert path
+"""
+import json
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.batch import BatchEvaluator
+from src.alerts.latency import BUCKETS, MAX_VALUE, LatencyHistogram, StageLatency, bucket_high, bucket_of
+from src.alerts.notify import NotificationDispatcher
+from src.alerts.rules import RuleEngine
+
+
+def test_buckets_are_contiguous_and_tight():
+    for value in [0, 1, 127, 128, 129, 255, 256, 1000, 123456789, MAX_VALUE]:
+        index = bucket_of(value)
+        assert index < BUCKETS
+        assert value <= bucket_high(index)
+        assert index == 0 or bucket_high(index - 1) < value
+        assert bucket_high(index) - value <= value / 64
+    assert bucket_of(MAX_VALUE) == BUCKETS - 1
+
+
+def test_percentiles_within_precision():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=14, sigma=1.5, size=200000).astype(np.int64)
+    vectorized, looped = LatencyHistogram(), LatencyHistogram()
+    vectorized.record_many(values)
+    for value in values[:5000].tolist():
+        looped.record(value)
+    assert vectorized.count == len(values) and vectorized.max == values.max()
+    for p in (50, 90, 99, 99.9):
+        exact = np.percentile(values, p, method='inverted_cdf')
+        assert exact <= vectorized.percentile(p) <= exact * (1 + 1 / 64)
+    check = LatencyHistogram()
+    check.record_many(values[:5000])
+    assert list(check.counts) == list(looped.counts) and check.total == looped.total
+    # Memory does not grow with samples; negatives (clock skew) count as 0, huge values clamp
+    vectorized.record(-5)
+    vectorized.record(MAX_VALUE * 10)
+    assert len(vectorized.counts) == BUCKETS and vectorized.max == MAX_VALUE
+    assert LatencyHistogram().percentile(99) == 0
+
+
+def test_interval_reports_only_new_samples():
+    stages = StageLatency()
+    stages.record('decode', 1000, count=99)
+    stages.record('decode', 10 ** 6)
+    first = stages.since_last_report()
+    assert first['decode'].count == 100 and first['decode'].percentile(99.9) == 10 ** 6
+    stages.record('decode', 2000, count=10)
+    second = stages.since_last_report()
+    assert second['decode'].count == 10 and second['decode'].max == bucket_high(bucket_of(2000))
+    assert stages.stages['decode'].count == 110 and second['transit'].count == 0
+
+
+def test_alert_and_dispatch_stages():
+    class Sink:
+        name = 'console'
+
+        def send(self, n):
+            time.sleep(0.01)
+
+    dispatcher = NotificationDispatcher([Sink()]).start()
+    alerts = AlertSystem(RuleEngine({'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}}), dispatcher)
+    sent = time.time() - 0.05
+    alerts.process_reading('co2', 1500, 'room1', now=sent, hour=12)
+    alerts.process_reading('co2', 600, 'room1', now=sent, hour=12)
+    dispatcher.stop()
+    alert = alerts.latency.stages['alert']
+    assert alert.count == 2 and 40e6 < alert.percentile(50) < 5e9
+    dispatch = dispatcher.latency()['console']
+    assert dispatch.count == 2 and dispatch.max >= 10e6
+    assert dispatcher.stats()['console']['latency_ms_p50'] >= 10
+
+
+def test_batch_records_transit_decode_and_evaluate():
+    alerts = AlertSystem(RuleEngine({'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}}))
+    evaluator = BatchEvaluator(alerts)
+    stamp = datetime.fromtimestamp(time.time() - 2, timezone.utc).replace(tzinfo=None).isoformat() + 'Z'
+    payload = json.dumps({'sensor_type': 'co2', 'value': 600, 'timestamp': stamp}).encode()
+    evaluator.process([(f"hostel/room{i}/co2", payload) for i in range(50)], hour=12)
+    stages = alerts.latency.stages
+    assert stages['transit'].count == 50 and 1.9e9 < stages['transit'].percentile(50) < 3e9
+    assert stages['decode'].count == 50 and stages['evaluate'].count == 50
+    assert stages['alert'].count == 0
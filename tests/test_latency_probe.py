@@ -0,0 +1,41 @@
+"""
+Latency Probe Harness Tests
+Checks probe bookkeeping (warmup, duplicates, unknown topics, scheduled-time latency) without a broker
+"""
+import time
+from types import SimpleNamespace
+
+from src.metrics.latency_test import PROBE, LatencyTester, ProbeCase, print_results
+
+
+def probe(topic, seq, scheduled, size=64):
+    payload = PROBE.pack(seq, scheduled, time.time_ns())
+    return SimpleNamespace(topic=topic, payload=payload + bytes(size - len(payload)))
+
+
+def test_probes_are_recorded_once_after_warmup():
+    tester = LatencyTester('127.0.0.1', 1883, use_tls=False)
+    case = tester.cases['probe/q1/64'] = ProbeCase('probe/q1/64', 1, 64, count=10, warmup=3)
+    case.sent = 10
+    # Scheduled 5 ms ago: the publisher's lag is part of the latency
+    scheduled = time.perf_counter_ns() - 5_000_000
+    for seq in range(10):
+        tester.on_message(None, None, probe(case.topic, seq, scheduled))
+    tester.on_message(None, None, probe(case.topic, 4, scheduled))
+    tester.on_message(None, None, probe(case.topic, 99, scheduled))
+    tester.on_message(None, None, probe('probe/other', 0, scheduled))
+
+    assert (case.received, case.duplicates) == (10, 2)
+    assert case.histogram.count == 7
+    assert case.histogram.percentile(50) >= 5_000_000
+
+
+def test_results_report_lost_probes(capsys):
+    case = ProbeCase('probe/q0/16', 0, 16, count=4, warmup=0)
+    # Probes are never smaller than their header
+    assert case.size == PROBE.size
+    case.sent, case.received, case.publish_seconds = 4, 3, 0.5
+    case.histogram.record(2_000_000)
+    print_results([case])
+    row = next(line for line in capsys.readouterr().out.splitlines() if line.startswith('  0'))
+    assert row.split()[:5] == ['0', '20', '3', '1', '8']
@@ -0,0 +1,108 @@
+"""
+Live Feed Tests
+Checks topic filters, coalescing, the WebSocket/HTTP endpoints on localhost and hostile client frames
+"""
+import asyncio
+import base64
+import json
+import os
+import struct
+from urllib.parse import quote
+
+import pytest
+
+from src.broker.topics import topic_matches
+from src.dashboard.live_feed import (
+    CLOSE_TOO_BIG, OP_CLOSE, FeedClient, LiveFeedServer, OP_TEXT, encode_frame, read_frame
+)
+
+
+def test_topic_matches_wildcards():
+    assert topic_matches('hostel/+/co2', 'hostel/room1/co2')
+    assert not topic_matches('hostel/+/co2', 'hostel/room1/light')
+    assert topic_matches('hostel/#', 'hostel/room1/co2')
+    assert topic_matches('#', 'anything/at/all')
+    assert not topic_matches('hostel/room1', 'hostel/room1/co2')
+
+
+def test_slow_client_keeps_only_latest_per_topic():
+    client = FeedClient(writer=None, filters=['#'])
+    for value in range(100):
+        client.offer('hostel/room1/co2', str(value).encode())
+    client.offer('hostel/room1/light', b'7')
+    assert client.pending == {'hostel/room1/co2': b'99', 'hostel/room1/light': b'7'}
+    assert client.coalesced == 99
+
+
+async def _open_ws(port, topics):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET /ws?topics={quote(topics)} HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    response = await reader.readuntil(b'\r\n\r\n')
+    assert response.startswith(b'HTTP/1.1 101')
+    return reader, writer
+
+
+def test_server_pushes_filtered_readings_and_serves_latest():
+    async def scenario():
+        server = await LiveFeedServer(host='127.0.0.1', port=0).start()
+        reader, writer = await _open_ws(server.port, 'hostel/+/co2')
+
+        server.publish('hostel/room1/temperature', {'value': 24.0})
+        server.publish('hostel/room1/co2', {'value': 900})
+        opcode, payload = await asyncio.wait_for(read_frame(reader), 2)
+        assert opcode == OP_TEXT
+        assert json.loads(payload) == [{'topic': 'hostel/room1/co2', 'value': 900}]
+
+        # Widen the subscription at runtime with a masked client frame
+        writer.write(encode_frame(json.dumps({'subscribe': ['hostel/#']}).encode(), mask=True))
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        server.publish('hostel/room2/light', {'value': 300})
+        _, payload = await asyncio.wait_for(read_frame(reader), 2)
+        assert json.loads(payload)[0]['topic'] == 'hostel/room2/light'
+
+        http_reader, http_writer = await asyncio.open_connection('127.0.0.1', server.port)
+        http_writer.write(b"GET /latest HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await http_reader.read()
+        body = json.loads(response.split(b'\r\n\r\n', 1)[1])
+        assert body['hostel/room1/temperature']['value'] == 24.0
+
+        writer.close()
+        await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_malformed_and_oversized_requests():
+    async def scenario():
+        server = await LiveFeedServer(host='127.0.0.1', port=0).start()
+        reader, writer = await _open_ws(server.port, 'hostel/+/co2')
+        # Valid JSON of the wrong shape is ignored instead of killing the receiver
+        for request in (b'5', b'"hostel/#"', b'{"subscribe": 5}', b'{"subscribe": ["hostel/#", 7]}'):
+            writer.write(encode_frame(request, mask=True))
+        await writer.drain()
+        await asyncio.sleep(0.05)
+        server.publish('hostel/room2/light', {'value': 300})
+        _, payload = await asyncio.wait_for(read_frame(reader), 2)
+        assert json.loads(payload)[0]['topic'] == 'hostel/room2/light'
+
+        # A frame header declaring 1 TB is refused before anything is read
+        writer.write(struct.pack('!BBQ', 0x81, 0x80 | 127, 1 << 40) + os.urandom(4))
+        await writer.drain()
+        opcode, payload = await asyncio.wait_for(read_frame(reader), 2)
+        assert opcode == OP_CLOSE and struct.unpack('!H', payload)[0] == CLOSE_TOO_BIG
+        writer.close()
+        await server.stop()
+
+    asyncio.run(scenario())
+
+
+def test_start_in_thread_raises_when_the_port_is_taken():
+    first = LiveFeedServer(host='127.0.0.1', port=0)
+    first.start_in_thread()
+    with pytest.raises(OSError):
+        LiveFeedServer(host='127.0.0.1', port=first.port).start_in_thread()
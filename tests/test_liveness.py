@@ -0,0 +1,98 @@
+"""
+Sensor Liveness Tests
+Checks timer-wheel deadlines, learned periods, lazy rescheduling and OFFLINE alerts
+"""
+from src.alerts.alert_system import AlertSystem
+from src.alerts.liveness import LivenessMonitor
+from src.alerts.rules import RuleEngine
+
+
+def test_configured_period_sets_deadline():
+    monitor = LivenessMonitor(factor=3, min_timeout=5, periods={'co2': 3})
+    monitor.seen('room1', 'co2', now=100.0)
+    # Deadline is 100 + max(5, 9) = 109
+    assert monitor.advance(108.5) == []
+    expired = monitor.advance(109.5)
+    assert [(room, sensor) for room, sensor, _ in expired] == [('room1', 'co2')]
+    assert monitor.is_offline('room1', 'co2')
+    # Already offline: no second alert
+    assert monitor.advance(200.0) == []
+
+
+def test_readings_postpone_and_clear():
+    monitor = LivenessMonitor(factor=3, min_timeout=0, periods={'temperature': 2})
+    for t in range(0, 60, 2):
+        monitor.seen('room1', 'temperature', now=float(t))
+        assert monitor.advance(t + 1.0) == []
+    assert monitor.advance(63.5) == []
+    assert len(monitor.advance(64.5)) == 1
+    cleared = monitor.seen('room1', 'temperature', now=70.0)
+    assert [t.action for t in cleared] == ['clear']
+    assert not monitor.is_offline('room1', 'temperature')
+    assert monitor.seen('room1', 'temperature', now=71.0) is None
+
+
+def test_learned_period_needs_second_reading():
+    monitor = LivenessMonitor(factor=3, min_timeout=0)
+    monitor.seen('room1', 'light', now=0.0)
+    # One reading says nothing about the period: not watched yet
+    assert monitor.advance(500.0) == []
+    for t in (500.0, 510.0, 520.0):
+        monitor.seen('room1', 'light', now=t)
+    # The first gap (500 s) still dominates the learned period
+    assert monitor.advance(560.0) == []
+    for t in range(530, 800, 10):
+        monitor.seen('room1', 'light', now=float(t))
+    # Now a 10 s sensor: offline about 30 s after its last reading, although
+    # the first gaps filed its entry much further out
+    assert monitor.advance(815.0) == []
+    assert len(monitor.advance(830.0)) == 1
+    # The offline gap does not inflate the learned period
+    slot = monitor.slots['room1', 'light']
+    period = monitor.period[slot]
+    monitor.seen('room1', 'light', now=900.0)
+    assert monitor.period[slot] == period
+
+
+def test_wheel_visits_are_lazy():
+    monitor = LivenessMonitor(factor=3, min_timeout=0, periods={'co2': 10}, wheel_slots=64)
+    sensors = [(f"room{i}", 'co2') for i in range(1000)]
+    for t in range(0, 300):
+        for room, sensor in sensors[t % 10::10]:
+            monitor.seen(room, sensor, now=float(t))
+        assert monitor.advance(t + 0.5) == []
+    # Every sensor reports every 10 s against a 30 s timeout: each is re-filed
+    # about once per timeout, never once per reading or once per tick
+    assert monitor.visited < 1000 * 300 / 30 * 1.5
+    expired = monitor.advance(400.0)
+    assert len(expired) == 1000 and len(list(monitor.active())) == 1000
+
+
+def test_sensors_filter_and_long_pause():
+    monitor = LivenessMonitor(factor=2, min_timeout=0, periods={'co2': 1000}, sensors=['co2'], wheel_slots=8)
+    assert monitor.seen('room1', 'humidity', now=0.0) is None
+    monitor.seen('room1', 'co2', now=0.0)
+    assert len(monitor) == 1
+    # Deadline far beyond one revolution of the wheel
+    assert monitor.advance(1999.0) == []
+    assert len(monitor.advance(2001.0)) == 1
+
+
+def test_alert_system_raises_and_clears_offline():
+    rules = RuleEngine({
+        'defaults': {'co2': {'unit': 'ppm', 'max': 1000}},
+        'offline': {'factor': 3, 'min_timeout': 10, 'periods': {'co2': 3}},
+    })
+    alerts = AlertSystem(rules)
+    clock = [0.0]
+    alerts.liveness.clock = lambda: clock[0]
+    alerts.process_reading('co2', 600, 'room1', 'ppm', now=0.0, hour=12)
+    clock[0] = 5.0
+    assert alerts.check_liveness() == 0
+    clock[0] = 11.5
+    assert alerts.check_liveness() == 1
+    assert ('room1', 'co2', 'OFFLINE', 'warning') in alerts.active_alerts()
+    assert alerts.alert_count == 1
+    clock[0] = 12.0
+    alerts.process_reading('co2', 600, 'room1', 'ppm', now=12.0, hour=12)
+    assert alerts.active_alerts() == []
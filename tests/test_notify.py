@@ -0,0 +1,126 @@
+"""
+Notification Dispatcher Tests
+Checks sink fan-out, isolation of slow sinks, bounded queues, thread-safe counting and the file/webhook sinks
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.notify import FileSink, Notification, NotificationDispatcher, WebhookSink
+from src.alerts.rules import RuleEngine
+
+
+class RecordingSink:
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.received = []
+
+    def send(self, n):
+        time.sleep(self.delay)
+        self.received.append(n)
+
+
+def test_slow_sink_does_not_delay_others():
+    fast, slow = RecordingSink('fast'), RecordingSink('slow', delay=0.2)
+    dispatcher = NotificationDispatcher([fast, slow]).start()
+    start = time.perf_counter()
+    for i in range(5):
+        dispatcher.submit(Notification('alert', 'temperature', 'room1', 'HIGH', alert_number=i))
+    assert time.perf_counter() - start < 0.05
+    deadline = time.time() + 2
+    while len(fast.received) < 5 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(fast.received) == 5 and len(slow.received) < 5
+    dispatcher.stop()
+    assert len(slow.received) == 5
+    stats = dispatcher.stats()
+    assert stats['slow']['latency_ms_max'] > stats['fast']['latency_ms_max']
+
+
+def test_full_queue_drops_and_counts():
+    blocked = threading.Event()
+
+    class BlockingSink:
+        name = 'blocking'
+
+        def send(self, n):
+            blocked.wait()
+
+    dispatcher = NotificationDispatcher([BlockingSink()], maxsize=3).start()
+    results = [dispatcher.submit(Notification('alert', 'co2', 'room1', 'HIGH')) for _ in range(10)]
+    blocked.set()
+    dispatcher.stop()
+    stats = dispatcher.stats()['blocking']
+    assert results.count(False) == stats['dropped'] >= 6
+    assert stats['sent'] + stats['dropped'] == 10
+    assert stats['max_depth'] <= 3
+
+
+def test_file_and_webhook_sinks(tmp_path):
+    posted = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            posted.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    path = tmp_path / 'alerts.jsonl'
+    dispatcher = NotificationDispatcher([
+        FileSink(str(path)), WebhookSink(f"http://127.0.0.1:{server.server_port}/hook")]).start()
+    dispatcher.submit(Notification('alert', 'humidity', 'room3', 'LOW', 'critical', 20, 30, '%', 1))
+    dispatcher.stop()
+    server.shutdown()
+
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record['room'] == 'room3' and record['severity'] == 'critical'
+    assert posted == [record]
+
+
+def test_alert_system_queues_transitions():
+    sink = RecordingSink('recording')
+    dispatcher = NotificationDispatcher([sink]).start()
+    alerts = AlertSystem(RuleEngine(), dispatcher)
+    for i, value in enumerate([24, 35, 36, 24]):
+        alerts.process_reading('temperature', value, 'room1', '°C', now=float(i), hour=12)
+    dispatcher.stop()
+    assert [(n.kind, n.alert_type) for n in sink.received] == [('alert', 'HIGH'), ('clear', 'HIGH')]
+
+
+def test_alerts_from_several_threads_are_counted_once():
+    sink = RecordingSink('recording')
+    # A burst of 100 that does not refill during the test
+    dispatcher = NotificationDispatcher([sink], limits={'recording': (100, 3600)}).start()
+    alerts = AlertSystem(RuleEngine(), dispatcher)
+    info = {'type': 'OFFLINE', 'severity': 'warning', 'threshold': '30s', 'value': 'silent', 'unit': ''}
+
+    def fire(room):
+        for _ in range(500):
+            alerts.trigger_alert('co2', {**info, 'room': room})
+
+    # Switch threads as often as possible so unguarded read-modify-writes interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=fire, args=(f"room{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    dispatcher.stop()
+    stats = dispatcher.stats()['recording']
+    assert alerts.alert_count == 4000
+    assert stats['sent'] == 100 and stats['limited'] == 3900
+    numbers = [n.alert_number for n in sink.received]
+    assert len(set(numbers)) == len(numbers)
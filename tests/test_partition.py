@@ -0,0 +1,99 @@
+"""
+Alert Worker Partitioning Tests
+Checks jump-hash ownership by room, minimal movement on resize, routing, stale-reading drops and compound rules across workers
+"""
+from collections import Counter
+
+import pytest
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.partition import PartitionRouter, jump_hash, owner_of
+from src.alerts.rules import RuleEngine
+
+TOPICS = [f"hostel/room{r}/{sensor}" for r in range(500) for sensor in ('temperature', 'humidity', 'co2', 'light')]
+
+
+def test_jump_hash_range_and_determinism():
+    for key in range(0, 10**12, 7919 * 10**6):
+        bucket = jump_hash(key, 8)
+        assert 0 <= bucket < 8
+        assert jump_hash(key, 8) == bucket
+    assert jump_hash(12345, 1) == 0
+
+
+def test_owners_are_balanced():
+    counts = Counter(owner_of(topic, 4) for topic in TOPICS)
+    assert set(counts) == {0, 1, 2, 3}
+    assert max(counts.values()) < 1.2 * len(TOPICS) / 4
+
+
+def test_a_rooms_sensors_share_one_owner():
+    for room in range(100):
+        owners = {owner_of(f"hostel/room{room}/{sensor}", 4) for sensor in ('temperature', 'humidity', 'co2')}
+        assert len(owners) == 1
+    # A custom key (the storm grouper's floor label) groups whole floors
+    floor = lambda topic: topic.split('/')[1][:5]  # noqa: E731
+    assert len({owner_of(f"hostel/room1{r:02d}/co2", 4, floor) for r in range(50)}) == 1
+
+
+def test_compound_rules_fire_with_several_workers():
+    rules = {'defaults': {'humidity': {'unit': '%', 'max': 95}, 'temperature': {'unit': '°C', 'min': 5, 'max': 40}},
+             'compound': [{'name': 'CONDENSATION_RISK', 'max_age': 60,
+                           'when': [{'sensor': 'humidity', 'above': 58}, {'sensor': 'temperature', 'below': 21}]}]}
+    workers = [AlertSystem(RuleEngine(rules)) for _ in range(4)]
+    routers = [PartitionRouter(w, 4) for w in range(4)]
+    for room in range(100):
+        for sensor, value in (('humidity', 62.0), ('temperature', 19.5)):
+            topic = f"hostel/room{room}/{sensor}"
+            # Whichever worker the broker picks, the reading ends up with the owner
+            owner = owner_of(topic, 4)
+            arrival = routers[room % 4]
+            assert arrival.route(topic) == (None if room % 4 == owner else f"alerts/partition/{owner}/{topic}")
+            workers[owner].process_reading(sensor, value, f"room{room}", now=float(room), hour=12)
+    assert sum(len(list(worker.compound.active())) for worker in workers) == 100
+
+
+def test_adding_a_worker_moves_few_sensors():
+    moved = sum(owner_of(topic, 4) != owner_of(topic, 5) for topic in TOPICS)
+    # Ideal is 1/5 of the sensors, all of them moving to the new worker
+    assert moved < 0.3 * len(TOPICS)
+    assert all(owner_of(t, 5) == 4 for t in TOPICS if owner_of(t, 4) != owner_of(t, 5))
+
+
+def test_route_forwards_only_foreign_topics():
+    routers = [PartitionRouter(w, 3) for w in range(3)]
+    for topic in TOPICS[:50]:
+        routes = [router.route(topic) for router in routers]
+        owner = owner_of(topic, 3)
+        assert routes[owner] is None
+        assert all(r == f"alerts/partition/{owner}/{topic}" for w, r in enumerate(routes) if w != owner)
+
+    owner = routers[owner_of(TOPICS[0], 3)]
+    assert owner.unwrap(f"alerts/partition/{owner.worker_id}/{TOPICS[0]}") == (TOPICS[0], True)
+    assert owner.unwrap(TOPICS[0]) == (TOPICS[0], False)
+    assert owner.received_forwards == 1
+
+
+def test_subscriptions():
+    assert PartitionRouter().subscriptions() == [('hostel/+/+', 1)]
+    assert PartitionRouter(1, 2).subscriptions() == [('$share/alerts/hostel/+/+', 1), ('alerts/partition/1/#', 1)]
+    broker = PartitionRouter(1, 2, routing='broker')
+    assert broker.subscriptions() == [('$share/alerts/hostel/+/+', 1)]
+    assert all(broker.route(topic) is None for topic in TOPICS[:50])
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        PartitionRouter(2, 2)
+    with pytest.raises(ValueError):
+        PartitionRouter(0, 2, routing='sticky')
+
+
+def test_admit_drops_overtaken_readings():
+    router = PartitionRouter(0, 2)
+    assert router.admit(None, 100.0)
+    assert router.admit(100.0, 100.0)
+    assert not router.admit(100.0, 97.0)
+    assert router.stale == 1
+    # A single worker sees readings in broker order and never drops
+    assert PartitionRouter().admit(100.0, 97.0)
@@ -0,0 +1,43 @@
+"""
+Render Snapshot Tests
+Checks that sessions share one snapshot per DataStore version
+"""
+from src.dashboard.data_store import DataStore
+from src.dashboard.snapshot import SnapshotCache
+
+
+def test_snapshot_is_rebuilt_once_per_version():
+    store = DataStore()
+    cache = SnapshotCache(store)
+    store.add_data('temperature', 24.5, '2024-01-01T00:00:00Z', 90.0)
+
+    first = cache.get()
+    assert cache.get() is first
+    assert cache.builds == 1
+
+    store.add_data('temperature', 25.5, '2024-01-01T00:00:03Z', 89.0)
+    second = cache.get()
+    assert second is not first
+    assert cache.builds == 2
+    assert second.get_latest('temperature', 22) == 25.5
+    assert second.counts['temperature'] == 2
+    assert second.series_stats['temperature']['mean'] == 25.0
+    assert second.battery_levels['temperature'] == 89.0
+
+
+def test_snapshot_defaults_and_shared_figures():
+    store = DataStore()
+    snapshot = SnapshotCache(store).get()
+    assert snapshot.get_latest('co2', 600) == 600
+    assert snapshot.counts['co2'] == 0
+
+    fig = snapshot.trend_chart('co2', "CO2 Level", "#95E1D3", "ppm")
+    assert snapshot.trend_chart('co2', "CO2 Level", "#95E1D3", "ppm") is fig
+
+
+def test_connection_changes_invalidate_snapshot():
+    store = DataStore()
+    cache = SnapshotCache(store)
+    assert cache.get().connected is False
+    store.set_connected(True)
+    assert cache.get().connected is True
@@ -0,0 +1,71 @@
+"""
+REST API Tests
+Checks routing, ETag/304 handling, the per-version cache, range queries and server startup failures
+"""
+import json
+
+import pytest
+
+from src.dashboard.data_store import DataStore
+from src.dashboard.rest_api import RestApi, RestApiServer
+
+
+def make_api():
+    store = DataStore()
+    for i in range(5):
+        store.add_data('temperature', 20 + i, f'2024-01-01T00:00:0{i}Z', 95.0)
+    store.add_data('co2', 800, '2024-01-01T00:00:05Z', 90.0)
+    return RestApi({'room1': store}), store
+
+
+def test_latest_and_unknown_routes():
+    api, _ = make_api()
+    status, etag, body = api.handle('GET', '/api/latest')
+    assert status == 200 and etag
+    latest = json.loads(body)['room1']
+    assert latest['temperature']['value'] == 24
+    assert latest['co2']['battery_level'] == 90.0
+    assert api.handle('GET', '/api/rooms/room9/latest')[0] == 404
+    assert api.handle('GET', '/api/rooms/room1/pressure/latest')[0] == 404
+    assert api.handle('POST', '/api/latest')[0] == 405
+
+
+def test_unchanged_poll_returns_304_without_encoding():
+    api, store = make_api()
+    _, etag, _ = api.handle('GET', '/api/rooms/room1/latest')
+    encodes = api.encodes
+    assert api.handle('GET', '/api/rooms/room1/latest', etag) == (304, etag, b'')
+    assert api.handle('GET', '/api/rooms/room1/latest')[2]
+    assert api.encodes == encodes
+
+    store.add_data('temperature', 30, '2024-01-01T00:00:09Z', 95.0)
+    status, new_etag, body = api.handle('GET', '/api/rooms/room1/latest', etag)
+    assert status == 200 and new_etag != etag
+    assert json.loads(body)['temperature']['value'] == 30
+
+
+def test_series_etag_ignores_other_sensors():
+    api, store = make_api()
+    _, etag, _ = api.handle('GET', '/api/rooms/room1/temperature/series')
+    store.add_data('co2', 850, '2024-01-01T00:00:06Z', 90.0)
+    assert api.handle('GET', '/api/rooms/room1/temperature/series', etag)[0] == 304
+
+
+def test_series_time_range():
+    api, _ = make_api()
+    status, _, body = api.handle(
+        'GET', '/api/rooms/room1/temperature/series?from=2024-01-01T00:00:01Z&to=2024-01-01T00:00:03Z')
+    assert status == 200
+    assert [p['value'] for p in json.loads(body)['points']] == [21, 22, 23]
+    assert api.handle('GET', '/api/rooms/room1/temperature/series?from=yesterday')[0] == 400
+    # Offsets are converted to the stored (naive UTC) times instead of failing the comparison
+    status, _, body = api.handle('GET', '/api/rooms/room1/temperature/series?from=2024-01-01T02:00:02%2B02:00')
+    assert status == 200
+    assert [p['value'] for p in json.loads(body)['points']] == [22, 23, 24]
+
+
+def test_start_in_thread_raises_when_the_port_is_taken():
+    first = RestApiServer({'room1': DataStore()}, host='127.0.0.1', port=0)
+    first.start_in_thread()
+    with pytest.raises(OSError):
+        RestApiServer({'room1': DataStore()}, host='127.0.0.1', port=first.port).start_in_thread()
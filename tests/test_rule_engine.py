@@ -0,0 +1,80 @@
+"""
+Rule Engine Tests
+Checks room overrides, time-of-day profiles, severity levels, rule file loading and the AlertSystem wiring
+"""
+import pytest
+
+from src.alerts import rules
+from src.alerts.alert_system import AlertSystem, room_from_topic
+from src.alerts.rules import DEFAULT_RULES_FILE, RuleEngine
+
+CONFIG = {
+    'defaults': {
+        'temperature': {'unit': '°C', 'min': 20, 'max': 28, 'critical_min': 16, 'critical_max': 32},
+        'co2': {'unit': 'ppm', 'min': None, 'max': 1000},
+    },
+    'rooms': {
+        'server_room': {'temperature': {'max': 24}},
+        'dorm': {'co2': {'profiles': [{'hours': [22, 7], 'max': 800}]}},
+    }
+}
+
+
+def test_defaults_overrides_and_severity():
+    engine = RuleEngine(CONFIG)
+    assert engine.evaluate('room1', 'temperature', 25, hour=12) is None
+    assert engine.evaluate('room1', 'temperature', 30, hour=12) == ('HIGH', 'warning', 28)
+    assert engine.evaluate('room1', 'temperature', 33, hour=12) == ('HIGH', 'critical', 32)
+    assert engine.evaluate('room1', 'temperature', 15, hour=12) == ('LOW', 'critical', 16)
+    # Override keeps the default min and critical bounds
+    assert engine.evaluate('server_room', 'temperature', 25, hour=12) == ('HIGH', 'warning', 24)
+    assert engine.evaluate('server_room', 'temperature', 19, hour=12) == ('LOW', 'warning', 20)
+    assert engine.evaluate('room1', 'pressure', 5, hour=12) is None
+
+
+def test_profiles_wrap_midnight():
+    engine = RuleEngine(CONFIG)
+    for hour in (22, 23, 0, 6):
+        assert engine.evaluate('dorm', 'co2', 900, hour=hour) == ('HIGH', 'warning', 800)
+    for hour in (7, 12, 21):
+        assert engine.evaluate('dorm', 'co2', 900, hour=hour) is None
+    assert engine.evaluate('room1', 'co2', 900, hour=23) is None
+
+
+def test_violations_and_bands_are_shared():
+    engine = RuleEngine(CONFIG)
+    first = engine.evaluate('room1', 'temperature', 30, hour=1)
+    assert engine.evaluate('room2', 'temperature', 31, hour=9) is first
+    # Four distinct sets of limits: temperature default/override, co2 day/night
+    assert engine.band_count() == 4
+
+
+def test_bundled_rules_match_builtin_limits():
+    engine = RuleEngine.from_file(DEFAULT_RULES_FILE)
+    assert engine.evaluate('room1', 'temperature', 29, hour=12).threshold == 28
+    assert engine.evaluate('room1', 'humidity', 35, hour=12).threshold == 40
+    assert engine.evaluate('room1', 'co2', 1100, hour=12).threshold == 1000
+    assert engine.evaluate('room1', 'light', 900, hour=12).threshold == 800
+
+
+def test_missing_rule_files(monkeypatch):
+    # A requested file must exist, whether passed in or set in ALERT_RULES_FILE
+    with pytest.raises(FileNotFoundError):
+        RuleEngine.from_file('/nonexistent/rules.json')
+    monkeypatch.setenv('ALERT_RULES_FILE', '/nonexistent/rules.json')
+    with pytest.raises(FileNotFoundError):
+        RuleEngine.from_file()
+    # Without the bundled file, the built-in limits apply
+    monkeypatch.delenv('ALERT_RULES_FILE')
+    monkeypatch.setattr(rules, 'DEFAULT_RULES_FILE', '/nonexistent/alert_rules.json')
+    assert RuleEngine.from_file().evaluate('room1', 'co2', 1100, hour=0)
+
+
+def test_alert_system_uses_room_rules():
+    alerts = AlertSystem(RuleEngine(CONFIG))
+    room = room_from_topic('hostel/server_room/temperature')
+    assert room == 'server_room'
+    info = alerts.check_thresholds('temperature', 25, room, hour=12)
+    assert info == {'type': 'HIGH', 'severity': 'warning', 'threshold': 24, 'value': 25,
+                    'unit': '°C', 'room': 'server_room'}
+    assert alerts.check_thresholds('temperature', 25, 'room1', hour=12) is None
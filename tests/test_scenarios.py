@@ -1,53 +1,68 @@
 """
 Consolidated Test Scenarios for IoT Monitoring System
 Tests all major functionalities
+
+Run interactively against a broker with `python tests/test_scenarios.py`;
+under pytest the scenarios run through the embedded broker fixture.
 """
 import paho.mqtt.client as mqtt
 import json
 import time
 import ssl
 import os
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# MQTT Configuration
-MQTT_BROKER = os.getenv("MQTT_BROKER", "95c2f02d61404267847ebc19552f72b0.s1.eu.hivemq.cloud")
-MQTT_PORT = int(os.getenv("MQTT_PORT", 8883))
+# MQTT Configuration - without MQTT_BROKER, the embedded broker (python -m src.broker.server)
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+MQTT_PORT = int(os.getenv("MQTT_PORT", 8883 if MQTT_USE_TLS else 1883))
 MQTT_USERNAME = os.getenv("MQTT_USERNAME", None)
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", None)
-MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
 
-class TestScenarios:
-    def __init__(self):
+class ScenarioRunner:
+    def __init__(self, broker=MQTT_BROKER, port=MQTT_PORT, use_tls=MQTT_USE_TLS, pace=1.0):
         self.client = mqtt.Client(
             client_id="test_scenarios",
             callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
             protocol=mqtt.MQTTv311
         )
+        self.broker = broker
+        self.port = port
+        self.use_tls = use_tls
+        # Scales the pauses between readings (0 for automated runs)
+        self.pace = pace
         self.connected = False
+
+    def wait(self, seconds):
+        time.sleep(seconds * self.pace)
         
     def connect(self):
         """Connect to MQTT broker"""
         try:
-            print(f"🔌 Connecting to {MQTT_BROKER}:{MQTT_PORT}...")
+            print(f"🔌 Connecting to {self.broker}:{self.port}...")
             
             # Set credentials if available
             if MQTT_USERNAME and MQTT_PASSWORD:
                 self.client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
             
             # Enable TLS if required
-            if MQTT_USE_TLS:
+            if self.use_tls:
                 self.client.tls_set(
                     cert_reqs=ssl.CERT_REQUIRED,
                     tls_version=ssl.PROTOCOL_TLSv1_2
                 )
             
-            self.client.connect(MQTT_BROKER, MQTT_PORT, 60)
+            connected = threading.Event()
+            self.client.on_connect = lambda *args: connected.set()
+            self.client.connect(self.broker, self.port, 60)
             self.client.loop_start()
-            time.sleep(2)
+            if not connected.wait(10):
+                raise ConnectionError("no CONNACK within 10s")
             self.connected = True
             print("✅ Connected successfully!\n")
             return True
@@ -67,7 +82,7 @@ class TestScenarios:
         }
         
         topic = f'hostel/room1/{sensor_type}'
-        self.client.publish(topic, json.dumps(message))
+        self.client.publish(topic, json.dumps(message), qos=1)
         print(f"  ✅ Published {sensor_type}: {value}{unit}")
     
     def scenario_normal(self):
@@ -79,13 +94,13 @@ class TestScenarios:
         print()
         
         self.publish_value('temperature', 24, '°C')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('humidity', 50, '%')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('co2', 600, 'ppm')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('light', 400, 'lux')
-        time.sleep(2)
+        self.wait(2)
         
         print("\n✅ Scenario 1 complete - System should show all green")
     
@@ -99,7 +114,7 @@ class TestScenarios:
         print()
         
         self.publish_value('temperature', 35, '°C')
-        time.sleep(3)
+        self.wait(3)
         
         print("\n✅ Scenario 2 complete - Check alert system for BEEP!")
     
@@ -113,7 +128,7 @@ class TestScenarios:
         print()
         
         self.publish_value('temperature', 15, '°C')
-        time.sleep(3)
+        self.wait(3)
         
         print("\n✅ Scenario 3 complete - Check alert system for BEEP!")
     
@@ -127,7 +142,7 @@ class TestScenarios:
         print()
         
         self.publish_value('humidity', 85, '%')
-        time.sleep(3)
+        self.wait(3)
         
         print("\n✅ Scenario 4 complete - Check alert system for BEEP!")
     
@@ -141,7 +156,7 @@ class TestScenarios:
         print()
         
         self.publish_value('co2', 1500, 'ppm')
-        time.sleep(3)
+        self.wait(3)
         
         print("\n✅ Scenario 5 complete - Check alert system for BEEP!")
     
@@ -155,7 +170,7 @@ class TestScenarios:
         print()
         
         self.publish_value('light', 50, 'lux')
-        time.sleep(3)
+        self.wait(3)
         
         print("\n✅ Scenario 6 complete - Check alert system for BEEP!")
     
@@ -169,13 +184,13 @@ class TestScenarios:
         print()
         
         self.publish_value('temperature', 40, '°C')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('humidity', 90, '%')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('co2', 1800, 'ppm')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('light', 1000, 'lux')
-        time.sleep(5)
+        self.wait(5)
         
         print("\n✅ Scenario 7 complete - Check for MULTIPLE ALARMS!")
     
@@ -188,13 +203,13 @@ class TestScenarios:
         print()
         
         self.publish_value('temperature', 24, '°C')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('humidity', 50, '%')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('co2', 600, 'ppm')
-        time.sleep(0.5)
+        self.wait(0.5)
         self.publish_value('light', 400, 'lux')
-        time.sleep(2)
+        self.wait(2)
         
         print("\n✅ Scenario 8 complete - All alarms should be cleared")
     
@@ -222,9 +237,9 @@ class TestScenarios:
             print(f"\n\n{'='*60}")
             print(f"Running test {i}/{len(scenarios)}: {name}")
             print(f"{'='*60}")
-            time.sleep(2)
+            self.wait(2)
             scenario()
-            time.sleep(3)
+            self.wait(3)
         
         print("\n\n" + "="*60)
         print("✅ ALL SCENARIOS COMPLETE!")
@@ -249,7 +264,7 @@ def main():
     print("🧪 IoT MONITORING SYSTEM - TEST SCENARIOS")
     print("="*60)
     
-    tester = TestScenarios()
+    tester = ScenarioRunner()
     
     if not tester.connect():
         return
@@ -303,3 +318,35 @@ def main():
 
 if __name__ == "__main__":
     main()
+
+
+def test_scenarios_reach_subscribers(mqtt_broker):
+    """The scenarios' readings arrive through the embedded broker"""
+    received = []
+    done = threading.Event()
+    listener = mqtt.Client(client_id="scenario_listener", callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                           protocol=mqtt.MQTTv311)
+    listener.on_subscribe = lambda *args: done.set()
+    listener.on_message = lambda client, userdata, msg: received.append(
+        (msg.topic, json.loads(msg.payload)['value']))
+    listener.connect('127.0.0.1', mqtt_broker.port, 60)
+    listener.loop_start()
+    listener.subscribe('hostel/room1/+', qos=1)
+    assert done.wait(5)
+
+    runner = ScenarioRunner('127.0.0.1', mqtt_broker.port, use_tls=False, pace=0)
+    assert runner.connect()
+    runner.scenario_high_temp()
+    runner.scenario_emergency()
+    runner.scenario_clear_all()
+    deadline = time.monotonic() + 5
+    while len(received) < 9 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    runner.disconnect()
+    listener.loop_stop()
+    listener.disconnect()
+    assert received == [('hostel/room1/temperature', 35.0),
+                        ('hostel/room1/temperature', 40.0), ('hostel/room1/humidity', 90.0),
+                        ('hostel/room1/co2', 1800.0), ('hostel/room1/light', 1000.0),
+                        ('hostel/room1/temperature', 24.0), ('hostel/room1/humidity', 50.0),
+                        ('hostel/room1/co2', 600.0), ('hostel/room1/light', 400.0)]
@@ -0,0 +1,98 @@
+"""
+Alert Storm Tests
+Checks location grouping, storm open/update/close, audit-only delivery and per-sink rate limits
+"""
+import time
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.notify import Notification, NotificationDispatcher, parse_rate_limits
+from src.alerts.rules import RuleEngine
+from src.alerts.storm import StormGrouper
+
+PATTERN = r'^(?:(?P<building>[A-Za-z]+)-)?room(?P<floor>\d+)\d\d$'
+
+
+class RecordingSink:
+    def __init__(self, name, audit=False):
+        self.name = name
+        self.audit = audit
+        self.received = []
+
+    def send(self, n):
+        self.received.append(n)
+
+
+def alert(room, ts, kind='alert', sensor='temperature', severity='warning'):
+    n = Notification(kind, sensor, room, 'HIGH', severity if kind == 'alert' else None, 30, 28, '°C')
+    n.timestamp = ts
+    return n
+
+
+def test_rooms_are_placed_by_locations_then_pattern():
+    storm = StormGrouper(pattern=PATTERN, locations={'server_room': 'annex/0'}, building='hostel')
+    assert [storm.label(r) for r in ('room101', 'room1203', 'B-room204', 'server_room', 'lobby')] == \
+        ['hostel/1', 'hostel/12', 'B/2', 'annex/0', 'hostel']
+    assert StormGrouper(level='building', pattern=PATTERN).label('B-room204') == 'B'
+
+
+def test_storm_opens_updates_and_closes():
+    storm = StormGrouper(window=60, min_rooms=3, update_interval=10, pattern=PATTERN, building='hostel')
+    results = [storm.observe(alert(f"room2{i:02d}", 100.0 + i)) for i in range(6)]
+    # Two rooms pass through; the third opens the storm and is folded into it
+    assert [deliver for deliver, _ in results] == [True, True, False, False, False, False]
+    [opened] = results[2][1]
+    assert (opened.kind, opened.room, opened.value, opened.rooms) == \
+        ('storm', 'hostel/2', 3, ['room200', 'room201', 'room202'])
+    assert all(not grouped for _, grouped in results[3:])
+
+    # Another floor and another sensor are separate groups
+    assert storm.observe(alert('room301', 106.0)) == (True, [])
+    assert storm.observe(alert('room201', 106.0, sensor='humidity')) == (True, [])
+
+    [update] = storm.tick(now=113.0)
+    assert (update.kind, update.value, update.threshold) == ('storm_update', 6, 6)
+    assert storm.tick(now=114.0) == []
+
+    for i in range(5):
+        assert storm.observe(alert(f"room2{i:02d}", 115.0 + i, kind='clear')) == (False, [])
+    deliver, [closed] = storm.observe(alert('room205', 130.0, kind='clear'))
+    assert not deliver and (closed.kind, closed.value, closed.threshold) == ('storm_clear', 0, 6)
+    assert storm.active() == [] and storm.storms == 1 and storm.suppressed == 10
+    # The pass-through room's clear is delivered normally
+    assert storm.observe(alert('room301', 131.0, kind='clear')) == (True, [])
+
+
+def test_spread_out_alerts_and_flapping_room_do_not_open_a_storm():
+    storm = StormGrouper(window=60, min_rooms=3, pattern=PATTERN)
+    for i in range(10):
+        assert storm.observe(alert('room101', 10.0 * i))[0]
+        assert storm.observe(alert('room101', 10.0 * i + 5, kind='clear'))[0]
+    for i in range(5):
+        assert storm.observe(alert(f"room10{i}", 1000.0 + 100 * i))[0]
+    storm.tick(now=2000.0)
+    assert storm.storms == 0 and len(storm.groups) == 1
+
+
+def test_alert_system_sends_grouped_alerts_to_audit_sinks_only():
+    console, audit = RecordingSink('console'), RecordingSink('eventlog', audit=True)
+    dispatcher = NotificationDispatcher([console, audit]).start()
+    rules = RuleEngine({'defaults': {'temperature': {'unit': '°C', 'max': 28}},
+                        'storm': {'min_rooms': 3, 'pattern': PATTERN}})
+    alerts = AlertSystem(rules, dispatcher)
+    for i in range(20):
+        alerts.process_reading('temperature', 35, f"room3{i:02d}", '°C', now=1.0, hour=12)
+    dispatcher.stop()
+    assert alerts.alert_count == 20
+    assert [n.kind for n in console.received] == ['alert', 'alert', 'storm']
+    assert len(audit.received) == 21 and audit.received[-1].kind == 'alert'
+
+
+def test_rate_limit_per_sink():
+    assert parse_rate_limits('sound=1/10, webhook=30/60') == {'sound': (1.0, 10.0), 'webhook': (30.0, 60.0)}
+    sound, console = RecordingSink('sound'), RecordingSink('console')
+    dispatcher = NotificationDispatcher([sound, console], limits={'sound': (2, 10)}).start()
+    results = [dispatcher.submit(alert(f"room{i}", time.time())) for i in range(5)]
+    dispatcher.stop()
+    assert results == [True, True, False, False, False]
+    assert len(sound.received) == 2 and len(console.received) == 5
+    assert dispatcher.stats()['sound']['limited'] == 3
@@ -1,5 +1,8 @@
 """
 Quick System Test - Verify sensors are publishing and dashboard can receive
+
+`python tests/test_system.py` listens to a running system for 30 seconds;
+under pytest the listener is checked against the embedded broker fixture.
 """
 import paho.mqtt.client as mqtt
 import json
@@ -11,12 +14,12 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# MQTT Configuration
-MQTT_BROKER = os.getenv("MQTT_BROKER", "95c2f02d61404267847ebc19552f72b0.s1.eu.hivemq.cloud")
-MQTT_PORT = int(os.getenv("MQTT_PORT", 8883))
+# MQTT Configuration - without MQTT_BROKER, the embedded broker (python -m src.broker.server)
+MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
+MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true" if "MQTT_BROKER" in os.environ else "false").lower() == "true"
+MQTT_PORT = int(os.getenv("MQTT_PORT", 8883 if MQTT_USE_TLS else 1883))
 MQTT_USERNAME = os.getenv("MQTT_USERNAME")
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD")
-MQTT_USE_TLS = os.getenv("MQTT_USE_TLS", "true").lower() == "true"
 
 MQTT_TOPICS = [
     "hostel/room1/temperature",
@@ -31,7 +34,7 @@ messages_received = {topic: 0 for topic in MQTT_TOPICS}
 def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
-        print(f"✅ Connected to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}")
+        print(f"✅ Connected to MQTT broker")
         print(f"📡 Subscribing to topics:")
         for topic in MQTT_TOPICS:
             result = client.subscribe(topic, qos=1)
@@ -54,14 +57,8 @@ def on_message(client, userdata, msg):
     except Exception as e:
         print(f"❌ Error processing message: {e}")
 
-def main():
-    print("="*70)
-    print(" 🧪 IoT System Test - MQTT Message Listener")
-    print("="*70)
-    print("\nThis test will listen for sensor messages for 30 seconds...")
-    print("If sensors are running, you should see messages appearing.\n")
-    
-    # Create MQTT client
+def start_listener(broker=MQTT_BROKER, port=MQTT_PORT, use_tls=MQTT_USE_TLS):
+    """Listener client, connecting; it subscribes to MQTT_TOPICS once connected"""
     client = mqtt.Client(
         client_id=f"test_listener_{int(time.time())}",
         callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
@@ -76,16 +73,26 @@ def main():
         client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
     
     # Enable TLS
-    if MQTT_USE_TLS:
+    if use_tls:
         client.tls_set(
             cert_reqs=ssl.CERT_REQUIRED,
             tls_version=ssl.PROTOCOL_TLSv1_2
         )
     
     # Connect
-    print(f"🔌 Connecting to {MQTT_BROKER}:{MQTT_PORT}...")
-    client.connect(MQTT_BROKER, MQTT_PORT, keepalive=60)
+    print(f"🔌 Connecting to {broker}:{port}...")
+    client.connect(broker, port, keepalive=60)
     client.loop_start()
+    return client
+
+def main():
+    print("="*70)
+    print(" 🧪 IoT System Test - MQTT Message Listener")
+    print("="*70)
+    print("\nThis test will listen for sensor messages for 30 seconds...")
+    print("If sensors are running, you should see messages appearing.\n")
+    
+    client = start_listener()
     
     # Wait for messages
     print("\n⏱️  Listening for 30 seconds...\n")
@@ -106,7 +113,7 @@ def main():
         print("\nPossible issues:")
         print("1. Sensors are not running (run: .\\start.ps1)")
         print("2. MQTT credentials are wrong (check .env file)")
-        print("3. Firewall is blocking port 8883")
+        print(f"3. Firewall is blocking port {MQTT_PORT}")
         print("4. Sensors are publishing to different topics")
     else:
         print(f"✅ Received {total_messages} total messages:\n")
@@ -119,5 +126,31 @@ def main():
     
     print("="*70)
 
+
+def test_listener_counts_sensor_messages(mqtt_broker):
+    for topic in MQTT_TOPICS:
+        messages_received[topic] = 0
+    listener = start_listener('127.0.0.1', mqtt_broker.port, use_tls=False)
+    publisher = mqtt.Client(client_id="test_publisher", callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+                            protocol=mqtt.MQTTv311)
+    publisher.connect('127.0.0.1', mqtt_broker.port, 60)
+    publisher.loop_start()
+    # Publish once the broker holds all of the listener's subscriptions
+    deadline = time.monotonic() + 5
+    while sum(len(session.subscriptions) for session in mqtt_broker.sessions.values()) < len(MQTT_TOPICS):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    for topic in MQTT_TOPICS:
+        for value in (1.0, 2.0):
+            payload = {'sensor_type': topic.rsplit('/', 1)[-1], 'value': value, 'battery_level': 99.0}
+            publisher.publish(topic, json.dumps(payload), qos=1)
+    deadline = time.monotonic() + 5
+    while sum(messages_received.values()) < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for client in (publisher, listener):
+        client.loop_stop()
+        client.disconnect()
+    assert messages_received == {topic: 2 for topic in MQTT_TOPICS}
+
 if __name__ == "__main__":
     main()
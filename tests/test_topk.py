@@ -0,0 +1,132 @@
+"""
+Noisiest Sensor Tests
+Checks the Space-Saving bounds, batch counting, transition counting and the saved and merged tables
+"""
+import json
+import sys
+import threading
+from collections import Counter
+
+import numpy as np
+
+from src.alerts.alert_system import AlertSystem
+from src.alerts.batch import BatchEvaluator
+from src.alerts.rules import RuleEngine
+from src.alerts.topk import NoisySensors, SpaceSaving, load, worker_path
+
+
+def zipf_keys(n, sensors, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = (rng.zipf(1.3, n) - 1) % sensors
+    return [(f"room{i}", 'co2') for i in ids.tolist()]
+
+
+def check_bounds(summary, truth):
+    assert len(summary) <= summary.k
+    assert summary.total == sum(truth.values())
+    top = summary.top()
+    for key, count, error in top:
+        assert count - error <= truth[key] <= count
+    kept = {key for key, _, _ in top}
+    for key, true in truth.items():
+        if key not in kept:
+            assert true <= summary.floor
+        if true > summary.total / summary.k:
+            assert key in kept
+
+
+def test_space_saving_bounds():
+    keys = zipf_keys(50000, 5000)
+    summary = SpaceSaving(k=25, chunk=1000)
+    for key in keys:
+        summary.add(key)
+    truth = Counter(keys)
+    check_bounds(summary, truth)
+    # The heaviest sensors come out in order
+    assert [key for key, _, _ in summary.top(5)] == [key for key, _ in truth.most_common(5)]
+
+
+def test_prefiltered_updates_keep_the_bounds():
+    keys = zipf_keys(40000, 3000, seed=1)
+    summary = SpaceSaving(k=10)
+    for start in range(0, len(keys), 500):
+        chunk = Counter(keys[start:start + 500])
+        # What BatchEvaluator passes: the chunk's 2k largest plus the monitored keys
+        weights = dict(chunk.most_common(20))
+        weights.update({key: chunk[key] for key in summary.counts if key in chunk})
+        summary.update(weights, sum(chunk.values()))
+    check_bounds(summary, Counter(keys))
+
+
+def test_batch_counts_match_per_message_counts():
+    rules = RuleEngine({'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}})
+    alerts = AlertSystem(rules, top_k=5)
+    alerts.noisy.messages.chunk = 1000
+    evaluator = BatchEvaluator(alerts)
+    keys = zipf_keys(3000, 40, seed=2)
+    payload = json.dumps({'sensor_type': 'co2', 'value': 600, 'timestamp': '2024-01-01T00:00:00Z'}).encode()
+    for start in range(0, len(keys), 250):
+        evaluator.process([(f"hostel/{room}/co2", payload) for room, _ in keys[start:start + 250]], hour=12)
+    evaluator.count_messages()
+    check_bounds(alerts.noisy.messages, Counter(keys))
+
+
+def test_transitions_are_counted_and_saved(tmp_path):
+    alerts = AlertSystem(RuleEngine({'defaults': {'co2': {'unit': 'ppm', 'max': 1000}}}), top_k=3)
+    for i in range(40):
+        alerts.process_reading('co2', 1200 if i % 2 else 800, 'room9', now=float(i), hour=12)
+    for room in ('room1', 'room2', 'room3', 'room4'):
+        alerts.process_reading('co2', 1200, room, now=50.0, hour=12)
+    [(key, count, error)] = alerts.noisy.transitions.top(1)
+    assert key == ('room9', 'co2') and count == 39 and error == 0
+
+    path = tmp_path / 'topk.json'
+    alerts.noisy.save(str(path))
+    data = load(str(path))
+    assert data['transitions']['total'] == 43 and data['messages']['total'] == 0
+    assert data['transitions']['top'][0] == {'room': 'room9', 'sensor_type': 'co2', 'count': 39, 'error': 0}
+    assert len(data['transitions']['top']) == 3
+    assert load(str(tmp_path / 'missing.json')) is None
+    assert NoisySensors(2).to_dict()['messages']['top'] == []
+
+
+def test_keys_added_from_two_threads_are_all_counted():
+    summary = SpaceSaving(k=10, chunk=64)
+
+    def feed(room):
+        for _ in range(20000):
+            summary.add((room, 'co2'))
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=feed, args=(room,)) for room in ('room1', 'room2')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert sorted(summary.top()) == [(('room1', 'co2'), 20000, 0), (('room2', 'co2'), 20000, 0)]
+    assert summary.total == 40000
+
+
+def test_worker_tables_are_merged_on_load(tmp_path):
+    keys = zipf_keys(50000, 200, seed=4)
+    exact = Counter(keys)
+    path = str(tmp_path / 'topk.json')
+    # Two workers, each seeing every other sensor's messages
+    for worker in (0, 1):
+        noisy = NoisySensors(k=20)
+        noisy.messages.extend(key for key in keys if int(key[0][4:]) % 2 == worker)
+        noisy.save(worker_path(path, worker))
+    assert worker_path(path, 1) == str(tmp_path / 'topk.w1.json')
+
+    data = load(path)
+    assert data['messages']['total'] == 50000 and len(data['messages']['top']) == 20
+    for row in data['messages']['top']:
+        true = exact[row['room'], row['sensor_type']]
+        assert row['count'] - row['error'] <= true <= row['count']
+    # Every sensor above total / k is still listed
+    listed = {(row['room'], row['sensor_type']) for row in data['messages']['top']}
+    assert {key for key, count in exact.items() if count > 50000 / 20} <= listed
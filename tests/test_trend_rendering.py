@@ -0,0 +1,71 @@
+"""
+Trend Rendering Tests
+Checks versioned DataStore deltas and the WebGL trend chart session
+"""
+from datetime import datetime, timedelta
+
+from src.dashboard.charts import TrendChartSession, create_trend_chart
+from src.dashboard.data_store import DataStore
+
+
+def add_points(store, count, start=0):
+    base = datetime(2024, 1, 1)
+    for i in range(start, start + count):
+        ts = (base + timedelta(seconds=3 * i)).isoformat() + 'Z'
+        store.add_data('temperature', 20 + i, ts, 100.0)
+
+
+def test_get_data_since_returns_only_new_points():
+    store = DataStore(maxlen=10)
+    add_points(store, 5)
+    points, version = store.get_data_since('temperature', 3)
+    assert version == 5
+    assert [p['value'] for p in points] == [23, 24]
+    assert store.get_data_since('temperature', 5) == ([], 5)
+
+
+def test_get_data_since_resyncs_after_overflow_and_clear():
+    store = DataStore(maxlen=10)
+    add_points(store, 25)
+    points, version = store.get_data_since('temperature', 2)
+    assert len(points) == 10 and version == 25
+    store.clear_all()
+    points, version = store.get_data_since('temperature', 25)
+    assert points == [] and version - 25 != len(points)
+
+
+def test_webgl_chart_drops_markers_above_threshold():
+    store = DataStore(maxlen=100)
+    add_points(store, 50)
+    data = store.get_data('temperature')
+    small = create_trend_chart(data, "Temperature", "#FF6B6B", "°C", webgl=True, marker_threshold=60)
+    large = create_trend_chart(data, "Temperature", "#FF6B6B", "°C", webgl=True, marker_threshold=10)
+    assert small.data[0].type == 'scattergl' and small.data[0].mode == 'lines+markers'
+    assert large.data[0].mode == 'lines'
+
+
+def test_trend_session_ships_deltas_after_first_render():
+    store = DataStore(maxlen=100)
+    add_points(store, 5)
+    session = TrendChartSession(store, 'temperature', "Temperature", "#FF6B6B", "°C")
+    kind, _ = session.refresh()
+    assert kind == 'full'
+    assert session.refresh() == ('none', None)
+
+    add_points(store, 2, start=5)
+    kind, delta = session.refresh()
+    assert kind == 'delta'
+    assert delta['update']['y'] == [[25.0, 26.0]]
+    assert delta['max_points'] == 100
+
+
+def test_trend_session_redraws_when_marker_threshold_crossed():
+    store = DataStore(maxlen=100)
+    add_points(store, 3)
+    session = TrendChartSession(store, 'temperature', "Temperature", "#FF6B6B", "°C",
+                                marker_threshold=4)
+    session.refresh()
+    add_points(store, 3, start=3)
+    kind, fig = session.refresh()
+    assert kind == 'full'
+    assert fig.data[0].mode == 'lines'